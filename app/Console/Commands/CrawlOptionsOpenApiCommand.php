@@ -4,6 +4,7 @@
 
 use Illuminate\Console\Command;
 use App\Services\TaifexOpenApiService;
+use App\Services\OptionCubeService;
 use App\Models\Option;
 use App\Models\OptionPrice;
 use Illuminate\Support\Facades\DB;
@@ -98,6 +99,9 @@ public function handle()
 
             $result = $this->saveToDatabase($cleanedData);
 
+            // 更新選擇權分析立方體（只重算有變動的交易日）
+            app(OptionCubeService::class)->refresh();
+
             $this->newLine();
             $this->info('========================================');
             $this->info('📊 執行結果');
@@ -5,6 +5,7 @@
 use Illuminate\Console\Command;
 use App\Models\Option;
 use App\Models\OptionPrice;
+use App\Services\OptionCubeService;
 use Carbon\Carbon;
 use Illuminate\Support\Facades\DB;
 use Illuminate\Support\Facades\Log;
@@ -272,6 +273,16 @@ protected function importData($headers, $rows, $createOptions)
             $this->info("   建立選擇權: " . count($uniqueOptions) . " 個");
         }
 
+        // 更新選擇權分析立方體（只重算有變動的交易日）
+        if ($successCount > 0) {
+            $cube = app(OptionCubeService::class)->refresh();
+            if ($cube['success'] ?? false) {
+                $this->info("   分析立方體: 重算 {$cube['dates']} 個交易日");
+            } else {
+                $this->warn('   分析立方體更新失敗: ' . ($cube['error'] ?? ''));
+            }
+        }
+
         return Command::SUCCESS;
     }
 
@@ -41,6 +41,51 @@ protected function schedule(Schedule $schedule): void
             ->withoutOverlapping()
             ->appendOutputTo(storage_path('logs/crawler.log'));
 
+        // 每天下午 2:30 以當日收盤價評分已到期的預測，更新 prediction_accuracies 摘要
+        $schedule->exec(env('PYTHON_PATH', 'python3') . ' ' . base_path('python/score_predictions.py'))
+            ->dailyAt('14:30')
+            ->weekdays()
+            ->timezone('Asia/Taipei')
+            ->runInBackground()
+            ->withoutOverlapping()
+            ->appendOutputTo(storage_path('logs/prediction_accuracy.log'));
+
+        // 每天下午 2:35 從資料庫重建模型端股價快取，供之後的配對掃描、序列篩檢與預先計算預測讀取
+        $schedule->exec(env('PYTHON_PATH', 'python3') . ' ' . base_path('python/price_cache.py'))
+            ->dailyAt('14:35')
+            ->weekdays()
+            ->timezone('Asia/Taipei')
+            ->runInBackground()
+            ->withoutOverlapping()
+            ->appendOutputTo(storage_path('logs/price_cache.log'));
+
+        // 每天下午 2:40 增量更新配對共整合結果（每週自動重新全掃描）
+        $schedule->exec(env('PYTHON_PATH', 'python3') . ' ' . base_path('python/pairs_scanner.py'))
+            ->dailyAt('14:40')
+            ->weekdays()
+            ->timezone('Asia/Taipei')
+            ->runInBackground()
+            ->withoutOverlapping()
+            ->appendOutputTo(storage_path('logs/pairs_scanner.log'));
+
+        // 每天下午 3:00 以 2:35 重建的股價快取篩檢全市場序列相關與 ARCH 效應，供 GARCH / ARIMA 略過不必要的模型搜尋
+        $schedule->exec(env('PYTHON_PATH', 'python3') . ' ' . base_path('python/screen_series.py'))
+            ->dailyAt('15:00')
+            ->weekdays()
+            ->timezone('Asia/Taipei')
+            ->runInBackground()
+            ->withoutOverlapping()
+            ->appendOutputTo(storage_path('logs/series_screening.log'));
+
+        // 每天下午 3:10 以 2:35 重建的股價快取預先計算下一交易日的 ARIMA / GARCH 預測（觀察清單優先，其餘依成交值排序，休市日自動略過）
+        $schedule->exec(env('PYTHON_PATH', 'python3') . ' ' . base_path('python/precompute_forecasts.py') . ' --universe --budget-seconds=3600')
+            ->dailyAt('15:10')
+            ->weekdays()
+            ->timezone('Asia/Taipei')
+            ->runInBackground()
+            ->withoutOverlapping()
+            ->appendOutputTo(storage_path('logs/precompute_forecasts.log'));
+
         // 每週一早上 8:00 更新公司基本資料
         // $schedule->command('crawler:company-info')
         //     ->weeklyOn(1, '08:00')
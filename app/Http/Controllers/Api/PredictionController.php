@@ -5,6 +5,7 @@
 use App\Http\Controllers\Controller;
 use App\Models\Option;
 use App\Models\Prediction;
+use App\Models\PredictionAccuracy;
 use App\Models\Stock;
 use App\Services\PredictionService;
 use Illuminate\Http\JsonResponse;
@@ -24,7 +25,9 @@
  *   POST /api/predictions/lstm
  *   POST /api/predictions/arima
  *   POST /api/predictions/garch
+ *   POST /api/predictions/har
  *   GET  /api/predictions/history
+ *   GET  /api/predictions/accuracy
  *   GET  /api/predictions/{id}
  */
 class PredictionController extends Controller
@@ -97,7 +100,7 @@ public function history(Request $request): JsonResponse
         $validator = Validator::make($request->all(), [
             'stock_symbol'    => 'nullable|string',
             'underlying'      => 'nullable|string',
-            'model_type'      => 'nullable|in:lstm,arima,garch',
+            'model_type'      => 'nullable|in:lstm,arima,garch,har',
             'days'            => 'nullable|integer|min:1|max:365',
         ]);
 
@@ -149,6 +152,69 @@ public function history(Request $request): JsonResponse
         }
     }
 
+    // ==========================================
+    // GET /api/predictions/accuracy
+    // 預測準確度摘要（讀取 prediction_accuracies，不逐筆重算）
+    // ==========================================
+
+    public function accuracy(Request $request): JsonResponse
+    {
+        $validator = Validator::make($request->all(), [
+            'stock_symbol' => 'nullable|string',
+            'model_type'   => 'nullable|in:lstm,arima,garch,har',
+            'group_by'     => 'nullable|in:model,model_horizon,model_stock,detail',
+        ]);
+
+        if ($validator->fails()) {
+            return response()->json([
+                'success' => false,
+                'errors'  => $validator->errors(),
+            ], 422);
+        }
+
+        try {
+            $query = PredictionAccuracy::query();
+
+            if ($request->has('stock_symbol')) {
+                $stock = Stock::where('symbol', $request->input('stock_symbol'))->firstOrFail();
+                $query->where('predictable_type', Stock::class)
+                      ->where('predictable_id', $stock->id);
+            }
+
+            if ($request->has('model_type')) {
+                $query->where('model_type', $request->input('model_type'));
+            }
+
+            $groupBy = $request->input('group_by', 'model_horizon');
+
+            if ($groupBy === 'detail') {
+                $data = $query->with('predictable')
+                    ->orderBy('model_type')
+                    ->orderBy('horizon')
+                    ->get();
+            } else {
+                $columns = [
+                    'model'         => ['model_type'],
+                    'model_horizon' => ['model_type', 'horizon'],
+                    'model_stock'   => ['model_type', 'predictable_id'],
+                ][$groupBy];
+                $data = PredictionAccuracy::rollup($query, $columns);
+            }
+
+            return response()->json([
+                'success' => true,
+                'data'    => $data,
+            ]);
+        } catch (\Exception $e) {
+            Log::error('取得預測準確度失敗', ['error' => $e->getMessage()]);
+
+            return response()->json([
+                'success' => false,
+                'message' => '查詢失敗: ' . $e->getMessage(),
+            ], 500);
+        }
+    }
+
     // ==========================================
     // GET /api/predictions/{id}
     // 取得單筆預測詳情
@@ -187,7 +253,7 @@ public function run(Request $request): JsonResponse
         $validator = Validator::make($request->all(), [
             'stock_symbol'   => 'nullable|string',
             'underlying'     => 'nullable|string',
-            'model_type'     => 'required|in:lstm,arima,garch',
+            'model_type'     => 'required|in:lstm,arima,garch,har',
             'prediction_days'=> 'nullable|integer|min:1|max:30',
             'parameters'     => 'nullable|array',
         ]);
@@ -247,6 +313,7 @@ public function run(Request $request): JsonResponse
     // POST /api/predictions/lstm
     // POST /api/predictions/arima
     // POST /api/predictions/garch
+    // POST /api/predictions/har
     // 個別模型捷徑
     // ==========================================
 
@@ -268,6 +335,12 @@ public function garch(Request $request): JsonResponse
         return $this->run($request);
     }
 
+    public function har(Request $request): JsonResponse
+    {
+        $request->merge(['model_type' => 'har']);
+        return $this->run($request);
+    }
+
     // ==========================================
     // 私有輔助方法
     // ==========================================
@@ -293,6 +366,7 @@ private function handleStockPrediction(
             'lstm'  => $this->predictionService->runLSTMPrediction($stock, $predictionDays, $parameters),
             'arima' => $this->predictionService->runARIMAPrediction($stock, $predictionDays, $parameters),
             'garch' => $this->predictionService->runGARCHPrediction($stock, $predictionDays, $parameters),
+            'har'   => $this->predictionService->runHARPrediction($stock, $predictionDays, $parameters),
         };
 
         if (!$result['success']) {
@@ -341,6 +415,7 @@ private function handleTxoPrediction(
             'lstm'  => $this->predictionService->runTxoMarketLSTMPrediction($underlying, $predictionDays, $parameters),
             'arima' => $this->predictionService->runTxoMarketARIMAPrediction($underlying, $predictionDays, $parameters),
             'garch' => $this->predictionService->runTxoMarketGARCHPrediction($underlying, $predictionDays, $parameters),
+            'har'   => $this->predictionService->runTxoMarketHARPrediction($underlying, $predictionDays, $parameters),
         };
 
         if (!$result['success']) {
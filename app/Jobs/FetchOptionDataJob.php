@@ -9,6 +9,7 @@
 use App\Services\TaifexApiService;
 use App\Services\TaifexOpenApiService;
 use App\Services\OptionDataCleanerService;
+use App\Services\OptionCubeService;
 use Illuminate\Bus\Queueable;
 use Illuminate\Contracts\Queue\ShouldQueue;
 use Illuminate\Foundation\Bus\Dispatchable;
@@ -116,6 +117,9 @@ public function handle(
 
             DB::commit();
 
+            // === 步驟 8: 更新選擇權分析立方體（只重算有變動的交易日） ===
+            app(OptionCubeService::class)->refresh();
+
             $duration = round(microtime(true) - $startTime, 2);
 
             Log::info('選擇權資料爬蟲執行完成', [
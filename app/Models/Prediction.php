@@ -19,6 +19,7 @@ class Prediction extends Model
         'predictable_id',     // 多型：對應的 id
         'model_type',         // LSTM / ARIMA / GARCH
         'prediction_date',    // 預測執行日期
+        'base_date',          // 預測基準日（輸入最後價格日）
         'prediction_days',    // 預測天數
         'predicted_price',    // 預測價格
         'predicted_volatility', // 預測波動率
@@ -39,6 +40,7 @@ class Prediction extends Model
      */
     protected $casts = [
         'prediction_date'     => 'date',
+        'base_date'           => 'date',
         'prediction_days'     => 'integer',
         'predicted_price'     => 'decimal:4',
         'predicted_volatility'=> 'decimal:6',
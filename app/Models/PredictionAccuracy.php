@@ -0,0 +1,106 @@
+<?php
+
+namespace App\Models;
+
+use Illuminate\Database\Eloquent\Model;
+use Illuminate\Database\Eloquent\Relations\MorphTo;
+use Illuminate\Support\Facades\DB;
+
+/**
+ * 預測準確度摘要（模型 × 標的 × 預測天數）
+ * 由 python/score_predictions.py 批次累加，頁面只讀取不重算
+ */
+class PredictionAccuracy extends Model
+{
+    protected $fillable = [
+        'predictable_type',
+        'predictable_id',
+        'model_type',
+        'horizon',
+        'sample_count',
+        'sum_error',
+        'sum_abs_error',
+        'sum_squared_error',
+        'sum_abs_pct_error',
+        'interval_count',
+        'interval_hits',
+        'direction_count',
+        'direction_hits',
+        'mae',
+        'rmse',
+        'mape',
+        'bias',
+        'coverage',
+        'direction_accuracy',
+        'first_target_date',
+        'last_target_date',
+    ];
+
+    protected $casts = [
+        'horizon'            => 'integer',
+        'sample_count'       => 'integer',
+        'interval_count'     => 'integer',
+        'interval_hits'      => 'integer',
+        'direction_count'    => 'integer',
+        'direction_hits'     => 'integer',
+        'mae'                => 'decimal:6',
+        'rmse'               => 'decimal:6',
+        'mape'               => 'decimal:4',
+        'bias'               => 'decimal:6',
+        'coverage'           => 'decimal:2',
+        'direction_accuracy' => 'decimal:2',
+        'first_target_date'  => 'date',
+        'last_target_date'   => 'date',
+    ];
+
+    public function predictable(): MorphTo
+    {
+        return $this->morphTo();
+    }
+
+    /**
+     * 依指定欄位彙總（例如 ['model_type'] 為各模型整體、['model_type', 'horizon'] 為各模型各天數）
+     * 由充分統計量加總後重算指標，結果與逐筆計算相同
+     *
+     * @param \Illuminate\Database\Eloquent\Builder $query
+     * @param array $groupBy 分組欄位
+     */
+    public static function rollup($query, array $groupBy): array
+    {
+        return $query->select($groupBy)
+            ->addSelect([
+                DB::raw('SUM(sample_count) as sample_count'),
+                DB::raw('SUM(sum_error) as sum_error'),
+                DB::raw('SUM(sum_abs_error) as sum_abs_error'),
+                DB::raw('SUM(sum_squared_error) as sum_squared_error'),
+                DB::raw('SUM(sum_abs_pct_error) as sum_abs_pct_error'),
+                DB::raw('SUM(interval_count) as interval_count'),
+                DB::raw('SUM(interval_hits) as interval_hits'),
+                DB::raw('SUM(direction_count) as direction_count'),
+                DB::raw('SUM(direction_hits) as direction_hits'),
+                DB::raw('MAX(last_target_date) as last_target_date'),
+            ])
+            ->groupBy($groupBy)
+            ->orderBy($groupBy[0])
+            ->get()
+            ->map(function ($row) use ($groupBy) {
+                $n = (int) $row->sample_count;
+                $result = [];
+                foreach ($groupBy as $column) {
+                    $result[$column] = $row->{$column};
+                }
+
+                return $result + [
+                    'sample_count'       => $n,
+                    'mae'                => $n ? round($row->sum_abs_error / $n, 4) : null,
+                    'rmse'               => $n ? round(sqrt($row->sum_squared_error / $n), 4) : null,
+                    'mape'               => $n ? round($row->sum_abs_pct_error / $n, 2) : null,
+                    'bias'               => $n ? round($row->sum_error / $n, 4) : null,
+                    'coverage'           => $row->interval_count ? round($row->interval_hits / $row->interval_count * 100, 2) : null,
+                    'direction_accuracy' => $row->direction_count ? round($row->direction_hits / $row->direction_count * 100, 2) : null,
+                    'last_target_date'   => $row->last_target_date,
+                ];
+            })
+            ->all();
+    }
+}
@@ -12,6 +12,22 @@
  */
 class OptionAnalysisService
 {
+    protected OptionCubeService $cube;
+
+    public function __construct(OptionCubeService $cube)
+    {
+        $this->cube = $cube;
+    }
+
+    /**
+     * 立方體已涵蓋到指定日期時改讀預先彙總的 option_daily_stats / option_cube
+     */
+    private function cubeCovers(string $date): bool
+    {
+        $latest = $this->cube->latestDate();
+        return $latest !== null && $latest >= $date && $this->cube->hasDate($date);
+    }
+
     private function getLatestTradeDate(): string
     {
         $latest = DB::table('option_prices')->max('trade_date');
@@ -28,18 +44,31 @@ public function getTxoTrend(int $days = 30): array
             $startDate = Carbon::parse($endDate)->subDays($days)->format('Y-m-d');
 
             // 修正：使用 COALESCE 確保數值不為 NULL
-            $trendData = DB::table('option_prices')
-                ->select(
-                    'trade_date',
-                    DB::raw('AVG(COALESCE(close, open, 0)) as avg_close'), // 優先取 close，沒有則取 open，再沒有補 0
-                    DB::raw('MAX(high) as max_high'),
-                    DB::raw('MIN(low) as min_low'),
-                    DB::raw('SUM(volume) as total_volume')
-                )
-                ->whereBetween('trade_date', [$startDate, $endDate])
-                ->groupBy('trade_date')
-                ->orderBy('trade_date', 'asc')
-                ->get();
+            $trendData = $this->cubeCovers($endDate)
+                ? DB::table('option_daily_stats')
+                    ->select(
+                        'trade_date',
+                        DB::raw('SUM(close_sum) / NULLIF(SUM(contracts), 0) as avg_close'),
+                        DB::raw('MAX(high) as max_high'),
+                        DB::raw('MIN(low) as min_low'),
+                        DB::raw('SUM(total_volume) as total_volume')
+                    )
+                    ->whereBetween('trade_date', [$startDate, $endDate])
+                    ->groupBy('trade_date')
+                    ->orderBy('trade_date', 'asc')
+                    ->get()
+                : DB::table('option_prices')
+                    ->select(
+                        'trade_date',
+                        DB::raw('AVG(COALESCE(close, open, 0)) as avg_close'), // 優先取 close，沒有則取 open，再沒有補 0
+                        DB::raw('MAX(high) as max_high'),
+                        DB::raw('MIN(low) as min_low'),
+                        DB::raw('SUM(volume) as total_volume')
+                    )
+                    ->whereBetween('trade_date', [$startDate, $endDate])
+                    ->groupBy('trade_date')
+                    ->orderBy('trade_date', 'asc')
+                    ->get();
 
             return [
                 'success' => true,
@@ -65,15 +94,21 @@ public function getVolumeAnalysis(?string $date = null): array
     {
         try {
             $date = $date ?: $this->getLatestTradeDate();
-            $stats = DB::table('option_prices')
-                ->join('options', 'option_prices.option_id', '=', 'options.id')
-                ->select('options.option_type', DB::raw('SUM(option_prices.volume) as total_volume'))
-                ->where('option_prices.trade_date', $date)
-                ->groupBy('options.option_type')
-                ->get();
+            if ($this->cubeCovers($date)) {
+                $totals = $this->cube->dailyTotals($date);
+                $callVolume = $totals->call_volume ?? 0;
+                $putVolume = $totals->put_volume ?? 0;
+            } else {
+                $stats = DB::table('option_prices')
+                    ->join('options', 'option_prices.option_id', '=', 'options.id')
+                    ->select('options.option_type', DB::raw('SUM(option_prices.volume) as total_volume'))
+                    ->where('option_prices.trade_date', $date)
+                    ->groupBy('options.option_type')
+                    ->get();
 
-            $callVolume = $stats->firstWhere('option_type', 'call')->total_volume ?? 0;
-            $putVolume = $stats->firstWhere('option_type', 'put')->total_volume ?? 0;
+                $callVolume = $stats->firstWhere('option_type', 'call')->total_volume ?? 0;
+                $putVolume = $stats->firstWhere('option_type', 'put')->total_volume ?? 0;
+            }
             $totalVolume = $callVolume + $putVolume;
 
             return [
@@ -98,15 +133,21 @@ public function getOiAnalysis(?string $date = null): array
     {
         try {
             $date = $date ?: $this->getLatestTradeDate();
-            $stats = DB::table('option_prices')
-                ->join('options', 'option_prices.option_id', '=', 'options.id')
-                ->select('options.option_type', DB::raw('SUM(option_prices.open_interest) as total_oi'))
-                ->where('option_prices.trade_date', $date)
-                ->groupBy('options.option_type')
-                ->get();
+            if ($this->cubeCovers($date)) {
+                $totals = $this->cube->dailyTotals($date);
+                $callOi = $totals->call_oi ?? 0;
+                $putOi = $totals->put_oi ?? 0;
+            } else {
+                $stats = DB::table('option_prices')
+                    ->join('options', 'option_prices.option_id', '=', 'options.id')
+                    ->select('options.option_type', DB::raw('SUM(option_prices.open_interest) as total_oi'))
+                    ->where('option_prices.trade_date', $date)
+                    ->groupBy('options.option_type')
+                    ->get();
 
-            $callOi = $stats->firstWhere('option_type', 'call')->total_oi ?? 0;
-            $putOi = $stats->firstWhere('option_type', 'put')->total_oi ?? 0;
+                $callOi = $stats->firstWhere('option_type', 'call')->total_oi ?? 0;
+                $putOi = $stats->firstWhere('option_type', 'put')->total_oi ?? 0;
+            }
             $totalOi = $callOi + $putOi;
 
             return [
@@ -132,6 +173,27 @@ public function getIvAnalysis(int $days = 30): array
         try {
             $endDate = $this->getLatestTradeDate();
             $startDate = Carbon::parse($endDate)->subDays($days)->format('Y-m-d');
+
+            if ($this->cubeCovers($endDate)) {
+                $rows = DB::table('option_daily_stats')
+                    ->select(
+                        'trade_date',
+                        DB::raw('SUM(call_iv_sum) / NULLIF(SUM(call_iv_count), 0) as call_iv'),
+                        DB::raw('SUM(put_iv_sum) / NULLIF(SUM(put_iv_count), 0) as put_iv')
+                    )
+                    ->whereBetween('trade_date', [$startDate, $endDate])
+                    ->groupBy('trade_date')
+                    ->havingRaw('SUM(call_iv_count) + SUM(put_iv_count) > 0')
+                    ->orderBy('trade_date')
+                    ->get();
+
+                return ['success' => true, 'data' => $rows->map(fn($row) => [
+                    'date' => $row->trade_date,
+                    'call_iv' => $row->call_iv !== null ? round($row->call_iv, 2) : 0,
+                    'put_iv' => $row->put_iv !== null ? round($row->put_iv, 2) : 0,
+                ])->values()->all()];
+            }
+
             $ivData = DB::table('option_prices')
                 ->join('options', 'option_prices.option_id', '=', 'options.id')
                 ->select('option_prices.trade_date', 'options.option_type', DB::raw('AVG(option_prices.implied_volatility) as avg_iv'))
@@ -161,13 +223,20 @@ public function getOiDistribution(?string $date = null): array
     {
         try {
             $date = $date ?: $this->getLatestTradeDate();
-            $data = DB::table('option_prices')
-                ->join('options', 'option_prices.option_id', '=', 'options.id')
-                ->select('options.strike_price', 'options.option_type', DB::raw('SUM(option_prices.open_interest) as oi'))
-                ->where('option_prices.trade_date', $date)
-                ->groupBy('options.strike_price', 'options.option_type')
-                ->orderBy('options.strike_price')
-                ->get();
+            $data = $this->cubeCovers($date)
+                ? DB::table('option_cube')
+                    ->select('strike_price', 'option_type', DB::raw('SUM(open_interest) as oi'))
+                    ->where('trade_date', $date)
+                    ->groupBy('strike_price', 'option_type')
+                    ->orderBy('strike_price')
+                    ->get()
+                : DB::table('option_prices')
+                    ->join('options', 'option_prices.option_id', '=', 'options.id')
+                    ->select('options.strike_price', 'options.option_type', DB::raw('SUM(option_prices.open_interest) as oi'))
+                    ->where('option_prices.trade_date', $date)
+                    ->groupBy('options.strike_price', 'options.option_type')
+                    ->orderBy('options.strike_price')
+                    ->get();
 
             $strikes = [];
             foreach ($data as $row) {
@@ -191,7 +260,12 @@ public function getSentiment(?string $date = null): array
             $date = $date ?: $this->getLatestTradeDate();
             $vol = $this->getVolumeAnalysis($date)['data'];
             $oi = $this->getOiAnalysis($date)['data'];
-            $avgIv = DB::table('option_prices')->where('trade_date', $date)->avg('implied_volatility');
+            if ($this->cubeCovers($date)) {
+                $totals = $this->cube->dailyTotals($date);
+                $avgIv = $totals->iv_count > 0 ? $totals->iv_sum / $totals->iv_count : null;
+            } else {
+                $avgIv = DB::table('option_prices')->where('trade_date', $date)->avg('implied_volatility');
+            }
             $pcr = $vol['put_call_volume_ratio'];
 
             $sentiment = ($pcr > 1.1) ? ['description' => '偏空', 'color' => 'error'] : (($pcr < 0.9) ? ['description' => '偏多', 'color' => 'success'] : ['description' => '中性', 'color' => 'grey']);
@@ -0,0 +1,78 @@
+<?php
+
+namespace App\Services;
+
+use Illuminate\Support\Facades\DB;
+use Illuminate\Support\Facades\Log;
+use Illuminate\Support\Facades\Process;
+
+/**
+ * 選擇權分析立方體服務
+ * option_cube / option_daily_stats 由 python/option_cube.py 維護，期交所資料匯入後呼叫 refresh()
+ */
+class OptionCubeService
+{
+    /**
+     * 重算立方體（未指定日期時只重算原始資料有變動的交易日）
+     *
+     * @param array $dates 強制重算的交易日
+     */
+    public function refresh(array $dates = []): array
+    {
+        $command = [env('PYTHON_PATH', 'python3'), base_path('python/option_cube.py')];
+        if (!empty($dates)) {
+            $command[] = '--date=' . implode(',', array_unique($dates));
+        }
+
+        $result = Process::timeout(600)->run($command);
+        $output = json_decode($result->output(), true);
+
+        if (!$result->successful() || !($output['success'] ?? false)) {
+            Log::warning('選擇權立方體更新失敗', [
+                'error' => $output['error'] ?? $result->errorOutput(),
+                'exit_code' => $result->exitCode(),
+            ]);
+            return ['success' => false, 'error' => $output['error'] ?? 'option_cube.py 執行失敗'];
+        }
+
+        Log::info('選擇權立方體更新完成', $output);
+        return $output;
+    }
+
+    /**
+     * 立方體是否已涵蓋指定交易日（尚未建立或資料表不存在時由呼叫端改用原始查詢）
+     */
+    public function hasDate(string $date): bool
+    {
+        try {
+            return DB::table('option_daily_stats')->where('trade_date', $date)->exists();
+        } catch (\Exception $e) {
+            return false;
+        }
+    }
+
+    /**
+     * 立方體涵蓋的最新交易日
+     */
+    public function latestDate(): ?string
+    {
+        try {
+            return DB::table('option_daily_stats')->max('trade_date');
+        } catch (\Exception $e) {
+            return null;
+        }
+    }
+
+    /**
+     * 指定交易日全部標的加總的每日統計（與原始資料 GROUP BY 相同口徑）
+     */
+    public function dailyTotals(string $date): ?object
+    {
+        return DB::table('option_daily_stats')
+            ->where('trade_date', $date)
+            ->selectRaw('SUM(call_volume) as call_volume, SUM(put_volume) as put_volume')
+            ->selectRaw('SUM(call_oi) as call_oi, SUM(put_oi) as put_oi')
+            ->selectRaw('SUM(call_iv_sum) + SUM(put_iv_sum) as iv_sum, SUM(call_iv_count) + SUM(put_iv_count) as iv_count')
+            ->first();
+    }
+}
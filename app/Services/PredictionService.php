@@ -25,6 +25,9 @@ private function getPythonModelsPath(): string
         'lstm'  => 'lstm_model.py',
         'arima' => 'arima_model.py',
         'garch' => 'garch_model.py',
+        'har'   => 'har_model.py',
+        // 以匯出權重進行純 NumPy 推論，不載入 TensorFlow
+        'lstm_numpy' => 'lstm_numpy_model.py',
     ];
 
     protected TxoMarketIndexService $txoIndexService;
@@ -63,17 +66,29 @@ public function runLSTMPrediction(Stock $stock, int $predictionDays = 7, array $
                 'base_date'       => Carbon::now()->format('Y-m-d'),
                 'prediction_days' => $predictionDays,
                 'stock_symbol'    => $stock->symbol,
-                'epochs'          => $parameters['epochs']  ?? 100,
-                'units'           => $parameters['units']   ?? 128,
-                'lookback'        => $parameters['lookback'] ?? 60,
-                'dropout'         => $parameters['dropout'] ?? 0.2,
-            ];
+                // 未指定時由 Python 端沿用超參數搜尋保存的最佳設定，否則為 100 / 128 / 60 / 0.2
+                'epochs'          => $parameters['epochs']  ?? null,
+                'units'           => $parameters['units']   ?? null,
+                'lookback'        => $parameters['lookback'] ?? null,
+                'dropout'         => $parameters['dropout'] ?? null,
+                'use_best_config' => $parameters['use_best_config'] ?? true,
+                // 快速訓練：tf.data 快取視窗與自適應批次大小
+                'fast_train'      => $parameters['fast_train'] ?? false,
+                'export_path'     => $this->getLstmWeightsPath($stock->symbol),
+            ] + $this->getValidationInput($prices, $parameters);
+
+            // 已有訓練好的權重時可直接以 NumPy 推論，省去重新訓練與載入 TensorFlow
+            $useSavedModel = ($parameters['use_saved_model'] ?? false) && file_exists($inputData['export_path']);
+            if ($useSavedModel) {
+                $inputData['weights_path'] = $inputData['export_path'];
+            }
 
-            $result = $this->executePythonModel('lstm', $inputData);
+            $result = $this->getPrecomputedForecast($stock, 'lstm', $predictionDays, $parameters, $prices, $inputData)
+                ?? $this->executePythonModel($useSavedModel ? 'lstm_numpy' : 'lstm', $inputData);
 
             if ($result['success']) {
                 // ✅ 儲存股票預測結果（使用 morphs 欄位）
-                $this->saveStockPredictions($stock, 'lstm', $result['predictions'] ?? [], $parameters);
+                $this->saveStockPredictions($stock, 'lstm', $result['predictions'] ?? [], $parameters, $prices);
                 $result['historical_prices'] = $prices;
             }
 
@@ -107,13 +122,16 @@ public function runARIMAPrediction(Stock $stock, int $predictionDays = 7, array
                 'd'               => $parameters['d'] ?? null,
                 'q'               => $parameters['q'] ?? null,
                 'auto_select'     => $parameters['auto_select'] ?? true,
-            ];
+                'fit_method'      => $parameters['fit_method'] ?? 'exact',
+            ] + $this->getValidationInput($prices, $parameters);
 
-            $result = $this->executePythonModel('arima', $inputData);
+            // 收盤後已預先計算且資料日仍為最新時直接回傳，否則即時計算
+            $result = $this->getPrecomputedForecast($stock, 'arima', $predictionDays, $parameters, $prices, $inputData)
+                ?? $this->executePythonModel('arima', $inputData);
 
             if ($result['success']) {
                 // ✅ 儲存股票預測結果
-                $this->saveStockPredictions($stock, 'arima', $result['predictions'] ?? [], $parameters);
+                $this->saveStockPredictions($stock, 'arima', $result['predictions'] ?? [], $parameters, $prices);
                 $result['historical_prices'] = $prices;
             }
 
@@ -145,13 +163,55 @@ public function runGARCHPrediction(Stock $stock, int $predictionDays = 7, array
                 'p'               => $parameters['p'] ?? 1,
                 'q'               => $parameters['q'] ?? 1,
                 'dist'            => $parameters['dist'] ?? 'normal',
-            ];
+                'vol'             => $parameters['vol'] ?? 'GARCH',
+                // select=true 時並行比較 GARCH / GJR / EGARCH × 階數 × 分配，依 BIC（或 criterion）取最佳設定
+                'select'          => $parameters['select'] ?? false,
+                'criterion'       => $parameters['criterion'] ?? 'bic',
+            ] + $this->getValidationInput($prices, $parameters);
 
-            $result = $this->executePythonModel('garch', $inputData);
+            // 收盤後已預先計算且資料日仍為最新時直接回傳，否則即時計算
+            $result = $this->getPrecomputedForecast($stock, 'garch', $predictionDays, $parameters, $prices, $inputData)
+                ?? $this->executePythonModel('garch', $inputData);
 
             if ($result['success']) {
                 // ✅ 儲存股票預測結果
-                $this->saveStockPredictions($stock, 'garch', $result['predictions'] ?? [], $parameters);
+                $this->saveStockPredictions($stock, 'garch', $result['predictions'] ?? [], $parameters, $prices);
+                $result['historical_prices'] = $prices;
+            }
+
+            return $result;
+        } catch (\Exception $e) {
+            return ['success' => false, 'message' => '預測失敗: ' . $e->getMessage()];
+        }
+    }
+
+    /**
+     * 執行 HAR-RV 股票波動率預測（閉式最小平方，為 GARCH 的快速替代）
+     */
+    public function runHARPrediction(Stock $stock, int $predictionDays = 7, array $parameters = []): array
+    {
+        try {
+            $historicalDays = $parameters['historical_days'] ?? 200;
+            $prices = $this->getHistoricalPricesFromDB($stock, $historicalDays);
+
+            if (count($prices) < 45) {
+                return ['success' => false, 'message' => 'HAR 模型需要至少 45 天的資料。'];
+            }
+
+            $inputData = [
+                'prices'          => array_column($prices, 'close'),
+                'dates'           => array_column($prices, 'date'),
+                'base_date'       => Carbon::now()->format('Y-m-d'),
+                'prediction_days' => $predictionDays,
+                'stock_symbol'    => $stock->symbol,
+                'weekly'          => $parameters['weekly'] ?? 5,
+                'monthly'         => $parameters['monthly'] ?? 22,
+            ] + $this->getValidationInput($prices, $parameters);
+
+            $result = $this->executePythonModel('har', $inputData);
+
+            if ($result['success']) {
+                $this->saveStockPredictions($stock, 'har', $result['predictions'] ?? [], $parameters, $prices);
                 $result['historical_prices'] = $prices;
             }
 
@@ -201,10 +261,14 @@ public function runTxoMarketLSTMPrediction(string $underlying = 'TXO', int $pred
                 'base_date'       => Carbon::now()->format('Y-m-d'),
                 'prediction_days' => $predictionDays,
                 'stock_symbol'    => $underlying,
-                'epochs'          => $parameters['epochs']  ?? 100,
-                'units'           => $parameters['units']   ?? 128,
-                'lookback'        => $parameters['lookback'] ?? 60,
-                'dropout'         => $parameters['dropout'] ?? 0.2,
+                // 未指定時由 Python 端沿用超參數搜尋保存的最佳設定，否則為 100 / 128 / 60 / 0.2
+                'epochs'          => $parameters['epochs']  ?? null,
+                'units'           => $parameters['units']   ?? null,
+                'lookback'        => $parameters['lookback'] ?? null,
+                'dropout'         => $parameters['dropout'] ?? null,
+                'use_best_config' => $parameters['use_best_config'] ?? true,
+                // 快速訓練：tf.data 快取視窗與自適應批次大小
+                'fast_train'      => $parameters['fast_train'] ?? false,
             ];
 
             $result = $this->executePythonModel('lstm', $inputData);
@@ -246,6 +310,7 @@ public function runTxoMarketARIMAPrediction(string $underlying = 'TXO', int $pre
                 'd'               => $parameters['d'] ?? null,
                 'q'               => $parameters['q'] ?? null,
                 'auto_select'     => $parameters['auto_select'] ?? true,
+                'fit_method'      => $parameters['fit_method'] ?? 'exact',
             ];
 
             $result = $this->executePythonModel('arima', $inputData);
@@ -285,6 +350,10 @@ public function runTxoMarketGARCHPrediction(string $underlying = 'TXO', int $pre
                 'p'               => $parameters['p'] ?? 1,
                 'q'               => $parameters['q'] ?? 1,
                 'dist'            => $parameters['dist'] ?? 'normal',
+                'vol'             => $parameters['vol'] ?? 'GARCH',
+                // select=true 時並行比較 GARCH / GJR / EGARCH × 階數 × 分配，依 BIC（或 criterion）取最佳設定
+                'select'          => $parameters['select'] ?? false,
+                'criterion'       => $parameters['criterion'] ?? 'bic',
             ];
 
             $result = $this->executePythonModel('garch', $inputData);
@@ -302,6 +371,44 @@ public function runTxoMarketGARCHPrediction(string $underlying = 'TXO', int $pre
         }
     }
 
+    /**
+     * 執行 TXO 市場指數 HAR-RV 波動率預測
+     */
+    public function runTxoMarketHARPrediction(string $underlying = 'TXO', int $predictionDays = 1, array $parameters = []): array
+    {
+        try {
+            $historicalDays = $parameters['historical_days'] ?? 200;
+            $prices = $this->txoIndexService->getHistoricalIndexForPrediction($historicalDays);
+
+            if (count($prices) < 45) {
+                return ['success' => false, 'message' => 'HAR 模型需要至少 45 天的資料。'];
+            }
+
+            $inputData = [
+                'prices'          => array_column($prices, 'close'),
+                'dates'           => array_column($prices, 'date'),
+                'base_date'       => Carbon::now()->format('Y-m-d'),
+                'prediction_days' => $predictionDays,
+                'stock_symbol'    => $underlying,
+                'weekly'          => $parameters['weekly'] ?? 5,
+                'monthly'         => $parameters['monthly'] ?? 22,
+            ];
+
+            $result = $this->executePythonModel('har', $inputData);
+
+            if ($result['success']) {
+                $result['data_source']    = 'TXO 市場整體指數(成交量加權平均)';
+                $result['historical_prices'] = $prices;
+                $result['current_price']  = end($prices)['close'];
+                $result['current_date']   = end($prices)['date'];
+            }
+
+            return $result;
+        } catch (\Exception $e) {
+            return ['success' => false, 'message' => '預測失敗: ' . $e->getMessage()];
+        }
+    }
+
     // ========================================
     // 私有輔助方法
     // ========================================
@@ -309,28 +416,37 @@ public function runTxoMarketGARCHPrediction(string $underlying = 'TXO', int $pre
     /**
      * ✅ 新增：儲存股票預測結果到資料庫（對齊 morphs 欄位）
      *
+     * 基準日為輸入最後一筆價格的日期，評分時目標交易日為基準日之後第 N 個交易日；
+     * 同一基準日的預測只保存一次（重複檢視、快取與預先計算命中不重複寫入）
+     *
      * @param Stock  $stock       股票 Model
      * @param string $modelType   lstm / arima / garch
      * @param array  $predictions Python 回傳的預測陣列
      * @param array  $parameters  模型參數
+     * @param array  $prices      模型輸入的歷史價格（getHistoricalPricesFromDB 的結果）
      */
-    private function saveStockPredictions(Stock $stock, string $modelType, array $predictions, array $parameters): void
+    private function saveStockPredictions(Stock $stock, string $modelType, array $predictions, array $parameters, array $prices): void
     {
-        if (empty($predictions)) {
+        if (empty($predictions) || empty($prices)) {
             return;
         }
 
+        $baseDate = Carbon::parse(end($prices)['date'])->toDateString();
+
         try {
             DB::beginTransaction();
 
-            foreach ($predictions as $prediction) {
-                Prediction::create([
+            foreach (array_values($predictions) as $index => $prediction) {
+                Prediction::firstOrCreate([
                     // ✅ 使用 morphs 欄位，不使用 stock_id
                     'predictable_type'    => Stock::class,
                     'predictable_id'      => $stock->id,
                     'model_type'          => $modelType,
+                    'base_date'           => $baseDate,
+                    // 預測陣列依序為第 1、2、... 天，評分時對應基準日之後第 N 個交易日
+                    'prediction_days'     => $index + 1,
+                ], [
                     'prediction_date'     => now()->toDateString(),
-                    'prediction_days'     => 1,
                     'predicted_price'     => $prediction['predicted_price']     ?? null,
                     'predicted_volatility'=> $prediction['predicted_volatility'] ?? null,
                     // ✅ 對齊 migration 欄位名（upper_bound / lower_bound）
@@ -347,6 +463,7 @@ private function saveStockPredictions(Stock $stock, string $modelType, array $pr
                 'stock_id'          => $stock->id,
                 'symbol'            => $stock->symbol,
                 'model_type'        => $modelType,
+                'base_date'         => $baseDate,
                 'predictions_count' => count($predictions),
             ]);
         } catch (\Exception $e) {
@@ -382,6 +499,122 @@ private function getHistoricalPricesFromDB(Stock $stock, int $days = 100): array
             ->toArray();
     }
 
+    /**
+     * 資料驗證所需欄位：parameters.validate=true 時 Python 端以 TWSE 交易日曆與 OHLC 檢查清理價格後再訓練
+     *
+     * 驗證會移除無效與停滯價格，並以跳空比例回溯調整除權息 / 分割前的價格（adjust_jumps=false 可停用），
+     * 改變模型實際使用的價格序列，因此預設關閉
+     */
+    private function getValidationInput(array $prices, array $parameters): array
+    {
+        return [
+            'validate'     => $parameters['validate'] ?? false,
+            'adjust_jumps' => $parameters['adjust_jumps'] ?? true,
+            'opens'    => array_column($prices, 'open'),
+            'highs'    => array_column($prices, 'high'),
+            'lows'     => array_column($prices, 'low'),
+            'volumes'  => array_column($prices, 'volume'),
+        ];
+    }
+
+    /**
+     * 取得收盤後預先計算的預測（python/precompute_forecasts.py 產生）
+     *
+     * 請求參數與預設值合併後（即 $inputData）須與預先計算時的參數相同、歷史天數相同，
+     * 且請求天數不超過預先計算天數、資料日與目前最新價格日相同時才使用；
+     * 與模型無關的參數（如 ARIMA 請求附帶的 epochs）不影響比對。
+     * 回傳結果附上 precomputed 欄位（計算時間、資料日、適用交易日、經過秒數、是否過期）
+     *
+     * @param array $prices    getHistoricalPricesFromDB 的結果
+     * @param array $inputData 即時計算時傳給模型的輸入（已合併預設值）
+     * @return array|null 無可用預測時回傳 null
+     */
+    private function getPrecomputedForecast(Stock $stock, string $modelType, int $predictionDays, array $parameters, array $prices, array $inputData): ?array
+    {
+        if (!($parameters['use_precomputed'] ?? true)) {
+            return null;
+        }
+
+        $path = $this->getForecastPath($modelType, $stock->symbol);
+        if (!is_file($path)) {
+            return null;
+        }
+
+        $content = json_decode(file_get_contents($path), true);
+        if (!is_array($content) || empty($content['result']['success'])
+            || ($content['prediction_days'] ?? 0) < $predictionDays) {
+            return null;
+        }
+
+        // 自訂參數或不同的歷史天數需以該輸入重新訓練
+        $mismatched = array_keys(array_filter(
+            $content['parameters'] ?? [],
+            fn($value, $key) => !$this->sameParameter($value, $inputData[$key] ?? null),
+            ARRAY_FILTER_USE_BOTH
+        ));
+        if ($mismatched || count($prices) !== ($content['historical_days'] ?? null)) {
+            Log::info('請求參數與預先計算的預測不同，改為即時計算', [
+                'symbol'          => $stock->symbol,
+                'model_type'      => $modelType,
+                'parameters'      => $mismatched,
+                'historical_days' => [count($prices), $content['historical_days'] ?? null],
+            ]);
+            return null;
+        }
+
+        $latestDate = Carbon::parse(end($prices)['date'])->toDateString();
+        if (($content['as_of'] ?? null) !== $latestDate) {
+            Log::info('預先計算的預測資料日與最新價格不符，改為即時計算', [
+                'symbol'      => $stock->symbol,
+                'model_type'  => $modelType,
+                'as_of'       => $content['as_of'] ?? null,
+                'latest_date' => $latestDate,
+            ]);
+            return null;
+        }
+
+        $result = $content['result'];
+        $result['predictions'] = array_slice($result['predictions'] ?? [], 0, $predictionDays);
+        $result['precomputed'] = [
+            'computed_at' => $content['computed_at'],
+            'as_of'       => $content['as_of'],
+            'valid_for'   => $content['valid_for'],
+            'age_seconds' => Carbon::parse($content['computed_at'])->diffInSeconds(now()),
+            // 適用交易日已過但仍無新價格（資料匯入延遲）時標記為過期
+            'stale'       => $content['valid_for'] < now()->toDateString(),
+        ];
+
+        return $result;
+    }
+
+    /**
+     * 比對單一模型參數（表單送出的數字字串與 JSON 數值視為相同，null 與 0 不同）
+     */
+    private function sameParameter($expected, $actual): bool
+    {
+        if (is_numeric($expected) && is_numeric($actual)) {
+            return (float) $expected === (float) $actual;
+        }
+
+        return $expected === $actual;
+    }
+
+    /**
+     * 取得預先計算預測檔路徑
+     */
+    private function getForecastPath(string $modelType, string $symbol): string
+    {
+        return storage_path('app' . DIRECTORY_SEPARATOR . 'forecasts' . DIRECTORY_SEPARATOR . $modelType . DIRECTORY_SEPARATOR . $symbol . '.json');
+    }
+
+    /**
+     * 取得 LSTM 匯出權重檔路徑
+     */
+    private function getLstmWeightsPath(string $symbol): string
+    {
+        return storage_path('app' . DIRECTORY_SEPARATOR . 'lstm_weights' . DIRECTORY_SEPARATOR . $symbol . '.npz');
+    }
+
     /**
      * 取得 Python 命令路徑（根據環境自動判斷）
      */
@@ -457,13 +690,19 @@ private function executePythonModel(string $modelType, array $inputData): array
         }
 
         $scriptPath = $this->getPythonModelsPath() . self::SUPPORTED_MODELS[$modelType];
+        if (!file_exists($scriptPath)) {
+            throw new \Exception("模型腳本不存在: {$scriptPath}");
+        }
+
+        // 透過 dispatcher.py 執行：合併同時進行的相同請求、互動請求優先，並使用 Python 端的結果快取
+        $runnerPath = base_path('python') . DIRECTORY_SEPARATOR . 'dispatcher.py';
         $inputJson  = json_encode($inputData, JSON_UNESCAPED_UNICODE | JSON_INVALID_UTF8_SUBSTITUTE);
         $tempFile   = tempnam(sys_get_temp_dir(), 'prediction_input_');
         file_put_contents($tempFile, $inputJson);
 
         try {
             $pythonCommand = $this->getPythonCommand();
-            $command       = "{$pythonCommand} {$scriptPath} \"{$tempFile}\"";
+            $command       = "{$pythonCommand} {$runnerPath} {$modelType} \"{$tempFile}\" --priority=interactive";
 
             Log::info('執行 Python 命令', [
                 'os'        => PHP_OS_FAMILY,
@@ -492,6 +731,14 @@ private function executePythonModel(string $modelType, array $inputData): array
                 throw new \Exception("無法解析 Python 輸出: " . json_last_error_msg());
             }
 
+            if (isset($output['cache']) || isset($output['dispatch'])) {
+                Log::info('Python 模型分派', [
+                    'model'    => $modelType,
+                    'cache'    => $output['cache'] ?? null,
+                    'dispatch' => $output['dispatch'] ?? null,
+                ]);
+            }
+
             return $output;
         } finally {
             if (file_exists($tempFile)) {
@@ -11,6 +11,13 @@
  */
 class TxoMarketIndexService
 {
+    protected OptionCubeService $cube;
+
+    public function __construct(OptionCubeService $cube)
+    {
+        $this->cube = $cube;
+    }
+
     /**
      * 計算 TXO 市場每日加權平均價格指數
      *
@@ -22,31 +29,52 @@ public function getHistoricalIndexForPrediction(int $days = 200): array
         try {
             Log::info('開始計算 TXO 市場指數', ['days' => $days]);
 
-            // ✅ 修正:使用子查詢先取得最新的 N 天,然後按日期升序排列
-            $indexData = DB::select("
-                SELECT *
-                FROM (
-                    SELECT
-                        CAST(trade_date AS CHAR) as date,
-                        CAST(SUM(close * volume) / NULLIF(SUM(volume), 0) AS DECIMAL(10,2)) as weighted_price,
-                        CAST(AVG(close) AS DECIMAL(10,2)) as avg_price,
-                        CAST(SUM(volume) AS UNSIGNED) as total_volume
-                    FROM option_prices
-                    WHERE option_id IN (
-                        SELECT id
-                        FROM options
-                        WHERE underlying = 'TXO'
+            // 立方體已涵蓋最新交易日時直接讀取預先彙總的每日加權指數（與下方 GROUP BY 相同口徑）
+            $latest = DB::table('option_prices')->max('trade_date');
+            $cubeLatest = $this->cube->latestDate();
+            if ($latest && $cubeLatest !== null && $cubeLatest >= $latest) {
+                $indexData = DB::table('option_daily_stats')
+                    ->select(
+                        DB::raw('CAST(trade_date AS CHAR) as date'),
+                        DB::raw('ROUND(weighted_index, 2) as weighted_price'),
+                        DB::raw('ROUND(avg_price, 2) as avg_price'),
+                        DB::raw('traded_volume as total_volume')
                     )
-                    AND close IS NOT NULL
-                    AND close > 0
-                    AND volume IS NOT NULL
-                    AND volume > 0
-                    GROUP BY trade_date
-                    ORDER BY trade_date DESC
-                    LIMIT ?
-                ) as latest_data
-                ORDER BY date ASC
-            ", [$days]);
+                    ->where('underlying', 'TXO')
+                    ->where('traded_count', '>', 0)
+                    ->orderBy('trade_date', 'desc')
+                    ->limit($days)
+                    ->get()
+                    ->reverse()
+                    ->values()
+                    ->all();
+            } else {
+                // ✅ 修正:使用子查詢先取得最新的 N 天,然後按日期升序排列
+                $indexData = DB::select("
+                    SELECT *
+                    FROM (
+                        SELECT
+                            CAST(trade_date AS CHAR) as date,
+                            CAST(SUM(close * volume) / NULLIF(SUM(volume), 0) AS DECIMAL(10,2)) as weighted_price,
+                            CAST(AVG(close) AS DECIMAL(10,2)) as avg_price,
+                            CAST(SUM(volume) AS UNSIGNED) as total_volume
+                        FROM option_prices
+                        WHERE option_id IN (
+                            SELECT id
+                            FROM options
+                            WHERE underlying = 'TXO'
+                        )
+                        AND close IS NOT NULL
+                        AND close > 0
+                        AND volume IS NOT NULL
+                        AND volume > 0
+                        GROUP BY trade_date
+                        ORDER BY trade_date DESC
+                        LIMIT ?
+                    ) as latest_data
+                    ORDER BY date ASC
+                ", [$days]);
+            }
 
             // 清理和轉換資料
             $result = [];
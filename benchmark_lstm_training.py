@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+LSTM 訓練流程基準測試腳本
+比較原訓練流程（NumPy 陣列、batch_size=32）與快速訓練模式（tf.data 快取視窗，批次 32 或自適應批次）
+的每輪時間、總訓練時間與驗證集誤差；驗證誤差隨種子變動很大，同時列出各種子間的標準差
+"""
+
+import sys
+import os
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python', 'models'))
+
+from lstm_model import LSTMPredictor, tf
+
+# 測試的序列長度（約 2 年、4 年、8 年日資料）
+LENGTHS = [500, 1000, 2000]
+
+# 模型設定（與 PHP 預設相同的 lookback，較小的 units 以縮短測試時間）
+CONFIG = {'lookback': 60, 'units': 64, 'dropout': 0.2, 'epochs': 60}
+
+SEEDS = [0, 1, 2, 3]
+
+# (名稱, fast_train, batch_size)
+MODES = [('原流程', False, None), ('快速', True, None), ('快速自適應', True, 'auto')]
+
+
+def make_prices(seed, length):
+    """產生模擬股價"""
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, length)))
+
+
+def validation_rmse(predictor, prices):
+    """驗證集（最後 20% 視窗）的一步預測 RMSE（價格單位）"""
+    X, y = predictor.prepare_data(prices)
+    n_val = int(np.ceil(len(X) * 0.2))
+    X_val = X[-n_val:].reshape((n_val, predictor.lookback, 1)).astype(np.float32)
+    predicted = predictor.model.predict(X_val, batch_size=256, verbose=0).reshape(-1, 1)
+    predicted = predictor.scaler.inverse_transform(predicted).ravel()
+    actual = predictor.scaler.inverse_transform(y[-n_val:].reshape(-1, 1)).ravel()
+    return float(np.sqrt(np.mean((predicted - actual) ** 2)))
+
+
+def naive_rmse(prices, lookback):
+    """以前一日收盤價作為預測的 RMSE（隨機漫步基準）"""
+    n_val = int(np.ceil((len(prices) - lookback) * 0.2))
+    actual = prices[-n_val:]
+    return float(np.sqrt(np.mean((actual - prices[-n_val - 1:-1]) ** 2)))
+
+
+def run_once(prices, seed, fast_train, batch_size=None):
+    """訓練一次並回傳 (總秒數, 每輪秒數, 訓練輪數, 驗證 RMSE, 批次大小)"""
+    tf.keras.utils.set_random_seed(seed)
+    predictor = LSTMPredictor(fast_train=fast_train, batch_size=batch_size, **CONFIG)
+
+    started = time.perf_counter()
+    history = predictor.train(prices)
+    elapsed = time.perf_counter() - started
+
+    epochs = len(history.history['loss'])
+    batch_size = predictor.training_info.get('batch_size', 32)
+    return elapsed, elapsed / epochs, epochs, validation_rmse(predictor, prices), batch_size
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print(f"LSTM 訓練流程基準測試（CPU 核心數: {os.cpu_count()}）")
+    print("="*60)
+    print(f"{'長度':>6} {'模式':>6} {'批次':>5} {'輪數':>6} {'每輪(s)':>8} {'總計(s)':>8} {'驗證RMSE':>9} {'標準差':>7}")
+
+    for length in LENGTHS:
+        naive = np.mean([naive_rmse(make_prices(seed, length), CONFIG['lookback']) for seed in SEEDS])
+        print(f"{length:>6} {'前日價':>6} {'':>5} {'':>6} {'':>8} {'':>8} {naive:>9.4f}")
+        for mode, fast_train, batch in MODES:
+            results = [run_once(make_prices(seed, length), seed, fast_train, batch) for seed in SEEDS]
+            elapsed, per_epoch, epochs, rmse, batch_size = (np.mean([r[i] for r in results]) for i in range(5))
+            spread = np.std([r[3] for r in results])
+            print(f"{length:>6} {mode:>6} {int(batch_size):>5} {epochs:>6.1f} {per_epoch:>8.3f} "
+                  f"{elapsed:>8.1f} {rmse:>9.4f} {spread:>7.4f}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
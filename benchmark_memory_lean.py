@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+精簡記憶體模式基準測試腳本
+以不同長度的模擬股價分別執行一般模式與 memory_lean 模式，比較各模型的峰值 RSS
+"""
+
+import sys
+import os
+import json
+import subprocess
+import tempfile
+import numpy as np
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python', 'models')
+
+# 測試的序列長度（日資料 20 年約 5000 筆，長序列模擬盤中資料）
+LENGTHS = [5000, 100000]
+
+MODELS = ['garch', 'arima', 'lstm']
+
+
+def run_once(model, prices, memory_lean):
+    """
+    以子程序執行模型並回傳峰值 RSS (MB)
+    """
+    input_data = {
+        'prices': prices,
+        'base_date': '2025-01-01',
+        'prediction_days': 1,
+        'memory_lean': memory_lean,
+        'report_memory': True,
+        # 縮短訓練時間，只比較記憶體
+        'epochs': 1,
+        'units': 16,
+        'lookback': 60,
+        'p': 1,
+        'd': 1,
+        'q': 1,
+        'auto_select': False
+    }
+
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False, encoding='utf-8') as f:
+        json.dump(input_data, f)
+        temp_file = f.name
+
+    try:
+        result = subprocess.run(
+            [sys.executable, os.path.join(MODELS_DIR, f'{model}_model.py'), temp_file],
+            capture_output=True,
+            text=True,
+            encoding='utf-8'
+        )
+        output = json.loads(result.stdout)
+        if not output.get('success'):
+            return None, output.get('error')
+        return output['memory']['peak_rss_mb'], None
+    except json.JSONDecodeError:
+        return None, result.stderr[-200:]
+    finally:
+        os.remove(temp_file)
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("精簡記憶體模式峰值 RSS 比較 (MB)")
+    print("="*60)
+    print(f"{'模型':8s} {'資料筆數':>10s} {'一般模式':>10s} {'精簡模式':>10s} {'差異':>8s}")
+
+    rng = np.random.default_rng(0)
+    for length in LENGTHS:
+        prices = (100 * np.exp(np.cumsum(rng.normal(0, 0.01, length)))).tolist()
+
+        for model in MODELS:
+            baseline, error = run_once(model, prices, False)
+            lean, lean_error = run_once(model, prices, True)
+
+            if baseline is None or lean is None:
+                print(f"{model:8s} {length:>10d}  ❌ {error or lean_error}")
+                continue
+
+            change = (lean - baseline) / baseline * 100
+            print(f"{model:8s} {length:>10d} {baseline:>10.1f} {lean:>10.1f} {change:>7.1f}%")
+
+    print("="*60 + "\n")
+
+
+if __name__ == '__main__':
+    main()
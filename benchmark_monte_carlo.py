@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+蒙地卡羅定價效能測試
+比較各報酬型態在不同變異數降低設定下的每秒路徑數與標準誤，
+並以 Black-Scholes 封閉解檢查歐式價格、以峰值記憶體確認百萬路徑分塊模擬的記憶體上限
+"""
+
+import sys
+import os
+import resource
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python', 'models'))
+
+from monte_carlo_pricer import MonteCarloPricer, black_scholes_price
+
+# 台指選擇權規模的參數：加權指數 22000、價平、一季到期
+SPOT, STRIKE, T, RATE, VOL = 22000.0, 22000.0, 0.25, 0.015, 0.2
+GARCH = {'omega': 0.02, 'alpha': 0.08, 'beta': 0.9}
+
+CASES = [
+    ('european', 'gbm', {}),
+    ('asian', 'gbm', {}),
+    ('barrier', 'gbm', {'barrier': 24000, 'barrier_type': 'up-and-out'}),
+    ('american', 'gbm', {}),
+    ('asian', 'garch', {}),
+    ('american', 'garch', {}),
+]
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(payoff, dynamics, paths, antithetic, control_variate, **kwargs):
+    option_type = 'put' if payoff == 'american' else 'call'
+    pricer = MonteCarloPricer(SPOT, STRIKE, T, RATE, VOL, option_type, dynamics=dynamics,
+                              garch=GARCH if dynamics == 'garch' else None, seed=42)
+    return pricer.price(payoff, paths=paths, antithetic=antithetic, control_variate=control_variate, **kwargs)
+
+
+def main():
+    """主函數"""
+    paths = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    print("\n" + "="*60)
+    print(f"蒙地卡羅定價效能測試（{paths:,} 路徑）")
+    print("="*60)
+    print(f"{'報酬':<10}{'模型':<7}{'設定':<10}{'價格':>11}{'標準誤':>10}{'變異縮減':>9}{'路徑/秒':>12}")
+
+    for payoff, dynamics, kwargs in CASES:
+        for label, antithetic, control in (('無', False, False), ('對偶', True, False), ('對偶+控制', True, True)):
+            result = run(payoff, dynamics, paths, antithetic, control, **kwargs)
+            print(f"{payoff:<10}{dynamics:<7}{label:<10}{result['price']:>11.4f}{result['standard_error']:>10.4f}"
+                  f"{result['variance_reduction']:>9.1f}{result['paths_per_second']:>12,}")
+
+    ok = True
+
+    # 歐式價格需落在封閉解的 3 個標準誤內
+    exact = black_scholes_price(SPOT, STRIKE, T, RATE, VOL, 'call')
+    result = run('european', 'gbm', paths, True, True)
+    error = abs(result['price'] - exact) / result['standard_error']
+    print(f"\n歐式買權: MC {result['price']:.4f} ± {result['standard_error']:.4f}，"
+          f"封閉解 {exact:.4f}（{error:.1f} 個標準誤）")
+    ok &= error < 3
+
+    # 百萬路徑完整路徑模擬，記憶體應由分塊大小決定
+    before = peak_rss_mb()
+    result = run('asian', 'gbm', 1_000_000, True, True, chunk_mb=64)
+    print(f"百萬路徑亞式: {result['seconds']}s，{result['paths_per_second']:,} 路徑/秒，"
+          f"峰值記憶體 {peak_rss_mb():.0f}MB（測試前 {before:.0f}MB）")
+    ok &= peak_rss_mb() < 1024
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
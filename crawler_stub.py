@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+爬蟲測試用本機 TWSE / TAIFEX 模擬伺服器
+回應檔（預設與本檔同目錄的 twse_response.json）有內容時，所有請求都重播該回應；
+檔案為空時依路徑產生與官方 API 相同格式的模擬資料（STOCK_DAY、STOCK_DAY_ALL、DailyMarketReportOpt）。
+可設定延遲與隨機錯誤率以測試重試與並行，以及查無資料的股票代號（STOCK_DAY 回傳 stat 非 OK）；
+路徑以 /moved 開頭時回傳 302 轉址至去除前綴後的網址
+"""
+
+import sys
+import os
+import json
+import zlib
+import random
+import asyncio
+import calendar
+from urllib.parse import urlsplit, parse_qs
+
+DEFAULT_RESPONSE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'twse_response.json')
+
+
+def load_replay(path):
+    """讀取重播回應，檔案不存在或為空時回傳 None"""
+    try:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            content = f.read().strip()
+        return json.loads(content) if content else None
+    except (OSError, ValueError):
+        return None
+
+
+def _number(value, decimals=0):
+    return f'{value:,.{decimals}f}'
+
+
+def stock_day_payload(symbol, date_param):
+    """產生 STOCK_DAY 月資料（以股票代號與月份為種子，結果固定）"""
+    year, month = int(date_param[:4]), int(date_param[4:6])
+    rng = random.Random(zlib.crc32(f'{symbol}{year}{month}'.encode()))
+    price = 20 + zlib.crc32(symbol.encode()) % 500
+
+    rows = []
+    previous = price
+    for day in range(1, calendar.monthrange(year, month)[1] + 1):
+        if calendar.weekday(year, month, day) >= 5:
+            continue
+        close = round(max(1.0, previous * (1 + rng.gauss(0, 0.015))), 2)
+        open_ = round(previous * (1 + rng.gauss(0, 0.005)), 2)
+        high = round(max(open_, close) * (1 + abs(rng.gauss(0, 0.005))), 2)
+        low = round(min(open_, close) * (1 - abs(rng.gauss(0, 0.005))), 2)
+        volume = rng.randint(1_000_000, 50_000_000)
+        change = close - previous
+        rows.append([
+            f'{year - 1911}/{month:02d}/{day:02d}',
+            _number(volume),
+            _number(volume * close),
+            _number(open_, 2), _number(high, 2), _number(low, 2), _number(close, 2),
+            f'{"+" if change >= 0 else "-"}{abs(change):.2f}',
+            _number(rng.randint(1_000, 50_000)),
+        ])
+        previous = close
+
+    return {
+        'stat': 'OK',
+        'date': date_param,
+        'title': f'{year - 1911}年{month:02d}月 {symbol} 模擬{symbol} 各日成交資訊',
+        'fields': ['日期', '成交股數', '成交金額', '開盤價', '最高價', '最低價', '收盤價', '漲跌價差', '成交筆數'],
+        'data': rows,
+    }
+
+
+def stock_day_all_payload(count=1000):
+    """產生 STOCK_DAY_ALL 全市場資料"""
+    payload = []
+    for index in range(count):
+        symbol = str(1101 + index)
+        rows = stock_day_payload(symbol, '20250101')['data']
+        _, volume, turnover, open_, high, low, close, change, transactions = rows[-1]
+        payload.append({
+            'Date': '1140131', 'Code': symbol, 'Name': f'模擬{symbol}',
+            'TradeVolume': volume.replace(',', ''), 'TradeValue': turnover.replace(',', ''),
+            'OpeningPrice': open_.replace(',', ''), 'HighestPrice': high.replace(',', ''),
+            'LowestPrice': low.replace(',', ''), 'ClosingPrice': close.replace(',', ''),
+            'Change': change, 'Transaction': transactions.replace(',', ''),
+        })
+    return payload
+
+
+def daily_options_payload():
+    """產生 DailyMarketReportOpt 資料（含非 TXO 契約）"""
+    rng = random.Random(0)
+    payload = []
+    for contract in ('TXO', 'TEO'):
+        for month in ('202501', '202502'):
+            for strike in range(21000, 24001, 100):
+                for call_put in ('買權', '賣權'):
+                    bid = round(rng.uniform(1, 500), 1)
+                    payload.append({
+                        'Date': '20250102', 'Contract': contract, 'ContractMonth(Week)': month,
+                        'StrikePrice': str(strike), 'Call/Put': call_put,
+                        'OpeningPrice': str(bid), 'HighestPrice': str(bid + 5), 'LowestPrice': str(bid - 1),
+                        'ClosingPrice': str(bid + 1), 'Volume': str(rng.randint(0, 20000)),
+                        'SettlementPrice': str(bid + 1), 'OpenInterest': str(rng.randint(0, 50000)),
+                        'BestBid': str(bid), 'BestAsk': str(bid + 2), 'Change': '-', 'ChangePercent': '-',
+                    })
+    return payload
+
+
+class StubServer:
+    """模擬伺服器"""
+
+    def __init__(self, response_file=None, latency=0.0, fail_rate=0.0, seed=0, no_data=()):
+        """
+        初始化模擬伺服器
+
+        Args:
+            response_file: 重播回應檔
+            latency: 每個請求的延遲秒數
+            fail_rate: 回傳 503 的機率
+            seed: 錯誤注入的亂數種子
+            no_data: 查無資料的股票代號
+        """
+        self.replay = load_replay(response_file or DEFAULT_RESPONSE_FILE)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.no_data = set(no_data)
+        self.server = None
+        self.port = None
+        self.stats = {'requests': 0, 'connections': 0, 'failures': 0}
+
+    def route(self, target):
+        """依路徑回傳 (狀態碼, 回應物件)"""
+        parts = urlsplit(target)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+
+        if self.replay is not None:
+            return 200, self.replay
+        if parts.path.endswith('/STOCK_DAY'):
+            if 'stockNo' not in query or len(query.get('date', '')) != 8:
+                return 200, {'stat': '查詢日期大於今日，請重新查詢!'}
+            if query['stockNo'] in self.no_data:
+                return 200, {'stat': '很抱歉，沒有符合條件的資料!'}
+            return 200, stock_day_payload(query['stockNo'], query['date'])
+        if parts.path.endswith('/STOCK_DAY_ALL'):
+            return 200, stock_day_all_payload()
+        if parts.path.endswith('/DailyMarketReportOpt'):
+            return 200, daily_options_payload()
+        return 404, {'error': 'not found'}
+
+    async def handle(self, reader, writer):
+        self.stats['connections'] += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                self.stats['requests'] += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+
+                target = request_line.decode('latin-1').split()[1]
+                location = ''
+                if self.rng.random() < self.fail_rate:
+                    self.stats['failures'] += 1
+                    status, payload = 503, {'error': 'service unavailable'}
+                elif target.startswith('/moved'):
+                    status, payload = 302, {}
+                    location = f'Location: {target[len("/moved"):]}\r\n'
+                else:
+                    status, payload = self.route(target)
+
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                if 'gzip' in headers.get('accept-encoding', '') and len(body) > 1024:
+                    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+                    body = compressor.compress(body) + compressor.flush()
+                    encoding = 'Content-Encoding: gzip\r\n'
+                else:
+                    encoding = ''
+
+                reason = {200: 'OK', 302: 'Found', 404: 'Not Found', 503: 'Service Unavailable'}[status]
+                writer.write((f'HTTP/1.1 {status} {reason}\r\n'
+                              f'Content-Type: application/json; charset=utf-8\r\n{encoding}{location}'
+                              f'Content-Length: {len(body)}\r\n\r\n').encode('latin-1') + body)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # 用戶端中斷或伺服器關閉時結束連線
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=0):
+        """啟動伺服器（port 0 為自動選擇），回傳基準網址"""
+        self.server = await asyncio.start_server(self.handle, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return f'http://{host}:{self.port}'
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def serve(options):
+    stub = StubServer(options.get('response'), float(options.get('latency', 0)),
+                      float(options.get('fail-rate', 0)))
+    base_url = await stub.start(options.get('host', '127.0.0.1'), int(options.get('port', 8765)))
+    print(json.dumps({'success': True, 'base_url': base_url, 'replay': stub.replay is not None}), flush=True)
+    await asyncio.Event().wait()
+
+
+def main():
+    """主函數：python crawler_stub.py [--port=8765] [--response=路徑] [--latency=0.05] [--fail-rate=0.1]"""
+    options = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+    try:
+        asyncio.run(serve(options))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
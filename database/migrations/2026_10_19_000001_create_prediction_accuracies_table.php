@@ -0,0 +1,57 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    /**
+     * Run the migrations.
+     *
+     * 預測準確度摘要（由 python/score_predictions.py 批次累加寫入）
+     */
+    public function up(): void
+    {
+        Schema::create('prediction_accuracies', function (Blueprint $table) {
+            $table->id();
+            $table->morphs('predictable'); // 與 predictions 相同的多型標的
+            $table->string('model_type', 50)->comment('模型類型(lstm/arima/garch/har)');
+            $table->integer('horizon')->comment('預測天數(交易日)');
+
+            // 可累加的充分統計量
+            $table->integer('sample_count')->default(0)->comment('已實現預測筆數');
+            $table->double('sum_error')->default(0)->comment('誤差總和(預測-實際)');
+            $table->double('sum_abs_error')->default(0)->comment('絕對誤差總和');
+            $table->double('sum_squared_error')->default(0)->comment('平方誤差總和');
+            $table->double('sum_abs_pct_error')->default(0)->comment('絕對百分比誤差總和');
+            $table->integer('interval_count')->default(0)->comment('有信賴區間的筆數');
+            $table->integer('interval_hits')->default(0)->comment('實際價格落在區間內的筆數');
+            $table->integer('direction_count')->default(0)->comment('可判斷漲跌方向的筆數');
+            $table->integer('direction_hits')->default(0)->comment('漲跌方向正確的筆數');
+
+            // 衍生指標
+            $table->decimal('mae', 14, 6)->nullable()->comment('平均絕對誤差');
+            $table->decimal('rmse', 14, 6)->nullable()->comment('均方根誤差');
+            $table->decimal('mape', 10, 4)->nullable()->comment('平均絕對百分比誤差(%)');
+            $table->decimal('bias', 14, 6)->nullable()->comment('平均誤差');
+            $table->decimal('coverage', 6, 2)->nullable()->comment('信賴區間命中率(%)');
+            $table->decimal('direction_accuracy', 6, 2)->nullable()->comment('方向準確率(%)');
+
+            $table->date('first_target_date')->nullable()->comment('最早目標日');
+            $table->date('last_target_date')->nullable()->comment('最近目標日');
+            $table->timestamps();
+
+            $table->unique(['predictable_type', 'predictable_id', 'model_type', 'horizon'], 'prediction_accuracies_unique');
+            $table->index('model_type');
+        });
+    }
+
+    /**
+     * Reverse the migrations.
+     */
+    public function down(): void
+    {
+        Schema::dropIfExists('prediction_accuracies');
+    }
+};
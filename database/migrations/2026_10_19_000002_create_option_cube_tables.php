@@ -0,0 +1,100 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    /**
+     * Run the migrations.
+     *
+     * 選擇權分析立方體（由 python/option_cube.py 於期交所資料匯入後增量重算）
+     */
+    public function up(): void
+    {
+        Schema::create('option_cube', function (Blueprint $table) {
+            $table->id();
+            $table->string('underlying', 20)->comment('標的代碼(TXO)');
+            $table->date('trade_date')->comment('交易日期');
+            $table->date('expiry_date')->comment('到期日');
+            $table->decimal('strike_price', 12, 2)->comment('履約價');
+            $table->enum('option_type', ['call', 'put'])->comment('選擇權類型');
+
+            // 可累加的統計量
+            $table->integer('contracts')->default(0)->comment('合約數');
+            $table->bigInteger('volume')->default(0)->comment('成交量');
+            $table->bigInteger('open_interest')->default(0)->comment('未平倉量');
+            $table->double('turnover')->default(0)->comment('成交金額(close × volume，僅計有成交)');
+            $table->bigInteger('traded_volume')->default(0)->comment('有成交價的成交量');
+            $table->double('traded_close_sum')->default(0)->comment('有成交價的收盤價總和');
+            $table->integer('traded_count')->default(0)->comment('有成交價的合約數');
+            $table->double('close_sum')->default(0)->comment('COALESCE(close, open, 0) 總和');
+            $table->double('iv_sum')->default(0)->comment('隱含波動率總和');
+            $table->integer('iv_count')->default(0)->comment('有隱含波動率的合約數');
+            $table->decimal('high', 12, 4)->nullable()->comment('最高價');
+            $table->decimal('low', 12, 4)->nullable()->comment('最低價');
+
+            // 衍生指標
+            $table->decimal('vwap', 12, 4)->nullable()->comment('成交量加權均價');
+            $table->decimal('avg_iv', 10, 6)->nullable()->comment('平均隱含波動率');
+            $table->timestamps();
+
+            $table->unique(['underlying', 'trade_date', 'expiry_date', 'strike_price', 'option_type'], 'option_cube_unique');
+            $table->index('trade_date');
+        });
+
+        Schema::create('option_daily_stats', function (Blueprint $table) {
+            $table->id();
+            $table->string('underlying', 20)->comment('標的代碼(TXO)');
+            $table->date('trade_date')->comment('交易日期');
+
+            // 可累加的統計量
+            $table->integer('contracts')->default(0)->comment('合約數');
+            $table->bigInteger('call_volume')->default(0)->comment('買權成交量');
+            $table->bigInteger('put_volume')->default(0)->comment('賣權成交量');
+            $table->bigInteger('call_oi')->default(0)->comment('買權未平倉量');
+            $table->bigInteger('put_oi')->default(0)->comment('賣權未平倉量');
+            $table->double('turnover')->default(0)->comment('成交金額(僅計有成交)');
+            $table->bigInteger('traded_volume')->default(0)->comment('有成交價的成交量');
+            $table->double('traded_close_sum')->default(0)->comment('有成交價的收盤價總和');
+            $table->integer('traded_count')->default(0)->comment('有成交價的合約數');
+            $table->double('close_sum')->default(0)->comment('COALESCE(close, open, 0) 總和');
+            $table->double('call_iv_sum')->default(0)->comment('買權隱含波動率總和');
+            $table->integer('call_iv_count')->default(0)->comment('有隱含波動率的買權數');
+            $table->double('put_iv_sum')->default(0)->comment('賣權隱含波動率總和');
+            $table->integer('put_iv_count')->default(0)->comment('有隱含波動率的賣權數');
+            $table->decimal('high', 12, 4)->nullable()->comment('最高價');
+            $table->decimal('low', 12, 4)->nullable()->comment('最低價');
+
+            // 衍生指標
+            $table->bigInteger('total_volume')->default(0)->comment('總成交量');
+            $table->bigInteger('total_oi')->default(0)->comment('總未平倉量');
+            $table->decimal('put_call_volume_ratio', 10, 4)->nullable()->comment('成交量 Put/Call 比');
+            $table->decimal('put_call_oi_ratio', 10, 4)->nullable()->comment('未平倉量 Put/Call 比');
+            $table->decimal('weighted_index', 12, 4)->nullable()->comment('成交量加權價格指數');
+            $table->decimal('avg_price', 12, 4)->nullable()->comment('有成交合約平均收盤價');
+            $table->decimal('avg_close', 12, 4)->nullable()->comment('全部合約平均收盤價');
+            $table->decimal('avg_iv', 10, 6)->nullable()->comment('平均隱含波動率');
+            $table->decimal('call_avg_iv', 10, 6)->nullable()->comment('買權平均隱含波動率');
+            $table->decimal('put_avg_iv', 10, 6)->nullable()->comment('賣權平均隱含波動率');
+
+            // 增量更新判斷：原始資料筆數與最後更新時間改變時重算該交易日
+            $table->integer('source_rows')->default(0)->comment('原始價格筆數');
+            $table->timestamp('source_updated_at')->nullable()->comment('原始價格最後更新時間');
+            $table->timestamps();
+
+            $table->unique(['underlying', 'trade_date']);
+            $table->index('trade_date');
+        });
+    }
+
+    /**
+     * Reverse the migrations.
+     */
+    public function down(): void
+    {
+        Schema::dropIfExists('option_daily_stats');
+        Schema::dropIfExists('option_cube');
+    }
+};
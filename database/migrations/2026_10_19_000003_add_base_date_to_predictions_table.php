@@ -0,0 +1,35 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    /**
+     * Run the migrations.
+     *
+     * 預測基準日：模型輸入最後一筆價格的日期（python/score_predictions.py 由此計算目標交易日）
+     * 同一標的、模型、基準日與預測天數只保存一筆，重複檢視不會重複計入準確度摘要
+     */
+    public function up(): void
+    {
+        Schema::table('predictions', function (Blueprint $table) {
+            $table->date('base_date')->nullable()->after('prediction_date')->comment('預測基準日(輸入最後價格日)');
+
+            $table->unique(['predictable_type', 'predictable_id', 'model_type', 'base_date', 'prediction_days'],
+                'predictions_base_date_unique');
+        });
+    }
+
+    /**
+     * Reverse the migrations.
+     */
+    public function down(): void
+    {
+        Schema::table('predictions', function (Blueprint $table) {
+            $table->dropUnique('predictions_base_date_unique');
+            $table->dropColumn('base_date');
+        });
+    }
+};
@@ -0,0 +1,858 @@
+#!/usr/bin/env python3
+"""
+TWSE / TAIFEX 非同步並行爬蟲
+以 asyncio 連線池（每個主機保持 keep-alive 連線）、固定數量的工作者、每主機令牌桶限速、
+指數退避加隨機抖動的重試，以及可續傳的檢查點批次回補每日行情。
+回應格式與 TwseApiService / TaifexOpenApiService 相同，解析結果寫入 JSON Lines 或 stock_prices 資料表
+
+任務類型：
+  stock_day:     舊版 API /exchangeReport/STOCK_DAY，每檔股票每月一個請求（歷史回補）
+  stock_day_all: OpenAPI /exchangeReport/STOCK_DAY_ALL，全市場最新一日
+  options:       期交所 OpenAPI /DailyMarketReportOpt，只保留 TXO
+
+檢查點只記錄已結束月份且有資料的任務；當月與查無資料（stat 非 OK）的任務每次執行都重新抓取
+"""
+
+import sys
+import os
+import re
+import ssl
+import json
+import time
+import zlib
+import random
+import asyncio
+from datetime import date
+from urllib.parse import urlsplit, urlencode, urljoin
+
+TWSE_BASE_URL = 'https://www.twse.com.tw'
+TWSE_OPENAPI_URL = 'https://openapi.twse.com.tw/v1'
+TAIFEX_OPENAPI_URL = 'https://openapi.taifex.com.tw/v1'
+
+# 與 TwseApiService::makeRequest 相同的瀏覽器標頭
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                  '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json, text/javascript, */*; q=0.01',
+    'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Referer': 'https://www.twse.com.tw/zh/page/trading/exchange/STOCK_DAY.html',
+    'X-Requested-With': 'XMLHttpRequest',
+}
+
+# TwseApiService::getAllStockSymbols 的主要權值股
+DEFAULT_SYMBOLS = ['2330', '2317', '2454', '2412', '2882', '2881', '2303', '2308',
+                   '2886', '2884', '1301', '1303', '2002', '3045', '2891']
+
+# 可重試的 HTTP 狀態碼
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# 轉址狀態碼與最多跟隨次數（與 Laravel Http 用戶端相同，自動跟隨 Location）
+REDIRECT_STATUS = {301, 302, 303, 307, 308}
+MAX_REDIRECTS = 5
+
+# 預設檢查點：storage/app/crawler/<任務類型>.checkpoint.jsonl
+DEFAULT_CHECKPOINT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'storage', 'app', 'crawler'
+)
+
+
+class HttpError(Exception):
+    """HTTP 請求失敗（retryable 表示可重試）"""
+
+    def __init__(self, message, status=None, retryable=True, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+# ---------------------------------------------------------------------------
+# 回應解析（對應 TwseApiService / TaifexOpenApiService）
+# ---------------------------------------------------------------------------
+
+def parse_number(value):
+    """解析數字（移除逗號與符號），無資料為 0"""
+    if value is None or value in ('', '--', 'X', '-', 'N/A'):
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    cleaned = re.sub(r'[^0-9.\-]', '', str(value).replace(',', ''))
+    try:
+        return float(cleaned)
+    except ValueError:
+        return 0.0
+
+
+def parse_price(value):
+    """解析價格，無成交（'--'）時為 None"""
+    if value is None or value in ('', '--', 'X', '-'):
+        return None
+    return parse_number(str(value).replace('+', '').replace('<', '').replace('>', ''))
+
+
+def parse_roc_date(value):
+    """民國年日期（114/11/03）轉為 YYYY-MM-DD"""
+    match = re.search(r'(\d{2,3})/(\d{1,2})/(\d{1,2})', str(value))
+    if not match:
+        return None
+    return f'{int(match.group(1)) + 1911}-{int(match.group(2)):02d}-{int(match.group(3)):02d}'
+
+
+def format_date(value):
+    """YYYYMMDD、YYYY-MM-DD、YYYY/MM/DD 或民國年日期轉為 YYYY-MM-DD"""
+    value = str(value or '').strip()
+    match = re.match(r'^(\d{4})[-/]?(\d{2})[-/]?(\d{2})$', value)
+    if match:
+        return f'{match.group(1)}-{match.group(2)}-{match.group(3)}'
+    match = re.match(r'^(\d{3})[-/]?(\d{2})[-/]?(\d{2})$', value)
+    if match:
+        return f'{int(match.group(1)) + 1911}-{match.group(2)}-{match.group(3)}'
+    return parse_roc_date(value)
+
+
+def extract_stock_name(title):
+    """從標題「114年11月 2317 鴻海 各日成交資訊」取出股票名稱"""
+    match = re.search(r'\d{4}\s+(.+?)\s+各日成交資訊', title or '')
+    return match.group(1).strip() if match else ''
+
+
+def third_wednesday(contract_month):
+    """契約月份（202412）的第三個星期三"""
+    match = re.match(r'^(\d{4})(\d{2})$', str(contract_month or ''))
+    if not match:
+        return None
+    first = date(int(match.group(1)), int(match.group(2)), 1)
+    day = 1 + (2 - first.weekday()) % 7 + 14
+    return first.replace(day=day).isoformat()
+
+
+def parse_stock_day(payload, task):
+    """
+    解析 STOCK_DAY 月資料
+
+    Args:
+        payload: API 回應 {'stat', 'title', 'data': [[日期, 成交股數, 成交金額, 開, 高, 低, 收, 漲跌, 筆數], ...]}
+        task: 任務（meta 含 symbol）
+
+    Returns:
+        records: 股價記錄列表；stat 非 OK（無資料或未上市）時為空列表
+    """
+    if not isinstance(payload, dict) or payload.get('stat') != 'OK':
+        return []
+
+    symbol = task['meta']['symbol']
+    name = extract_stock_name(payload.get('title', ''))
+    records = []
+    for row in payload.get('data') or []:
+        if len(row) < 9:
+            continue
+        records.append({
+            'symbol': symbol,
+            'name': name,
+            'trade_date': parse_roc_date(row[0]),
+            'volume': parse_number(row[1]),
+            'turnover': parse_number(row[2]),
+            'open': parse_price(row[3]),
+            'high': parse_price(row[4]),
+            'low': parse_price(row[5]),
+            'close': parse_price(row[6]),
+            'change': parse_price(row[7]),
+            'transactions': parse_number(row[8]),
+        })
+    return records
+
+
+def parse_stock_day_all(payload, task):
+    """
+    解析 STOCK_DAY_ALL 全市場資料（對應 TwseApiService::transformStockData）
+
+    Args:
+        payload: API 回應（物件陣列）
+        task: 任務
+
+    Returns:
+        records: 股價記錄列表
+    """
+    if not isinstance(payload, list):
+        return []
+
+    fallback_date = task['meta'].get('date')
+    records = []
+    for item in payload:
+        records.append({
+            'symbol': item.get('Code') or item.get('股票代號', ''),
+            'name': item.get('Name') or item.get('股票名稱', ''),
+            'trade_date': format_date(item.get('Date') or item.get('TradeDate') or fallback_date),
+            'volume': parse_number(item.get('TradeVolume', item.get('成交股數'))),
+            'turnover': parse_number(item.get('TradeValue', item.get('成交金額'))),
+            'open': parse_price(item.get('OpeningPrice', item.get('開盤價'))),
+            'high': parse_price(item.get('HighestPrice', item.get('最高價'))),
+            'low': parse_price(item.get('LowestPrice', item.get('最低價'))),
+            'close': parse_price(item.get('ClosingPrice', item.get('收盤價'))),
+            'change': parse_price(item.get('Change', item.get('漲跌價差'))),
+            'transactions': parse_number(item.get('Transaction', item.get('成交筆數'))),
+        })
+    return records
+
+
+def parse_daily_options(payload, task):
+    """
+    解析期交所選擇權每日行情，只保留 TXO（對應 TaifexOpenApiService::transformRecord）
+
+    Args:
+        payload: API 回應（物件陣列）
+        task: 任務
+
+    Returns:
+        records: 選擇權記錄列表
+    """
+    if not isinstance(payload, list):
+        return []
+
+    option_types = {'買權': 'CALL', 'Call': 'CALL', 'C': 'CALL', '賣權': 'PUT', 'Put': 'PUT', 'P': 'PUT'}
+    records = []
+    for item in payload:
+        if item.get('Contract') != 'TXO':
+            continue
+
+        strike = parse_number(item.get('StrikePrice'))
+        option_type = option_types.get(item.get('Call/Put', ''))
+        if not option_type or strike <= 0:
+            continue
+
+        month = item.get('ContractMonth(Week)', '')
+        bid = parse_number(item.get('BestBid'))
+        ask = parse_number(item.get('BestAsk'))
+        trade_date = None
+        for field in ('TradeDate', 'Date', '交易日期', '日期'):
+            if item.get(field):
+                trade_date = format_date(item[field])
+                break
+
+        records.append({
+            'option_code': f'TXO {month} {option_type[0]} {int(strike)}',
+            'underlying': 'TXO',
+            'contract': 'TXO',
+            'strike_price': strike,
+            'option_type': option_type,
+            'expiry_date': third_wednesday(month),
+            'expiry_month': month,
+            'open_price': parse_number(item.get('OpeningPrice')),
+            'high_price': parse_number(item.get('HighestPrice')),
+            'low_price': parse_number(item.get('LowestPrice')),
+            'close_price': parse_number(item.get('ClosingPrice')),
+            'settlement_price': parse_number(item.get('SettlementPrice')),
+            'change': parse_number(item.get('Change')),
+            'change_percent': parse_number(item.get('ChangePercent')),
+            'volume_total': int(parse_number(item.get('Volume'))),
+            'open_interest': int(parse_number(item.get('OpenInterest'))),
+            'best_bid': bid,
+            'best_ask': ask,
+            'spread': round(ask - bid, 2) if bid > 0 and ask > 0 else 0,
+            'mid_price': round((ask + bid) / 2, 2) if bid > 0 and ask > 0 else 0,
+            'date': trade_date or task['meta'].get('date') or date.today().isoformat(),
+        })
+    return records
+
+
+PARSERS = {
+    'stock_day': parse_stock_day,
+    'stock_day_all': parse_stock_day_all,
+    'options': parse_daily_options,
+}
+
+
+# ---------------------------------------------------------------------------
+# 任務產生
+# ---------------------------------------------------------------------------
+
+def month_range(start, end):
+    """列出 [start, end] 之間的月份（YYYY-MM）"""
+    year, month = map(int, start.split('-')[:2])
+    last_year, last_month = map(int, end.split('-')[:2])
+    months = []
+    while (year, month) <= (last_year, last_month):
+        months.append(f'{year:04d}{month:02d}')
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return months
+
+
+def stock_day_tasks(symbols, start, end, base_url=TWSE_BASE_URL, today=None):
+    """
+    建立 STOCK_DAY 回補任務（每檔股票每月一個）
+
+    當月（及之後）的任務標記為 final=False：資料仍會隨交易日增加，不寫入檢查點，
+    每次執行都重新抓取（寫入資料庫時以 upsert 覆寫）
+
+    Args:
+        symbols: 股票代號列表
+        start: 起始月份 YYYY-MM
+        end: 結束月份 YYYY-MM
+        base_url: 舊版 API 網址
+        today: 判斷當月的日期（預設今日）
+
+    Returns:
+        tasks: 任務列表
+    """
+    current = (today or date.today()).strftime('%Y%m')
+    return [{
+        'key': f'stock_day:{symbol}:{month}',
+        'kind': 'stock_day',
+        'url': f'{base_url}/exchangeReport/STOCK_DAY',
+        'params': {'response': 'json', 'date': f'{month}01', 'stockNo': symbol},
+        'meta': {'symbol': symbol, 'month': month},
+        'final': month < current,
+    } for month in month_range(start, end) for symbol in symbols]
+
+
+def stock_day_all_task(trade_date=None, base_url=TWSE_OPENAPI_URL):
+    """建立 STOCK_DAY_ALL 任務（API 只回傳最新一日，trade_date 僅作為缺少日期欄位時的備援）"""
+    trade_date = trade_date or date.today().isoformat()
+    return [{
+        'key': f'stock_day_all:{trade_date}',
+        'kind': 'stock_day_all',
+        'url': f'{base_url}/exchangeReport/STOCK_DAY_ALL',
+        'params': {},
+        'meta': {'date': trade_date},
+    }]
+
+
+def options_task(trade_date=None, base_url=TAIFEX_OPENAPI_URL):
+    """建立期交所選擇權每日行情任務"""
+    trade_date = trade_date or date.today().isoformat()
+    return [{
+        'key': f'options:{trade_date}',
+        'kind': 'options',
+        'url': f'{base_url}/DailyMarketReportOpt',
+        'params': {},
+        'meta': {'date': trade_date},
+    }]
+
+
+# ---------------------------------------------------------------------------
+# HTTP 連線池與限速
+# ---------------------------------------------------------------------------
+
+class HttpPool:
+    """HTTP/1.1 keep-alive 連線池（每個主機最多 max_per_host 條連線）"""
+
+    def __init__(self, max_per_host=8, timeout=30, headers=None):
+        """
+        初始化連線池
+
+        Args:
+            max_per_host: 每個主機的連線上限
+            timeout: 單次請求逾時秒數
+            headers: 預設請求標頭
+        """
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.headers = dict(DEFAULT_HEADERS if headers is None else headers)
+        self.idle = {}
+        self.limits = {}
+        self.ssl_context = None
+        self.stats = {'requests': 0, 'connections': 0, 'reused': 0}
+
+    async def _open(self, key):
+        scheme, host, port = key
+        if scheme == 'https' and self.ssl_context is None:
+            self.ssl_context = ssl.create_default_context()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=self.ssl_context if scheme == 'https' else None),
+            self.timeout
+        )
+        self.stats['connections'] += 1
+        return reader, writer
+
+    def _take_idle(self, key):
+        idle = self.idle.get(key, [])
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return None
+
+    async def _roundtrip(self, reader, writer, host, target, headers):
+        lines = [f'GET {target} HTTP/1.1', f'Host: {host}', 'Connection: keep-alive',
+                 'Accept-Encoding: gzip']
+        lines.extend(f'{name}: {value}' for name, value in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError('連線已被伺服器關閉')
+        version, status = status_line.decode('latin-1').split(None, 2)[:2]
+
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == 'HTTP/1.1' and response_headers.get('connection', '').lower() != 'close'
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            parts = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                parts.append((await reader.readexactly(size + 2))[:-2])
+            body = b''.join(parts)
+        elif 'content-length' in response_headers:
+            body = await reader.readexactly(int(response_headers['content-length']))
+        else:
+            body = await reader.read()
+            keep_alive = False
+
+        if response_headers.get('content-encoding', '').lower() == 'gzip':
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        return int(status), response_headers, body, keep_alive
+
+    async def get(self, url, params=None, headers=None):
+        """
+        發送 GET 請求
+
+        Args:
+            url: 網址
+            params: 查詢參數
+            headers: 額外標頭
+
+        Returns:
+            status, headers, body
+        """
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        key = (parts.scheme, parts.hostname, port)
+        target = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        if params:
+            target += ('&' if parts.query else '?') + urlencode(params)
+        host = parts.hostname if port in (80, 443) else f'{parts.hostname}:{port}'
+        request_headers = {**self.headers, **(headers or {})}
+
+        if key not in self.limits:
+            self.limits[key] = asyncio.Semaphore(self.max_per_host)
+
+        async with self.limits[key]:
+            # 閒置連線可能已被伺服器關閉，失敗時改用新連線重送一次
+            for attempt in range(2):
+                connection = self._take_idle(key) if attempt == 0 else None
+                reused = connection is not None
+                if connection is None:
+                    connection = await self._open(key)
+                reader, writer = connection
+                try:
+                    status, response_headers, body, keep_alive = await asyncio.wait_for(
+                        self._roundtrip(reader, writer, host, target, request_headers), self.timeout
+                    )
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    writer.close()
+                    if reused:
+                        continue
+                    raise HttpError(f'連線錯誤: {e}')
+                except ValueError as e:
+                    # 狀態列或 chunk 大小無法解析
+                    writer.close()
+                    raise HttpError(f'回應格式錯誤: {e}')
+                except BaseException:
+                    writer.close()
+                    raise
+                break
+
+            self.stats['requests'] += 1
+            self.stats['reused'] += int(reused)
+            if keep_alive:
+                self.idle.setdefault(key, []).append((reader, writer))
+            else:
+                writer.close()
+
+        return status, response_headers, body
+
+    async def close(self):
+        """關閉所有閒置連線"""
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle = {}
+
+
+class RateLimiter:
+    """令牌桶限速器（rate 次/秒，最多累積 burst 個令牌）"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = None
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        """暫停整個主機（收到 429 Retry-After 時使用）"""
+        loop = asyncio.get_running_loop()
+        self.paused_until = max(self.paused_until, loop.time() + seconds)
+
+    async def acquire(self):
+        """取得一個令牌（不足時等待）"""
+        if not self.rate:
+            return
+        loop = asyncio.get_running_loop()
+        async with self.lock:
+            while True:
+                now = loop.time()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                if self.updated is not None:
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# ---------------------------------------------------------------------------
+# 檢查點與輸出
+# ---------------------------------------------------------------------------
+
+class Checkpoint:
+    """可續傳檢查點：JSON Lines 記錄已完成（資料已寫出且內容不會再變動）的任務"""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self.pending = []
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self.done.add(json.loads(line)['key'])
+                    except (ValueError, KeyError):
+                        continue  # 中斷時寫到一半的最後一行
+
+    def mark(self, key, records):
+        self.pending.append({'key': key, 'records': records})
+
+    def flush(self):
+        """寫出待確認的任務（必須在輸出 flush 之後呼叫）"""
+        if not self.pending:
+            return
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in self.pending))
+        self.done.update(entry['key'] for entry in self.pending)
+        self.pending = []
+
+
+class JsonlSink:
+    """將記錄附加寫入 JSON Lines 檔案"""
+
+    def __init__(self, path):
+        self.path = path
+        self.buffer = []
+        self.written = 0
+
+    def write(self, task, records):
+        self.buffer.extend(records)
+
+    def flush(self):
+        if not self.buffer:
+            return
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in self.buffer))
+        self.written += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        return {'records_written': self.written}
+
+
+class DatabaseSink:
+    """以 import_prices 的驗證與批次 upsert 寫入 stock_prices"""
+
+    def __init__(self, db, update_cache=True):
+        from import_prices import PriceImporter
+        self.importer = PriceImporter(db, update_cache=update_cache)
+        self.buffer = []
+
+    def write(self, task, records):
+        self.buffer.extend(records)
+
+    def flush(self):
+        if not self.buffer:
+            return
+        import pandas as pd
+        from import_prices import normalize_chunk
+
+        frame, rejected = normalize_chunk(pd.DataFrame(self.buffer))
+        stats = self.importer.stats
+        stats['rows_read'] += len(self.buffer)
+        for reason, count in rejected.items():
+            stats['rejected'][reason] = stats['rejected'].get(reason, 0) + count
+        self.importer.import_chunk(frame)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        stats = self.importer.finish()
+        return {key: stats[key] for key in ('rows_read', 'rows_upserted', 'stocks_created', 'rejected')
+                if key in stats}
+
+
+# ---------------------------------------------------------------------------
+# 爬蟲
+# ---------------------------------------------------------------------------
+
+class Crawler:
+    """並行爬蟲：固定數量工作者 + 每主機限速 + 重試 + 檢查點"""
+
+    def __init__(self, sink, checkpoint=None, concurrency=8, rate=1.0, burst=3, retries=4,
+                 backoff=1.0, max_backoff=30.0, timeout=30, flush_every=50, pool=None):
+        """
+        初始化爬蟲
+
+        Args:
+            sink: 輸出（JsonlSink / DatabaseSink）
+            checkpoint: Checkpoint（None 時不續傳）
+            concurrency: 同時進行的請求數
+            rate: 每個主機每秒請求數（0 為不限速）
+            burst: 令牌桶容量
+            retries: 失敗後的重試次數
+            backoff: 退避基準秒數（第 n 次重試等待 0~backoff*2^n 秒）
+            max_backoff: 退避上限秒數
+            timeout: 單次請求逾時秒數
+            flush_every: 每完成幾個任務寫出一次輸出與檢查點
+            pool: HttpPool（預設每主機 concurrency 條連線）
+        """
+        self.sink = sink
+        self.checkpoint = checkpoint or Checkpoint(None)
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.flush_every = flush_every
+        self.pool = pool or HttpPool(max_per_host=concurrency, timeout=timeout)
+        self.limiters = {}
+        self.failed = []
+        self.uncommitted = 0
+        self.stats = {'tasks': 0, 'skipped': 0, 'completed': 0, 'empty': 0, 'failed': 0,
+                      'retries': 0, 'redirects': 0, 'records': 0}
+
+    def _limiter(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.limiters:
+            self.limiters[host] = RateLimiter(self.rate, self.burst)
+        return self.limiters[host]
+
+    async def _get(self, url, params):
+        """
+        發送請求並跟隨轉址（最多 MAX_REDIRECTS 次，轉址後的網址已含查詢參數）
+
+        Returns:
+            status, headers, body
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            status, headers, body = await self.pool.get(url, params)
+            if status not in REDIRECT_STATUS:
+                return status, headers, body
+            location = headers.get('location')
+            if not location:
+                raise HttpError(f'HTTP {status} 轉址缺少 Location', status, retryable=False)
+            url, params = urljoin(url, location), None
+            self.stats['redirects'] += 1
+        raise HttpError(f'轉址超過 {MAX_REDIRECTS} 次（最後轉址至 {url}）', status, retryable=False)
+
+    async def fetch(self, task):
+        """
+        取得並解析單一任務（含限速與重試）
+
+        Args:
+            task: 任務
+
+        Returns:
+            records: 解析後的記錄列表
+        """
+        limiter = self._limiter(task['url'])
+        for attempt in range(self.retries + 1):
+            await limiter.acquire()
+            try:
+                status, headers, body = await self._get(task['url'], task['params'])
+                if status in RETRY_STATUS:
+                    retry_after = headers.get('retry-after')
+                    raise HttpError(f'HTTP {status}', status,
+                                    retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None)
+                if status != 200:
+                    raise HttpError(f'HTTP {status}', status, retryable=False)
+                try:
+                    payload = json.loads(body.decode('utf-8-sig')) if body.strip() else None
+                except ValueError:
+                    # 請求過於頻繁時 TWSE 會回傳 HTML 頁面
+                    raise HttpError('回應不是 JSON', status)
+                return PARSERS[task['kind']](payload, task)
+
+            except (HttpError, asyncio.TimeoutError, OSError) as e:
+                retryable = getattr(e, 'retryable', True)
+                if not retryable or attempt == self.retries:
+                    raise HttpError(str(e) or type(e).__name__, getattr(e, 'status', None), retryable=False)
+
+                self.stats['retries'] += 1
+                retry_after = getattr(e, 'retry_after', None)
+                if retry_after:
+                    limiter.pause(retry_after)
+                # 指數退避 + 全隨機抖動，避免所有工作者同時重送
+                await asyncio.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+    def _commit(self):
+        self.sink.flush()
+        self.checkpoint.flush()
+        self.uncommitted = 0
+
+    async def _worker(self, queue):
+        while True:
+            task = await queue.get()
+            try:
+                records = await self.fetch(task)
+                self.sink.write(task, records)
+                # 只記錄內容已確定的任務：未結束的月份（final=False）與無資料 / stat 非 OK 的回應
+                # 下次執行重新抓取，避免新交易日或暫時無資料的月份被永久略過
+                if records and task.get('final', True):
+                    self.checkpoint.mark(task['key'], len(records))
+                self.stats['completed'] += 1
+                self.stats['empty'] += int(not records)
+                self.stats['records'] += len(records)
+                self.uncommitted += 1
+                if self.uncommitted >= self.flush_every:
+                    self._commit()
+            except Exception as e:
+                # 解析錯誤（非預期的回應格式）或寫出失敗只記錄該任務，工作者繼續處理佇列，
+                # 否則工作者結束後 queue.join() 會永遠等待
+                self.stats['failed'] += 1
+                self.failed.append({'key': task['key'], 'error': f'{type(e).__name__}: {e}'})
+            finally:
+                queue.task_done()
+
+    async def run(self, tasks):
+        """
+        執行任務（已在檢查點中的任務略過）
+
+        Args:
+            tasks: 任務列表
+
+        Returns:
+            stats: 統計
+        """
+        started = time.perf_counter()
+        pending = [task for task in tasks if task['key'] not in self.checkpoint.done]
+        self.stats['tasks'] += len(tasks)
+        self.stats['skipped'] += len(tasks) - len(pending)
+
+        queue = asyncio.Queue()
+        for task in pending:
+            queue.put_nowait(task)
+
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(min(self.concurrency, len(pending)))]
+        try:
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            # 中斷時也寫出已完成的任務，下次從未完成處繼續
+            self._commit()
+            await self.pool.close()
+
+        elapsed = time.perf_counter() - started
+        return {
+            **self.stats,
+            'seconds': round(elapsed, 2),
+            'requests_per_second': round(self.pool.stats['requests'] / elapsed, 2) if elapsed > 0 else None,
+            'http': dict(self.pool.stats),
+        }
+
+
+def main():
+    """主函數"""
+    try:
+        args = [a for a in sys.argv[1:] if not a.startswith('--')]
+        options = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+
+        kind = args[0] if args else None
+        if kind not in PARSERS:
+            print(json.dumps({
+                'success': False,
+                'error': '使用方式: python crawler.py <stock_day|stock_day_all|options> '
+                         '[--symbols=2330,2317] [--start=2024-01] [--end=2024-12] [--date=YYYY-MM-DD] '
+                         '[--concurrency=8] [--rate=1] [--burst=3] [--retries=4] [--base-url=...] '
+                         '[--checkpoint=路徑] [--output=路徑.jsonl] [--database=sqlite路徑] [--no-cache] [--reset]'
+            }, ensure_ascii=False))
+            sys.exit(1)
+
+        base_url = options.get('base-url')
+        if kind == 'stock_day':
+            today = date.today().strftime('%Y-%m')
+            symbols = options['symbols'].split(',') if options.get('symbols') else DEFAULT_SYMBOLS
+            tasks = stock_day_tasks(symbols, options.get('start', today), options.get('end', today),
+                                    base_url or TWSE_BASE_URL)
+        elif kind == 'stock_day_all':
+            tasks = stock_day_all_task(options.get('date'), base_url or TWSE_OPENAPI_URL)
+        else:
+            tasks = options_task(options.get('date'), base_url or TAIFEX_OPENAPI_URL)
+
+        checkpoint_path = options.get('checkpoint', os.path.join(DEFAULT_CHECKPOINT_DIR, f'{kind}.checkpoint.jsonl'))
+        if '--reset' in sys.argv and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        db = None
+        if kind != 'options' and ('database' in options or '--db' in sys.argv):
+            from db import Database
+            db = Database(options.get('database'))
+            db.ensure_schema()
+            sink = DatabaseSink(db, update_cache='--no-cache' not in sys.argv)
+        else:
+            sink = JsonlSink(options.get('output', os.path.join(DEFAULT_CHECKPOINT_DIR, f'{kind}.jsonl')))
+
+        crawler = Crawler(
+            sink, Checkpoint(checkpoint_path),
+            concurrency=int(options.get('concurrency', 8)),
+            rate=float(options.get('rate', 1.0)),
+            burst=int(options.get('burst', 3)),
+            retries=int(options.get('retries', 4)),
+            timeout=float(options.get('timeout', 30)),
+        )
+        stats = asyncio.run(crawler.run(tasks))
+        stats['output'] = sink.close()
+        if db is not None:
+            db.close()
+
+        print(json.dumps({
+            'success': stats['failed'] == 0,
+            **stats,
+            'failed_tasks': crawler.failed[:20],
+        }, ensure_ascii=False))
+        sys.exit(0 if stats['failed'] == 0 else 1)
+
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }, ensure_ascii=False))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+資料庫連線工具
+依 Laravel .env 的 DB_* 設定連線（MySQL 需安裝 pymysql），
+未設定或指定 SQLite 檔案時使用 sqlite3，作為測試與離線匯入的替代資料庫
+"""
+
+import os
+import sqlite3
+
+# 專案根目錄（Laravel .env 所在位置）
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 與 Laravel migration 相同的資料表結構（SQLite 版）
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stocks (
+    id                 INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol             VARCHAR(20) NOT NULL UNIQUE,
+    name               VARCHAR(100) NOT NULL,
+    exchange           VARCHAR(20) NOT NULL DEFAULT 'TWSE',
+    industry           VARCHAR(100),
+    market_cap         DECIMAL(20, 2),
+    shares_outstanding DECIMAL(20, 2),
+    is_active          TINYINT(1) NOT NULL DEFAULT 1,
+    meta_data          TEXT,
+    created_at         TIMESTAMP,
+    updated_at         TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS stock_prices (
+    id             INTEGER PRIMARY KEY AUTOINCREMENT,
+    stock_id       INTEGER NOT NULL REFERENCES stocks (id) ON DELETE CASCADE,
+    trade_date     DATE NOT NULL,
+    open           DECIMAL(12, 2) NOT NULL,
+    high           DECIMAL(12, 2) NOT NULL,
+    low            DECIMAL(12, 2) NOT NULL,
+    close          DECIMAL(12, 2) NOT NULL,
+    volume         BIGINT NOT NULL DEFAULT 0,
+    turnover       DECIMAL(20, 2),
+    change         DECIMAL(12, 2),
+    change_percent DECIMAL(10, 2),
+    transactions   INTEGER,
+    created_at     TIMESTAMP,
+    updated_at     TIMESTAMP,
+    UNIQUE (stock_id, trade_date)
+);
+CREATE INDEX IF NOT EXISTS stock_prices_trade_date_index ON stock_prices (trade_date);
+CREATE TABLE IF NOT EXISTS predictions (
+    id                   INTEGER PRIMARY KEY AUTOINCREMENT,
+    predictable_type     VARCHAR(255) NOT NULL,
+    predictable_id       INTEGER NOT NULL,
+    model_type           VARCHAR(50) NOT NULL,
+    prediction_date      DATE NOT NULL,
+    base_date            DATE,
+    prediction_days      INTEGER NOT NULL,
+    predicted_price      DECIMAL(12, 4),
+    predicted_volatility DECIMAL(10, 6),
+    upper_bound          DECIMAL(12, 4),
+    lower_bound          DECIMAL(12, 4),
+    confidence_level     DECIMAL(5, 2) NOT NULL DEFAULT 95,
+    mse                  DECIMAL(12, 6),
+    rmse                 DECIMAL(12, 6),
+    mae                  DECIMAL(12, 6),
+    accuracy             DECIMAL(5, 2),
+    model_parameters     TEXT,
+    prediction_series    TEXT,
+    notes                TEXT,
+    created_at           TIMESTAMP,
+    updated_at           TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS predictions_predictable_type_predictable_id_index
+    ON predictions (predictable_type, predictable_id);
+CREATE INDEX IF NOT EXISTS predictions_prediction_date_index ON predictions (prediction_date);
+CREATE TABLE IF NOT EXISTS prediction_accuracies (
+    id                 INTEGER PRIMARY KEY AUTOINCREMENT,
+    predictable_type   VARCHAR(255) NOT NULL,
+    predictable_id     INTEGER NOT NULL,
+    model_type         VARCHAR(50) NOT NULL,
+    horizon            INTEGER NOT NULL,
+    sample_count       INTEGER NOT NULL DEFAULT 0,
+    sum_error          DOUBLE NOT NULL DEFAULT 0,
+    sum_abs_error      DOUBLE NOT NULL DEFAULT 0,
+    sum_squared_error  DOUBLE NOT NULL DEFAULT 0,
+    sum_abs_pct_error  DOUBLE NOT NULL DEFAULT 0,
+    interval_count     INTEGER NOT NULL DEFAULT 0,
+    interval_hits      INTEGER NOT NULL DEFAULT 0,
+    direction_count    INTEGER NOT NULL DEFAULT 0,
+    direction_hits     INTEGER NOT NULL DEFAULT 0,
+    mae                DECIMAL(14, 6),
+    rmse               DECIMAL(14, 6),
+    mape               DECIMAL(10, 4),
+    bias               DECIMAL(14, 6),
+    coverage           DECIMAL(6, 2),
+    direction_accuracy DECIMAL(6, 2),
+    first_target_date  DATE,
+    last_target_date   DATE,
+    created_at         TIMESTAMP,
+    updated_at         TIMESTAMP,
+    UNIQUE (predictable_type, predictable_id, model_type, horizon)
+);
+CREATE TABLE IF NOT EXISTS options (
+    id             INTEGER PRIMARY KEY AUTOINCREMENT,
+    underlying     VARCHAR(20) NOT NULL,
+    option_code    VARCHAR(50) NOT NULL UNIQUE,
+    option_type    VARCHAR(4) NOT NULL,
+    strike_price   DECIMAL(12, 2) NOT NULL,
+    expiry_date    DATE NOT NULL,
+    contract_size  INTEGER NOT NULL DEFAULT 1,
+    exercise_style VARCHAR(20) NOT NULL DEFAULT 'european',
+    is_active      TINYINT(1) NOT NULL DEFAULT 1,
+    meta_data      TEXT,
+    created_at     TIMESTAMP,
+    updated_at     TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS option_prices (
+    id                 INTEGER PRIMARY KEY AUTOINCREMENT,
+    option_id          INTEGER NOT NULL REFERENCES options (id) ON DELETE CASCADE,
+    trade_date         DATE NOT NULL,
+    open               DECIMAL(12, 4),
+    high               DECIMAL(12, 4),
+    low                DECIMAL(12, 4),
+    close              DECIMAL(12, 4),
+    volume             INTEGER NOT NULL DEFAULT 0,
+    open_interest      INTEGER,
+    implied_volatility DECIMAL(10, 6),
+    delta              DECIMAL(10, 6),
+    gamma              DECIMAL(10, 6),
+    theta              DECIMAL(10, 6),
+    vega               DECIMAL(10, 6),
+    rho                DECIMAL(10, 6),
+    created_at         TIMESTAMP,
+    updated_at         TIMESTAMP,
+    UNIQUE (option_id, trade_date)
+);
+CREATE INDEX IF NOT EXISTS option_prices_trade_date_index ON option_prices (trade_date);
+CREATE TABLE IF NOT EXISTS option_cube (
+    id               INTEGER PRIMARY KEY AUTOINCREMENT,
+    underlying       VARCHAR(20) NOT NULL,
+    trade_date       DATE NOT NULL,
+    expiry_date      DATE NOT NULL,
+    strike_price     DECIMAL(12, 2) NOT NULL,
+    option_type      VARCHAR(4) NOT NULL,
+    contracts        INTEGER NOT NULL DEFAULT 0,
+    volume           BIGINT NOT NULL DEFAULT 0,
+    open_interest    BIGINT NOT NULL DEFAULT 0,
+    turnover         DOUBLE NOT NULL DEFAULT 0,
+    traded_volume    BIGINT NOT NULL DEFAULT 0,
+    traded_close_sum DOUBLE NOT NULL DEFAULT 0,
+    traded_count     INTEGER NOT NULL DEFAULT 0,
+    close_sum        DOUBLE NOT NULL DEFAULT 0,
+    iv_sum           DOUBLE NOT NULL DEFAULT 0,
+    iv_count         INTEGER NOT NULL DEFAULT 0,
+    high             DECIMAL(12, 4),
+    low              DECIMAL(12, 4),
+    vwap             DECIMAL(12, 4),
+    avg_iv           DECIMAL(10, 6),
+    created_at       TIMESTAMP,
+    updated_at       TIMESTAMP,
+    UNIQUE (underlying, trade_date, expiry_date, strike_price, option_type)
+);
+CREATE INDEX IF NOT EXISTS option_cube_trade_date_index ON option_cube (trade_date);
+CREATE TABLE IF NOT EXISTS option_daily_stats (
+    id                    INTEGER PRIMARY KEY AUTOINCREMENT,
+    underlying            VARCHAR(20) NOT NULL,
+    trade_date            DATE NOT NULL,
+    contracts             INTEGER NOT NULL DEFAULT 0,
+    call_volume           BIGINT NOT NULL DEFAULT 0,
+    put_volume            BIGINT NOT NULL DEFAULT 0,
+    call_oi               BIGINT NOT NULL DEFAULT 0,
+    put_oi                BIGINT NOT NULL DEFAULT 0,
+    turnover              DOUBLE NOT NULL DEFAULT 0,
+    traded_volume         BIGINT NOT NULL DEFAULT 0,
+    traded_close_sum      DOUBLE NOT NULL DEFAULT 0,
+    traded_count          INTEGER NOT NULL DEFAULT 0,
+    close_sum             DOUBLE NOT NULL DEFAULT 0,
+    call_iv_sum           DOUBLE NOT NULL DEFAULT 0,
+    call_iv_count         INTEGER NOT NULL DEFAULT 0,
+    put_iv_sum            DOUBLE NOT NULL DEFAULT 0,
+    put_iv_count          INTEGER NOT NULL DEFAULT 0,
+    high                  DECIMAL(12, 4),
+    low                   DECIMAL(12, 4),
+    total_volume          BIGINT NOT NULL DEFAULT 0,
+    total_oi              BIGINT NOT NULL DEFAULT 0,
+    put_call_volume_ratio DECIMAL(10, 4),
+    put_call_oi_ratio     DECIMAL(10, 4),
+    weighted_index        DECIMAL(12, 4),
+    avg_price             DECIMAL(12, 4),
+    avg_close             DECIMAL(12, 4),
+    avg_iv                DECIMAL(10, 6),
+    call_avg_iv           DECIMAL(10, 6),
+    put_avg_iv            DECIMAL(10, 6),
+    source_rows           INTEGER NOT NULL DEFAULT 0,
+    source_updated_at     TIMESTAMP,
+    created_at            TIMESTAMP,
+    updated_at            TIMESTAMP,
+    UNIQUE (underlying, trade_date)
+);
+CREATE INDEX IF NOT EXISTS option_daily_stats_trade_date_index ON option_daily_stats (trade_date);
+"""
+
+
+def read_env(path=None):
+    """
+    讀取 Laravel .env 檔案（不覆寫已存在的環境變數）
+
+    Args:
+        path: .env 路徑（預設專案根目錄）
+
+    Returns:
+        env: 設定值字典
+    """
+    env = {}
+    try:
+        with open(path or os.path.join(BASE_DIR, '.env'), 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#') or '=' not in line:
+                    continue
+                key, value = line.split('=', 1)
+                env[key.strip()] = value.strip().strip('"').strip("'")
+    except OSError:
+        pass
+
+    env.update({key: value for key, value in os.environ.items() if key.startswith('DB_')})
+    return env
+
+
+class Database:
+    """DB-API 連線包裝：統一參數佔位符與 upsert 語法"""
+
+    def __init__(self, database=None):
+        """
+        建立連線
+
+        Args:
+            database: SQLite 檔案路徑；None 時依 .env / 環境變數的 DB_CONNECTION 決定
+        """
+        env = read_env()
+        connection = env.get('DB_CONNECTION', 'sqlite')
+        if database is None and connection == 'mysql':
+            try:
+                import pymysql
+            except ImportError:
+                raise RuntimeError('連線 MySQL 需要 pymysql：pip install pymysql')
+
+            self.dialect = 'mysql'
+            self.conn = pymysql.connect(
+                host=env.get('DB_HOST', '127.0.0.1'),
+                port=int(env.get('DB_PORT', 3306)),
+                user=env.get('DB_USERNAME', 'root'),
+                password=env.get('DB_PASSWORD', ''),
+                database=env.get('DB_DATABASE', 'laravel'),
+                charset='utf8mb4',
+                autocommit=False
+            )
+            self.placeholder = '%s'
+        else:
+            path = database or (env.get('DB_DATABASE') if connection == 'sqlite' else None) \
+                or os.path.join(BASE_DIR, 'database', 'database.sqlite')
+            self.dialect = 'sqlite'
+            self.conn = sqlite3.connect(path)
+            self.conn.execute('PRAGMA foreign_keys = ON')
+            self.conn.execute('PRAGMA journal_mode = WAL')
+            self.conn.execute('PRAGMA synchronous = NORMAL')
+            self.placeholder = '?'
+
+    def ensure_schema(self):
+        """SQLite 替代資料庫建立資料表（MySQL 由 Laravel migration 管理）"""
+        if self.dialect == 'sqlite':
+            self.conn.executescript(SQLITE_SCHEMA)
+            # 舊版資料庫的 predictions 沒有預測基準日欄位
+            columns = [row[1] for row in self.conn.execute('PRAGMA table_info(predictions)')]
+            if 'base_date' not in columns:
+                self.conn.execute('ALTER TABLE predictions ADD COLUMN base_date DATE')
+            self.conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS predictions_base_date_unique ON predictions '
+                              '(predictable_type, predictable_id, model_type, base_date, prediction_days)')
+
+    def upsert_sql(self, table, columns, keys, updates):
+        """
+        產生批次 upsert 語句
+
+        Args:
+            table: 資料表
+            columns: 插入欄位
+            keys: 唯一鍵欄位（SQLite ON CONFLICT 使用）
+            updates: 衝突時更新的欄位
+
+        Returns:
+            sql: 可用於 executemany 的語句
+        """
+        column_list = ', '.join(f'`{c}`' if self.dialect == 'mysql' else f'"{c}"' for c in columns)
+        values = ', '.join([self.placeholder] * len(columns))
+        sql = f'INSERT INTO {table} ({column_list}) VALUES ({values})'
+
+        if self.dialect == 'mysql':
+            assignments = ', '.join(f'`{c}` = VALUES(`{c}`)' for c in updates)
+            return f'{sql} ON DUPLICATE KEY UPDATE {assignments}'
+
+        assignments = ', '.join(f'"{c}" = excluded."{c}"' for c in updates)
+        return f'{sql} ON CONFLICT ({", ".join(keys)}) DO UPDATE SET {assignments}'
+
+    def execute(self, sql, params=()):
+        cursor = self.conn.cursor()
+        cursor.execute(sql.replace('?', self.placeholder), params)
+        return cursor
+
+    def executemany(self, sql, rows):
+        cursor = self.conn.cursor()
+        cursor.executemany(sql, rows)
+        return cursor
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
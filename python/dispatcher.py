@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+模型請求分派器
+位於 run_model.py 之前：合併進行中的相同請求、互動請求優先於批次請求，
+並以佇列深度限制提供背壓。以 SQLite 作為跨行程的共用佇列
+"""
+
+import sys
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from result_cache import cache_key
+from run_model import run_with_cache
+
+# 預設佇列資料庫：Laravel storage/app/model_dispatch.sqlite
+DEFAULT_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'storage', 'app', 'model_dispatch.sqlite'
+)
+
+# 優先權：數值越小越優先
+PRIORITIES = {
+    'interactive': 0,
+    'batch': 1,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    key         TEXT PRIMARY KEY,
+    model_type  TEXT NOT NULL,
+    priority    INTEGER NOT NULL,
+    status      TEXT NOT NULL,
+    owner_pid   INTEGER,
+    waiters     INTEGER NOT NULL DEFAULT 0,
+    created_at  REAL NOT NULL,
+    heartbeat_at REAL,
+    started_at  REAL,
+    finished_at REAL,
+    result      TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_requests_status ON requests (status, priority, created_at);
+CREATE TABLE IF NOT EXISTS counters (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class QueueFullError(Exception):
+    """佇列深度超過上限"""
+
+
+def pid_alive(pid):
+    """檢查行程是否仍存在（非 POSIX 平台一律視為存在，改由逾時判斷）"""
+    if os.name != 'posix' or not pid:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Heartbeat(threading.Thread):
+    """執行模型期間定期更新請求的心跳時間，讓其他行程分辨長時間執行中與已遺失的請求"""
+
+    def __init__(self, db_path, key, interval):
+        super().__init__(daemon=True)
+        self.db_path = db_path
+        self.key = key
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    conn.execute('UPDATE requests SET heartbeat_at = ? WHERE key = ?', (time.time(), self.key))
+                except sqlite3.Error:
+                    # 資料庫暫時鎖定時略過這次心跳
+                    pass
+        finally:
+            conn.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class ModelDispatcher:
+    """以 SQLite 協調多個行程的模型請求分派器"""
+
+    def __init__(self, db_path=None, max_concurrency=None, max_queue_depth=None,
+                 poll_interval=0.1, stale_after=120, heartbeat_interval=10, retention=300):
+        """
+        初始化分派器
+
+        Args:
+            db_path: 佇列資料庫路徑（可用 STOCK_DISPATCH_DB 覆寫）
+            max_concurrency: 同時執行的模型數（預設 STOCK_DISPATCH_CONCURRENCY 或 CPU 數）
+            max_queue_depth: 批次請求可排隊的上限，互動請求為兩倍（預設 STOCK_DISPATCH_MAX_QUEUE 或 50）
+            poll_interval: 輪詢間隔秒數
+            stale_after: 擁有者超過此秒數未更新心跳即視為遺失（與執行多久無關）
+            heartbeat_interval: 擁有者更新心跳的間隔秒數（須小於 stale_after）
+            retention: 已完成結果保留給晚到等待者的秒數
+        """
+        self.db_path = db_path or os.environ.get('STOCK_DISPATCH_DB', DEFAULT_DB_PATH)
+        self.max_concurrency = max_concurrency or int(
+            os.environ.get('STOCK_DISPATCH_CONCURRENCY', os.cpu_count() or 1))
+        self.max_queue_depth = max_queue_depth or int(os.environ.get('STOCK_DISPATCH_MAX_QUEUE', 50))
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.heartbeat_interval = heartbeat_interval
+        self.retention = retention
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        # 舊版佇列資料庫沒有心跳欄位
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(requests)')]
+        if 'heartbeat_at' not in columns:
+            conn.execute('ALTER TABLE requests ADD COLUMN heartbeat_at REAL')
+        conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    @staticmethod
+    def _increment(conn, name, amount=1):
+        conn.execute(
+            'INSERT INTO counters (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            (name, amount)
+        )
+
+    def _lost(self, pid, heartbeat_at, now=None):
+        """擁有者行程已結束，或超過 stale_after 秒未更新心跳（其他主機或非 POSIX 平台的行程）"""
+        return not pid_alive(pid) or (now or time.time()) - heartbeat_at > self.stale_after
+
+    def _expire(self, conn):
+        """標記擁有者已消失的請求為失敗，並清除過舊的完成結果"""
+        now = time.time()
+        for key, pid, heartbeat_at in conn.execute(
+                "SELECT key, owner_pid, COALESCE(heartbeat_at, created_at) FROM requests "
+                "WHERE status IN ('queued', 'running')").fetchall():
+            if self._lost(pid, heartbeat_at, now):
+                conn.execute(
+                    "UPDATE requests SET status = 'failed', finished_at = ?, result = ? WHERE key = ?",
+                    (now, json.dumps({'success': False, 'error': '模型請求遺失或逾時'}), key)
+                )
+
+        conn.execute(
+            "DELETE FROM requests WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (now - self.retention,)
+        )
+
+    def _register(self, conn, key, model_type, priority):
+        """
+        登記請求
+
+        Returns:
+            role: 'owner'（由本行程執行）或 'waiter'（等待相同請求的結果）
+        """
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._expire(conn)
+            self._increment(conn, 'submitted')
+
+            row = conn.execute('SELECT status FROM requests WHERE key = ?', (key,)).fetchone()
+            if row and row[0] in ('queued', 'running'):
+                conn.execute('UPDATE requests SET waiters = waiters + 1 WHERE key = ?', (key,))
+                self._increment(conn, 'coalesced')
+                conn.execute('COMMIT')
+                return 'waiter'
+
+            depth = conn.execute("SELECT COUNT(*) FROM requests WHERE status = 'queued'").fetchone()[0]
+            limit = self.max_queue_depth * (2 if priority == PRIORITIES['interactive'] else 1)
+            if depth >= limit:
+                self._increment(conn, 'rejected')
+                conn.execute('COMMIT')
+                raise QueueFullError(f'模型佇列已滿（{depth} 筆排隊中）')
+
+            now = time.time()
+            conn.execute(
+                'INSERT OR REPLACE INTO requests (key, model_type, priority, status, owner_pid, waiters, '
+                "created_at, heartbeat_at) VALUES (?, ?, ?, 'queued', ?, 0, ?, ?)",
+                (key, model_type, priority, os.getpid(), now, now)
+            )
+            conn.execute('COMMIT')
+            return 'owner'
+        except QueueFullError:
+            raise
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _acquire_slot(self, conn, key):
+        """
+        等待執行名額：前面的高優先或較早請求數須小於剩餘名額
+
+        Returns:
+            acquired: False 表示請求已被其他行程標記為遺失或清除，需重新登記
+        """
+        while True:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT priority, created_at, status FROM requests WHERE key = ?', (key,)).fetchone()
+            if row is None or row[2] != 'queued':
+                conn.execute('COMMIT')
+                return False
+            priority, created_at, _ = row
+            conn.execute('UPDATE requests SET heartbeat_at = ? WHERE key = ?', (time.time(), key))
+            running = conn.execute("SELECT COUNT(*) FROM requests WHERE status = 'running'").fetchone()[0]
+            ahead = conn.execute(
+                "SELECT COUNT(*) FROM requests WHERE status = 'queued' "
+                'AND (priority < ? OR (priority = ? AND created_at < ?))',
+                (priority, priority, created_at)
+            ).fetchone()[0]
+
+            if ahead < self.max_concurrency - running:
+                conn.execute(
+                    "UPDATE requests SET status = 'running', started_at = ? WHERE key = ?",
+                    (time.time(), key)
+                )
+                conn.execute('COMMIT')
+                return True
+
+            conn.execute('COMMIT')
+            time.sleep(self.poll_interval)
+
+    def _finish(self, conn, key, output):
+        status = 'done' if output.get('success') else 'failed'
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute(
+            'UPDATE requests SET status = ?, finished_at = ?, result = ? WHERE key = ?',
+            (status, time.time(), json.dumps(output, ensure_ascii=False), key)
+        )
+        self._increment(conn, 'completed')
+        conn.execute('COMMIT')
+
+    def _wait_result(self, conn, key):
+        """等待進行中的相同請求完成；若該請求遺失則回傳 None"""
+        while True:
+            row = conn.execute(
+                'SELECT status, result, owner_pid, COALESCE(heartbeat_at, created_at) FROM requests WHERE key = ?',
+                (key,)).fetchone()
+            if row is None:
+                return None
+            status, result, pid, heartbeat_at = row
+            if status in ('done', 'failed'):
+                return json.loads(result)
+            if self._lost(pid, heartbeat_at):
+                return None
+            time.sleep(self.poll_interval)
+
+    def submit(self, model_type, input_file, priority='interactive'):
+        """
+        送出模型請求並等待結果
+
+        Args:
+            model_type: 模型類型
+            input_file: 輸入資料檔案路徑
+            priority: 'interactive' 或 'batch'
+
+        Returns:
+            output: 模型輸出，附帶 dispatch 分派資訊
+        """
+        with open(input_file, 'r', encoding='utf-8-sig') as f:
+            input_data = json.load(f)
+
+        key = cache_key(model_type, input_data)
+        priority_value = PRIORITIES.get(priority, PRIORITIES['batch'])
+        submitted_at = time.time()
+
+        conn = self._connect()
+        try:
+            while True:
+                try:
+                    role = self._register(conn, key, model_type, priority_value)
+                except QueueFullError as e:
+                    return {
+                        'success': False,
+                        'error': str(e),
+                        'dispatch': {'rejected': True, **self.metrics(conn)}
+                    }
+
+                if role == 'waiter':
+                    output = self._wait_result(conn, key)
+                    if output is None:
+                        # 原執行者已消失，重新登記由本行程執行
+                        continue
+                    output['dispatch'] = {
+                        'coalesced': True,
+                        'wait_seconds': round(time.time() - submitted_at, 3)
+                    }
+                    return output
+
+                if not self._acquire_slot(conn, key):
+                    continue
+                queue_wait = time.time() - submitted_at
+
+                heartbeat = Heartbeat(self.db_path, key, self.heartbeat_interval)
+                heartbeat.start()
+                try:
+                    output = run_with_cache(model_type, input_file, input_data)
+                except Exception as e:
+                    output = {'success': False, 'error': str(e)}
+                finally:
+                    heartbeat.stop()
+
+                self._finish(conn, key, output)
+                output['dispatch'] = {
+                    'coalesced': False,
+                    'priority': priority,
+                    'queue_wait_seconds': round(queue_wait, 3)
+                }
+                return output
+        finally:
+            conn.close()
+
+    def metrics(self, conn=None):
+        """
+        取得佇列指標
+
+        Returns:
+            metrics: 各優先權排隊數、執行中數量與累計計數
+        """
+        own = conn is None
+        conn = conn or self._connect()
+        try:
+            queued = {name: 0 for name in PRIORITIES}
+            names = {value: name for name, value in PRIORITIES.items()}
+            for priority, count in conn.execute(
+                    "SELECT priority, COUNT(*) FROM requests WHERE status = 'queued' GROUP BY priority"):
+                queued[names.get(priority, 'batch')] += count
+
+            running = conn.execute("SELECT COUNT(*) FROM requests WHERE status = 'running'").fetchone()[0]
+            waiters = conn.execute(
+                "SELECT COALESCE(SUM(waiters), 0) FROM requests WHERE status IN ('queued', 'running')").fetchone()[0]
+            counters = dict(conn.execute('SELECT name, value FROM counters').fetchall())
+
+            return {
+                'queue_depth': sum(queued.values()),
+                'queued': queued,
+                'running': running,
+                'waiting_coalesced': waiters,
+                'max_concurrency': self.max_concurrency,
+                'max_queue_depth': self.max_queue_depth,
+                'counters': counters
+            }
+        finally:
+            if own:
+                conn.close()
+
+
+def main():
+    """主函數"""
+    try:
+        args = [a for a in sys.argv[1:] if not a.startswith('--')]
+        options = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+
+        dispatcher = ModelDispatcher()
+
+        if '--metrics' in sys.argv:
+            print(json.dumps({'success': True, 'metrics': dispatcher.metrics()}, ensure_ascii=False))
+            return
+
+        if len(args) != 2:
+            print(json.dumps({
+                'success': False,
+                'error': '使用方式: python dispatcher.py <model_type> <input_file> [--priority=interactive|batch]'
+            }))
+            sys.exit(1)
+
+        output = dispatcher.submit(args[0], args[1], options.get('priority', 'interactive'))
+        print(json.dumps(output, ensure_ascii=False))
+
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+歷史股價串流匯入工具
+分塊讀取 CSV / Excel 檔案，以向量化方式解析與驗證，再以批次 executemany upsert 寫入
+stocks / stock_prices 資料表（與 Laravel migration 相同結構），最後更新模型端股價快取
+
+支援格式：
+  generic: 英文欄位 symbol, trade_date, open, high, low, close, volume, turnover, transactions
+  twse:    證交所個股月報（第一行標題含股票代號，欄位 日期, 成交股數, 成交金額, 開盤價, ...，民國年日期）
+           或含 證券代號 欄位的全市場資料
+"""
+
+import sys
+import os
+import json
+import time
+import glob
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from db import Database
+from price_cache import PriceCache
+
+# 中文欄位對應
+TWSE_COLUMNS = {
+    '證券代號': 'symbol',
+    '證券名稱': 'name',
+    '日期': 'trade_date',
+    '開盤價': 'open',
+    '最高價': 'high',
+    '最低價': 'low',
+    '收盤價': 'close',
+    '成交股數': 'volume',
+    '成交金額': 'turnover',
+    '成交筆數': 'transactions',
+    '漲跌價差': 'change',
+}
+
+PRICE_COLUMNS = ['stock_id', 'trade_date', 'open', 'high', 'low', 'close', 'volume',
+                 'turnover', 'change', 'transactions', 'created_at', 'updated_at']
+
+NUMERIC_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'turnover', 'change', 'transactions']
+
+
+def detect_encoding(path):
+    """檔案可用 UTF-8 解碼時使用 UTF-8，否則視為 Big5（CP950）"""
+    with open(path, 'rb') as f:
+        sample = f.read(65536)
+    try:
+        sample.decode('utf-8')
+        return 'utf-8-sig'
+    except UnicodeDecodeError as e:
+        # 取樣可能截斷在多位元組字元中間
+        if e.start >= len(sample) - 3:
+            return 'utf-8-sig'
+        return 'cp950'
+
+
+def parse_numbers(series):
+    """
+    向量化解析數字欄位：移除千分位、'--' / 'X' 等標記視為缺值
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(np.float64)
+
+    # 大部分欄位可直接轉換，只對轉換失敗的值做字串清理
+    values = pd.to_numeric(series, errors='coerce')
+    retry = values.isna() & series.notna()
+    if retry.any():
+        cleaned = series[retry].astype(str).str.replace(r'[,\s]', '', regex=True).str.lstrip('+X')
+        values[retry] = pd.to_numeric(cleaned, errors='coerce')
+    return values.astype(np.float64)
+
+
+def parse_dates(series):
+    """
+    向量化解析日期：民國年 (114/01/02) 與西元年格式
+
+    Returns:
+        dates: 'YYYY-MM-DD' 字串 Series，無法解析者為 NaN
+    """
+    series = series.astype(str).str.strip()
+    roc = series.str.extract(r'^(\d{2,3})[/\-.](\d{1,2})[/\-.](\d{1,2})$')
+    is_roc = roc[0].notna()
+
+    parsed = pd.to_datetime(series.where(~is_roc), errors='coerce', format='mixed')
+    if is_roc.any():
+        roc = roc[is_roc].astype(int)
+        parsed[is_roc] = pd.to_datetime(pd.DataFrame({
+            'year': roc[0] + 1911, 'month': roc[1], 'day': roc[2]
+        }), errors='coerce')
+
+    return parsed.dt.strftime('%Y-%m-%d')
+
+
+def read_chunks(path, file_format, encoding, chunk_size):
+    """
+    分塊讀取檔案
+
+    Args:
+        path: 檔案路徑
+        file_format: generic / twse / auto
+        encoding: 檔案編碼（auto 自動偵測）
+        chunk_size: 每塊列數
+
+    Yields:
+        (chunk, symbol): 欄位已標準化的 DataFrame，以及檔案標題中的股票代號（沒有則為 None）
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        yield from read_excel_chunks(path, file_format, chunk_size)
+        return
+
+    if encoding == 'auto':
+        encoding = detect_encoding(path)
+
+    with open(path, 'r', encoding=encoding, errors='replace') as f:
+        first_line = f.readline()
+
+    # 證交所個股月報：第一行為「114年01月 2330 台積電 各日成交資訊」
+    symbol = None
+    skip_rows = 0
+    if file_format in ('twse', 'auto') and '日期' not in first_line and 'trade_date' not in first_line:
+        skip_rows = 1
+        match = pd.Series([first_line]).str.extract(r'(?<!\d)(\d{4,6}[A-Z]?)(?!\d)')[0][0]
+        symbol = match if isinstance(match, str) else None
+
+    reader = pd.read_csv(path, encoding=encoding, skiprows=skip_rows, dtype=str,
+                         chunksize=chunk_size, skipinitialspace=True, on_bad_lines='skip',
+                         encoding_errors='replace')
+    for chunk in reader:
+        chunk.columns = [str(c).replace('\ufeff', '').strip() for c in chunk.columns]
+        yield chunk.rename(columns=TWSE_COLUMNS), symbol
+
+
+def read_excel_chunks(path, file_format, chunk_size):
+    """以 openpyxl 唯讀模式逐列讀取 Excel，不載入整個活頁簿"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError('讀取 Excel 需要 openpyxl：pip install openpyxl')
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(c).strip() if c is not None else '' for c in next(rows)]
+
+        symbol = None
+        if file_format in ('twse', 'auto') and '日期' not in header and 'trade_date' not in header:
+            title = ' '.join(header)
+            match = pd.Series([title]).str.extract(r'(?<!\d)(\d{4,6}[A-Z]?)(?!\d)')[0][0]
+            symbol = match if isinstance(match, str) else None
+            header = [str(c).strip() if c is not None else '' for c in next(rows)]
+
+        buffer = []
+        for row in rows:
+            buffer.append(['' if c is None else str(c) for c in row])
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer, columns=header).rename(columns=TWSE_COLUMNS), symbol
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header).rename(columns=TWSE_COLUMNS), symbol
+    finally:
+        workbook.close()
+
+
+def normalize_chunk(chunk, file_symbol=None, symbol_filter=None):
+    """
+    向量化解析與驗證一個資料塊
+
+    Args:
+        chunk: 欄位已標準化的原始資料
+        file_symbol: 檔案標題中的股票代號
+        symbol_filter: 只保留指定股票
+
+    Returns:
+        frame: 有效資料（symbol, name, trade_date, 數值欄位）
+        rejected: 各原因的剔除筆數
+    """
+    frame = pd.DataFrame(index=chunk.index)
+    if 'symbol' in chunk:
+        frame['symbol'] = chunk['symbol'].astype(str).str.strip().str.lstrip('=').str.strip('"')
+    else:
+        frame['symbol'] = file_symbol
+    frame['name'] = chunk['name'].str.strip() if 'name' in chunk else frame['symbol']
+    frame['trade_date'] = parse_dates(chunk['trade_date']) if 'trade_date' in chunk else np.nan
+
+    for column in NUMERIC_COLUMNS:
+        frame[column] = parse_numbers(chunk[column]) if column in chunk else np.nan
+
+    # 無成交時開高低價為 '--'，以收盤價補齊（資料表欄位不可為 NULL）
+    for column in ('open', 'high', 'low'):
+        frame[column] = frame[column].fillna(frame['close'])
+    frame['volume'] = frame['volume'].fillna(0)
+
+    rejected = {}
+    missing = frame['symbol'].isna() | (frame['symbol'] == '') | (frame['symbol'] == 'nan') \
+        | frame['trade_date'].isna() | frame['close'].isna()
+    rejected['unparseable'] = int(missing.sum())
+
+    valid = ~missing
+    non_positive = valid & (frame[['open', 'high', 'low', 'close']] <= 0).any(axis=1)
+    rejected['non_positive'] = int(non_positive.sum())
+    valid &= ~non_positive
+
+    inconsistent = valid & (
+        (frame['high'] < frame[['open', 'close', 'low']].max(axis=1))
+        | (frame['low'] > frame[['open', 'close']].min(axis=1))
+    )
+    rejected['ohlc_inconsistent'] = int(inconsistent.sum())
+    valid &= ~inconsistent
+
+    if symbol_filter:
+        valid &= frame['symbol'] == symbol_filter
+
+    frame = frame[valid]
+
+    # 同一塊內重複的 (股票, 日期) 以最後一筆為準
+    before = len(frame)
+    frame = frame.drop_duplicates(['symbol', 'trade_date'], keep='last')
+    rejected['duplicate'] = before - len(frame)
+
+    return frame, rejected
+
+
+class PriceImporter:
+    """股價批次匯入器"""
+
+    def __init__(self, db, batch_size=5000, update_cache=True, cache=None):
+        """
+        初始化匯入器
+
+        Args:
+            db: db.Database
+            batch_size: 每次 executemany 的列數
+            update_cache: 匯入後是否重建模型端股價快取
+            cache: PriceCache（預設 storage/app/price_cache）
+        """
+        self.db = db
+        self.batch_size = batch_size
+        self.update_cache = update_cache
+        self.cache = cache
+        self.stock_ids = {}
+        self.touched = set()
+        self.stats = {'rows_read': 0, 'rows_upserted': 0, 'stocks_created': 0,
+                      'rejected': {}, 'files': 0}
+        self.price_sql = db.upsert_sql(
+            'stock_prices', PRICE_COLUMNS, ['stock_id', 'trade_date'],
+            [c for c in PRICE_COLUMNS if c not in ('stock_id', 'trade_date', 'created_at')]
+        )
+
+    def _resolve_stocks(self, frame, now):
+        """取得股票 id，不存在的股票批次建立"""
+        names = frame.drop_duplicates('symbol').set_index('symbol')['name']
+        unknown = [s for s in names.index if s not in self.stock_ids]
+        if not unknown:
+            return
+
+        placeholders = ', '.join([self.db.placeholder] * len(unknown))
+        for stock_id, symbol in self.db.execute(
+                f'SELECT id, symbol FROM stocks WHERE symbol IN ({placeholders})', unknown).fetchall():
+            self.stock_ids[symbol] = stock_id
+
+        missing = [s for s in unknown if s not in self.stock_ids]
+        if missing:
+            insert = self.db.upsert_sql('stocks', ['symbol', 'name', 'exchange', 'is_active',
+                                                   'created_at', 'updated_at'], ['symbol'], ['updated_at'])
+            self.db.executemany(insert, [(s, str(names[s])[:100] or s, 'TWSE', 1, now, now) for s in missing])
+            placeholders = ', '.join([self.db.placeholder] * len(missing))
+            for stock_id, symbol in self.db.execute(
+                    f'SELECT id, symbol FROM stocks WHERE symbol IN ({placeholders})', missing).fetchall():
+                self.stock_ids[symbol] = stock_id
+            self.stats['stocks_created'] += len(missing)
+
+    def _rows(self, frame, now):
+        """將資料塊轉為 executemany 的參數列（NaN 轉為 None）"""
+        columns = [frame['symbol'].map(self.stock_ids).astype(np.int64).tolist(), frame['trade_date'].tolist()]
+        for name in ('open', 'high', 'low', 'close', 'volume', 'turnover', 'change', 'transactions'):
+            values = frame[name].to_numpy(dtype=np.float64)
+            if name in ('volume', 'transactions'):
+                column = np.nan_to_num(values).astype(np.int64).astype(object)
+            else:
+                column = values.astype(object)
+            column[np.isnan(values)] = None
+            columns.append(column.tolist())
+
+        n = len(frame)
+        columns.extend([[now] * n, [now] * n])
+        return list(zip(*columns))
+
+    def import_chunk(self, frame):
+        """寫入一個已驗證的資料塊（單一交易）"""
+        if frame.empty:
+            return
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            self._resolve_stocks(frame, now)
+            rows = self._rows(frame, now)
+            for start in range(0, len(rows), self.batch_size):
+                self.db.executemany(self.price_sql, rows[start:start + self.batch_size])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        self.stats['rows_upserted'] += len(frame)
+        self.touched.update(frame['symbol'].unique().tolist())
+
+    def import_file(self, path, file_format='auto', encoding='auto', chunk_size=200000, symbol_filter=None):
+        """
+        串流匯入單一檔案
+
+        Args:
+            path: 檔案路徑
+            file_format: generic / twse / auto
+            encoding: 檔案編碼（auto 自動偵測 UTF-8 / Big5）
+            chunk_size: 每塊列數
+            symbol_filter: 只匯入指定股票
+        """
+        for chunk, file_symbol in read_chunks(path, file_format, encoding, chunk_size):
+            self.stats['rows_read'] += len(chunk)
+            frame, rejected = normalize_chunk(chunk, file_symbol, symbol_filter)
+            for reason, count in rejected.items():
+                self.stats['rejected'][reason] = self.stats['rejected'].get(reason, 0) + count
+            self.import_chunk(frame)
+        self.stats['files'] += 1
+
+    def finish(self):
+        """更新股價快取並回傳統計"""
+        if self.update_cache and self.touched:
+            cache = self.cache or PriceCache()
+            self.stats['cache_updated'] = cache.refresh_from_db(self.db, sorted(self.touched))
+        self.stats['symbols'] = len(self.touched)
+        return self.stats
+
+
+def expand_paths(paths):
+    """展開目錄與萬用字元為檔案列表"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for pattern in ('*.csv', '*.xlsx'):
+                files.extend(sorted(glob.glob(os.path.join(path, pattern))))
+        else:
+            files.extend(sorted(glob.glob(path)) or [path])
+    return files
+
+
+def main():
+    """主函數"""
+    try:
+        args = [a for a in sys.argv[1:] if not a.startswith('--')]
+        options = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+
+        if not args:
+            print(json.dumps({
+                'success': False,
+                'error': '使用方式: python import_prices.py <檔案或目錄>... [--format=auto|generic|twse] '
+                         '[--encoding=auto] [--chunk-size=200000] [--symbol=2330] [--database=sqlite路徑] [--no-cache]'
+            }, ensure_ascii=False))
+            sys.exit(1)
+
+        db = Database(options.get('database'))
+        db.ensure_schema()
+
+        importer = PriceImporter(db, batch_size=int(options.get('batch-size', 5000)),
+                                 update_cache='--no-cache' not in sys.argv)
+        started = time.perf_counter()
+
+        files = expand_paths(args)
+        for path in files:
+            importer.import_file(path, options.get('format', 'auto'), options.get('encoding', 'auto'),
+                                 int(options.get('chunk-size', 200000)), options.get('symbol'))
+
+        stats = importer.finish()
+        elapsed = time.perf_counter() - started
+        stats['seconds'] = round(elapsed, 2)
+        stats['rows_per_minute'] = int(stats['rows_upserted'] / elapsed * 60) if elapsed > 0 else None
+        db.close()
+
+        print(json.dumps({'success': True, **stats}, ensure_ascii=False))
+
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }, ensure_ascii=False))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
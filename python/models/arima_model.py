@@ -15,15 +15,29 @@ warnings.filterwarnings('ignore')
 # 統計模型相關套件
 from statsmodels.tsa.arima.model import ARIMA
 from statsmodels.tsa.stattools import adfuller
+from statsmodels.tsa.arima.estimators.hannan_rissanen import hannan_rissanen
 from pmdarima import auto_arima
 import scipy.stats as stats
+from scipy.optimize import least_squares
+from scipy.signal import lfilter
 from scipy.stats import skew, kurtosis
 import traceback
 
+from memory_utils import load_prices, memory_report
+from price_validation import clean_input
+from profiling import profiled
+
+# 估計方法：exact 為狀態空間精確概似 MLE；css 為 Hannan-Rissanen 初始值加條件平方和精修；
+# hannan_rissanen 僅使用 Hannan-Rissanen 迴歸估計（最快）
+FIT_METHODS = ('exact', 'css', 'hannan_rissanen')
+
+# 快速模式自動選參的 p、q 上限
+FAST_MAX_ORDER = 3
+
 class ARIMAPredictor:
     """ARIMA 預測模型類別"""
 
-    def __init__(self, p=None, d=None, q=None, auto_select=True):
+    def __init__(self, p=None, d=None, q=None, auto_select=True, memory_lean=False, fit_method='exact'):
         """
         初始化 ARIMA 模型參數
 
@@ -32,11 +46,18 @@ class ARIMAPredictor:
             d: 差分階數
             q: 移動平均項數
             auto_select: 是否自動選擇參數
+            memory_lean: 精簡記憶體模式（ADF 落後期選擇不保留各落後期的迴歸結果）
+            fit_method: 估計方法 (exact, css, hannan_rissanen)
         """
+        if fit_method not in FIT_METHODS:
+            raise ValueError(f"不支援的估計方法: {fit_method}")
+
         self.p = p
         self.d = d
         self.q = q
         self.auto_select = auto_select
+        self.memory_lean = memory_lean
+        self.fit_method = fit_method
         self.model = None
         self.fitted_model = None
 
@@ -52,7 +73,13 @@ class ARIMAPredictor:
             adf_result: ADF 測試結果
         """
         # Augmented Dickey-Fuller 測試
-        adf_result = adfuller(prices)
+        if self.memory_lean:
+            # statsmodels 的 autolag 會保留每個落後期的完整迴歸結果，長序列時峰值記憶體數 GB；
+            # 改為自行以 AIC 選擇落後期，再以該落後期執行單次測試（結果相同）
+            prices = np.asarray(prices, dtype=np.float64)
+            adf_result = adfuller(prices, maxlag=self.select_adf_lag(prices), autolag=None)
+        else:
+            adf_result = adfuller(prices)
 
         # p-value < 0.05 表示序列平穩
         is_stationary = adf_result[1] < 0.05
@@ -64,6 +91,43 @@ class ARIMAPredictor:
             'is_stationary': is_stationary
         }
 
+    @staticmethod
+    def select_adf_lag(prices):
+        """
+        以 AIC 選擇 ADF 測試的落後期數（與 adfuller(autolag='AIC') 相同的樣本與準則）
+
+        Args:
+            prices: 股價序列 (float64)
+
+        Returns:
+            lag: 最佳落後期數
+        """
+        n = len(prices)
+        maxlag = int(np.ceil(12.0 * np.power(n / 100.0, 1 / 4.0)))
+        maxlag = max(0, min(n // 2 - 2, maxlag))
+
+        diff = np.diff(prices)
+        nobs = len(diff) - maxlag
+
+        # 設計矩陣欄位：常數、前期水準值、差分落後 1..maxlag
+        X = np.empty((nobs, maxlag + 2))
+        X[:, 0] = 1.0
+        X[:, 1] = prices[maxlag:-1]
+        for lag in range(1, maxlag + 1):
+            X[:, lag + 1] = diff[maxlag - lag:-lag]
+        y = diff[maxlag:]
+
+        best_lag, best_aic = 0, np.inf
+        for lag in range(maxlag + 1):
+            k = lag + 2
+            coef = np.linalg.lstsq(X[:, :k], y, rcond=None)[0]
+            ssr = float(np.sum((y - X[:, :k] @ coef) ** 2))
+            aic = nobs * np.log(ssr / nobs) + 2 * k
+            if aic < best_aic:
+                best_lag, best_aic = lag, aic
+
+        return best_lag
+
     def find_optimal_parameters(self, prices):
         """
         自動尋找最佳 ARIMA 參數
@@ -88,6 +152,104 @@ class ARIMAPredictor:
 
         return auto_model.order
 
+    @staticmethod
+    def css_residuals(params, y, p, q, include_mean):
+        """
+        計算 ARMA 條件殘差（前 p 期為條件值，樣本前的殘差設為 0）
+
+        Args:
+            params: [平均數（選用）, AR 係數..., MA 係數...]
+            y: 已差分的序列
+            p: AR 階數
+            q: MA 階數
+            include_mean: params 是否包含平均數
+
+        Returns:
+            residuals: 條件殘差
+        """
+        offset = 1 if include_mean else 0
+        z = y - params[0] if include_mean else y
+        ar = params[offset:offset + p]
+        ma = params[offset + p:offset + p + q]
+
+        # w_t = z_t - Σ φ_i z_{t-i}，再以 MA 多項式反向濾波得到 e_t
+        w = z[p:].copy()
+        for i in range(p):
+            w -= ar[i] * z[p - 1 - i:len(z) - 1 - i]
+
+        return lfilter([1.0], np.r_[1.0, ma], w)
+
+    def fit_fast(self, series, order):
+        """
+        以 Hannan-Rissanen（可選條件平方和精修）估計 ARIMA 參數
+
+        Args:
+            series: 股價序列
+            order: (p, d, q)
+
+        Returns:
+            params: 依 ARIMA 參數順序排列的參數 (const, ar, ma, sigma2)
+            details: 估計資訊
+        """
+        p, d, q = order
+        y = np.diff(np.asarray(series, dtype=np.float64), n=d)
+
+        # 與 statsmodels ARIMA 相同：未差分時包含常數（過程平均數）
+        include_mean = d == 0
+        mean = float(np.mean(y)) if include_mean else 0.0
+
+        hr_params, _ = hannan_rissanen(y - mean, ar_order=p, ma_order=q, demean=False)
+        start = np.r_[[mean] if include_mean else [], hr_params.ar_params, hr_params.ma_params]
+
+        # Hannan-Rissanen 結果非平穩或不可逆時，仍以條件平方和精修
+        refined = len(start) > 0 and (
+            self.fit_method == 'css' or not (hr_params.is_stationary and hr_params.is_invertible))
+        if refined:
+            if not hr_params.is_invertible:
+                start[len(start) - q:] = 0.0
+            solution = least_squares(self.css_residuals, start, args=(y, p, q, include_mean))
+            start = solution.x
+
+        residuals = self.css_residuals(start, y, p, q, include_mean)
+        sigma2 = float(np.mean(residuals ** 2))
+
+        return np.r_[start, sigma2], {
+            'refined': bool(refined),
+            'css_sigma2': sigma2,
+            'nobs_effective': int(len(residuals))
+        }
+
+    def find_fast_parameters(self, prices, is_stationary):
+        """
+        快速模式的參數選擇：以 ADF 決定差分階數，再以條件平方和 AIC 搜尋 p、q
+
+        Args:
+            prices: 股價序列
+            is_stationary: 原序列是否平穩
+
+        Returns:
+            order: (p, d, q) 參數
+        """
+        d = 0
+        series = np.asarray(prices, dtype=np.float64)
+        while not is_stationary and d < 2:
+            d += 1
+            is_stationary, _ = self.check_stationarity(np.diff(series, n=d))
+
+        best_order, best_aic = (0, d, 0), np.inf
+        for p in range(FAST_MAX_ORDER + 1):
+            for q in range(FAST_MAX_ORDER + 1):
+                try:
+                    params, details = self.fit_fast(series, (p, d, q))
+                except (ValueError, np.linalg.LinAlgError):
+                    continue
+                n = details['nobs_effective']
+                aic = n * np.log(details['css_sigma2']) + 2 * len(params)
+                if aic < best_aic:
+                    best_order, best_aic = (p, d, q), aic
+
+        return best_order
+
     def train(self, prices):
         """
         訓練 ARIMA 模型
@@ -103,14 +265,27 @@ class ARIMAPredictor:
 
         # 如果需要自動選擇參數
         if self.auto_select or None in [self.p, self.d, self.q]:
-            order = self.find_optimal_parameters(prices)
+            if self.fit_method == 'exact':
+                order = self.find_optimal_parameters(prices)
+            else:
+                order = self.find_fast_parameters(prices, is_stationary)
             self.p, self.d, self.q = order
         else:
             order = (self.p, self.d, self.q)
 
         # 建立並訓練模型
         self.model = ARIMA(prices, order=order)
-        self.fitted_model = self.model.fit()
+        fit_details = None
+        if self.fit_method != 'exact':
+            # 快速估計參數後執行一次卡爾曼濾波，預測值與信賴區間沿用相同的狀態空間結果
+            params, fit_details = self.fit_fast(prices, order)
+            self.fitted_model = self.model.filter(params)
+        elif self.memory_lean:
+            # 估計時不保存平滑結果，再以估計參數執行一次濾波取得預測所需的狀態
+            params = self.model.fit(low_memory=True).params
+            self.fitted_model = self.model.filter(params)
+        else:
+            self.fitted_model = self.model.fit()
 
         # 取得模型資訊
         aic = float(self.fitted_model.aic)
@@ -121,7 +296,9 @@ class ARIMAPredictor:
             'aic': aic,
             'bic': bic,
             'stationarity': stationarity_test,
-            'params': {name: float(value) for name, value in zip(self.fitted_model.param_names, self.fitted_model.params)}
+            'params': {name: float(value) for name, value in zip(self.fitted_model.param_names, self.fitted_model.params)},
+            'fit_method': self.fit_method,
+            'fit_details': fit_details
         }
 
     def predict(self, steps=7):
@@ -213,6 +390,7 @@ class ARIMAPredictor:
 
         return diagnostics
 
+@profiled('arima')
 def main():
     """主函數"""
     try:
@@ -230,14 +408,29 @@ def main():
         # 讀取檔案內容
         with open(input_file, 'r', encoding='utf-8-sig') as f:
             input_data = json.load(f)# 解析參數
-        prices = np.array(input_data['prices'])
+        memory_lean = input_data.get('memory_lean', False)
+        prices = load_prices(input_data, memory_lean)
         prediction_days = input_data.get('prediction_days', 7)
 
+        # 資料驗證：以交易日曆與數值檢查清理價格序列
+        validation = None
+        if input_data.get('validate'):
+            prices, validation = clean_input(input_data, prices)
+
         # ARIMA 參數
         p = input_data.get('p', None)
         d = input_data.get('d', None)
         q = input_data.get('q', None)
         auto_select = input_data.get('auto_select', True)
+        fit_method = input_data.get('fit_method', 'exact')
+
+        # 預先篩檢：screen_series.py 判定報酬率無序列相關的股票為隨機漫步，略過階數搜尋直接估計 ARIMA(0,1,0)
+        screening = None
+        if auto_select and None in [p, d, q] and input_data.get('screen', True):
+            from series_screening import lookup
+            screening = lookup(input_data.get('stock_symbol'), input_data.get('screening_max_age_days', 7))
+            if screening is not None and not screening['serial_correlation']:
+                p, d, q, auto_select = 0, 1, 0, False
 
         # 檢查資料長度
         if len(prices) < 30:
@@ -246,7 +439,8 @@ def main():
                 'error': '資料不足,至少需要30天的歷史資料'
             }))
             sys.exit(1)# 建立預測器
-        predictor = ARIMAPredictor(p=p, d=d, q=q, auto_select=auto_select)# 訓練模型
+        predictor = ARIMAPredictor(p=p, d=d, q=q, auto_select=auto_select, memory_lean=memory_lean,
+                                   fit_method=fit_method)# 訓練模型
         model_info = predictor.train(prices)# 進行預測
         predictions = predictor.predict(steps=prediction_days)# 計算信賴區間
         intervals = predictor.calculate_confidence_intervals(predictions)# 模型診斷
@@ -270,11 +464,21 @@ def main():
                 'order': model_info['order'],
                 'aic': round(model_info['aic'], 2),
                 'bic': round(model_info['bic'], 2),
+                'fit_method': model_info['fit_method'],
                 'model_type': 'ARIMA'
             },
             'diagnostics': diagnostics
         }
 
+        if memory_lean or input_data.get('report_memory'):
+            result['memory'] = memory_report(memory_lean, prices)
+
+        if validation is not None:
+            result['validation'] = validation
+
+        if screening is not None:
+            result['screening'] = screening
+
         print(json.dumps(result, ensure_ascii=False))
 
     except Exception as e:
@@ -6,6 +6,9 @@ GARCH 波動率預測模型
 
 import sys
 import json
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
@@ -14,12 +17,46 @@ warnings.filterwarnings('ignore')
 
 # ARCH/GARCH 模型套件
 from arch import arch_model
+from arch.univariate import Normal, StudentsT, SkewStudent
 from scipy import stats
 
+from memory_utils import load_prices, memory_report
+from price_validation import clean_input
+from profiling import profiled
+
+# 波動率模型 → (arch 的 vol 名稱, 不對稱項階數 o)
+VOL_MODELS = {
+    'GARCH': ('GARCH', 0),
+    'GJR': ('GARCH', 1),
+    'EGARCH': ('EGARCH', 1),
+}
+
+# 固定亂數種子的誤差分配（EGARCH 多期預測需以模擬計算，結果才可重現）
+SEEDED_DISTRIBUTIONS = {
+    'normal': Normal,
+    't': StudentsT,
+    'skewt': SkewStudent,
+}
+
+VOL_LABELS = {
+    'GARCH': 'GARCH',
+    'GJR': 'GJR-GARCH',
+    'EGARCH': 'EGARCH',
+}
+
+# 串流模式可做 O(1) 變異數遞迴的波動率模型
+STREAM_VOL_MODELS = ('GARCH', 'GJR')
+
+
+def model_label(vol, p, q):
+    """模型名稱，例如 GJR-GARCH(1,1)"""
+    return f'{VOL_LABELS[vol]}({p},{q})'
+
+
 class GARCHPredictor:
     """GARCH 波動率預測模型"""
 
-    def __init__(self, p=1, q=1, dist='normal'):
+    def __init__(self, p=1, q=1, dist='normal', vol='GARCH'):
         """
         初始化 GARCH 模型參數
 
@@ -27,10 +64,14 @@ class GARCHPredictor:
             p: GARCH 項數
             q: ARCH 項數
             dist: 誤差分配 ('normal', 't', 'skewt')
+            vol: 波動率模型 ('GARCH', 'GJR', 'EGARCH')，GJR / EGARCH 含一階不對稱項
         """
+        if vol not in VOL_MODELS:
+            raise ValueError(f'不支援的波動率模型: {vol}')
         self.p = p
         self.q = q
         self.dist = dist
+        self.vol = vol
         self.model = None
         self.fitted_model = None
 
@@ -50,12 +91,13 @@ class GARCHPredictor:
 
         return returns
 
-    def train(self, prices):
+    def train(self, prices, starting_values=None):
         """
         訓練 GARCH 模型
 
         Args:
             prices: 歷史股價資料
+            starting_values: 最佳化起始參數（用於以前次結果暖啟動）
 
         Returns:
             model_info: 模型資訊
@@ -64,16 +106,20 @@ class GARCHPredictor:
         returns = self.calculate_returns(prices)
 
         # 建立 GARCH 模型
+        vol, o = VOL_MODELS[self.vol]
         self.model = arch_model(
             returns,
-            vol='Garch',
+            vol=vol,
             p=self.p,
+            o=o,
             q=self.q,
             dist=self.dist
         )
+        if self.dist in SEEDED_DISTRIBUTIONS:
+            self.model.distribution = SEEDED_DISTRIBUTIONS[self.dist](seed=0)
 
         # 訓練模型
-        self.fitted_model = self.model.fit(disp='off')
+        self.fitted_model = self.model.fit(disp='off', starting_values=starting_values)
 
         # 取得模型資訊
         aic = float(self.fitted_model.aic)
@@ -85,23 +131,31 @@ class GARCHPredictor:
         omega = params['omega']
         alpha = params[['alpha[%d]' % i for i in range(1, self.p + 1)]].sum()
         beta = params[['beta[%d]' % i for i in range(1, self.q + 1)]].sum()
+        gamma = params.get('gamma[1]', 0.0)
 
-        # 長期波動率
-        if (alpha + beta) < 1:
-            long_run_variance = omega / (1 - alpha - beta)
-            long_run_volatility = np.sqrt(long_run_variance)
+        # 長期波動率（GJR 的不對稱項在對稱分配下平均貢獻 gamma / 2；EGARCH 為對數變異數的長期水準）
+        long_run_volatility = None
+        if self.vol == 'EGARCH':
+            if beta < 1:
+                long_run_volatility = np.sqrt(np.exp(omega / (1 - beta)))
         else:
-            long_run_volatility = None
+            persistence = alpha + gamma / 2 + beta
+            if persistence < 1:
+                long_run_volatility = np.sqrt(omega / (1 - persistence))
+
+        parameters = {
+            'omega': float(omega),
+            'alpha': float(alpha),
+            'beta': float(beta)
+        }
+        if 'gamma[1]' in params:
+            parameters['gamma'] = float(gamma)
 
         return {
             'aic': aic,
             'bic': bic,
             'log_likelihood': llf,
-            'parameters': {
-                'omega': float(omega),
-                'alpha': float(alpha),
-                'beta': float(beta)
-            },
+            'parameters': parameters,
             'long_run_volatility': float(long_run_volatility) if long_run_volatility else None
         }
 
@@ -118,8 +172,11 @@ class GARCHPredictor:
         if self.fitted_model is None:
             raise ValueError("模型尚未訓練")
 
-        # 預測波動率
-        forecast = self.fitted_model.forecast(horizon=horizon)
+        # 預測波動率（EGARCH 沒有多期解析解，改以模擬計算）
+        if self.vol == 'EGARCH' and horizon > 1:
+            forecast = self.fitted_model.forecast(horizon=horizon, method='simulation', simulations=2000)
+        else:
+            forecast = self.fitted_model.forecast(horizon=horizon)
 
         # 取得預測值
         variance_forecast = forecast.variance.values[-1, :]
@@ -190,6 +247,287 @@ class GARCHPredictor:
             'has_volatility_clustering': bool(arch_test[1] < 0.05)
         }
 
+class GARCHStream:
+    """
+    GARCH 串流更新器
+
+    保留已估計的參數與條件變異數，每筆新價格只做一次 O(1) 變異數遞迴，
+    並依設定週期在背景執行緒重新估計參數。支援 GARCH 與 GJR-GARCH；
+    EGARCH 的對數變異數遞迴與多期模擬預測無法以相同狀態更新，不支援串流
+    """
+
+    def __init__(self, predictor, prices, refit_every=None, max_history=2000):
+        """
+        初始化串流狀態
+
+        Args:
+            predictor: 已訓練的 GARCHPredictor
+            prices: 訓練時使用的歷史股價
+            refit_every: 每累積多少筆新觀測值重新估計一次（None 表示不重新估計）
+            max_history: 保留於記憶體的最大價格筆數
+        """
+        if predictor.fitted_model is None:
+            raise ValueError("模型尚未訓練")
+        if predictor.vol not in STREAM_VOL_MODELS:
+            raise ValueError(f'串流模式不支援 {VOL_LABELS[predictor.vol]}，請使用 GARCH 或 GJR')
+
+        self.p = predictor.p
+        self.q = predictor.q
+        self.dist = predictor.dist
+        self.vol = predictor.vol
+        self.refit_every = refit_every
+        self.prices = deque((float(x) for x in prices), maxlen=max_history)
+        self.observations = 0
+        self.parameters_version = 0
+
+        self._executor = None
+        self._refit_future = None
+        self._refit_observations = 0
+
+        self._load_state(predictor)
+
+    def _load_state(self, predictor):
+        """由已訓練模型載入參數、殘差與條件變異數"""
+        params = predictor.fitted_model.params
+        self.params = params
+        self.mu = float(params.get('mu', 0.0))
+        self.omega = float(params['omega'])
+        self.alpha = np.array([params['alpha[%d]' % i] for i in range(1, self.p + 1)], dtype=float)
+        self.beta = np.array([params['beta[%d]' % i] for i in range(1, self.q + 1)], dtype=float)
+        self.gamma = float(params.get('gamma[1]', 0.0))
+
+        resid = np.asarray(predictor.fitted_model.resid, dtype=float)
+        variance = np.asarray(predictor.fitted_model.conditional_volatility, dtype=float) ** 2
+
+        # 最近的殘差平方與條件變異數，索引 0 為最新一筆
+        self.eps2 = deque(resid[::-1][:self.p] ** 2, maxlen=self.p)
+        self.sigma2 = deque(variance[::-1][:self.q], maxlen=self.q)
+        negative = float(resid[-1] ** 2) if resid[-1] < 0 else 0.0
+        self.next_variance = self._recursion(self.eps2, self.sigma2, negative)
+
+    def _recursion(self, eps2, sigma2, negative):
+        """
+        變異數遞迴：sigma2_t+1 = omega + sum(alpha * eps2) + gamma * eps2_t * I(eps_t < 0) + sum(beta * sigma2)
+
+        GARCH 的 gamma 為 0
+        """
+        return (self.omega
+                + float(np.dot(self.alpha, list(eps2)))
+                + self.gamma * negative
+                + float(np.dot(self.beta, list(sigma2))))
+
+    def _advance(self, ret, eps2, sigma2, next_variance):
+        """以一筆新報酬率推進狀態，回傳下一期條件變異數"""
+        resid = ret - self.mu
+        negative = resid ** 2 if resid < 0 else 0.0
+        eps2.appendleft(resid ** 2)
+        sigma2.appendleft(next_variance)
+        return self._recursion(eps2, sigma2, negative)
+
+    def update(self, price):
+        """
+        加入一筆新價格並更新條件變異數
+
+        Args:
+            price: 最新價格
+
+        Returns:
+            next_variance: 下一期條件變異數
+        """
+        self._poll_refit()
+
+        ret = (np.log(price) - np.log(self.prices[-1])) * 100
+        self.next_variance = self._advance(ret, self.eps2, self.sigma2, self.next_variance)
+        self.prices.append(float(price))
+        self.observations += 1
+
+        if self.refit_every and self.observations - self._refit_observations >= self.refit_every:
+            self._start_refit()
+
+        return self.next_variance
+
+    def forecast(self, horizon=7, next_variance=None, eps2=None, sigma2=None):
+        """
+        由目前狀態計算多期波動率預測
+
+        Args:
+            horizon: 預測期間
+            next_variance: 下一期條件變異數（預設使用目前狀態）
+            eps2: 最近的殘差平方（預設使用目前狀態）
+            sigma2: 最近的條件變異數（預設使用目前狀態）
+
+        Returns:
+            predictions: 與 GARCHPredictor.predict 相同格式的預測
+        """
+        eps2 = list(self.eps2 if eps2 is None else eps2)
+        sigma2 = list(self.sigma2 if sigma2 is None else sigma2)
+        variance = self.next_variance if next_variance is None else next_variance
+
+        predictions = []
+        for _ in range(horizon):
+            predictions.append({
+                'volatility': float(np.sqrt(variance)),
+                'variance': float(variance)
+            })
+            # 未來期的殘差平方期望值等於其條件變異數，負向部分取一半（與 arch 的解析預測相同）
+            eps2 = ([variance] + eps2)[:self.p]
+            sigma2 = ([variance] + sigma2)[:self.q]
+            variance = self._recursion(eps2, sigma2, variance / 2)
+
+        return predictions
+
+    def step(self, price, horizon=7, provisional=False):
+        """
+        加入一筆價格並回傳更新後的預測
+
+        Args:
+            price: 最新價格
+            horizon: 預測期間
+            provisional: 是否為盤中暫定價（只計算預測，不寫入狀態）
+
+        Returns:
+            update: 含預測與狀態資訊的字典
+        """
+        if provisional:
+            self._poll_refit()
+            ret = (np.log(price) - np.log(self.prices[-1])) * 100
+            eps2 = deque(self.eps2, maxlen=self.p)
+            sigma2 = deque(self.sigma2, maxlen=self.q)
+            next_variance = self._advance(ret, eps2, sigma2, self.next_variance)
+            predictions = self.forecast(horizon, next_variance, eps2, sigma2)
+        else:
+            self.update(price)
+            predictions = self.forecast(horizon)
+
+        return {
+            'price': float(price),
+            'provisional': provisional,
+            'observations': self.observations,
+            'parameters_version': self.parameters_version,
+            'refitting': self._refit_future is not None,
+            'predictions': predictions
+        }
+
+    def stream(self, prices, horizon=7):
+        """
+        同步產生器：逐筆輸入價格並產出更新後的預測
+
+        Args:
+            prices: 可迭代的價格，元素可為數值或 (price, provisional)
+            horizon: 預測期間
+        """
+        for item in prices:
+            price, provisional = item if isinstance(item, tuple) else (item, False)
+            yield self.step(price, horizon, provisional)
+
+    async def astream(self, prices, horizon=7):
+        """
+        非同步產生器：適用於 async 行情來源
+
+        Args:
+            prices: 非同步可迭代的價格，元素可為數值或 (price, provisional)
+            horizon: 預測期間
+        """
+        async for item in prices:
+            price, provisional = item if isinstance(item, tuple) else (item, False)
+            yield self.step(price, horizon, provisional)
+            await asyncio.sleep(0)
+
+    def _start_refit(self):
+        """在背景執行緒以最新資料重新估計參數"""
+        if self._refit_future is not None:
+            return
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+
+        snapshot = np.array(self.prices)
+        self._refit_observations = self.observations
+        self._refit_future = self._executor.submit(self._refit, snapshot, self.params.values)
+
+    def _refit(self, prices, starting_values):
+        predictor = GARCHPredictor(p=self.p, q=self.q, dist=self.dist, vol=self.vol)
+        predictor.train(prices, starting_values=starting_values)
+        return predictor
+
+    def _poll_refit(self, wait=False):
+        """若背景估計完成，換上新參數並重播估計期間新進的觀測值"""
+        if self._refit_future is None or not (wait or self._refit_future.done()):
+            return
+
+        future, self._refit_future = self._refit_future, None
+        try:
+            predictor = future.result()
+        except Exception:
+            # 重新估計失敗時沿用原參數
+            return
+
+        pending = self.observations - self._refit_observations
+        self._load_state(predictor)
+
+        if pending > 0:
+            recent = np.array(self.prices)[-(pending + 1):]
+            for ret in np.diff(np.log(recent)) * 100:
+                self.next_variance = self._advance(ret, self.eps2, self.sigma2, self.next_variance)
+
+        self.parameters_version += 1
+
+    def close(self):
+        """等待進行中的重新估計並釋放背景執行緒"""
+        self._poll_refit(wait=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+def run_stream(input_data):
+    """
+    串流模式：以輸入價格訓練後，從標準輸入逐行讀取新價格並輸出 JSON Lines
+
+    每行可為數值，或 {"price": 123.4, "provisional": true}
+    """
+    prices = np.array(input_data['prices'])
+    horizon = input_data.get('prediction_days', 7)
+
+    vol = input_data.get('vol', 'GARCH')
+    if vol not in STREAM_VOL_MODELS:
+        raise ValueError(f'串流模式不支援 {VOL_LABELS.get(vol, vol)}，請使用 GARCH 或 GJR')
+
+    predictor = GARCHPredictor(
+        p=input_data.get('p', 1),
+        q=input_data.get('q', 1),
+        dist=input_data.get('dist', 'normal'),
+        vol=vol
+    )
+    predictor.train(prices)
+
+    stream = GARCHStream(
+        predictor,
+        prices,
+        refit_every=input_data.get('refit_every', 20),
+        max_history=input_data.get('max_history', 2000)
+    )
+
+    def read_lines():
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, dict):
+                yield (float(item['price']), bool(item.get('provisional', False)))
+            else:
+                yield float(item)
+
+    print(json.dumps({'success': True, 'predictions': stream.forecast(horizon)}), flush=True)
+
+    try:
+        for update in stream.stream(read_lines(), horizon):
+            print(json.dumps({'success': True, **update}, ensure_ascii=False), flush=True)
+    finally:
+        stream.close()
+
+@profiled('garch')
 def main():
     """主函數"""
     try:
@@ -208,14 +546,26 @@ def main():
         with open(input_file, 'r', encoding='utf-8-sig') as f:
             input_data = json.load(f)
 
+        # 串流模式：盤中逐筆更新波動率預測
+        if input_data.get('mode') == 'stream':
+            run_stream(input_data)
+            return
+
         # 解析參數
-        prices = np.array(input_data['prices'])
+        memory_lean = input_data.get('memory_lean', False)
+        prices = load_prices(input_data, memory_lean)
         prediction_days = input_data.get('prediction_days', 7)
 
+        # 資料驗證：以交易日曆與數值檢查清理價格序列
+        validation = None
+        if input_data.get('validate'):
+            prices, validation = clean_input(input_data, prices)
+
         # GARCH 參數
         p = input_data.get('p', 1)
         q = input_data.get('q', 1)
         dist = input_data.get('dist', 'normal')
+        vol = input_data.get('vol', 'GARCH')
 
         # 檢查資料長度
         if len(prices) < 100:
@@ -225,11 +575,35 @@ def main():
             }))
             sys.exit(1)
 
+        # 預先篩檢：screen_series.py 判定無 ARCH 效應的股票略過模型選擇，直接以輸入的 p / q / dist / vol（預設 GARCH(1,1)）估計
+        screening = None
+        if input_data.get('select') and input_data.get('screen', True):
+            from series_screening import lookup
+            screening = lookup(input_data.get('stock_symbol'), input_data.get('screening_max_age_days', 7))
+
+        # 模型選擇：並行比較候選設定，以最佳設定的參數暖啟動最終估計
+        selection = None
+        starting_values = None
+        if input_data.get('select') and (screening is None or screening['arch_effect']):
+            from garch_selection import select
+            selection = select(
+                prices,
+                symbol=input_data.get('stock_symbol'),
+                candidates=input_data.get('candidates'),
+                criterion=input_data.get('criterion', 'bic'),
+                workers=input_data.get('workers'),
+                max_age_days=input_data.get('spec_max_age_days', 7),
+                reselect=input_data.get('reselect', False)
+            )
+            best = selection['best']
+            p, q, dist, vol = best['p'], best['q'], best['dist'], best['vol']
+            starting_values = np.array(list(best['params'].values()))
+
         # 建立預測器
-        predictor = GARCHPredictor(p=p, q=q, dist=dist)
+        predictor = GARCHPredictor(p=p, q=q, dist=dist, vol=vol)
 
         # 訓練模型
-        model_info = predictor.train(prices)
+        model_info = predictor.train(prices, starting_values=starting_values)
 
         # 預測波動率
         volatility_predictions = predictor.predict(horizon=prediction_days)
@@ -274,7 +648,8 @@ def main():
             'predictions': predictions_with_dates,
             'model_info': {
                 'model_type': 'GARCH',
-                'order': f'GARCH({p},{q})',
+                'order': model_label(vol, p, q),
+                'dist': dist,
                 'aic': round(model_info['aic'], 2),
                 'bic': round(model_info['bic'], 2),
                 'long_run_volatility': round(model_info['long_run_volatility'], 4) if model_info['long_run_volatility'] else None
@@ -283,6 +658,23 @@ def main():
             'volatility_clustering': clustering_test
         }
 
+        if memory_lean or input_data.get('report_memory'):
+            result['memory'] = memory_report(memory_lean, prices)
+
+        if validation is not None:
+            result['validation'] = validation
+
+        if selection is not None:
+            result['selection'] = {
+                'ranking': selection['ranking'][:10],
+                **selection['summary']
+            }
+        elif screening is not None:
+            result['selection'] = {'skipped': True, 'reason': 'no_arch_effect'}
+
+        if screening is not None:
+            result['screening'] = screening
+
         print(json.dumps(result, ensure_ascii=False))
 
     except Exception as e:
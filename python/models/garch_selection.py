@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+GARCH 模型選擇
+以多個行程並行估計 波動率模型 × 階數 × 誤差分配 的候選組合，依 AIC / BIC 排序選出最佳設定。
+候選依「(1,1) 常態 → 高階常態 → t → skewt」的鏈結，以最接近的已估計模型參數暖啟動；
+最佳設定依股票代號保存，有效期間內的請求直接沿用，不必重新選擇
+"""
+
+import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+import numpy as np
+
+
+# 預設最佳設定目錄：Laravel storage/app/garch_specs
+DEFAULT_SPEC_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'storage', 'app', 'garch_specs'
+)
+
+# 預設候選：3 種波動率模型 × 階數至 (2,2) × 3 種誤差分配，共 36 組
+DEFAULT_CANDIDATES = {
+    'vol': ['GARCH', 'GJR', 'EGARCH'],
+    'p': [1, 2],
+    'q': [1, 2],
+    'dist': ['normal', 't', 'skewt'],
+}
+
+# 誤差分配參數的起始值
+DIST_STARTS = {
+    'normal': {},
+    't': {'nu': 8.0},
+    'skewt': {'eta': 8.0, 'lambda': 0.0},
+}
+
+# 高階落後項的起始值：將基準模型 (1,1) 的係數依此比例拆分，總持續性不變
+LAG_SPLIT = (0.8, 0.2)
+
+CRITERIA = ('aic', 'bic')
+
+
+def spec_key(spec):
+    """候選設定的識別字串，例如 GJR(1,2)-t"""
+    return f"{spec['vol']}({spec['p']},{spec['q']})-{spec['dist']}"
+
+
+def candidate_specs(candidates=None):
+    """
+    展開候選格點
+
+    Args:
+        candidates: 各維度的候選值（未指定的維度使用 DEFAULT_CANDIDATES）
+
+    Returns:
+        specs: [{'vol', 'p', 'q', 'dist'}, ...]
+    """
+    space = {**DEFAULT_CANDIDATES, **(candidates or {})}
+    return [{'vol': vol, 'p': int(p), 'q': int(q), 'dist': dist}
+            for vol in space['vol'] for p in space['p'] for q in space['q'] for dist in space['dist']]
+
+
+def parent_spec(spec):
+    """
+    暖啟動來源：skewt 取同階 t、t 取同階常態、高階常態取 (1,1) 常態；(1,1) 常態為起點
+
+    Returns:
+        parent: 來源設定（起點回傳 None）
+    """
+    if spec['dist'] == 'skewt':
+        return {**spec, 'dist': 't'}
+    if spec['dist'] == 't':
+        return {**spec, 'dist': 'normal'}
+    if (spec['p'], spec['q']) != (1, 1):
+        return {**spec, 'p': 1, 'q': 1}
+    return None
+
+
+def fit_order(specs, warm):
+    """
+    估計順序：暖啟動時補上候選集合以外的來源模型，並讓來源排在前面
+
+    Returns:
+        order: 設定列表
+        extra: 只作為暖啟動來源、不列入排序的設定鍵
+    """
+    order, seen, extra = [], set(), set()
+    requested = {spec_key(spec) for spec in specs}
+
+    def visit(spec):
+        key = spec_key(spec)
+        if key in seen:
+            return
+        parent = parent_spec(spec) if warm else None
+        if parent is not None:
+            visit(parent)
+        seen.add(key)
+        order.append(spec)
+        if key not in requested:
+            extra.add(key)
+
+    for spec in specs:
+        visit(spec)
+    return order, extra
+
+
+def _lags(params, name, lags):
+    present = [params[f'{name}[{i}]'] for i in range(1, lags + 1) if f'{name}[{i}]' in params]
+    if len(present) == lags:
+        return present
+    # 來源階數較低：將其係數總和依比例拆分，總持續性不變
+    total = sum(value for key, value in params.items() if key.startswith(f'{name}['))
+    return [total] if lags == 1 else [total * share for share in LAG_SPLIT]
+
+
+def warm_start(spec, parent_params):
+    """
+    由來源模型參數建立候選的起始值（依 arch 的參數順序）
+
+    Args:
+        spec: 候選設定
+        parent_params: 來源模型參數 {名稱: 值}
+
+    Returns:
+        starting_values: 起始值陣列
+    """
+    values = [parent_params['mu'], parent_params['omega']]
+    values += _lags(parent_params, 'alpha', spec['p'])
+    if 'gamma[1]' in parent_params:
+        values.append(parent_params['gamma[1]'])
+    values += _lags(parent_params, 'beta', spec['q'])
+
+    if spec['dist'] == 't':
+        values.append(parent_params.get('nu', DIST_STARTS['t']['nu']))
+    elif spec['dist'] == 'skewt':
+        values.append(parent_params.get('eta', parent_params.get('nu', DIST_STARTS['skewt']['eta'])))
+        values.append(parent_params.get('lambda', DIST_STARTS['skewt']['lambda']))
+    return np.array(values, dtype=float)
+
+
+def fit_candidate(spec, prices, starting_values=None):
+    """
+    估計單一候選（於子行程中）；暖啟動未收斂時改以預設起始值重新估計
+
+    Args:
+        spec: 候選設定
+        prices: 股價陣列
+        starting_values: 起始值（None 為 arch 預設）
+
+    Returns:
+        result: 資訊準則、對數概似、參數與收斂資訊
+    """
+    # 延遲載入 arch：result_cache 計算快取鍵時只需要 spec_path，不必載入估計程式
+    from garch_model import GARCHPredictor, model_label
+
+    started = time.perf_counter()
+    result = {'key': spec_key(spec), 'spec': spec, 'label': model_label(spec['vol'], spec['p'], spec['q'])}
+    try:
+        predictor = GARCHPredictor(**spec)
+        info = predictor.train(prices, starting_values=starting_values)
+        warm = starting_values is not None
+        if warm and predictor.fitted_model.convergence_flag != 0:
+            info = predictor.train(prices)
+            warm = False
+
+        fitted = predictor.fitted_model
+        result.update({
+            'aic': info['aic'],
+            'bic': info['bic'],
+            'log_likelihood': info['log_likelihood'],
+            'converged': fitted.convergence_flag == 0,
+            'iterations': int(getattr(fitted.optimization_result, 'nit', 0) or 0),
+            'warm_start': warm,
+            'params': {name: float(value) for name, value in fitted.params.items()},
+        })
+    except Exception as e:
+        result.update({'converged': False, 'error': str(e)})
+
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def spec_path(symbol, spec_dir=None):
+    """
+    取得股票最佳設定檔路徑
+
+    Args:
+        symbol: 股票代號
+        spec_dir: 設定目錄（預設 storage/app/garch_specs，可用 STOCK_GARCH_SPEC_DIR 覆寫）
+    """
+    spec_dir = spec_dir or os.environ.get('STOCK_GARCH_SPEC_DIR', DEFAULT_SPEC_DIR)
+    return os.path.join(spec_dir, f'{symbol}.json')
+
+
+def load_spec(symbol, spec_dir=None):
+    """讀取股票的最佳設定，尚未選擇時回傳 None"""
+    if not symbol:
+        return None
+    try:
+        with open(spec_path(symbol, spec_dir), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_spec(symbol, entry, spec_dir=None):
+    """保存股票的最佳設定（先寫暫存檔再置換）"""
+    path = spec_path(symbol, spec_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(entry, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+    return path
+
+
+def _memo_fresh(entry, criterion, max_age_days, candidates):
+    if entry is None or entry.get('criterion') != criterion:
+        return False
+    try:
+        selected_at = datetime.strptime(entry['selected_at'], '%Y-%m-%d %H:%M:%S')
+    except (KeyError, ValueError):
+        return False
+    if (datetime.now() - selected_at).total_seconds() > max_age_days * 86400:
+        return False
+    # 候選集合不同時（例如指定只比較部分模型）不沿用
+    return entry.get('candidates') == sorted(spec_key(s) for s in candidates)
+
+
+def _start_for(spec, results):
+    parent = parent_spec(spec)
+    source = results.get(spec_key(parent)) if parent else None
+    return warm_start(spec, source['params']) if source and source.get('converged') else None
+
+
+def _run_serial(order, prices, warm):
+    results = {}
+    for spec in order:
+        results[spec_key(spec)] = fit_candidate(spec, prices, _start_for(spec, results) if warm else None)
+    return results
+
+
+def _run_parallel(order, prices, warm, workers):
+    """來源模型估計完成後立即送出以它暖啟動的候選，彼此無依賴的候選同時在各行程中估計"""
+    results = {}
+    children = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for spec in order:
+            parent = parent_spec(spec) if warm else None
+            if parent is None:
+                pending.add(pool.submit(fit_candidate, spec, prices))
+            else:
+                children.setdefault(spec_key(parent), []).append(spec)
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                results[result['key']] = result
+                for spec in children.pop(result['key'], []):
+                    pending.add(pool.submit(fit_candidate, spec, prices, _start_for(spec, results)))
+    return results
+
+
+def select(prices, symbol=None, candidates=None, criterion='bic', workers=None, warm=True,
+           max_age_days=7, reselect=False, spec_dir=None, persist=True):
+    """
+    選擇最佳 GARCH 設定
+
+    Args:
+        prices: 股價陣列
+        symbol: 股票代號（提供時沿用 / 保存最佳設定）
+        candidates: 候選維度（未指定的維度使用 DEFAULT_CANDIDATES）
+        criterion: 排序依據 aic / bic
+        workers: 並行行程數（預設為可用 CPU 數，不超過候選數；1 時不啟動子行程）
+        warm: 是否以來源模型參數暖啟動
+        max_age_days: 保存的最佳設定有效天數
+        reselect: 忽略保存的最佳設定重新選擇
+        spec_dir: 最佳設定目錄
+        persist: 是否保存最佳設定
+
+    Returns:
+        result: best（設定與參數）、ranking、summary
+    """
+    if criterion not in CRITERIA:
+        raise ValueError(f'不支援的資訊準則: {criterion}')
+
+    prices = np.asarray(prices, dtype=np.float64)
+    specs = candidate_specs(candidates)
+
+    entry = None if reselect else load_spec(symbol, spec_dir)
+    if _memo_fresh(entry, criterion, max_age_days, specs):
+        return {
+            'best': entry['best'],
+            'ranking': entry.get('ranking', []),
+            'summary': {'from_memo': True, 'selected_at': entry['selected_at'], 'criterion': criterion}
+        }
+
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    workers = max(1, min(workers or cpus, len(specs)))
+
+    order, extra = fit_order(specs, warm)
+    started = time.perf_counter()
+    if workers == 1:
+        results = _run_serial(order, prices, warm)
+    else:
+        results = _run_parallel(order, prices, warm, workers)
+    elapsed = time.perf_counter() - started
+
+    for key in extra:
+        results.pop(key, None)
+
+    fitted = [r for r in results.values() if r.get('converged')]
+    if not fitted:
+        raise ValueError('所有候選模型皆未收斂')
+    fitted.sort(key=lambda r: r[criterion])
+
+    winner = fitted[0]
+    best = {**winner['spec'], 'label': winner['label'], 'aic': winner['aic'], 'bic': winner['bic'],
+            'params': winner['params']}
+    ranking = [{'key': r['key'], 'label': r['label'], 'dist': r['spec']['dist'],
+                'aic': round(r['aic'], 2), 'bic': round(r['bic'], 2),
+                'delta': round(r[criterion] - winner[criterion], 2)} for r in fitted]
+
+    all_results = list(results.values())
+    summary = {
+        'from_memo': False,
+        'criterion': criterion,
+        'candidates': len(specs),
+        'converged': len(fitted),
+        'failed': [r['key'] for r in all_results if not r.get('converged')],
+        'warm_started': sum(bool(r.get('warm_start')) for r in all_results),
+        'iterations': sum(r.get('iterations', 0) for r in all_results),
+        'fit_seconds': round(sum(r['seconds'] for r in all_results), 2),
+        'workers': workers,
+        'seconds': round(elapsed, 2),
+    }
+
+    result = {'best': best, 'ranking': ranking, 'summary': summary}
+
+    if symbol and persist:
+        selected_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        result['spec_path'] = save_spec(symbol, {
+            'stock_symbol': symbol,
+            'criterion': criterion,
+            'best': best,
+            'ranking': ranking[:10],
+            'candidates': sorted(spec_key(s) for s in specs),
+            'data_points': int(len(prices)),
+            'selected_at': selected_at,
+        }, spec_dir)
+        summary['selected_at'] = selected_at
+
+    return result
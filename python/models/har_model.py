@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+HAR-RV 已實現波動率預測模型
+以日/週/月已實現變異數的線性迴歸預測波動率，可作為 GARCH 的快速替代方案
+"""
+
+import sys
+import json
+import numpy as np
+from datetime import datetime, timedelta
+import warnings
+warnings.filterwarnings('ignore')
+
+from price_validation import clean_input
+from profiling import profiled
+
+
+class HARPredictor:
+    """
+    HAR-RV 波動率預測模型
+
+    RV_t+1 = b0 + bd * RV_d + bw * RV_w + bm * RV_m
+    以最小平方法閉式求解，可一次估計多檔股票
+    """
+
+    def __init__(self, weekly=5, monthly=22):
+        """
+        初始化 HAR 模型參數
+
+        Args:
+            weekly: 週成分視窗（交易日）
+            monthly: 月成分視窗（交易日）
+        """
+        self.weekly = weekly
+        self.monthly = monthly
+        self.coef = None
+        self.rv = None
+        self.r_squared = None
+
+    def calculate_returns(self, prices):
+        """
+        計算對數報酬率（與 GARCHPredictor 相同，以百分比表示）
+
+        Args:
+            prices: 股價序列或矩陣 (標的數 × 期數)
+
+        Returns:
+            returns: 報酬率
+        """
+        return np.diff(np.log(prices), axis=-1) * 100
+
+    def _rolling_mean(self, rv, window):
+        """沿時間軸計算移動平均，視窗不足的位置為 NaN"""
+        cumsum = np.cumsum(np.nan_to_num(rv), axis=1)
+        counts = np.cumsum(~np.isnan(rv), axis=1)
+
+        cumsum = np.concatenate([np.zeros((rv.shape[0], 1)), cumsum], axis=1)
+        counts = np.concatenate([np.zeros((rv.shape[0], 1)), counts], axis=1)
+
+        mean = np.full(rv.shape, np.nan)
+        total = cumsum[:, window:] - cumsum[:, :-window]
+        valid = counts[:, window:] - counts[:, :-window]
+        mean[:, window - 1:] = np.where(valid == window, total / window, np.nan)
+
+        return mean
+
+    def features(self, rv):
+        """
+        建立 HAR 迴歸特徵
+
+        Args:
+            rv: 已實現變異數矩陣 (標的數 × 期數)
+
+        Returns:
+            X: (標的數 × 期數 × 4) 特徵，依序為常數項、日、週、月成分
+        """
+        ones = np.ones_like(rv)
+        weekly = self._rolling_mean(rv, self.weekly)
+        monthly = self._rolling_mean(rv, self.monthly)
+        return np.stack([ones, rv, weekly, monthly], axis=-1)
+
+    def train(self, prices):
+        """
+        訓練 HAR 模型
+
+        Args:
+            prices: 歷史股價，一維序列或 (標的數 × 期數) 矩陣（長度不足可左側補 NaN）
+
+        Returns:
+            model_info: 模型資訊（多檔時各欄位為陣列）
+        """
+        prices = np.atleast_2d(np.asarray(prices, dtype=float))
+
+        # 以日報酬平方作為每日已實現變異數
+        self.rv = self.calculate_returns(prices) ** 2
+
+        X = self.features(self.rv)[:, :-1, :]
+        y = self.rv[:, 1:]
+
+        # 含 NaN 的樣本不參與估計
+        mask = ~(np.isnan(X).any(axis=-1) | np.isnan(y))
+        X = np.where(mask[..., None], X, 0.0)
+        y = np.where(mask, y, 0.0)
+
+        # 批次正規方程式：(X'X) b = X'y
+        xtx = np.einsum('ntk,ntj->nkj', X, X)
+        xty = np.einsum('ntk,nt->nk', X, y)
+        xtx += np.eye(4) * 1e-10
+        self.coef = np.linalg.solve(xtx, xty[..., None])[..., 0]
+
+        fitted = np.einsum('ntk,nk->nt', X, self.coef)
+        n_obs = mask.sum(axis=1)
+        y_mean = y.sum(axis=1) / np.maximum(n_obs, 1)
+        ss_res = (((y - fitted) * mask) ** 2).sum(axis=1)
+        ss_tot = (((y - y_mean[:, None]) * mask) ** 2).sum(axis=1)
+        self.r_squared = 1 - ss_res / np.where(ss_tot > 0, ss_tot, np.nan)
+
+        persistence = self.coef[:, 1:].sum(axis=1)
+        long_run_variance = np.where(persistence < 1, self.coef[:, 0] / (1 - persistence), np.nan)
+
+        return {
+            'parameters': {
+                'beta0': self.coef[:, 0],
+                'beta_d': self.coef[:, 1],
+                'beta_w': self.coef[:, 2],
+                'beta_m': self.coef[:, 3]
+            },
+            'r_squared': self.r_squared,
+            'observations': n_obs,
+            'long_run_volatility': np.sqrt(np.where(long_run_variance > 0, long_run_variance, np.nan))
+        }
+
+    def predict(self, horizon=7):
+        """
+        遞迴預測未來已實現變異數
+
+        Args:
+            horizon: 預測期間
+
+        Returns:
+            variance: (標的數 × 預測期間) 變異數預測
+        """
+        if self.coef is None:
+            raise ValueError("模型尚未訓練")
+
+        # 只需保留最近一個月的變異數，預測值會依序接在後面
+        history = self.rv[:, -self.monthly:]
+        floor = np.nanmean(self.rv, axis=1) * 1e-3
+
+        forecasts = np.empty((self.rv.shape[0], horizon))
+        for h in range(horizon):
+            daily = history[:, -1]
+            weekly = np.nanmean(history[:, -self.weekly:], axis=1)
+            monthly = np.nanmean(history[:, -self.monthly:], axis=1)
+
+            variance = (self.coef[:, 0] + self.coef[:, 1] * daily
+                        + self.coef[:, 2] * weekly + self.coef[:, 3] * monthly)
+            forecasts[:, h] = np.maximum(variance, floor)
+            history = np.concatenate([history[:, 1:], forecasts[:, h:h + 1]], axis=1)
+
+        return forecasts
+
+    def calculate_var_cvar(self, prices, confidence_levels=[0.95, 0.99]):
+        """
+        計算 VaR 和 CVaR（與 GARCHPredictor 相同定義，可一次計算多檔）
+
+        Args:
+            prices: 股價序列或矩陣 (標的數 × 期數)
+            confidence_levels: 信賴水準
+
+        Returns:
+            risk_metrics: 風險指標（多檔時為陣列）
+        """
+        returns = self.calculate_returns(np.atleast_2d(np.asarray(prices, dtype=float)))
+
+        risk_metrics = {}
+        for level in confidence_levels:
+            var = np.nanpercentile(returns, (1 - level) * 100, axis=1)
+            tail = returns <= var[:, None]
+            cvar = np.where(tail, returns, 0).sum(axis=1) / np.maximum(tail.sum(axis=1), 1)
+
+            risk_metrics[f'VaR_{int(level*100)}'] = var
+            risk_metrics[f'CVaR_{int(level*100)}'] = cvar
+
+        return risk_metrics
+
+
+def build_predictions(current_price, variance_forecast, base_date):
+    """
+    將變異數預測轉換為與 garch_model.py 相同格式的預測結果
+
+    Args:
+        current_price: 目前價格
+        variance_forecast: 各期日變異數預測（百分比平方）
+        base_date: 基準日期
+
+    Returns:
+        predictions: 預測列表
+    """
+    predictions = []
+    cumulative_variance = np.cumsum(variance_forecast)
+
+    for i, variance in enumerate(variance_forecast):
+        target_date = base_date + timedelta(days=i+1)
+
+        # 多期價格區間使用累積變異數
+        price_std = current_price * np.sqrt(cumulative_variance[i]) / 100
+        lower_bound = current_price - 1.96 * price_std
+        upper_bound = current_price + 1.96 * price_std
+
+        predictions.append({
+            'target_date': target_date.strftime('%Y-%m-%d'),
+            'predicted_price': round((lower_bound + upper_bound) / 2, 2),
+            'predicted_volatility': round(float(np.sqrt(variance)), 4),
+            'confidence_lower': round(lower_bound, 2),
+            'confidence_upper': round(upper_bound, 2),
+            'confidence_level': 0.95
+        })
+
+    return predictions
+
+
+@profiled('har')
+def main():
+    """主函數"""
+    try:
+        # 從檔案讀取輸入資料
+        if len(sys.argv) < 2:
+            print(json.dumps({
+                'success': False,
+                'error': '請提供輸入資料檔案路徑'
+            }))
+            sys.exit(1)
+
+        input_file = sys.argv[1]
+
+        with open(input_file, 'r', encoding='utf-8-sig') as f:
+            input_data = json.load(f)
+
+        prediction_days = input_data.get('prediction_days', 7)
+        base_date = datetime.strptime(input_data['base_date'], '%Y-%m-%d')
+
+        predictor = HARPredictor(
+            weekly=input_data.get('weekly', 5),
+            monthly=input_data.get('monthly', 22)
+        )
+
+        # 多檔模式：{"panel": {"2330": [...], "2317": [...]}}，長度不同時左側補 NaN 對齊
+        panel = input_data.get('panel')
+        if panel:
+            symbols = list(panel.keys())
+            length = max(len(series) for series in panel.values())
+            prices = np.full((len(symbols), length), np.nan)
+            for i, series in enumerate(panel.values()):
+                prices[i, length - len(series):] = series
+        else:
+            symbols = [input_data.get('stock_symbol')]
+            prices = np.array(input_data['prices'], dtype=float)
+
+            # 資料驗證：以交易日曆與數值檢查清理價格序列
+            if input_data.get('validate'):
+                prices, validation = clean_input(input_data, prices)
+            prices = prices.reshape(1, -1)
+
+        # 檢查資料長度
+        lengths = (~np.isnan(prices)).sum(axis=1)
+        min_length = predictor.monthly * 2 + 1
+        if lengths.min() < min_length:
+            print(json.dumps({
+                'success': False,
+                'error': f'資料不足,至少需要{min_length}天的歷史資料'
+            }))
+            sys.exit(1)
+
+        model_info = predictor.train(prices)
+        variance_forecast = predictor.predict(horizon=prediction_days)
+        risk_metrics = predictor.calculate_var_cvar(prices)
+
+        results = []
+        for i, symbol in enumerate(symbols):
+            long_run = model_info['long_run_volatility'][i]
+            results.append({
+                'stock_symbol': symbol,
+                'predictions': build_predictions(float(prices[i, -1]), variance_forecast[i], base_date),
+                'model_info': {
+                    'model_type': 'HAR',
+                    'order': f'HAR(1,{predictor.weekly},{predictor.monthly})',
+                    'parameters': {name: round(float(values[i]), 6)
+                                   for name, values in model_info['parameters'].items()},
+                    'r_squared': round(float(model_info['r_squared'][i]), 4),
+                    'long_run_volatility': round(float(long_run), 4) if np.isfinite(long_run) else None
+                },
+                'risk_metrics': {name: float(values[i]) for name, values in risk_metrics.items()}
+            })
+
+        if panel:
+            result = {'success': True, 'results': results}
+        else:
+            result = {'success': True, **results[0]}
+            del result['stock_symbol']
+            if input_data.get('validate'):
+                result['validation'] = validation
+
+        print(json.dumps(result, ensure_ascii=False))
+
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
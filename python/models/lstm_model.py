@@ -13,6 +13,11 @@ from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
+from memory_utils import load_prices, memory_report
+from price_validation import clean_input
+from lstm_search import search, load_best_config
+from profiling import profiled
+
 # 設定環境變數避免 Windows asyncio 問題
 os.environ['PYTHONDONTWRITEBYTECODE'] = '1'
 os.environ['NO_PROXY'] = '*'
@@ -27,10 +32,17 @@ from tensorflow.keras.layers import LSTM, Dense, Dropout
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
 
+# 套用排程器指定的 TensorFlow 執行緒預算（見 python/scheduler.py）
+if os.environ.get('TF_NUM_INTRAOP_THREADS'):
+    tf.config.threading.set_intra_op_parallelism_threads(int(os.environ['TF_NUM_INTRAOP_THREADS']))
+if os.environ.get('TF_NUM_INTEROP_THREADS'):
+    tf.config.threading.set_inter_op_parallelism_threads(int(os.environ['TF_NUM_INTEROP_THREADS']))
+
 class LSTMPredictor:
     """LSTM 預測模型類別"""
 
-    def __init__(self, lookback=60, units=128, dropout=0.2, epochs=100):
+    def __init__(self, lookback=60, units=128, dropout=0.2, epochs=100, memory_lean=False,
+                 fast_train=False, batch_size=None, jit_compile='auto'):
         """
         初始化模型參數
 
@@ -39,11 +51,20 @@ class LSTMPredictor:
             units: LSTM 單元數
             dropout: Dropout 比率
             epochs: 訓練輪數
+            memory_lean: 精簡記憶體模式（float32、不展開訓練視窗）
+            fast_train: 快速訓練模式（tf.data 快取視窗）
+            batch_size: 快速訓練的批次大小（None 為原流程的 32；'auto' 為依樣本數自動加大，較快但驗證誤差較高）
+            jit_compile: 快速訓練是否以 XLA 編譯訓練步驟（'auto' 僅在有 GPU 時啟用）
         """
         self.lookback = lookback
         self.units = units
         self.dropout = dropout
         self.epochs = epochs
+        self.memory_lean = memory_lean
+        self.fast_train = fast_train
+        self.batch_size = batch_size
+        self.jit_compile = jit_compile
+        self.training_info = {}
         self.model = None
         self.scaler = MinMaxScaler(feature_range=(0, 1))
 
@@ -67,12 +88,105 @@ class LSTMPredictor:
 
         return np.array(X), np.array(y)
 
-    def build_model(self, input_shape):
+    def prepare_dataset(self, prices, validation_split=0.2, batch_size=32):
+        """
+        精簡記憶體模式的訓練資料：只保留一份 float32 標準化序列，
+        訓練視窗由 tf.data 依索引即時切出，不建立 (樣本數 × lookback) 的視窗矩陣；
+        訓練集每輪重新洗牌視窗起點索引（與 model.fit 傳入陣列時的預設行為相同）
+
+        驗證集切分方式與 train_test_split(shuffle=False) 相同
+
+        Args:
+            prices: 股價陣列
+            validation_split: 驗證集比例
+            batch_size: 批次大小
+
+        Returns:
+            train_ds, val_ds: 訓練與驗證資料集
+        """
+        scaled = self.scaler.fit_transform(prices.reshape(-1, 1)).astype(np.float32, copy=False).ravel()
+        series = tf.constant(scaled)
+
+        n_samples = len(scaled) - self.lookback
+        n_train = n_samples - int(np.ceil(n_samples * validation_split))
+
+        def window(i):
+            return tf.reshape(series[i:i + self.lookback], (self.lookback, 1)), series[i + self.lookback]
+
+        def dataset(start, stop, shuffle=False):
+            indices = tf.data.Dataset.range(start, stop)
+            if shuffle:
+                indices = indices.shuffle(stop - start, reshuffle_each_iteration=True)
+            return (indices
+                    .map(window, num_parallel_calls=tf.data.AUTOTUNE)
+                    .batch(batch_size)
+                    .prefetch(tf.data.AUTOTUNE))
+
+        return dataset(0, n_train, shuffle=True), dataset(n_train, n_samples)
+
+    def prepare_cached_dataset(self, prices, batch_size, validation_split=0.2):
+        """
+        快速訓練模式的訓練資料：視窗只建立一次並快取於 tf.data，
+        每輪重新洗牌（與 model.fit 傳入陣列時的預設行為相同），批次預先準備
+
+        驗證集切分方式與 train_test_split(shuffle=False) 相同
+
+        Args:
+            prices: 股價陣列
+            batch_size: 批次大小
+            validation_split: 驗證集比例
+
+        Returns:
+            train_ds, val_ds: 訓練與驗證資料集
+            n_train: 訓練樣本數
+        """
+        X, y = self.prepare_data(prices)
+        X = X.astype(np.float32).reshape((X.shape[0], X.shape[1], 1))
+        y = y.astype(np.float32)
+        n_train = len(X) - int(np.ceil(len(X) * validation_split))
+
+        train_ds = (tf.data.Dataset.from_tensor_slices((X[:n_train], y[:n_train]))
+                    .cache()
+                    .shuffle(n_train, reshuffle_each_iteration=True)
+                    .batch(batch_size)
+                    .prefetch(tf.data.AUTOTUNE))
+        val_ds = (tf.data.Dataset.from_tensor_slices((X[n_train:], y[n_train:]))
+                  .batch(batch_size)
+                  .cache()
+                  .prefetch(tf.data.AUTOTUNE))
+        return train_ds, val_ds, n_train
+
+    @staticmethod
+    def adaptive_batch_size(n_train, base=32, max_batch=256, min_steps=8):
+        """
+        依訓練樣本數決定批次大小：在每輪至少 min_steps 次更新的前提下取最大的 base × 2^k
+
+        CPU 上 LSTM 每個訓練步驟的固定開銷遠大於批次內的計算，
+        批次加大可明顯縮短每輪時間，但驗證誤差較高（見 benchmark_lstm_training.py），
+        因此只在 batch_size='auto' 時使用
+
+        Args:
+            n_train: 訓練樣本數
+            base: 最小批次（原訓練流程的 32）
+            max_batch: 批次上限
+            min_steps: 每輪最少更新次數
+
+        Returns:
+            batch_size: 批次大小
+        """
+        batch_size = base
+        while batch_size * 2 <= max_batch and n_train / (batch_size * 2) >= min_steps:
+            batch_size *= 2
+        return batch_size
+
+    def build_model(self, input_shape, learning_rate=0.001, jit_compile=False):
         """
         建立 LSTM 模型架構
 
         Args:
             input_shape: 輸入形狀
+            learning_rate: 學習率
+            jit_compile: 是否以 XLA 編譯訓練步驟
         """
         self.model = Sequential([
             # 第一層 LSTM
@@ -98,9 +212,10 @@ class LSTMPredictor:
 
         # 編譯模型
         self.model.compile(
-            optimizer=Adam(learning_rate=0.001),
+            optimizer=Adam(learning_rate=learning_rate),
             loss='mean_squared_error',
-            metrics=['mae']
+            metrics=['mae'],
+            jit_compile=jit_compile
         )
 
     def train(self, prices):
@@ -113,6 +228,11 @@ class LSTMPredictor:
         Returns:
             history: 訓練歷史
         """
+        if self.memory_lean:
+            return self._train_lean(prices)
+        if self.fast_train:
+            return self._train_fast(prices)
+
         # 準備資料
         X, y = self.prepare_data(prices)
 
@@ -128,19 +248,7 @@ class LSTMPredictor:
         self.build_model(X_train.shape)
 
         # 設定回調函數
-        callbacks = [
-            EarlyStopping(
-                monitor='val_loss',
-                patience=10,
-                restore_best_weights=True
-            ),
-            ReduceLROnPlateau(
-                monitor='val_loss',
-                factor=0.5,
-                patience=5,
-                min_lr=1e-6
-            )
-        ]
+        callbacks = self._callbacks()
 
         # 訓練模型
         history = self.model.fit(
@@ -154,6 +262,63 @@ class LSTMPredictor:
 
         return history
 
+    def _callbacks(self):
+        """設定回調函數"""
+        return [
+            EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True),
+            ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=5, min_lr=1e-6)
+        ]
+
+    def _train_lean(self, prices):
+        """精簡記憶體模式訓練：以 tf.data 即時產生視窗"""
+        train_ds, val_ds = self.prepare_dataset(prices)
+        self.build_model((None, self.lookback))
+
+        return self.model.fit(
+            train_ds,
+            epochs=self.epochs,
+            validation_data=val_ds,
+            callbacks=self._callbacks(),
+            verbose=0
+        )
+
+    def _train_fast(self, prices):
+        """
+        快速訓練模式：tf.data 快取視窗，預設維持原流程的批次大小 32
+
+        指定較大的批次（或 'auto'）時學習率依 sqrt(批次 / 32) 放大；
+        此縮放無法完全抵銷更新次數減少，驗證誤差會高於原流程
+        """
+        n_samples = len(prices) - self.lookback
+        n_train = n_samples - int(np.ceil(n_samples * 0.2))
+        if self.batch_size == 'auto':
+            batch_size = self.adaptive_batch_size(n_train)
+        else:
+            batch_size = int(self.batch_size or 32)
+        learning_rate = 0.001 * np.sqrt(batch_size / 32)
+
+        jit_compile = self.jit_compile
+        if jit_compile == 'auto':
+            # XLA 編譯 LSTM 的時間迴圈在 CPU 上反而較慢，只在 GPU 上啟用
+            jit_compile = bool(tf.config.list_physical_devices('GPU'))
+
+        train_ds, val_ds, n_train = self.prepare_cached_dataset(prices, batch_size)
+        self.build_model((None, self.lookback), learning_rate=learning_rate, jit_compile=bool(jit_compile))
+        self.training_info = {
+            'mode': 'fast',
+            'batch_size': batch_size,
+            'learning_rate': round(float(learning_rate), 6),
+            'jit_compile': bool(jit_compile)
+        }
+
+        return self.model.fit(
+            train_ds,
+            epochs=self.epochs,
+            validation_data=val_ds,
+            callbacks=self._callbacks(),
+            verbose=0
+        )
+
     def predict(self, prices, days=7):
         """
         預測未來股價
@@ -192,6 +357,51 @@ class LSTMPredictor:
 
         return predictions
 
+    def export_weights(self, path, metadata=None):
+        """
+        匯出 LSTM / Dense 權重與標準化參數，供 lstm_numpy_model.py 免載入 TensorFlow 推論
+
+        Args:
+            path: 輸出的 .npz 檔案路徑
+            metadata: 額外寫入的資訊（如股票代號、訓練指標）
+        """
+        if self.model is None:
+            raise ValueError("模型尚未訓練")
+
+        arrays = {}
+        layers = []
+        for layer in self.model.layers:
+            # Dropout 在推論時不作用，不需匯出
+            if isinstance(layer, LSTM):
+                kernel, recurrent, bias = layer.get_weights()
+                arrays[f'layer{len(layers)}_recurrent'] = recurrent
+                layers.append({'type': 'lstm', 'units': layer.units,
+                               'return_sequences': layer.return_sequences})
+            elif isinstance(layer, Dense):
+                kernel, bias = layer.get_weights()
+                layers.append({'type': 'dense', 'units': layer.units})
+            else:
+                continue
+
+            arrays[f'layer{len(layers) - 1}_kernel'] = kernel
+            arrays[f'layer{len(layers) - 1}_bias'] = bias
+
+        meta = {
+            'lookback': self.lookback,
+            'units': self.units,
+            'layers': layers,
+            'scaler_min': float(self.scaler.min_[0]),
+            'scaler_scale': float(self.scaler.scale_[0]),
+            'trained_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        meta.update(metadata or {})
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        np.savez(path, meta=np.array(json.dumps(meta, ensure_ascii=False)), **arrays)
+
     def calculate_confidence_intervals(self, predictions, confidence=0.95):
         """
         計算信賴區間
@@ -217,6 +427,7 @@ class LSTMPredictor:
 
         return intervals
 
+@profiled('lstm')
 def main():
     """主函數"""
     try:
@@ -239,13 +450,47 @@ def main():
             # 嘗試直接解析 JSON
             input_data = json.loads(input_arg)
 
-        # 解析參數
-        prices = np.array(input_data['prices'])
+        # 超參數搜尋模式
+        if input_data.get('mode') == 'search':
+            result = search(
+                input_data['prices'],
+                symbol=input_data.get('stock_symbol'),
+                search_space=input_data.get('search_space'),
+                n_trials=input_data.get('n_trials', 12),
+                workers=input_data.get('workers'),
+                validation_split=input_data.get('validation_split', 0.2),
+                warmup_epochs=input_data.get('warmup_epochs', 5),
+                seed=input_data.get('seed', 0)
+            )
+            print(json.dumps({'success': True, 'mode': 'search', **result}, ensure_ascii=False))
+            return
+
+        # 解析參數：未指定的參數優先沿用該股票搜尋出的最佳設定
+        memory_lean = input_data.get('memory_lean', False)
+        prices = load_prices(input_data, memory_lean)
         prediction_days = input_data.get('prediction_days', 7)
-        epochs = input_data.get('epochs', 100)
-        units = input_data.get('units', 128)
-        lookback = input_data.get('lookback', 60)
-        dropout = input_data.get('dropout', 0.2)
+
+        # 資料驗證：以交易日曆與數值檢查清理價格序列
+        validation = None
+        if input_data.get('validate'):
+            prices, validation = clean_input(input_data, prices)
+
+        best_config = None
+        if input_data.get('use_best_config', True):
+            best_config = load_best_config(input_data.get('stock_symbol'))
+
+        defaults = {'epochs': 100, 'units': 128, 'lookback': 60, 'dropout': 0.2}
+        params = {}
+        for name, default in defaults.items():
+            value = input_data.get(name)
+            if value is None:
+                value = (best_config or {}).get(name, default)
+            params[name] = value
+
+        epochs = params['epochs']
+        units = params['units']
+        lookback = params['lookback']
+        dropout = params['dropout']
 
         # 檢查資料長度
         if len(prices) < 100:
@@ -260,7 +505,11 @@ def main():
             lookback=lookback,
             units=units,
             dropout=dropout,
-            epochs=epochs
+            epochs=epochs,
+            memory_lean=memory_lean,
+            fast_train=input_data.get('fast_train', False),
+            batch_size=input_data.get('batch_size'),
+            jit_compile=input_data.get('jit_compile', 'auto')
         )
 
         # 訓練模型
@@ -290,6 +539,17 @@ def main():
         final_loss = float(history.history['loss'][-1])
         final_mae = float(history.history['mae'][-1])
 
+        # 匯出權重，之後可用 lstm_numpy_model.py 免 TensorFlow 推論
+        if input_data.get('export_path'):
+            predictor.export_weights(input_data['export_path'], {
+                'stock_symbol': input_data.get('stock_symbol'),
+                'metrics': {
+                    'final_loss': round(final_loss, 6),
+                    'final_mae': round(final_mae, 4),
+                    'epochs_trained': len(history.history['loss'])
+                }
+            })
+
         # 輸出結果
         result = {
             'success': True,
@@ -299,9 +559,22 @@ def main():
                 'final_mae': round(final_mae, 4),
                 'epochs_trained': len(history.history['loss']),
                 'model_type': 'LSTM'
+            },
+            'hyperparameters': {
+                **params,
+                'from_best_config': best_config is not None and any(input_data.get(name) is None for name in defaults)
             }
         }
 
+        if memory_lean or input_data.get('report_memory'):
+            result['memory'] = memory_report(memory_lean, prices)
+
+        if predictor.training_info:
+            result['training'] = predictor.training_info
+
+        if validation is not None:
+            result['validation'] = validation
+
         print(json.dumps(result, ensure_ascii=False))
 
     except Exception as e:
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+LSTM 純 NumPy 推論模型
+載入 LSTMPredictor 匯出的權重，以 NumPy 執行前向傳播，不需載入 TensorFlow
+
+權重檔格式（由 LSTMPredictor.export_weights 產生的 .npz）：
+    meta:               JSON 字串（lookback、layers、scaler 參數與訓練指標）
+    layer{i}_kernel:    LSTM 輸入權重 (輸入維度, 4*units) 或 Dense 權重
+    layer{i}_recurrent: LSTM 遞迴權重 (units, 4*units)
+    layer{i}_bias:      偏差項
+LSTM 閘門順序與 Keras 相同：input, forget, cell, output
+"""
+
+import sys
+import json
+import os
+import numpy as np
+from datetime import datetime, timedelta
+import warnings
+warnings.filterwarnings('ignore')
+
+from profiling import profiled
+
+
+def sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class NumpyLSTMNetwork:
+    """
+    LSTM / Dense 堆疊網路的 NumPy 前向傳播
+
+    權重可為共用（2 維）或依標的堆疊（多一個標的維度），
+    輸入形狀為 (標的數, 批次, 時間步, 特徵)
+    """
+
+    def __init__(self, layers, dtype=np.float32):
+        """
+        Args:
+            layers: [{'type': 'lstm'|'dense', 'kernel', 'recurrent', 'bias', 'return_sequences'}]
+            dtype: 運算精度
+        """
+        self.dtype = dtype
+        self.layers = []
+        for layer in layers:
+            converted = dict(layer)
+            for key in ('kernel', 'recurrent', 'bias'):
+                if key in layer:
+                    converted[key] = np.asarray(layer[key], dtype=dtype)
+            self.layers.append(converted)
+
+    @classmethod
+    def stack(cls, networks):
+        """
+        將多個相同架構的網路堆疊成依標的批次運算的網路
+
+        Args:
+            networks: NumpyLSTMNetwork 列表（順序即標的順序）
+
+        Returns:
+            network: 權重多一個標的維度的網路
+        """
+        layers = []
+        for parts in zip(*[n.layers for n in networks]):
+            layer = dict(parts[0])
+            for key in ('kernel', 'recurrent', 'bias'):
+                if key in layer:
+                    layer[key] = np.stack([p[key] for p in parts])
+            layers.append(layer)
+        return cls(layers, networks[0].dtype)
+
+    @staticmethod
+    def _expand(weight, shared_ndim, extra_axes):
+        """堆疊權重需在標的維度後補上批次等軸以便廣播"""
+        if weight.ndim == shared_ndim:
+            return weight
+        return weight.reshape(weight.shape[:1] + (1,) * extra_axes + weight.shape[1:])
+
+    def _lstm(self, x, layer):
+        kernel, recurrent, bias = layer['kernel'], layer['recurrent'], layer['bias']
+        units = recurrent.shape[-2]
+
+        # 一次算出所有時間步的輸入投影，迴圈內只剩遞迴部分
+        projected = x @ self._expand(kernel, 2, 1) + self._expand(bias, 1, 2)
+
+        h = np.zeros(x.shape[:2] + (units,), dtype=self.dtype)
+        c = np.zeros_like(h)
+        outputs = []
+
+        for t in range(x.shape[2]):
+            z = projected[:, :, t, :] + h @ recurrent
+            i = sigmoid(z[..., :units])
+            f = sigmoid(z[..., units:2 * units])
+            g = np.tanh(z[..., 2 * units:3 * units])
+            o = sigmoid(z[..., 3 * units:])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+            if layer['return_sequences']:
+                outputs.append(h)
+
+        return np.stack(outputs, axis=2) if layer['return_sequences'] else h
+
+    def _dense(self, x, layer):
+        return x @ layer['kernel'] + self._expand(layer['bias'], 1, 1)
+
+    def forward(self, x):
+        """
+        前向傳播
+
+        Args:
+            x: (標的數, 批次, 時間步, 特徵) 輸入
+
+        Returns:
+            output: (標的數, 批次, 輸出維度)
+        """
+        x = np.asarray(x, dtype=self.dtype)
+        for layer in self.layers:
+            x = self._lstm(x, layer) if layer['type'] == 'lstm' else self._dense(x, layer)
+        return x
+
+
+class NumpyLSTMPredictor:
+    """以匯出權重進行推論的 LSTM 預測器（介面對應 LSTMPredictor.predict）"""
+
+    def __init__(self, network, lookback, scaler_min, scaler_scale, meta=None):
+        """
+        Args:
+            network: NumpyLSTMNetwork
+            lookback: 回顧期間
+            scaler_min: MinMaxScaler.min_（單一值或依標的的陣列）
+            scaler_scale: MinMaxScaler.scale_（單一值或依標的的陣列）
+            meta: 權重檔中的其他資訊
+        """
+        self.network = network
+        self.lookback = lookback
+        self.scaler_min = np.atleast_1d(np.asarray(scaler_min, dtype=np.float64))
+        self.scaler_scale = np.atleast_1d(np.asarray(scaler_scale, dtype=np.float64))
+        self.meta = meta or {}
+
+    @classmethod
+    def load(cls, path):
+        """
+        由權重檔載入預測器
+
+        Args:
+            path: export_weights 產生的 .npz 檔案
+
+        Returns:
+            predictor: NumpyLSTMPredictor
+        """
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            layers = []
+            for i, layer_meta in enumerate(meta['layers']):
+                layer = {'type': layer_meta['type'],
+                         'return_sequences': layer_meta.get('return_sequences', False),
+                         'kernel': data[f'layer{i}_kernel'],
+                         'bias': data[f'layer{i}_bias']}
+                if layer_meta['type'] == 'lstm':
+                    layer['recurrent'] = data[f'layer{i}_recurrent']
+                layers.append(layer)
+
+        return cls(NumpyLSTMNetwork(layers), meta['lookback'],
+                   meta['scaler_min'], meta['scaler_scale'], meta)
+
+    @classmethod
+    def load_many(cls, paths):
+        """
+        載入多檔股票的權重並堆疊，之後可一次預測所有標的
+
+        Args:
+            paths: 權重檔路徑列表（需為相同架構）
+
+        Returns:
+            predictor: 權重依標的堆疊的 NumpyLSTMPredictor
+        """
+        predictors = [cls.load(path) for path in paths]
+        lookbacks = {p.lookback for p in predictors}
+        if len(lookbacks) != 1:
+            raise ValueError("所有模型的 lookback 必須相同才能批次推論")
+
+        return cls(
+            NumpyLSTMNetwork.stack([p.network for p in predictors]),
+            predictors[0].lookback,
+            np.concatenate([p.scaler_min for p in predictors]),
+            np.concatenate([p.scaler_scale for p in predictors]),
+            {'symbols': [p.meta.get('stock_symbol') for p in predictors]}
+        )
+
+    def predict_batch(self, prices, days=7):
+        """
+        批次遞迴預測多檔股票未來價格
+
+        Args:
+            prices: (標的數 × 期數) 股價矩陣，至少包含 lookback 期
+            days: 預測天數
+
+        Returns:
+            predictions: (標的數 × 預測天數) 預測價格
+        """
+        prices = np.atleast_2d(np.asarray(prices, dtype=np.float64))
+        window = prices[:, -self.lookback:] * self.scaler_scale[:, None] + self.scaler_min[:, None]
+        window = window.astype(np.float32)
+
+        predictions = np.empty((prices.shape[0], days))
+        for day in range(days):
+            next_scaled = self.network.forward(window[:, None, :, None])[:, 0, 0]
+            predictions[:, day] = (next_scaled - self.scaler_min) / self.scaler_scale
+
+            # 更新序列（滑動視窗）
+            window = np.concatenate([window[:, 1:], next_scaled[:, None]], axis=1)
+
+        return predictions
+
+    def predict(self, prices, days=7):
+        """
+        預測單一股票未來價格（與 LSTMPredictor.predict 相同回傳格式）
+        """
+        return [float(x) for x in self.predict_batch(np.asarray(prices)[None, :], days)[0]]
+
+
+@profiled('lstm_numpy')
+def main():
+    """主函數"""
+    try:
+        if len(sys.argv) < 2:
+            print(json.dumps({
+                'success': False,
+                'error': '請提供輸入資料'
+            }))
+            sys.exit(1)
+
+        input_arg = sys.argv[1]
+        if os.path.exists(input_arg):
+            with open(input_arg, 'r', encoding='utf-8') as f:
+                input_data = json.load(f)
+        else:
+            input_data = json.loads(input_arg)
+
+        weights_path = input_data.get('weights_path')
+        if not weights_path or not os.path.exists(weights_path):
+            print(json.dumps({
+                'success': False,
+                'error': f'找不到 LSTM 權重檔: {weights_path}'
+            }))
+            sys.exit(1)
+
+        predictor = NumpyLSTMPredictor.load(weights_path)
+        prices = np.array(input_data['prices'])
+        prediction_days = input_data.get('prediction_days', 7)
+
+        if len(prices) < predictor.lookback:
+            print(json.dumps({
+                'success': False,
+                'error': f'資料不足，至少需要{predictor.lookback}天的歷史資料'
+            }))
+            sys.exit(1)
+
+        predictions = predictor.predict(prices, days=prediction_days)
+
+        # 信賴區間沿用 LSTMPredictor.calculate_confidence_intervals 的簡化算法
+        margin = np.std(predictions) * 0.1 * 1.96
+
+        base_date = datetime.strptime(input_data['base_date'], '%Y-%m-%d')
+        predictions_with_dates = []
+        for i, pred in enumerate(predictions):
+            target_date = base_date + timedelta(days=i+1)
+            predictions_with_dates.append({
+                'target_date': target_date.strftime('%Y-%m-%d'),
+                'predicted_price': round(pred, 2),
+                'confidence_lower': round(pred - margin, 2),
+                'confidence_upper': round(pred + margin, 2),
+                'confidence_level': 0.95
+            })
+
+        metrics = dict(predictor.meta.get('metrics', {}))
+        metrics.update({
+            'model_type': 'LSTM',
+            'inference': 'numpy',
+            'trained_at': predictor.meta.get('trained_at')
+        })
+
+        print(json.dumps({
+            'success': True,
+            'predictions': predictions_with_dates,
+            'metrics': metrics
+        }, ensure_ascii=False))
+
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+全市場面板 LSTM 預測模型
+以多檔股票的標準化視窗一次訓練單一模型，並加入股票 / 產業嵌入向量，
+取代逐檔訓練 LSTMPredictor 的做法
+"""
+
+import sys
+import json
+import os
+import numpy as np
+from datetime import datetime, timedelta
+import warnings
+warnings.filterwarnings('ignore')
+
+from profiling import profiled
+
+# 設定環境變數避免 Windows asyncio 問題
+os.environ['PYTHONDONTWRITEBYTECODE'] = '1'
+os.environ['NO_PROXY'] = '*'
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # 減少 TensorFlow 輸出
+
+import tensorflow as tf
+from tensorflow.keras import Model
+from tensorflow.keras.layers import Input, LSTM, Dense, Dropout, Embedding, Flatten, Concatenate
+from tensorflow.keras.optimizers import Adam
+from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+
+# 套用排程器指定的 TensorFlow 執行緒預算（見 python/scheduler.py）
+if os.environ.get('TF_NUM_INTRAOP_THREADS'):
+    tf.config.threading.set_intra_op_parallelism_threads(int(os.environ['TF_NUM_INTRAOP_THREADS']))
+if os.environ.get('TF_NUM_INTEROP_THREADS'):
+    tf.config.threading.set_inter_op_parallelism_threads(int(os.environ['TF_NUM_INTEROP_THREADS']))
+
+# 嵌入索引 0 保留給未知股票 / 產業
+UNKNOWN_ID = 0
+
+
+class PanelLSTMPredictor:
+    """全市場面板 LSTM 預測模型類別"""
+
+    def __init__(self, lookback=60, units=64, dropout=0.2, epochs=30,
+                 batch_size=512, symbol_dim=8, sector_dim=4):
+        """
+        初始化模型參數
+
+        Args:
+            lookback: 回顧期間
+            units: LSTM 單元數
+            dropout: Dropout 比率
+            epochs: 訓練輪數
+            batch_size: 批次大小（面板資料量大，使用大批次）
+            symbol_dim: 股票嵌入維度
+            sector_dim: 產業嵌入維度
+        """
+        self.lookback = lookback
+        self.units = units
+        self.dropout = dropout
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.symbol_dim = symbol_dim
+        self.sector_dim = sector_dim
+        self.model = None
+        self.symbol_ids = {}
+        self.sector_ids = {}
+        self.sectors = {}
+        self.residual_std = None
+
+    @staticmethod
+    def normalize_windows(windows):
+        """
+        以視窗最後一筆價格標準化：x / x_last - 1，使不同價位的股票可共用同一模型
+
+        Args:
+            windows: (樣本數 × 期數) 價格視窗
+
+        Returns:
+            normalized: 標準化後的視窗
+        """
+        return windows / windows[:, -1:] - 1.0
+
+    def _encode(self, symbols, sectors):
+        """建立股票與產業的嵌入索引"""
+        self.symbol_ids = {symbol: i + 1 for i, symbol in enumerate(symbols)}
+        self.sectors = {symbol: sectors.get(symbol) for symbol in symbols}
+        names = sorted({s for s in self.sectors.values() if s is not None})
+        self.sector_ids = {name: i + 1 for i, name in enumerate(names)}
+
+    def _ids(self, symbols):
+        symbol_ids = np.array([self.symbol_ids.get(s, UNKNOWN_ID) for s in symbols], dtype=np.int32)
+        sector_ids = np.array([self.sector_ids.get(self.sectors.get(s), UNKNOWN_ID) for s in symbols],
+                              dtype=np.int32)
+        return symbol_ids, sector_ids
+
+    def prepare_data(self, panel, validation_split=0.2):
+        """
+        由多檔股價建立訓練與驗證資料
+
+        每檔股票依時間切分，最後 validation_split 比例的視窗作為驗證集，避免未來資訊洩漏
+
+        Args:
+            panel: {股票代號: 股價序列}
+            validation_split: 驗證集比例
+
+        Returns:
+            train, val: (X, symbol_ids, sector_ids, y) 元組
+        """
+        train_parts, val_parts = [], []
+
+        for symbol, prices in panel.items():
+            prices = np.asarray(prices, dtype=np.float32)
+            if len(prices) <= self.lookback + 1:
+                continue
+
+            windows = np.lib.stride_tricks.sliding_window_view(prices, self.lookback + 1)
+            X = self.normalize_windows(windows[:, :-1])
+            y = windows[:, -1] / windows[:, -2] - 1.0
+
+            symbol_ids, sector_ids = self._ids([symbol] * len(X))
+            split = int(len(X) * (1 - validation_split))
+            train_parts.append((X[:split], symbol_ids[:split], sector_ids[:split], y[:split]))
+            val_parts.append((X[split:], symbol_ids[split:], sector_ids[split:], y[split:]))
+
+        n_train = sum(len(p[3]) for p in train_parts)
+        n_val = sum(len(p[3]) for p in val_parts)
+        if n_train == 0 or n_val == 0:
+            raise ValueError(
+                f'資料不足，無法建立訓練與驗證視窗：每檔股票至少需要 {self.lookback + 2} 天的歷史資料'
+                f'（lookback={self.lookback}），目前最長 {max((len(p) for p in panel.values()), default=0)} 天'
+            )
+
+        def concat(parts):
+            return tuple(np.concatenate([p[i] for p in parts]) for i in range(4))
+
+        return concat(train_parts), concat(val_parts)
+
+    def build_model(self):
+        """建立面板 LSTM 模型架構（價格視窗 + 股票嵌入 + 產業嵌入）"""
+        window_input = Input(shape=(self.lookback, 1), name='window')
+        symbol_input = Input(shape=(1,), dtype='int32', name='symbol')
+        sector_input = Input(shape=(1,), dtype='int32', name='sector')
+
+        x = LSTM(self.units, return_sequences=True)(window_input)
+        x = Dropout(self.dropout)(x)
+        x = LSTM(self.units // 2)(x)
+        x = Dropout(self.dropout)(x)
+
+        symbol_embedding = Flatten()(Embedding(len(self.symbol_ids) + 1, self.symbol_dim)(symbol_input))
+        sector_embedding = Flatten()(Embedding(len(self.sector_ids) + 1, self.sector_dim)(sector_input))
+
+        x = Concatenate()([x, symbol_embedding, sector_embedding])
+        x = Dense(32, activation='relu')(x)
+        output = Dense(1)(x)
+
+        self.model = Model(inputs=[window_input, symbol_input, sector_input], outputs=output)
+        self.model.compile(
+            optimizer=Adam(learning_rate=0.001),
+            loss='mean_squared_error',
+            metrics=['mae']
+        )
+
+    def train(self, panel, sectors=None):
+        """
+        以全市場資料訓練單一模型
+
+        Args:
+            panel: {股票代號: 股價序列}
+            sectors: {股票代號: 產業名稱}
+
+        Returns:
+            history: 訓練歷史
+        """
+        self._encode(list(panel.keys()), sectors or {})
+        (X, sym, sec, y), (X_val, sym_val, sec_val, y_val) = self.prepare_data(panel)
+
+        self.build_model()
+
+        train_ds = (tf.data.Dataset
+                    .from_tensor_slices(((X[..., None], sym, sec), y))
+                    .shuffle(min(len(X), 100000), reshuffle_each_iteration=True)
+                    .batch(self.batch_size)
+                    .prefetch(tf.data.AUTOTUNE))
+        val_ds = (tf.data.Dataset
+                  .from_tensor_slices(((X_val[..., None], sym_val, sec_val), y_val))
+                  .batch(self.batch_size)
+                  .prefetch(tf.data.AUTOTUNE))
+
+        callbacks = [
+            EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True),
+            ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=3, min_lr=1e-6)
+        ]
+
+        history = self.model.fit(
+            train_ds,
+            epochs=self.epochs,
+            validation_data=val_ds,
+            callbacks=callbacks,
+            verbose=0
+        )
+
+        # 驗證集報酬率殘差標準差，用於預測信賴區間
+        residuals = self.model.predict(val_ds, verbose=0)[:, 0] - y_val
+        self.residual_std = float(np.std(residuals))
+
+        return history
+
+    def predict(self, panel, days=7):
+        """
+        批次遞迴預測多檔股票未來價格
+
+        Args:
+            panel: {股票代號: 股價序列}，每檔至少 lookback 筆
+            days: 預測天數
+
+        Returns:
+            predictions: {股票代號: 預測價格列表}
+        """
+        if self.model is None:
+            raise ValueError("模型尚未訓練")
+
+        symbols = list(panel.keys())
+        windows = np.array([np.asarray(panel[s], dtype=np.float32)[-self.lookback:] for s in symbols])
+        symbol_ids, sector_ids = self._ids(symbols)
+
+        forecasts = np.empty((len(symbols), days))
+        for day in range(days):
+            X = self.normalize_windows(windows)[..., None]
+            next_return = self.model.predict([X, symbol_ids, sector_ids],
+                                             batch_size=self.batch_size, verbose=0)[:, 0]
+            next_price = windows[:, -1] * (1.0 + next_return)
+            forecasts[:, day] = next_price
+            windows = np.concatenate([windows[:, 1:], next_price[:, None]], axis=1)
+
+        return {symbol: [float(x) for x in forecasts[i]] for i, symbol in enumerate(symbols)}
+
+    def save(self, model_dir):
+        """
+        儲存模型與編碼資訊
+
+        Args:
+            model_dir: 輸出目錄
+        """
+        os.makedirs(model_dir, exist_ok=True)
+        self.model.save(os.path.join(model_dir, 'panel_lstm.keras'))
+
+        with open(os.path.join(model_dir, 'panel_lstm.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'lookback': self.lookback,
+                'units': self.units,
+                'batch_size': self.batch_size,
+                'symbol_ids': self.symbol_ids,
+                'sector_ids': self.sector_ids,
+                'sectors': self.sectors,
+                'residual_std': self.residual_std,
+                'trained_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, model_dir):
+        """
+        載入已訓練的面板模型
+
+        Args:
+            model_dir: save() 的輸出目錄
+
+        Returns:
+            predictor: PanelLSTMPredictor
+        """
+        with open(os.path.join(model_dir, 'panel_lstm.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        predictor = cls(lookback=meta['lookback'], units=meta['units'], batch_size=meta['batch_size'])
+        predictor.symbol_ids = meta['symbol_ids']
+        predictor.sector_ids = meta['sector_ids']
+        predictor.sectors = meta['sectors']
+        predictor.residual_std = meta['residual_std']
+        predictor.trained_at = meta.get('trained_at')
+        predictor.model = tf.keras.models.load_model(os.path.join(model_dir, 'panel_lstm.keras'))
+
+        return predictor
+
+
+@profiled('lstm_panel')
+def main():
+    """主函數"""
+    try:
+        if len(sys.argv) < 2:
+            print(json.dumps({
+                'success': False,
+                'error': '請提供輸入資料'
+            }))
+            sys.exit(1)
+
+        input_arg = sys.argv[1]
+        if os.path.exists(input_arg):
+            with open(input_arg, 'r', encoding='utf-8') as f:
+                input_data = json.load(f)
+        else:
+            input_data = json.loads(input_arg)
+
+        # 面板資料：{"panel": {"2330": [...], ...}}；單檔輸入時以 stock_symbol 包裝
+        panel = input_data.get('panel') or {input_data.get('stock_symbol'): input_data['prices']}
+        mode = input_data.get('mode', 'predict')
+        model_dir = input_data['model_dir']
+        prediction_days = input_data.get('prediction_days', 7)
+
+        if mode == 'train':
+            # 夜間批次：一次訓練全市場模型
+            predictor = PanelLSTMPredictor(
+                lookback=input_data.get('lookback', 60),
+                units=input_data.get('units', 64),
+                dropout=input_data.get('dropout', 0.2),
+                epochs=input_data.get('epochs', 30),
+                batch_size=input_data.get('batch_size', 512)
+            )
+            history = predictor.train(panel, input_data.get('sectors'))
+            predictor.save(model_dir)
+
+            print(json.dumps({
+                'success': True,
+                'metrics': {
+                    'final_loss': round(float(history.history['loss'][-1]), 6),
+                    'final_val_loss': round(float(history.history['val_loss'][-1]), 6),
+                    'epochs_trained': len(history.history['loss']),
+                    'symbols': len(predictor.symbol_ids),
+                    'residual_std': round(predictor.residual_std, 6),
+                    'model_type': 'PANEL_LSTM'
+                }
+            }, ensure_ascii=False))
+            return
+
+        predictor = PanelLSTMPredictor.load(model_dir)
+
+        too_short = [s for s, prices in panel.items() if len(prices) < predictor.lookback]
+        if too_short:
+            print(json.dumps({
+                'success': False,
+                'error': f'資料不足，至少需要{predictor.lookback}天的歷史資料: {too_short}'
+            }, ensure_ascii=False))
+            sys.exit(1)
+
+        forecasts = predictor.predict(panel, days=prediction_days)
+        base_date = datetime.strptime(input_data['base_date'], '%Y-%m-%d')
+
+        results = []
+        for symbol, predictions in forecasts.items():
+            predictions_with_dates = []
+            for i, pred in enumerate(predictions):
+                target_date = base_date + timedelta(days=i+1)
+                # 以驗證集報酬率殘差估計區間，隨預測期數放大
+                margin = pred * predictor.residual_std * np.sqrt(i + 1) * 1.96
+                predictions_with_dates.append({
+                    'target_date': target_date.strftime('%Y-%m-%d'),
+                    'predicted_price': round(pred, 2),
+                    'confidence_lower': round(pred - margin, 2),
+                    'confidence_upper': round(pred + margin, 2),
+                    'confidence_level': 0.95
+                })
+
+            results.append({
+                'stock_symbol': symbol,
+                'known_symbol': symbol in predictor.symbol_ids,
+                'predictions': predictions_with_dates
+            })
+
+        metrics = {
+            'model_type': 'PANEL_LSTM',
+            'trained_at': predictor.trained_at,
+            'residual_std': round(predictor.residual_std, 6)
+        }
+
+        if input_data.get('panel'):
+            result = {'success': True, 'results': results, 'metrics': metrics}
+        else:
+            result = {'success': True, 'predictions': results[0]['predictions'], 'metrics': metrics}
+
+        print(json.dumps(result, ensure_ascii=False))
+
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+LSTM 超參數搜尋
+以多個行程並行訓練不同的 LSTMPredictor 設定，使用時間序列驗證切分評分，
+依各輪驗證損失曲線提早中止表現不佳的試驗，並保存各股票的最佳設定供後續預測沿用
+"""
+
+import os
+import json
+import time
+import random
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+
+# 預設最佳設定目錄：Laravel storage/app/lstm_configs
+DEFAULT_CONFIG_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'storage', 'app', 'lstm_configs'
+)
+
+# 預設搜尋空間（epochs 為上限，實際輪數由提早停止決定）
+DEFAULT_SEARCH_SPACE = {
+    'lookback': [20, 40, 60],
+    'units': [32, 64, 128],
+    'dropout': [0.1, 0.2, 0.3],
+    'epochs': [100],
+}
+
+# 可由最佳設定提供的參數
+CONFIG_FIELDS = ('lookback', 'units', 'dropout', 'epochs')
+
+
+def config_path(symbol, config_dir=None):
+    """
+    取得股票最佳設定檔路徑
+
+    Args:
+        symbol: 股票代號
+        config_dir: 設定目錄（預設 storage/app/lstm_configs，可用 STOCK_LSTM_CONFIG_DIR 覆寫）
+
+    Returns:
+        path: 設定檔路徑
+    """
+    config_dir = config_dir or os.environ.get('STOCK_LSTM_CONFIG_DIR', DEFAULT_CONFIG_DIR)
+    return os.path.join(config_dir, f'{symbol}.json')
+
+
+def load_best_config(symbol, config_dir=None):
+    """
+    讀取股票的最佳設定
+
+    Args:
+        symbol: 股票代號
+        config_dir: 設定目錄
+
+    Returns:
+        config: lookback / units / dropout / epochs；尚未搜尋時回傳 None
+    """
+    if not symbol:
+        return None
+    try:
+        with open(config_path(symbol, config_dir), 'r', encoding='utf-8') as f:
+            return json.load(f)['config']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_best_config(symbol, entry, config_dir=None):
+    """
+    保存股票的最佳設定（先寫暫存檔再置換）
+
+    Args:
+        symbol: 股票代號
+        entry: 設定與搜尋摘要
+        config_dir: 設定目錄
+
+    Returns:
+        path: 設定檔路徑
+    """
+    path = config_path(symbol, config_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(entry, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+    return path
+
+
+def sample_configs(search_space, n_trials, seed=0):
+    """
+    從搜尋空間的格點中不重複抽樣
+
+    Args:
+        search_space: 各參數的候選值
+        n_trials: 試驗數（超過格點數時使用全部格點）
+        seed: 隨機種子
+
+    Returns:
+        configs: 設定列表
+    """
+    space = {**DEFAULT_SEARCH_SPACE, **(search_space or {})}
+    grid = [{}]
+    for name in CONFIG_FIELDS:
+        grid = [{**config, name: value} for config in grid for value in space[name]]
+
+    random.Random(seed).shuffle(grid)
+    return grid[:n_trials]
+
+
+def time_series_split(predictor, prices, validation_split):
+    """
+    時間序列驗證切分：以價格索引切分，前段訓練、後段驗證，
+    標準化參數只以訓練段估計，避免驗證資料外洩。
+    不同 lookback 的試驗驗證相同的目標期間，驗證損失可直接比較
+
+    Args:
+        predictor: LSTMPredictor
+        prices: 股價陣列
+        validation_split: 驗證期間比例
+
+    Returns:
+        X_train, y_train, X_val, y_val
+    """
+    split = int(len(prices) * (1 - validation_split))
+    predictor.scaler.fit(prices[:split].reshape(-1, 1))
+    scaled = predictor.scaler.transform(prices.reshape(-1, 1))[:, 0]
+
+    lookback = predictor.lookback
+    windows = np.lib.stride_tricks.sliding_window_view(scaled[:-1], lookback)
+    targets = scaled[lookback:]
+    target_index = np.arange(lookback, len(scaled))
+
+    train = target_index < split
+    X = windows[..., np.newaxis]
+    return X[train], targets[train], X[~train], targets[~train]
+
+
+def _median_pruner_callback(trial_id, curves, warmup_epochs, min_trials):
+    """
+    建立中位數剪枝回調：暖身期後，若本試驗目前最佳驗證損失
+    劣於其他試驗在相同輪數時最佳損失的中位數，即停止訓練
+    """
+    from tensorflow.keras.callbacks import Callback
+
+    class MedianPruner(Callback):
+        def __init__(self):
+            super().__init__()
+            self.history = []
+            self.pruned_at = None
+
+        def on_epoch_end(self, epoch, logs=None):
+            self.history.append(float(logs['val_loss']))
+            curves[trial_id] = list(self.history)
+
+            if epoch + 1 < warmup_epochs:
+                return
+
+            peers = [min(curve[:epoch + 1]) for key, curve in curves.items()
+                     if key != trial_id and len(curve) > epoch]
+            if len(peers) < min_trials:
+                return
+
+            if min(self.history) > float(np.median(peers)):
+                self.pruned_at = epoch + 1
+                self.model.stop_training = True
+
+    return MedianPruner()
+
+
+def run_trial(trial_id, config, prices, options, curves):
+    """
+    執行單一試驗（於子行程中）
+
+    Args:
+        trial_id: 試驗編號
+        config: lookback / units / dropout / epochs
+        prices: 股價陣列
+        options: validation_split / batch_size / warmup_epochs / min_trials / seed
+        curves: 各試驗驗證損失曲線的共享字典
+
+    Returns:
+        trial: 試驗結果
+    """
+    import tensorflow as tf
+    from lstm_model import LSTMPredictor
+
+    started = time.perf_counter()
+    tf.keras.utils.set_random_seed(options['seed'] + trial_id)
+
+    predictor = LSTMPredictor(**config)
+    X_train, y_train, X_val, y_val = time_series_split(predictor, prices, options['validation_split'])
+    predictor.build_model(X_train.shape)
+
+    pruner = _median_pruner_callback(trial_id, curves, options['warmup_epochs'], options['min_trials'])
+    history = predictor.model.fit(
+        X_train, y_train,
+        epochs=config['epochs'],
+        batch_size=options['batch_size'],
+        validation_data=(X_val, y_val),
+        callbacks=predictor._callbacks() + [pruner],
+        verbose=0
+    )
+
+    val_losses = history.history['val_loss']
+    best_epoch = int(np.argmin(val_losses))
+    # 標準化後的 MSE 換算回價格單位的 RMSE
+    scale = float(predictor.scaler.data_range_[0])
+
+    return {
+        'trial': trial_id,
+        'config': config,
+        'val_loss': float(val_losses[best_epoch]),
+        'val_rmse': float(np.sqrt(val_losses[best_epoch]) * scale),
+        'best_epoch': best_epoch + 1,
+        'epochs_trained': len(val_losses),
+        'pruned': pruner.pruned_at is not None,
+        'seconds': round(time.perf_counter() - started, 2)
+    }
+
+
+def search(prices, symbol=None, search_space=None, n_trials=12, workers=None,
+           validation_split=0.2, batch_size=32, warmup_epochs=5, min_trials=2,
+           seed=0, config_dir=None, persist=True):
+    """
+    並行執行超參數搜尋
+
+    Args:
+        prices: 股價陣列
+        symbol: 股票代號（提供時保存最佳設定）
+        search_space: 搜尋空間（未指定的參數使用 DEFAULT_SEARCH_SPACE）
+        n_trials: 試驗數
+        workers: 並行行程數（預設為 CPU 數，不超過試驗數）
+        validation_split: 驗證期間比例
+        batch_size: 批次大小
+        warmup_epochs: 開始剪枝前的最少輪數
+        min_trials: 剪枝時至少需要的對照試驗數
+        seed: 隨機種子
+        config_dir: 最佳設定目錄
+        persist: 是否保存最佳設定
+
+    Returns:
+        result: 最佳設定與各試驗結果
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    configs = sample_configs(search_space, n_trials, seed)
+
+    min_length = max(config['lookback'] for config in configs) / (1 - validation_split) + 20
+    if len(prices) < min_length:
+        raise ValueError(f'資料不足，搜尋空間至少需要 {int(np.ceil(min_length))} 筆歷史資料')
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(configs)))
+    options = {
+        'validation_split': validation_split,
+        'batch_size': batch_size,
+        'warmup_epochs': warmup_epochs,
+        'min_trials': min_trials,
+        'seed': seed,
+    }
+
+    # 各子行程平分核心，避免 TensorFlow 執行緒超額訂閱（子行程啟動時繼承環境變數）
+    threads = str(max(1, (os.cpu_count() or 1) // workers))
+    saved_env = {name: os.environ.get(name) for name in
+                 ('TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS', 'OMP_NUM_THREADS')}
+    os.environ.update({
+        'TF_NUM_INTRAOP_THREADS': threads,
+        'TF_NUM_INTEROP_THREADS': '1',
+        'OMP_NUM_THREADS': threads,
+    })
+
+    # TensorFlow 不支援 fork 後使用，子行程一律以 spawn 啟動
+    context = multiprocessing.get_context('spawn')
+    started = time.perf_counter()
+    trials = []
+    try:
+        with context.Manager() as manager:
+            curves = manager.dict()
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                futures = [pool.submit(run_trial, i, config, prices, options, curves)
+                           for i, config in enumerate(configs)]
+                for future in as_completed(futures):
+                    trials.append(future.result())
+    finally:
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    trials.sort(key=lambda trial: trial['trial'])
+    completed = [trial for trial in trials if not trial['pruned']] or trials
+    best = min(completed, key=lambda trial: trial['val_loss'])
+
+    # 沿用最佳試驗實際需要的輪數（加上提早停止的耐心值），後續訓練不必跑滿上限
+    best_config = {**best['config'], 'epochs': min(best['config']['epochs'], best['best_epoch'] + 10)}
+
+    result = {
+        'best_config': best_config,
+        'best_trial': best,
+        'trials': trials,
+        'summary': {
+            'n_trials': len(trials),
+            'pruned': sum(trial['pruned'] for trial in trials),
+            'workers': workers,
+            'threads_per_worker': int(threads),
+            'seconds': round(time.perf_counter() - started, 2)
+        }
+    }
+
+    if symbol and persist:
+        result['config_path'] = save_best_config(symbol, {
+            'stock_symbol': symbol,
+            'config': best_config,
+            'val_loss': best['val_loss'],
+            'val_rmse': best['val_rmse'],
+            'data_points': int(len(prices)),
+            'validation_split': validation_split,
+            'n_trials': len(trials),
+            'searched_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }, config_dir)
+
+    return result
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+模型記憶體工具
+提供精簡記憶體模式的價格載入與峰值記憶體量測
+"""
+
+import sys
+import numpy as np
+
+
+def load_prices(input_data, memory_lean=False, key='prices'):
+    """
+    將輸入 JSON 的價格列表轉為陣列
+
+    精簡模式使用 float32 並直接轉換，不經過預設的 float64 中間陣列
+
+    Args:
+        input_data: 模型輸入資料
+        memory_lean: 是否使用精簡記憶體模式
+        key: 價格欄位名稱
+
+    Returns:
+        prices: 價格陣列
+    """
+    dtype = np.float32 if memory_lean else None
+    prices = np.asarray(input_data[key], dtype=dtype)
+
+    # 精簡模式下列表已轉換完成，釋放原始 Python 物件
+    if memory_lean:
+        input_data[key] = None
+
+    return prices
+
+
+def peak_rss_mb():
+    """
+    取得目前行程的峰值常駐記憶體 (MB)
+
+    Returns:
+        peak: 峰值 RSS；平台不支援時回傳 None
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 以 KB 為單位，macOS 以 bytes 為單位
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 2)
+    except ImportError:
+        pass
+
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / (1024 * 1024), 2)
+    except ImportError:
+        return None
+
+
+def memory_report(memory_lean, prices):
+    """
+    建立輸出用的記憶體報告
+
+    Args:
+        memory_lean: 是否使用精簡記憶體模式
+        prices: 模型使用的價格陣列
+
+    Returns:
+        report: 記憶體資訊
+    """
+    return {
+        'memory_lean': bool(memory_lean),
+        'dtype': str(prices.dtype),
+        'data_points': int(len(prices)),
+        'peak_rss_mb': peak_rss_mb()
+    }
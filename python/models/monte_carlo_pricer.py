@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+蒙地卡羅選擇權定價
+支援歐式、算術平均亞式、離散監控障礙與美式（Longstaff-Schwartz）選擇權，
+標的價格以固定波動率幾何布朗運動或風險中立 GARCH(1,1) 模擬。
+以對偶變數與控制變數降低變異，路徑分塊產生使記憶體用量與路徑數無關，並回傳標準誤
+
+單位與 BlackScholesService.php 相同：time_to_expiry 以年計、volatility 與 risk_free_rate 為年化小數
+"""
+
+import sys
+import os
+import json
+import time
+import numpy as np
+from scipy.special import ndtr
+
+# 每年交易日數（模擬步數預設為到期年數 × 252）
+TRADING_DAYS = 252
+
+# 每個分塊的記憶體上限（MB）
+DEFAULT_CHUNK_MB = 64
+
+PAYOFFS = ('european', 'asian', 'barrier', 'american')
+
+BARRIER_TYPES = ('up-and-out', 'up-and-in', 'down-and-out', 'down-and-in')
+
+
+def black_scholes_price(spot, strike, T, rate, volatility, option_type='call'):
+    """Black-Scholes 歐式選擇權價格（同 BlackScholesService::calculatePrice）"""
+    d1 = (np.log(spot / strike) + (rate + 0.5 * volatility ** 2) * T) / (volatility * np.sqrt(T))
+    d2 = d1 - volatility * np.sqrt(T)
+    if option_type == 'call':
+        return float(spot * ndtr(d1) - strike * np.exp(-rate * T) * ndtr(d2))
+    return float(strike * np.exp(-rate * T) * ndtr(-d2) - spot * ndtr(-d1))
+
+
+def geometric_asian_price(spot, strike, T, rate, volatility, steps, option_type='call'):
+    """
+    離散幾何平均亞式選擇權的封閉解（作為算術平均亞式的控制變數）
+
+    平均取第 1 ~ steps 個監控點（不含期初價格）
+    """
+    dt = T / steps
+    mu = np.log(spot) + (rate - 0.5 * volatility ** 2) * dt * (steps + 1) / 2
+    variance = volatility ** 2 * dt * (steps + 1) * (2 * steps + 1) / (6 * steps)
+    d2 = (mu - np.log(strike)) / np.sqrt(variance)
+    d1 = d2 + np.sqrt(variance)
+    forward = np.exp(mu + 0.5 * variance)
+    discount = np.exp(-rate * T)
+    if option_type == 'call':
+        return float(discount * (forward * ndtr(d1) - strike * ndtr(d2)))
+    return float(discount * (strike * ndtr(-d2) - forward * ndtr(-d1)))
+
+
+class MomentAccumulator:
+    """分塊累積 (Y, X1..Xk) 的一階與二階動差，最後以迴歸求控制變數係數"""
+
+    def __init__(self, k):
+        self.n = 0
+        self.shift = None
+        self.total = np.zeros(k + 1)
+        self.cross = np.zeros((k + 1, k + 1))
+
+    def add(self, samples):
+        """
+        Args:
+            samples: (n, k + 1) 陣列，第 0 欄為估計目標，其餘為控制變數
+        """
+        if self.shift is None:
+            # 以第一塊平均值平移，降低大數相減的誤差
+            self.shift = samples.mean(axis=0)
+        centered = samples - self.shift
+        self.n += len(samples)
+        self.total += centered.sum(axis=0)
+        self.cross += centered.T @ centered
+
+    def estimate(self, control_means):
+        """
+        Args:
+            control_means: 各控制變數的理論期望值
+
+        Returns:
+            plain: (平均, 標準誤)，未使用控制變數
+            controlled: (估計值, 標準誤, 係數)
+        """
+        n = self.n
+        mean = self.total / n
+        cov = (self.cross - n * np.outer(mean, mean)) / (n - 1)
+        mean = mean + self.shift
+
+        plain = (float(mean[0]), float(np.sqrt(cov[0, 0] / n)))
+        if len(mean) == 1:
+            return plain, plain + (np.zeros(0),)
+
+        cxx, cxy = cov[1:, 1:], cov[1:, 0]
+        beta = np.linalg.lstsq(cxx, cxy, rcond=None)[0]
+        value = mean[0] - beta @ (mean[1:] - np.asarray(control_means))
+        residual = max(cov[0, 0] - cxy @ beta, 0.0)
+        return plain, (float(value), float(np.sqrt(residual / n)), beta)
+
+
+class MonteCarloPricer:
+    """蒙地卡羅選擇權定價器"""
+
+    def __init__(self, spot, strike, T, rate=0.015, volatility=0.2, option_type='call',
+                 dynamics='gbm', garch=None, steps=None, seed=0):
+        """
+        初始化定價器
+
+        Args:
+            spot: 標的價格
+            strike: 履約價
+            T: 到期時間（年）
+            rate: 無風險利率
+            volatility: 年化波動率（gbm 使用）
+            option_type: call / put
+            dynamics: gbm（固定波動率）或 garch（風險中立 GARCH(1,1)）
+            garch: {'omega', 'alpha', 'beta', 'initial_variance'}，
+                   與 garch_model.py 相同的百分比日報酬單位（initial_variance 省略時使用長期變異數）
+            steps: 模擬步數（預設 T × 252，至少 1）
+            seed: 亂數種子
+        """
+        if spot <= 0 or strike <= 0 or T <= 0:
+            raise ValueError('標的價格、履約價與到期時間必須大於零')
+        if option_type not in ('call', 'put'):
+            raise ValueError(f'選擇權類型錯誤: {option_type}')
+        if dynamics not in ('gbm', 'garch'):
+            raise ValueError(f'不支援的價格模型: {dynamics}')
+
+        self.spot = float(spot)
+        self.strike = float(strike)
+        self.T = float(T)
+        self.rate = float(rate)
+        self.volatility = float(volatility)
+        self.option_type = option_type
+        self.dynamics = dynamics
+        self.steps = int(steps or max(1, round(T * TRADING_DAYS)))
+        self.dt = self.T / self.steps
+        self.seed = seed
+
+        if dynamics == 'garch':
+            if not garch:
+                raise ValueError('GARCH 模擬需要 omega / alpha / beta 參數')
+            # 百分比報酬的變異數轉為小數報酬
+            self.omega = float(garch['omega']) / 1e4
+            self.alpha = float(garch['alpha'])
+            self.beta = float(garch['beta'])
+            if self.alpha + self.beta >= 1:
+                raise ValueError('GARCH 參數不平穩（alpha + beta >= 1）')
+            initial = garch.get('initial_variance')
+            self.h0 = float(initial) / 1e4 if initial else self.omega / (1 - self.alpha - self.beta)
+
+    def exercise_value(self, prices):
+        """立即履約價值"""
+        if self.option_type == 'call':
+            return np.maximum(prices - self.strike, 0.0)
+        return np.maximum(self.strike - prices, 0.0)
+
+    def simulate(self, z):
+        """
+        由標準常態亂數產生價格路徑
+
+        Args:
+            z: (路徑數, 步數) 標準常態亂數
+
+        Returns:
+            prices: (路徑數, 步數 + 1)，第 0 欄為期初價格
+            variances: GARCH 時為 (路徑數, 步數 + 1) 的每步條件變異數，gbm 為 None
+        """
+        n, steps = z.shape
+        log_prices = np.empty((n, steps + 1))
+        log_prices[:, 0] = np.log(self.spot)
+
+        if self.dynamics == 'gbm':
+            increments = (self.rate - 0.5 * self.volatility ** 2) * self.dt + self.volatility * np.sqrt(self.dt) * z
+            np.cumsum(increments, axis=1, out=log_prices[:, 1:])
+            log_prices[:, 1:] += log_prices[:, :1]
+            return np.exp(log_prices), None
+
+        # 風險中立 GARCH：每步為一個交易日，r_t = r*dt - h_t / 2 + sqrt(h_t) z_t
+        variances = np.empty((n, steps + 1))
+        h = np.full(n, self.h0)
+        for t in range(steps):
+            variances[:, t] = h
+            shock = np.sqrt(h) * z[:, t]
+            log_prices[:, t + 1] = log_prices[:, t] + self.rate * self.dt - 0.5 * h + shock
+            h = self.omega + self.alpha * shock * shock + self.beta * h
+        variances[:, steps] = h
+        return np.exp(log_prices), variances
+
+    def _normals(self, rng, n, antithetic):
+        """產生亂數；對偶變數時後半為前半的相反數"""
+        if antithetic:
+            half = rng.standard_normal((n // 2, self.steps))
+            return np.concatenate([half, -half])
+        return rng.standard_normal((n, self.steps))
+
+    def _chunk_size(self, chunk_mb):
+        # 價格、變異數與暫存陣列約為 4 份 (路徑數 × 步數) 的 float64
+        size = int(chunk_mb * 1e6 / (8 * 4 * (self.steps + 1)))
+        return max(2, size - size % 2)
+
+    def _payoff(self, payoff, prices, variances, barrier, barrier_type, policy):
+        """
+        計算折現後的報酬與控制變數
+
+        Returns:
+            samples: (路徑數, 1 + 控制變數數)
+            control_means: 控制變數期望值
+        """
+        discount = np.exp(-self.rate * self.T)
+        terminal = prices[:, -1]
+        european = discount * self.exercise_value(terminal)
+        # 折現後的期末價格為平賭，期望值等於期初價格，任何價格模型都可作為控制變數
+        controls = [discount * terminal]
+        means = [self.spot]
+
+        if payoff == 'european':
+            value = european
+        elif payoff == 'asian':
+            average = prices[:, 1:].mean(axis=1)
+            value = discount * self.exercise_value(average)
+            if self.dynamics == 'gbm':
+                geometric = np.exp(np.log(prices[:, 1:]).mean(axis=1))
+                controls.append(discount * self.exercise_value(geometric))
+                means.append(geometric_asian_price(self.spot, self.strike, self.T, self.rate,
+                                                   self.volatility, self.steps, self.option_type))
+        elif payoff == 'barrier':
+            if barrier_type.startswith('up'):
+                hit = prices.max(axis=1) >= barrier
+            else:
+                hit = prices.min(axis=1) <= barrier
+            alive = ~hit if barrier_type.endswith('out') else hit
+            value = european * alive
+        else:
+            value = self._apply_policy(prices, variances, policy)
+
+        if payoff in ('barrier', 'american') and self.dynamics == 'gbm':
+            controls.append(european)
+            means.append(black_scholes_price(self.spot, self.strike, self.T, self.rate,
+                                             self.volatility, self.option_type))
+
+        return np.column_stack([value] + controls), means
+
+    def _basis(self, prices, variances):
+        """Longstaff-Schwartz 迴歸基底：價內程度的二次多項式（GARCH 另加條件變異數項）"""
+        x = prices / self.strike
+        columns = [np.ones_like(x), x, x * x]
+        if variances is not None:
+            v = variances / self.h0
+            columns.extend([v, x * v])
+        return np.column_stack(columns)
+
+    def fit_exercise_policy(self, n_paths, rng):
+        """
+        Longstaff-Schwartz 逆向歸納：以一組訓練路徑估計每個履約日的持有價值迴歸係數
+
+        Args:
+            n_paths: 訓練路徑數
+            rng: 亂數產生器
+
+        Returns:
+            policy: 每步的迴歸係數（None 表示該步不履約）
+        """
+        prices, variances = self.simulate(self._normals(rng, n_paths, True))
+        step_discount = np.exp(-self.rate * self.dt)
+        cashflow = self.exercise_value(prices[:, -1])
+        policy = [None] * (self.steps + 1)
+
+        for t in range(self.steps - 1, 0, -1):
+            cashflow *= step_discount
+            exercise = self.exercise_value(prices[:, t])
+            itm = exercise > 0
+            if itm.sum() <= 10:
+                continue
+            basis = self._basis(prices[itm, t], None if variances is None else variances[itm, t])
+            coefficients = np.linalg.lstsq(basis, cashflow[itm], rcond=None)[0]
+            continuation = basis @ coefficients
+            exercise_now = exercise[itm] > continuation
+            rows = np.nonzero(itm)[0][exercise_now]
+            cashflow[rows] = exercise[rows]
+            policy[t] = coefficients
+        return policy
+
+    def _apply_policy(self, prices, variances, policy):
+        """以固定的履約策略向前模擬（獨立於訓練路徑，估計值不含前瞻偏誤）"""
+        n = len(prices)
+        value = np.zeros(n)
+        alive = np.ones(n, dtype=bool)
+        for t in range(1, self.steps):
+            if policy[t] is None:
+                continue
+            exercise = self.exercise_value(prices[:, t])
+            candidates = alive & (exercise > 0)
+            if not candidates.any():
+                continue
+            basis = self._basis(prices[candidates, t], None if variances is None else variances[candidates, t])
+            exercise_now = np.zeros(n, dtype=bool)
+            exercise_now[candidates] = exercise[candidates] > basis @ policy[t]
+            value[exercise_now] = np.exp(-self.rate * self.dt * t) * exercise[exercise_now]
+            alive &= ~exercise_now
+        value[alive] = np.exp(-self.rate * self.T) * self.exercise_value(prices[alive, -1])
+        return value
+
+    def price(self, payoff='european', paths=100000, antithetic=True, control_variate=True,
+              barrier=None, barrier_type='up-and-out', lsm_paths=50000, chunk_size=None,
+              chunk_mb=DEFAULT_CHUNK_MB):
+        """
+        定價
+
+        Args:
+            payoff: european / asian / barrier / american
+            paths: 模擬路徑數
+            antithetic: 是否使用對偶變數
+            control_variate: 是否使用控制變數
+            barrier: 障礙價格（barrier 使用）
+            barrier_type: up-and-out / up-and-in / down-and-out / down-and-in
+            lsm_paths: 美式選擇權估計履約策略的訓練路徑數
+            chunk_size: 每塊路徑數（None 時依 chunk_mb 決定）
+            chunk_mb: 每塊記憶體上限（MB）
+
+        Returns:
+            result: 價格、標準誤、信賴區間與效能資訊
+        """
+        if payoff not in PAYOFFS:
+            raise ValueError(f'不支援的報酬型態: {payoff}')
+        if payoff == 'barrier':
+            if barrier is None or barrier_type not in BARRIER_TYPES:
+                raise ValueError('障礙選擇權需要 barrier 與 barrier_type')
+            barrier = float(barrier)
+
+        started = time.perf_counter()
+        rng = np.random.default_rng(self.seed)
+
+        policy = None
+        if payoff == 'american':
+            policy = self.fit_exercise_policy(min(lsm_paths, paths), rng)
+
+        # 歐式 gbm 只需要期末價格，單步模擬即可
+        steps = self.steps
+        if payoff == 'european' and self.dynamics == 'gbm':
+            self.steps, self.dt = 1, self.T
+
+        try:
+            chunk = chunk_size or self._chunk_size(chunk_mb)
+            if antithetic:
+                chunk -= chunk % 2
+            accumulator = None
+            means = None
+            done = 0
+            while done < paths:
+                n = min(chunk, paths - done)
+                if antithetic:
+                    n += n % 2
+                prices, variances = self.simulate(self._normals(rng, n, antithetic))
+                samples, means = self._payoff(payoff, prices, variances, barrier, barrier_type, policy)
+                if not control_variate:
+                    samples, means = samples[:, :1], []
+                if antithetic:
+                    # 對偶路徑取平均後視為一個獨立樣本
+                    half = n // 2
+                    samples = 0.5 * (samples[:half] + samples[half:])
+                if accumulator is None:
+                    accumulator = MomentAccumulator(samples.shape[1] - 1)
+                accumulator.add(samples)
+                done += n
+        finally:
+            self.steps, self.dt = steps, self.T / steps
+
+        plain, controlled = accumulator.estimate(means)
+        value, standard_error = controlled[0], controlled[1]
+        elapsed = time.perf_counter() - started
+
+        result = {
+            'price': round(value, 4),
+            'standard_error': round(standard_error, 6),
+            'confidence_interval': [round(value - 1.96 * standard_error, 4), round(value + 1.96 * standard_error, 4)],
+            'payoff': payoff,
+            'option_type': self.option_type,
+            'dynamics': self.dynamics,
+            'paths': done,
+            'steps': self.steps,
+            'antithetic': antithetic,
+            'control_variates': len(means),
+            'plain_standard_error': round(plain[1], 6),
+            'variance_reduction': round((plain[1] / standard_error) ** 2, 2) if standard_error > 0 else None,
+            'seconds': round(elapsed, 3),
+            'paths_per_second': int(done / elapsed) if elapsed > 0 else None,
+        }
+        if payoff in ('american', 'barrier', 'asian') and self.dynamics == 'gbm':
+            result['black_scholes_european'] = round(black_scholes_price(
+                self.spot, self.strike, self.T, self.rate, self.volatility, self.option_type), 4)
+        if payoff == 'barrier':
+            result['barrier'] = barrier
+            result['barrier_type'] = barrier_type
+        return result
+
+
+def fit_garch(prices):
+    """以 garch_model.py 估計 GARCH(1,1) 參數，回傳 MonteCarloPricer 的 garch 參數"""
+    from garch_model import GARCHPredictor
+
+    predictor = GARCHPredictor(p=1, q=1)
+    info = predictor.train(np.asarray(prices, dtype=float))
+    forecast = predictor.fitted_model.forecast(horizon=1, reindex=False)
+    return {**info['parameters'], 'initial_variance': float(forecast.variance.values[-1, 0])}
+
+
+def main():
+    """主函數"""
+    try:
+        if len(sys.argv) < 2:
+            print(json.dumps({
+                'success': False,
+                'error': '請提供輸入資料'
+            }))
+            sys.exit(1)
+
+        input_arg = sys.argv[1]
+        if os.path.exists(input_arg):
+            with open(input_arg, 'r', encoding='utf-8') as f:
+                input_data = json.load(f)
+        else:
+            input_data = json.loads(input_arg)
+
+        T = input_data.get('time_to_expiry')
+        if T is None:
+            T = float(input_data['days_to_expiry']) / 365
+
+        dynamics = input_data.get('dynamics', 'gbm')
+        garch = input_data.get('garch')
+        if dynamics == 'garch' and not garch:
+            garch = fit_garch(input_data['prices'])
+
+        pricer = MonteCarloPricer(
+            float(input_data['spot_price']),
+            float(input_data['strike_price']),
+            float(T),
+            rate=float(input_data.get('risk_free_rate', 0.015)),
+            volatility=float(input_data.get('volatility', 0.2)),
+            option_type=input_data.get('option_type', 'call'),
+            dynamics=dynamics,
+            garch=garch,
+            steps=input_data.get('steps'),
+            seed=input_data.get('seed', 0)
+        )
+        result = pricer.price(
+            payoff=input_data.get('payoff', 'european'),
+            paths=int(input_data.get('paths', 100000)),
+            antithetic=input_data.get('antithetic', True),
+            control_variate=input_data.get('control_variate', True),
+            barrier=input_data.get('barrier'),
+            barrier_type=input_data.get('barrier_type', 'up-and-out'),
+            lsm_paths=int(input_data.get('lsm_paths', 50000)),
+            chunk_mb=float(input_data.get('chunk_mb', DEFAULT_CHUNK_MB))
+        )
+        if dynamics == 'garch':
+            result['garch'] = garch
+
+        print(json.dumps({'success': True, **result}, ensure_ascii=False))
+
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+選擇權組合情境分析
+對多腳 TXO 部位，以單次 NumPy 廣播計算 標的價格 × 剩餘天數 × 波動率 三維網格上的
+部位價值、損益與 Greeks，輸出可直接給圖表使用的精簡陣列
+
+公式與單位與 BlackScholesService.php 相同：
+  Theta 為每日（年化值 / 365），Vega 與 Rho 為每 1% 變動的價值；
+  常態累積分佈使用 scipy.special.ndtr（PHP 為 Abramowitz-Stegun 近似，誤差約 1e-7）
+"""
+
+import sys
+import os
+import json
+import base64
+import time
+import numpy as np
+from scipy.special import ndtr
+
+# 臺指選擇權每點 50 元
+TXO_MULTIPLIER = 50
+
+# 預設網格大小：標的價格 × 天數 × 波動率
+DEFAULT_GRID = {'spot_points': 200, 'time_points': 60, 'vol_points': 20}
+
+# 可輸出的網格欄位
+GRID_FIELDS = ('value', 'pnl', 'delta', 'gamma', 'theta', 'vega', 'rho')
+
+SQRT_2PI = np.sqrt(2 * np.pi)
+
+
+def normalize_legs(legs, volatility):
+    """
+    整理部位各腳參數
+
+    Args:
+        legs: [{'option_type': 'call'|'put', 'strike_price', 'days_to_expiry',
+                'position': 'long'|'short', 'quantity', 'premium', 'volatility'}, ...]
+        volatility: 未指定各腳波動率時使用的波動率
+
+    Returns:
+        legs: 標準化後的參數列表
+    """
+    if not legs:
+        raise ValueError('至少需要一個部位')
+
+    normalized = []
+    for leg in legs:
+        option_type = str(leg.get('option_type', 'call')).lower()
+        if option_type not in ('call', 'put'):
+            raise ValueError(f'選擇權類型錯誤: {option_type}')
+        strike = float(leg['strike_price'])
+        days = float(leg['days_to_expiry'])
+        sigma = float(leg.get('volatility') or volatility)
+        if strike <= 0 or days <= 0 or sigma <= 0:
+            raise ValueError('履約價、到期天數與波動率必須大於零')
+
+        sign = 1.0 if str(leg.get('position', 'long')).lower() == 'long' else -1.0
+        normalized.append({
+            'option_type': option_type,
+            'strike_price': strike,
+            'days_to_expiry': days,
+            'volatility': sigma,
+            'weight': sign * float(leg.get('quantity', 1)),
+            'premium': None if leg.get('premium') is None else float(leg['premium']),
+        })
+    return normalized
+
+
+def black_scholes(spot, strike, tau, rate, sigma, is_call):
+    """
+    廣播計算 Black-Scholes 價格與 Greeks（tau <= 0 時為到期內在價值）
+
+    Args:
+        spot, tau, sigma: 可互相廣播的陣列（tau 以年為單位）
+        strike: 履約價
+        rate: 無風險利率
+        is_call: 是否為買權
+
+    Returns:
+        result: {'value', 'delta', 'gamma', 'theta', 'vega', 'rho'}
+    """
+    expired = tau <= 0
+    tau_safe = np.where(expired, 1.0, tau)
+    sqrt_tau = np.sqrt(tau_safe)
+    vol_sqrt = sigma * sqrt_tau
+    d1 = (np.log(spot / strike) + (rate + 0.5 * sigma * sigma) * tau_safe) / vol_sqrt
+    d2 = d1 - vol_sqrt
+    discount = strike * np.exp(-rate * tau_safe)
+    pdf = np.exp(-0.5 * d1 * d1) / SQRT_2PI
+
+    if is_call:
+        cdf1, cdf2 = ndtr(d1), ndtr(d2)
+        value = spot * cdf1 - discount * cdf2
+        delta = cdf1
+        carry = -rate * discount * cdf2
+        rho = tau_safe * discount * cdf2
+        intrinsic = np.maximum(spot - strike, 0.0)
+        expiry_delta = (spot > strike).astype(np.float64)
+    else:
+        cdf1, cdf2 = ndtr(-d1), ndtr(-d2)
+        value = discount * cdf2 - spot * cdf1
+        delta = -cdf1
+        carry = rate * discount * cdf2
+        rho = -tau_safe * discount * cdf2
+        intrinsic = np.maximum(strike - spot, 0.0)
+        expiry_delta = -(spot < strike).astype(np.float64)
+
+    return {
+        'value': np.where(expired, intrinsic, value),
+        'delta': np.where(expired, expiry_delta, delta),
+        'gamma': np.where(expired, 0.0, pdf / (spot * vol_sqrt)),
+        'theta': np.where(expired, 0.0, (-(spot * pdf * sigma) / (2 * sqrt_tau) + carry) / 365),
+        'vega': np.where(expired, 0.0, spot * sqrt_tau * pdf / 100),
+        'rho': np.where(expired, 0.0, rho / 100),
+    }
+
+
+def build_axes(spot_price, legs, spot_range=None, spot_points=None, time_points=None,
+               vol_shifts=None, vol_points=None):
+    """
+    建立網格座標軸
+
+    Args:
+        spot_price: 目前標的價格
+        legs: normalize_legs 的結果
+        spot_range: [最低, 最高]（預設目前價格 ±10%）
+        spot_points: 標的價格點數
+        time_points: 時間點數（從今日到最近一個到期日）
+        vol_shifts: 波動率平移量列表（絕對值，例如 -0.05 表示各腳波動率減 5 個百分點）
+        vol_points: 未指定 vol_shifts 時，-10 到 +10 個百分點之間的點數
+
+    Returns:
+        spots, days_elapsed, vol_shifts: 三個座標軸
+    """
+    spot_points = spot_points or DEFAULT_GRID['spot_points']
+    time_points = time_points or DEFAULT_GRID['time_points']
+    vol_points = vol_points or DEFAULT_GRID['vol_points']
+
+    low, high = spot_range or (spot_price * 0.9, spot_price * 1.1)
+    spots = np.linspace(float(low), float(high), spot_points)
+
+    nearest = min(leg['days_to_expiry'] for leg in legs)
+    days_elapsed = np.linspace(0.0, nearest, time_points)
+
+    if vol_shifts is None:
+        vol_shifts = np.linspace(-0.1, 0.1, vol_points) if vol_points > 1 else np.zeros(1)
+    vol_shifts = np.asarray(vol_shifts, dtype=np.float64)
+    return spots, days_elapsed, vol_shifts
+
+
+def evaluate_grid(spot_price, legs, rate=0.015, volatility=0.2, multiplier=TXO_MULTIPLIER,
+                  spot_range=None, spot_points=None, time_points=None, vol_shifts=None, vol_points=None,
+                  fields=GRID_FIELDS, dtype=np.float32):
+    """
+    計算部位在三維網格上的價值、損益與 Greeks
+
+    Args:
+        spot_price: 目前標的價格
+        legs: 部位列表（見 normalize_legs）
+        rate: 無風險利率
+        volatility: 預設波動率
+        multiplier: 每點價值（TXO 為 50 元）
+        spot_range / spot_points / time_points / vol_shifts / vol_points: 見 build_axes
+        fields: 要輸出的欄位
+        dtype: 輸出陣列型別
+
+    Returns:
+        result: {'axes': {...}, 'grid': {欄位: (時間, 波動率, 價格) 陣列}, 'legs': [...], 'entry_cost': 成本}
+                value / pnl / theta / vega / rho 以元計（乘上 multiplier），delta / gamma 為口數單位
+    """
+    legs = normalize_legs(legs, volatility)
+    spots, days_elapsed, shifts = build_axes(spot_price, legs, spot_range, spot_points, time_points,
+                                             vol_shifts, vol_points)
+
+    # 網格形狀 (時間, 波動率, 價格)
+    S = spots[None, None, :]
+    elapsed = days_elapsed[:, None, None]
+    shift = shifts[None, :, None]
+
+    totals = {field: 0.0 for field in ('value', 'delta', 'gamma', 'theta', 'vega', 'rho')}
+    entry_cost = 0.0
+    for leg in legs:
+        is_call = leg['option_type'] == 'call'
+        if leg['premium'] is None:
+            # 未提供權利金時以目前理論價作為成本
+            leg['premium'] = float(black_scholes(np.float64(spot_price), leg['strike_price'],
+                                                 np.float64(leg['days_to_expiry'] / 365), rate,
+                                                 np.float64(leg['volatility']), is_call)['value'])
+        entry_cost += leg['weight'] * leg['premium']
+
+        tau = (leg['days_to_expiry'] - elapsed) / 365
+        sigma = np.maximum(leg['volatility'] + shift, 1e-4)
+        greeks = black_scholes(S, leg['strike_price'], tau, rate, sigma, is_call)
+        for field in totals:
+            totals[field] = totals[field] + leg['weight'] * greeks[field]
+
+    shape = (len(days_elapsed), len(shifts), len(spots))
+    grid = {}
+    for field in fields:
+        if field == 'pnl':
+            values = (totals['value'] - entry_cost) * multiplier
+        else:
+            # 金額欄位換算為元；Delta / Gamma 維持每口的點數單位
+            values = totals[field] * (1.0 if field in ('delta', 'gamma') else multiplier)
+        grid[field] = np.broadcast_to(values, shape).astype(dtype)
+
+    return {
+        'axes': {'spot': spots, 'days_elapsed': days_elapsed, 'vol_shift': shifts,
+                 'days_to_expiry': min(leg['days_to_expiry'] for leg in legs) - days_elapsed},
+        'grid': grid,
+        'legs': legs,
+        'entry_cost': entry_cost,
+        'multiplier': multiplier,
+    }
+
+
+def expiry_payoff(spots, legs, multiplier=TXO_MULTIPLIER):
+    """
+    到期損益曲線（與 BlackScholesService::calculatePayoff 相同，多腳加總並乘上每點價值）
+
+    Args:
+        spots: 標的價格陣列
+        legs: 已含 premium 的 normalize_legs 結果
+
+    Returns:
+        payoff: 損益陣列
+    """
+    payoff = np.zeros_like(spots)
+    for leg in legs:
+        intrinsic = (np.maximum(spots - leg['strike_price'], 0.0) if leg['option_type'] == 'call'
+                     else np.maximum(leg['strike_price'] - spots, 0.0))
+        payoff += leg['weight'] * (intrinsic - leg['premium'])
+    return payoff * multiplier
+
+
+def summarize(spots, payoff, result, spot_price):
+    """到期損平衡點、最大損益與目前 Greeks"""
+    sign = np.sign(payoff)
+    crossings = np.nonzero(sign[:-1] * sign[1:] < 0)[0]
+    breakevens = [float(spots[i] - payoff[i] * (spots[i + 1] - spots[i]) / (payoff[i + 1] - payoff[i]))
+                  for i in crossings]
+    # 損益恰好落在網格點上為零時（例如整數權利金與 10 點間距）不會出現變號，需另外列入；
+    # 連續為零的區段不視為損平衡點
+    zero = sign == 0
+    isolated = zero & ~np.r_[False, zero[:-1]] & ~np.r_[zero[1:], False]
+    breakevens = sorted(breakevens + [float(spots[i]) for i in np.nonzero(isolated)[0]])
+
+    # 目前情境：今日、波動率不平移、最接近目前價格的網格點
+    axes = result['axes']
+    t = 0
+    v = int(np.argmin(np.abs(axes['vol_shift'])))
+    s = int(np.argmin(np.abs(axes['spot'] - spot_price)))
+    current = {field: round(float(values[t, v, s]), 4) for field, values in result['grid'].items()}
+
+    return {
+        'breakevens': [round(b, 2) for b in breakevens],
+        'max_profit': round(float(payoff.max()), 2),
+        'max_loss': round(float(payoff.min()), 2),
+        'entry_cost': round(result['entry_cost'] * result['multiplier'], 2),
+        'current': current,
+    }
+
+
+def encode(values, output_format):
+    """輸出網格：json 為巢狀列表（四捨五入），base64 為 float32 小端序位元組"""
+    if output_format == 'base64':
+        return {'shape': list(values.shape), 'dtype': 'float32',
+                'data': base64.b64encode(np.ascontiguousarray(values, dtype='<f4').tobytes()).decode('ascii')}
+    return np.round(values.astype(np.float64), 4).tolist()
+
+
+def main():
+    """主函數"""
+    try:
+        if len(sys.argv) < 2:
+            print(json.dumps({
+                'success': False,
+                'error': '請提供輸入資料'
+            }))
+            sys.exit(1)
+
+        input_arg = sys.argv[1]
+        if os.path.exists(input_arg):
+            with open(input_arg, 'r', encoding='utf-8') as f:
+                input_data = json.load(f)
+        else:
+            input_data = json.loads(input_arg)
+
+        started = time.perf_counter()
+        spot_price = float(input_data['spot_price'])
+        fields = input_data.get('fields') or ['pnl', 'delta', 'gamma', 'theta', 'vega']
+        unknown = [f for f in fields if f not in GRID_FIELDS]
+        if unknown:
+            raise ValueError(f'不支援的欄位: {unknown}')
+
+        result = evaluate_grid(
+            spot_price,
+            input_data['legs'],
+            rate=float(input_data.get('risk_free_rate', 0.015)),
+            volatility=float(input_data.get('volatility', 0.2)),
+            multiplier=float(input_data.get('multiplier', TXO_MULTIPLIER)),
+            spot_range=input_data.get('spot_range'),
+            spot_points=input_data.get('spot_points'),
+            time_points=input_data.get('time_points'),
+            vol_shifts=input_data.get('vol_shifts'),
+            vol_points=input_data.get('vol_points'),
+            fields=fields
+        )
+        axes = result['axes']
+        payoff = expiry_payoff(axes['spot'], result['legs'], result['multiplier'])
+        output_format = input_data.get('format', 'json')
+
+        print(json.dumps({
+            'success': True,
+            'axes': {name: np.round(values, 4).tolist() for name, values in axes.items()},
+            'layout': ['days_elapsed', 'vol_shift', 'spot'],
+            'grid': {field: encode(values, output_format) for field, values in result['grid'].items()},
+            'expiry_payoff': np.round(payoff, 2).tolist(),
+            'summary': summarize(axes['spot'], payoff, result, spot_price),
+            'legs': [{**leg, 'premium': round(leg['premium'], 4)} for leg in result['legs']],
+            'compute_ms': round((time.perf_counter() - started) * 1000, 1),
+        }, ensure_ascii=False))
+
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
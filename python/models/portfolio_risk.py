@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+投資組合風險值模型
+以向量化方式計算多檔持股投資組合的 VaR / CVaR 與成分風險值
+"""
+
+import sys
+import os
+import json
+import hashlib
+import tempfile
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+from scipy import stats
+
+# 預設共變異數快取目錄：Laravel storage/app/covariance_cache
+DEFAULT_COVARIANCE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'storage', 'app', 'covariance_cache'
+)
+
+
+def covariance_path(symbols, window, last_date, observations, cache_dir=None):
+    """
+    取得共變異數快取檔路徑（鍵為排序後的股票代號、視窗長度、最後報酬日與觀測數）
+
+    Args:
+        symbols: 股票代號列表
+        window: 估計視窗長度
+        last_date: 最後一筆報酬的日期
+        observations: 視窗內的報酬筆數
+        cache_dir: 快取目錄（預設 storage/app/covariance_cache，可用 STOCK_COVARIANCE_CACHE_DIR 覆寫）
+    """
+    cache_dir = cache_dir or os.environ.get('STOCK_COVARIANCE_CACHE_DIR', DEFAULT_COVARIANCE_DIR)
+    content = json.dumps({'symbols': sorted(symbols), 'window': window, 'last_date': str(last_date),
+                          'observations': observations}, ensure_ascii=False)
+    return os.path.join(cache_dir, hashlib.sha256(content.encode('utf-8')).hexdigest()[:32] + '.npz')
+
+
+class PortfolioRiskEngine:
+    """投資組合 VaR / CVaR 計算引擎"""
+
+    def __init__(self, confidence_levels=(0.95, 0.99), n_simulations=10000, seed=None):
+        """
+        初始化風險引擎
+
+        Args:
+            confidence_levels: 信賴水準
+            n_simulations: 蒙地卡羅模擬次數
+            seed: 亂數種子
+        """
+        self.confidence_levels = list(confidence_levels)
+        self.n_simulations = n_simulations
+        self.rng = np.random.default_rng(seed)
+
+    @staticmethod
+    def calculate_returns(prices):
+        """
+        計算對數報酬率矩陣
+
+        Args:
+            prices: 股價矩陣 (期數 × 標的數)
+
+        Returns:
+            returns: 百分比報酬率矩陣 (期數-1 × 標的數)
+        """
+        prices = np.asarray(prices, dtype=float)
+        return np.diff(np.log(prices), axis=0) * 100
+
+    @staticmethod
+    def _as_weight_matrix(weights):
+        """將單一權重向量或多組權重轉為 (投組數 × 標的數) 矩陣"""
+        weights = np.asarray(weights, dtype=float)
+        return weights.reshape(1, -1) if weights.ndim == 1 else weights
+
+    def _level_labels(self):
+        return [int(round(level * 100)) for level in self.confidence_levels]
+
+    def _tail_metrics(self, portfolio_returns):
+        """
+        由情境報酬率計算每個投組的 VaR / CVaR
+
+        Args:
+            portfolio_returns: 情境報酬率 (情境數 × 投組數)
+
+        Returns:
+            metrics: {'VaR_95': array, 'CVaR_95': array, ...}
+        """
+        metrics = {}
+        for level, label in zip(self.confidence_levels, self._level_labels()):
+            var = np.percentile(portfolio_returns, (1 - level) * 100, axis=0)
+            tail = portfolio_returns <= var
+            cvar = (portfolio_returns * tail).sum(axis=0) / np.maximum(tail.sum(axis=0), 1)
+
+            metrics[f'VaR_{label}'] = var
+            metrics[f'CVaR_{label}'] = cvar
+
+        return metrics
+
+    @staticmethod
+    def covariance(returns, window=None, symbols=None, last_date=None, cache_dir=None):
+        """
+        估計平均報酬與共變異數矩陣
+
+        呼叫端提供股票代號與最後報酬日時，結果以磁碟快取保存（依代號排序存放，讀取時還原為 returns 的欄位順序），
+        同一組股票與視窗在下一筆報酬出現前不必重新估計
+
+        Args:
+            returns: 報酬率矩陣
+            window: 估計視窗長度（None 表示全部資料）
+            symbols: 各欄的股票代號（與 last_date 同時提供才使用快取）
+            last_date: 最後一筆報酬的日期
+            cache_dir: 快取目錄
+
+        Returns:
+            mean, cov: 平均報酬向量與共變異數矩陣
+        """
+        window_returns = returns[-window:] if window else returns
+        n_assets = window_returns.shape[1]
+
+        path = None
+        if symbols is not None and last_date is not None and len(set(symbols)) == len(symbols) == n_assets:
+            path = covariance_path(symbols, window, last_date, len(window_returns), cache_dir)
+            order = np.argsort(np.asarray(symbols, dtype=str), kind='stable')
+            restore = np.argsort(order)
+            try:
+                with np.load(path) as archive:
+                    return archive['mean'][restore], archive['cov'][np.ix_(restore, restore)]
+            except (OSError, KeyError, ValueError):
+                pass
+
+        mean = window_returns.mean(axis=0)
+        cov = np.cov(window_returns, rowvar=False).reshape(n_assets, n_assets)
+
+        if path is not None:
+            # 先寫暫存檔再置換，避免並行讀取到寫到一半的檔案
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.npz')
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, mean=mean[order], cov=cov[np.ix_(order, order)])
+            os.replace(temp_path, path)
+        return mean, cov
+
+    def historical(self, returns, weights):
+        """
+        歷史模擬法 VaR / CVaR
+
+        Args:
+            returns: 報酬率矩陣 (期數 × 標的數)
+            weights: 權重 (投組數 × 標的數) 或單一權重向量
+
+        Returns:
+            metrics: 各信賴水準的 VaR / CVaR 陣列（每個投組一個值）
+        """
+        weights = self._as_weight_matrix(weights)
+        return self._tail_metrics(returns @ weights.T)
+
+    def parametric(self, mean, cov, weights):
+        """
+        變異數-共變異數法（常態假設）VaR / CVaR
+
+        Args:
+            mean: 平均報酬向量
+            cov: 共變異數矩陣
+            weights: 權重 (投組數 × 標的數) 或單一權重向量
+
+        Returns:
+            metrics: 各信賴水準的 VaR / CVaR 陣列
+        """
+        weights = self._as_weight_matrix(weights)
+        portfolio_mean = weights @ mean
+        portfolio_std = np.sqrt(np.einsum('kn,nm,km->k', weights, cov, weights))
+
+        metrics = {}
+        for level, label in zip(self.confidence_levels, self._level_labels()):
+            z = stats.norm.ppf(1 - level)
+            metrics[f'VaR_{label}'] = portfolio_mean + z * portfolio_std
+            metrics[f'CVaR_{label}'] = portfolio_mean - portfolio_std * stats.norm.pdf(z) / (1 - level)
+
+        return metrics
+
+    def monte_carlo(self, mean, cov, weights, n_simulations=None):
+        """
+        蒙地卡羅模擬法 VaR / CVaR（多元常態情境）
+
+        Args:
+            mean: 平均報酬向量
+            cov: 共變異數矩陣
+            weights: 權重 (投組數 × 標的數) 或單一權重向量
+            n_simulations: 模擬次數
+
+        Returns:
+            metrics: 各信賴水準的 VaR / CVaR 陣列
+        """
+        weights = self._as_weight_matrix(weights)
+        n_simulations = n_simulations or self.n_simulations
+
+        # 投組數少於標的數時，直接以 W Σ W' 的 Cholesky 分解在投組空間模擬，
+        # 避免產生 (模擬次數 × 標的數) 的大型情境矩陣；否則在標的空間模擬後再加權
+        if weights.shape[0] <= weights.shape[1]:
+            chol = self._cholesky(weights @ cov @ weights.T)
+            shocks = self.rng.standard_normal((n_simulations, weights.shape[0]))
+            scenarios = weights @ mean + shocks @ chol.T
+        else:
+            chol = self._cholesky(cov)
+            shocks = self.rng.standard_normal((n_simulations, len(mean)))
+            scenarios = (mean + shocks @ chol.T) @ weights.T
+
+        return self._tail_metrics(scenarios)
+
+    @staticmethod
+    def _cholesky(cov):
+        """Cholesky 分解；矩陣非正定時改用特徵值分解"""
+        try:
+            return np.linalg.cholesky(cov)
+        except np.linalg.LinAlgError:
+            eigenvalues, eigenvectors = np.linalg.eigh(cov)
+            return eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+
+    def component_var(self, mean, cov, weights, confidence=0.95):
+        """
+        參數法邊際 VaR 與成分 VaR
+
+        Args:
+            mean: 平均報酬向量
+            cov: 共變異數矩陣
+            weights: 權重 (投組數 × 標的數) 或單一權重向量
+            confidence: 信賴水準
+
+        Returns:
+            marginal, component: (投組數 × 標的數)，各投組成分 VaR 加總等於其參數法 VaR
+        """
+        weights = self._as_weight_matrix(weights)
+        z = stats.norm.ppf(1 - confidence)
+
+        cov_w = weights @ cov
+        portfolio_std = np.sqrt(np.einsum('kn,kn->k', cov_w, weights))
+
+        marginal = mean + z * cov_w / np.maximum(portfolio_std, 1e-12)[:, None]
+        component = weights * marginal
+
+        return marginal, component
+
+
+def main():
+    """主函數"""
+    try:
+        if len(sys.argv) < 2:
+            print(json.dumps({
+                'success': False,
+                'error': '請提供輸入資料檔案路徑'
+            }))
+            sys.exit(1)
+
+        with open(sys.argv[1], 'r', encoding='utf-8-sig') as f:
+            input_data = json.load(f)
+
+        engine = PortfolioRiskEngine(
+            confidence_levels=input_data.get('confidence_levels', [0.95, 0.99]),
+            n_simulations=input_data.get('n_simulations', 10000),
+            seed=input_data.get('seed')
+        )
+
+        # 支援股價矩陣或直接提供報酬率矩陣 (期數 × 標的數)
+        if 'returns' in input_data:
+            returns = np.asarray(input_data['returns'], dtype=float)
+        else:
+            returns = engine.calculate_returns(input_data['prices'])
+
+        symbols = input_data.get('symbols')
+        window = input_data.get('window')
+        weights = engine._as_weight_matrix(input_data['weights'])
+        methods = input_data.get('methods', ['historical', 'parametric', 'monte_carlo'])
+
+        if weights.shape[1] != returns.shape[1]:
+            print(json.dumps({
+                'success': False,
+                'error': f'權重數量({weights.shape[1]})與標的數量({returns.shape[1]})不一致'
+            }))
+            sys.exit(1)
+
+        # 提供股票代號與價格日期（或 last_date）時快取平均報酬與共變異數，use_cache=false 可停用
+        last_date = input_data.get('last_date') or (input_data['dates'][-1] if input_data.get('dates') else None)
+        if not input_data.get('use_cache', True):
+            last_date = None
+
+        window_returns = returns[-window:] if window else returns
+        mean, cov = engine.covariance(returns, window, symbols, last_date)
+
+        results = {}
+        if 'historical' in methods:
+            results['historical'] = engine.historical(window_returns, weights)
+        if 'parametric' in methods:
+            results['parametric'] = engine.parametric(mean, cov, weights)
+        if 'monte_carlo' in methods:
+            results['monte_carlo'] = engine.monte_carlo(mean, cov, weights)
+
+        marginal, component = engine.component_var(mean, cov, weights, engine.confidence_levels[0])
+
+        portfolios = []
+        for k in range(weights.shape[0]):
+            portfolios.append({
+                'risk_metrics': {
+                    method: {name: round(float(values[k]), 6) for name, values in metrics.items()}
+                    for method, metrics in results.items()
+                },
+                'marginal_var': [round(float(x), 6) for x in marginal[k]],
+                'component_var': [round(float(x), 6) for x in component[k]]
+            })
+
+        result = {
+            'success': True,
+            'portfolios': portfolios,
+            'model_info': {
+                'model_type': 'PORTFOLIO_VAR',
+                'symbols': symbols,
+                'assets': int(returns.shape[1]),
+                'observations': int(window_returns.shape[0]),
+                'confidence_levels': engine.confidence_levels,
+                'methods': list(results.keys())
+            }
+        }
+
+        print(json.dumps(result, ensure_ascii=False))
+
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
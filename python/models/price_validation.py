@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+股價資料驗證與清理
+以向量化方式一次掃描 OHLCV 面板（日期 × 股票）：對照 TWSE 交易日曆找出缺漏交易日，
+並檢查非正價格、OHLC 不一致、類似分割的跳空與停滯價格，輸出精簡報告與清理後的收盤價陣列
+"""
+
+import sys
+import json
+import numpy as np
+import pandas as pd
+
+from twse_calendar import TwseCalendar, to_days
+
+# 臺股漲跌幅限制為 10%，超過 11% 的單日變動視為除權、減資或分割等非交易造成的跳空
+DEFAULT_JUMP_THRESHOLD = 0.11
+
+# 收盤價連續相同（且無成交量）達此筆數視為停滯
+DEFAULT_STALE_RUN = 5
+
+# 報告中每種問題每檔股票最多列出的日期數
+MAX_REPORTED_DATES = 5
+
+ISSUES = ('missing_day', 'non_trading_day', 'non_positive', 'ohlc_inconsistent', 'split_like_jump', 'stale')
+
+
+def _forward_fill(values):
+    """沿時間軸（第 0 軸）向前填補 NaN"""
+    valid = ~np.isnan(values)
+    index = np.where(valid, np.arange(len(values))[:, None], 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    filled = np.take_along_axis(values, index, axis=0)
+    # 第一個有效值之前維持 NaN
+    filled[np.cumsum(valid, axis=0) == 0] = np.nan
+    return filled
+
+
+def _run_lengths(same):
+    """
+    計算每個位置所屬的連續 True 區段長度（沿第 0 軸）
+
+    Args:
+        same: (T, N) 布林陣列
+
+    Returns:
+        lengths: (T, N) 區段長度，False 位置為 0
+    """
+    T = len(same)
+    position = np.arange(T)[:, None]
+    # 區段起點：前一筆為 False
+    starts = same & ~np.vstack([np.zeros((1, same.shape[1]), dtype=bool), same[:-1]])
+    start_index = np.maximum.accumulate(np.where(starts, position, -1), axis=0)
+    ends = same & ~np.vstack([same[1:], np.zeros((1, same.shape[1]), dtype=bool)])
+    end_index = np.minimum.accumulate(np.where(ends, position, T)[::-1], axis=0)[::-1]
+    return np.where(same, end_index - start_index + 1, 0)
+
+
+def validate_panel(dates, close, open_=None, high=None, low=None, volume=None, symbols=None,
+                   calendar=None, jump_threshold=DEFAULT_JUMP_THRESHOLD, stale_run=DEFAULT_STALE_RUN,
+                   adjust_jumps=True, fill_missing=True):
+    """
+    驗證並清理 OHLCV 面板
+
+    Args:
+        dates: (T,) 日期
+        close: (T, N) 收盤價，缺值為 NaN
+        open_, high, low, volume: (T, N) 選用欄位
+        symbols: 股票代號（預設 0..N-1）
+        calendar: TwseCalendar（None 時使用預設日曆；False 時略過交易日檢查）
+        jump_threshold: 跳空門檻（單日報酬絕對值）
+        stale_run: 停滯價格最少連續筆數
+        adjust_jumps: 是否以跳空比例回溯調整先前價格
+        fill_missing: 缺漏交易日是否以前值填補（否則保留 NaN）
+
+    Returns:
+        cleaned_dates: (T',) 清理後的日期（交易日）
+        cleaned: (T', N) 清理後的收盤價
+        report: 精簡報告
+    """
+    dates = to_days(dates)
+    close = np.asarray(close, dtype=np.float64).reshape(len(dates), -1)
+    shape = close.shape
+    columns = {name: None if values is None else np.asarray(values, dtype=np.float64).reshape(shape)
+               for name, values in (('open', open_), ('high', high), ('low', low), ('volume', volume))}
+    symbols = list(symbols) if symbols is not None else [str(i) for i in range(shape[1])]
+
+    order = np.argsort(dates, kind='stable')
+    dates = dates[order]
+    close = close[order]
+    columns = {name: None if values is None else values[order] for name, values in columns.items()}
+
+    flags = {issue: np.zeros(shape, dtype=bool) for issue in ISSUES}
+    has_data = ~np.isnan(close)
+    inferred_closures = np.array([], dtype='datetime64[D]')
+
+    # 交易日曆：以日曆交易日與實際日期的聯集為時間軸
+    if calendar is not False and len(dates):
+        calendar = calendar or TwseCalendar()
+        expected = calendar.trading_days(dates[0], dates[-1])
+
+        # 面板中所有股票皆無資料的交易日，推定為日曆未列入的休市日（農曆假日、颱風假等）
+        if shape[1] > 1:
+            present = np.isin(expected, dates[has_data.any(axis=1)])
+            inferred_closures = expected[~present]
+            expected = expected[present]
+
+        timeline = np.union1d(dates, expected)
+        position = np.searchsorted(timeline, dates)
+
+        def reindex(values, fill=np.nan):
+            if values is None:
+                return None
+            out = np.full((len(timeline), shape[1]), fill)
+            out[position] = values
+            return out
+
+        close = reindex(close)
+        columns = {name: reindex(values) for name, values in columns.items()}
+        for issue in ISSUES:
+            flags[issue] = reindex(flags[issue], False).astype(bool)
+        dates = timeline
+        has_data = ~np.isnan(close)
+
+        scheduled = np.isin(dates, expected)
+        flags['non_trading_day'] = has_data & ~scheduled[:, None]
+
+        # 日曆外但過半股票有資料的日期視為實際交易（如補行交易日），單一序列則保留資料
+        trading = scheduled | ((has_data.sum(axis=1) * 2 >= shape[1]) & has_data.any(axis=1))
+
+        # 只在每檔股票第一筆與最後一筆資料之間判斷缺漏
+        seen = np.cumsum(has_data, axis=0)
+        active = ((seen > 0) & (seen < seen[-1])) | has_data
+        flags['missing_day'] = scheduled[:, None] & active & ~has_data
+    else:
+        trading = np.ones(len(dates), dtype=bool)
+
+    # 非正價格
+    non_positive = has_data & (close <= 0)
+    for name in ('open', 'high', 'low'):
+        if columns[name] is not None:
+            non_positive |= columns[name] <= 0
+    flags['non_positive'] = non_positive
+
+    # OHLC 一致性：最高價不低於開收低，最低價不高於開收
+    if columns['high'] is not None and columns['low'] is not None:
+        with np.errstate(invalid='ignore'):
+            upper = np.fmax(close, columns['open']) if columns['open'] is not None else close
+            lower = np.fmin(close, columns['open']) if columns['open'] is not None else close
+            inconsistent = (columns['high'] < upper) | (columns['low'] > lower) | (columns['high'] < columns['low'])
+        flags['ohlc_inconsistent'] = has_data & inconsistent & ~non_positive
+
+    valid = has_data & ~non_positive & ~flags['ohlc_inconsistent']
+    values = np.where(valid, close, np.nan)
+
+    # 停滯價格：與前一筆有效收盤價相同（且無成交量）連續達 stale_run 筆
+    previous = np.vstack([np.full((1, shape[1]), np.nan), _forward_fill(values)[:-1]])
+    with np.errstate(invalid='ignore'):
+        same = valid & (values == previous)
+    if columns['volume'] is not None:
+        same &= ~(columns['volume'] > 0)
+    # same 區段不含區段前第一筆（該筆為正常價格），故 stale_run 筆相同價格對應長度 stale_run - 1
+    flags['stale'] = _run_lengths(same) >= stale_run - 1
+    values[flags['stale']] = np.nan
+
+    # 類似分割的跳空：相對前一筆有效收盤價的變動超過門檻
+    previous = np.vstack([np.full((1, shape[1]), np.nan), _forward_fill(values)[:-1]])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = values / previous
+        jumps = np.abs(np.log(ratio)) > np.log1p(jump_threshold)
+    flags['split_like_jump'] = jumps
+
+    # 回溯調整：跳空之前的價格乘上跳空比例，使序列在跳空處連續
+    if adjust_jumps and jumps.any():
+        factor = np.where(jumps, ratio, 1.0)
+        # 位置 t 的調整係數為 t 之後所有跳空比例的乘積
+        after = np.vstack([np.cumprod(factor[::-1], axis=0)[::-1][1:], np.ones((1, shape[1]))])
+        values = values * after
+
+    # 清理後的時間軸只保留交易日
+    cleaned = values[trading]
+    cleaned_dates = dates[trading]
+    if fill_missing:
+        cleaned = _forward_fill(cleaned)
+
+    report = build_report(dates, symbols, flags, inferred_closures)
+    report['adjusted_jumps'] = bool(adjust_jumps)
+    report['calendar_checked'] = calendar is not False
+
+    return cleaned_dates, cleaned, report
+
+
+def build_report(dates, symbols, flags, inferred_closures):
+    """
+    建立精簡報告：各問題總數，以及各股票的筆數與前幾個日期
+
+    Args:
+        dates: 時間軸
+        symbols: 股票代號
+        flags: 各問題的 (T, N) 布林陣列
+        inferred_closures: 推定休市日
+
+    Returns:
+        report: 報告
+    """
+    counts = {issue: flags[issue].sum(axis=0) for issue in ISSUES}
+    per_symbol = {}
+    for j, symbol in enumerate(symbols):
+        issues = {}
+        for issue in ISSUES:
+            if counts[issue][j]:
+                where = np.flatnonzero(flags[issue][:, j])[:MAX_REPORTED_DATES]
+                issues[issue] = {
+                    'count': int(counts[issue][j]),
+                    'dates': [str(d) for d in dates[where]]
+                }
+        if issues:
+            per_symbol[symbol] = issues
+
+    return {
+        'summary': {issue: int(counts[issue].sum()) for issue in ISSUES},
+        'symbols_checked': len(symbols),
+        'symbols_with_issues': len(per_symbol),
+        'start_date': str(dates[0]) if len(dates) else None,
+        'end_date': str(dates[-1]) if len(dates) else None,
+        'inferred_closures': [str(d) for d in inferred_closures],
+        'issues': per_symbol
+    }
+
+
+def clean_input(input_data, prices):
+    """
+    驗證單一股票的模型輸入並回傳清理後的價格（模型腳本使用）
+
+    使用輸入中的 dates / opens / highs / lows / volumes（若有），
+    沒有 dates 時略過交易日檢查。單一序列無法推定農曆假日等休市日，
+    缺漏交易日只列入報告、不以前值補入，無效價格直接移除；
+    adjust_jumps=false 時跳空只列入報告，不回溯調整先前價格
+
+    Args:
+        input_data: 模型輸入資料
+        prices: 收盤價陣列
+
+    Returns:
+        prices: 清理後的收盤價（移除開頭無效值）
+        report: 驗證報告
+    """
+    dates = input_data.get('dates')
+    calendar = None
+    if not dates or len(dates) != len(prices):
+        # 沒有日期時以連續索引代替，只做數值檢查
+        dates = np.arange(len(prices)).astype('datetime64[D]')
+        calendar = False
+
+    def optional(name):
+        values = input_data.get(name)
+        if values is None or len(values) != len(prices):
+            return None
+        return np.array(values, dtype=np.float64)
+
+    _, cleaned, report = validate_panel(
+        [str(d)[:10] for d in dates] if calendar is None else dates,
+        np.asarray(prices, dtype=np.float64),
+        open_=optional('opens'),
+        high=optional('highs'),
+        low=optional('lows'),
+        volume=optional('volumes'),
+        symbols=[input_data.get('stock_symbol') or 'series'],
+        calendar=calendar,
+        jump_threshold=input_data.get('jump_threshold', DEFAULT_JUMP_THRESHOLD),
+        stale_run=input_data.get('stale_run', DEFAULT_STALE_RUN),
+        adjust_jumps=input_data.get('adjust_jumps', True),
+        fill_missing=False
+    )
+
+    cleaned = cleaned[:, 0]
+    cleaned = cleaned[~np.isnan(cleaned)].astype(np.asarray(prices).dtype, copy=False)
+    report['data_points'] = {'input': int(len(prices)), 'cleaned': int(len(cleaned))}
+
+    return cleaned, report
+
+
+def main():
+    """
+    命令列：驗證 OHLCV 面板
+
+    輸入 JSON：{"rows": [{"symbol", "date", "open", "high", "low", "close", "volume"}, ...],
+              "holidays": [...], "include_cleaned": false}
+    """
+    try:
+        if len(sys.argv) < 2:
+            print(json.dumps({
+                'success': False,
+                'error': '請提供輸入資料檔案路徑'
+            }))
+            sys.exit(1)
+
+        with open(sys.argv[1], 'r', encoding='utf-8-sig') as f:
+            input_data = json.load(f)
+
+        rows = pd.DataFrame(input_data['rows'])
+        rows['date'] = pd.to_datetime(rows['date']).values.astype('datetime64[D]')
+        panel = rows.pivot_table(index='date', columns='symbol', aggfunc='last')
+
+        def field(name):
+            if name not in rows.columns:
+                return None
+            return panel[name].to_numpy(dtype=np.float64)
+
+        symbols = [str(s) for s in panel['close'].columns]
+        calendar = TwseCalendar(input_data['holidays']) if 'holidays' in input_data else None
+
+        cleaned_dates, cleaned, report = validate_panel(
+            panel.index.values, field('close'),
+            open_=field('open'), high=field('high'), low=field('low'), volume=field('volume'),
+            symbols=symbols,
+            calendar=calendar,
+            jump_threshold=input_data.get('jump_threshold', DEFAULT_JUMP_THRESHOLD),
+            stale_run=input_data.get('stale_run', DEFAULT_STALE_RUN),
+            adjust_jumps=input_data.get('adjust_jumps', True)
+        )
+
+        result = {'success': True, 'report': report}
+        if input_data.get('include_cleaned'):
+            result['cleaned'] = {
+                'dates': [str(d) for d in cleaned_dates],
+                'close': {symbol: [None if np.isnan(v) else round(float(v), 4) for v in cleaned[:, j]]
+                          for j, symbol in enumerate(symbols)}
+            }
+
+        print(json.dumps(result, ensure_ascii=False))
+
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
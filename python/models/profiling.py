@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+慢速執行的效能剖析擷取
+設定 STOCK_PROFILE_THRESHOLD（秒）後啟用：模型 main() 於 cProfile 下執行，
+耗時超過門檻時將 pstats 檔、輸入指紋與執行環境（函式庫版本、執行緒設定）寫入輪替目錄，
+未超過門檻的執行直接丟棄剖析結果。未設定時不做任何事
+
+環境變數：
+  STOCK_PROFILE_THRESHOLD   門檻秒數（未設定為停用）
+  STOCK_PROFILE_DIR         輸出目錄（預設 storage/app/profiles）
+  STOCK_PROFILE_KEEP        保留的擷取數（預設 20，超過時刪除最舊的）
+  STOCK_PROFILE_SAVE_INPUT  設為 1 時一併保存完整輸入 JSON，供離線重現
+"""
+
+import sys
+import os
+import io
+import json
+import time
+import shutil
+import marshal
+import hashlib
+import platform
+import functools
+import cProfile
+import pstats
+from datetime import datetime
+
+# 預設輸出目錄：Laravel storage/app/profiles
+DEFAULT_PROFILE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'storage', 'app', 'profiles'
+)
+
+# 記錄版本的函式庫（以套件中繼資料讀取，不會匯入套件本身）
+LIBRARIES = ['numpy', 'pandas', 'scipy', 'statsmodels', 'pmdarima', 'arch',
+             'scikit-learn', 'tensorflow', 'tensorflow-cpu', 'keras']
+
+# 影響數值運算執行緒數的環境變數
+THREAD_ENV_VARS = [
+    'OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS', 'TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS',
+    'TF_ENABLE_ONEDNN_OPTS', 'CUDA_VISIBLE_DEVICES',
+]
+
+# run_model.py 傳給子程序的啟動時間與執行編號
+STARTED_ENV = 'STOCK_PROFILE_STARTED'
+RUN_ID_ENV = 'STOCK_PROFILE_RUN_ID'
+
+
+def profile_threshold():
+    """取得門檻秒數，未啟用時回傳 None"""
+    value = os.environ.get('STOCK_PROFILE_THRESHOLD', '').strip()
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def new_run_id(name):
+    """產生擷取目錄名稱（時間在前，依名稱排序即為時間順序）"""
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}_{name}_{os.getpid()}"
+
+
+def input_fingerprint(input_data):
+    """
+    輸入資料指紋：內容雜湊與結構摘要（列表只記錄長度與首尾值，不保存原始資料）
+
+    Args:
+        input_data: 模型輸入
+
+    Returns:
+        fingerprint: {'sha256', 'bytes', 'fields'}
+    """
+    canonical = json.dumps(input_data, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    fields = {}
+    for key, value in input_data.items():
+        if isinstance(value, list):
+            summary = {'length': len(value)}
+            if value and not isinstance(value[0], (dict, list)):
+                summary['first'], summary['last'] = value[0], value[-1]
+            fields[key] = summary
+        elif isinstance(value, dict):
+            fields[key] = {'keys': sorted(value)[:20]}
+        elif isinstance(value, str) and len(value) > 200:
+            fields[key] = {'length': len(value)}
+        else:
+            fields[key] = value
+    return {
+        'sha256': hashlib.sha256(canonical.encode('utf-8')).hexdigest(),
+        'bytes': len(canonical.encode('utf-8')),
+        'fields': fields,
+    }
+
+
+def _library_versions():
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        return {}
+    versions = {}
+    for name in LIBRARIES:
+        try:
+            versions[name] = version(name)
+        except PackageNotFoundError:
+            continue
+    return versions
+
+
+def _runtime_threads():
+    """已載入函式庫的實際執行緒設定（不主動匯入未使用的函式庫）"""
+    threads = {}
+    try:
+        from threadpoolctl import threadpool_info
+        threads['threadpools'] = [{k: pool.get(k) for k in ('user_api', 'internal_api', 'num_threads', 'version')}
+                                  for pool in threadpool_info()]
+    except Exception:
+        pass
+
+    tf = sys.modules.get('tensorflow')
+    if tf is not None:
+        try:
+            threads['tensorflow'] = {
+                'intra_op': tf.config.threading.get_intra_op_parallelism_threads(),
+                'inter_op': tf.config.threading.get_inter_op_parallelism_threads(),
+                'gpus': len(tf.config.list_physical_devices('GPU')),
+            }
+        except Exception:
+            pass
+
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        threads['torch'] = torch.get_num_threads()
+    return threads
+
+
+def environment_info():
+    """
+    執行環境資訊
+
+    Returns:
+        info: Python / 平台 / CPU 親和性 / 函式庫版本 / 執行緒設定
+    """
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else None
+    try:
+        load = os.getloadavg()
+    except (AttributeError, OSError):
+        load = None
+    return {
+        'python': sys.version.split()[0],
+        'executable': sys.executable,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'hostname': platform.node(),
+        'cpu_count': os.cpu_count(),
+        'cpu_affinity': cpus,
+        'load_average': load,
+        'libraries': _library_versions(),
+        'thread_env': {name: os.environ[name] for name in THREAD_ENV_VARS if name in os.environ},
+        'threads': _runtime_threads(),
+    }
+
+
+def rotate(directory, keep):
+    """保留最新的 keep 個擷取目錄"""
+    try:
+        entries = sorted(e for e in os.listdir(directory)
+                         if not e.startswith('.') and os.path.isdir(os.path.join(directory, e)))
+    except OSError:
+        return
+    for entry in entries[:max(0, len(entries) - keep)]:
+        shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+
+
+def write_capture(run_id, files, directory=None, keep=None):
+    """
+    寫入一個擷取目錄（每個檔案先寫暫存檔再置換；同一 run_id 可由 run_model.py 與模型子程序分別寫入不同檔案）
+
+    Args:
+        run_id: 擷取目錄名稱
+        files: {檔名: bytes 或可 JSON 序列化的物件}
+        directory: 輸出目錄（預設 STOCK_PROFILE_DIR）
+        keep: 保留數（預設 STOCK_PROFILE_KEEP 或 20）
+
+    Returns:
+        path: 擷取目錄路徑
+    """
+    directory = directory or os.environ.get('STOCK_PROFILE_DIR', DEFAULT_PROFILE_DIR)
+    keep = keep if keep is not None else int(os.environ.get('STOCK_PROFILE_KEEP', 20))
+    target = os.path.join(directory, run_id)
+    os.makedirs(target, exist_ok=True)
+
+    for name, content in files.items():
+        if not isinstance(content, bytes):
+            content = json.dumps(content, ensure_ascii=False, indent=2, default=str).encode('utf-8')
+        temp_path = os.path.join(target, f'.{name}.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+        os.replace(temp_path, os.path.join(target, name))
+
+    rotate(directory, keep)
+    return target
+
+
+def read_input(path):
+    """讀取模型輸入（檔案路徑或 JSON 字串），失敗時回傳 None"""
+    try:
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8-sig') as f:
+                return json.load(f)
+        return json.loads(path)
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+class ProfileCapture:
+    """cProfile 擷取：執行時間超過門檻才保存"""
+
+    def __init__(self, name, threshold=None, input_path=None):
+        """
+        初始化
+
+        Args:
+            name: 擷取名稱（模型類型）
+            threshold: 門檻秒數（預設 STOCK_PROFILE_THRESHOLD，None 為停用）
+            input_path: 模型輸入（檔案路徑或 JSON 字串），僅在保存時讀取
+        """
+        self.name = name
+        self.threshold = threshold if threshold is not None else profile_threshold()
+        self.input_path = input_path
+        self.profiler = None
+        self.started = None
+        self.elapsed = None
+        self.path = None
+
+    @property
+    def enabled(self):
+        return self.threshold is not None
+
+    def __enter__(self):
+        if self.enabled:
+            self.started = time.perf_counter()
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.enabled:
+            return False
+        self.profiler.disable()
+        self.elapsed = time.perf_counter() - self.started
+        if self.elapsed >= self.threshold:
+            status = 'ok' if exc_type is None or (exc_type is SystemExit and not exc.code) else 'error'
+            try:
+                self.save(status)
+            except Exception:
+                # 剖析保存失敗不影響模型輸出
+                pass
+        return False
+
+    def save(self, status='ok'):
+        """寫入 profile.pstats、profile.txt（前 40 個累計耗時函式）與 meta.json"""
+        # 與 pstats.Stats.dump_stats 相同的 marshal 格式，可直接以 pstats / snakeviz 開啟
+        stats_bytes = marshal.dumps(pstats.Stats(self.profiler).stats)
+
+        report = io.StringIO()
+        pstats.Stats(self.profiler, stream=report).sort_stats('cumulative').print_stats(40)
+
+        started_at = os.environ.get(STARTED_ENV)
+        meta = {
+            'name': self.name,
+            'status': status,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'threshold_seconds': self.threshold,
+            # 自 run_model.py 啟動子程序到進入 main() 的時間（直譯器啟動與模組匯入）
+            'startup_seconds': round(time.time() - self.elapsed - float(started_at), 3) if started_at else None,
+            'captured_at': datetime.now().isoformat(timespec='seconds'),
+            'argv': sys.argv,
+            'environment': environment_info(),
+        }
+        files = {'profile.pstats': stats_bytes, 'profile.txt': report.getvalue().encode('utf-8')}
+
+        input_data = read_input(self.input_path) if self.input_path else None
+        if isinstance(input_data, dict):
+            meta['input'] = input_fingerprint(input_data)
+            if os.environ.get('STOCK_PROFILE_SAVE_INPUT') == '1':
+                files['input.json'] = input_data
+        files['meta.json'] = meta
+
+        self.path = write_capture(os.environ.get(RUN_ID_ENV) or new_run_id(self.name), files)
+        return self.path
+
+
+def profiled(name):
+    """
+    模型 main() 的裝飾器：啟用時於 cProfile 下執行，慢速執行保存剖析結果
+
+    Args:
+        name: 擷取名稱（模型類型）
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with ProfileCapture(name, input_path=sys.argv[1] if len(sys.argv) > 1 else None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
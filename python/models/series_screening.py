@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+序列相關與 ARCH 效應批次篩檢
+對整個報酬率矩陣一次計算 Ljung-Box Q（以 FFT 批次計算各股自相關）與 ARCH-LM 檢定
+（對所有股票同時求解正規方程式），結果保存於 storage/app/screening，
+供模型執行前查詢：無 ARCH 效應的股票略過 GARCH 模型選擇，報酬率無序列相關的股票略過 ARIMA 階數搜尋
+
+數值與 statsmodels acorr_ljungbox / het_arch 相同（GARCHPredictor.volatility_clustering_test 使用的檢定）
+"""
+
+import os
+import json
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+# 預設輸出目錄：Laravel storage/app/screening
+DEFAULT_SCREENING_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'storage', 'app', 'screening'
+)
+
+RESULT_FILE = 'series_screening.json'
+
+# 與 volatility_clustering_test 相同的落後期
+LB_LAGS = 10
+ARCH_LAGS = 5
+
+
+def batched_acf(x, nlags):
+    """
+    以 FFT 計算多條序列的自相關（與 statsmodels acf(fft=True, adjusted=False) 相同）
+
+    Args:
+        x: (期數 × 序列數) 矩陣
+        nlags: 最大落後期
+
+    Returns:
+        acf: (nlags + 1 × 序列數)，第 0 列為 1
+    """
+    n = len(x)
+    demeaned = x - x.mean(axis=0)
+    size = 1 << int(np.ceil(np.log2(2 * n - 1)))
+    spectrum = np.fft.rfft(demeaned, n=size, axis=0)
+    acov = np.fft.irfft(spectrum * np.conj(spectrum), n=size, axis=0)[:nlags + 1]
+    variance = acov[0]
+    return acov / np.where(variance > 0, variance, np.inf)
+
+
+def ljung_box(x, nlags=LB_LAGS):
+    """
+    多條序列的 Ljung-Box Q 檢定（落後 nlags 期）
+
+    Args:
+        x: (期數 × 序列數) 矩陣
+        nlags: 落後期
+
+    Returns:
+        statistic, p_value: 各序列的 Q 統計量與 p 值
+    """
+    # 延遲載入 scipy：result_cache 計算快取鍵時只需要 screening_path
+    from scipy.stats import chi2
+
+    n = len(x)
+    acf = batched_acf(x, nlags)[1:]
+    weights = 1.0 / (n - np.arange(1, nlags + 1))
+    statistic = n * (n + 2) * (weights @ (acf * acf))
+    return statistic, chi2.sf(statistic, nlags)
+
+
+def arch_lm(x, nlags=ARCH_LAGS, block_size=512):
+    """
+    多條序列的 ARCH-LM 檢定：e²_t 對常數與 nlags 期落後 e² 迴歸，LM = (T - nlags) × R²
+
+    以去均值後的正規方程式對一批序列同時求解（截距由去均值吸收，R² 不變）
+
+    Args:
+        x: (期數 × 序列數) 報酬率矩陣
+        nlags: 落後期
+        block_size: 每批序列數
+
+    Returns:
+        statistic, p_value: 各序列的 LM 統計量與 p 值
+    """
+    from scipy.stats import chi2
+
+    squared = x * x
+    n_obs = len(x) - nlags
+    statistic = np.empty(x.shape[1])
+    for start in range(0, x.shape[1], block_size):
+        block = squared[:, start:start + block_size]
+        y = block[nlags:]
+        # 設計矩陣 (序列數 × 期數 × 落後期)
+        lags = np.stack([block[nlags - k:-k] for k in range(1, nlags + 1)], axis=-1).transpose(1, 0, 2)
+        y = (y - y.mean(axis=0)).T
+        lags = lags - lags.mean(axis=1, keepdims=True)
+
+        xtx = np.einsum('nti,ntj->nij', lags, lags)
+        xty = np.einsum('nti,nt->ni', lags, y)
+        # 常數序列（停牌等）以單位矩陣避免奇異，R² 視為 0
+        singular = np.abs(np.linalg.det(xtx)) < 1e-300
+        xtx[singular] = np.eye(nlags)
+        beta = np.linalg.solve(xtx, xty[..., None])[..., 0]
+
+        sst = np.einsum('nt,nt->n', y, y)
+        explained = np.einsum('ni,ni->n', beta, xty)
+        r_squared = np.where((sst > 0) & ~singular, explained / np.where(sst > 0, sst, 1), 0.0)
+        statistic[start:start + block_size] = n_obs * r_squared
+    return statistic, chi2.sf(statistic, nlags)
+
+
+def screen_returns(returns, alpha=0.05):
+    """
+    篩檢一個報酬率矩陣（各欄長度相同）
+
+    Args:
+        returns: (期數 × 序列數) 報酬率矩陣
+        alpha: 顯著水準
+
+    Returns:
+        results: 每條序列一個字典
+    """
+    lb_stat, lb_p = ljung_box(returns, LB_LAGS)
+    lb2_stat, lb2_p = ljung_box(returns * returns, LB_LAGS)
+    lm_stat, lm_p = arch_lm(returns, ARCH_LAGS)
+    results = []
+    for k in range(returns.shape[1]):
+        results.append({
+            'observations': int(len(returns)),
+            'ljung_box_statistic': round(float(lb_stat[k]), 4),
+            'ljung_box_pvalue': float(lb_p[k]),
+            'ljung_box_squared_statistic': round(float(lb2_stat[k]), 4),
+            'ljung_box_squared_pvalue': float(lb2_p[k]),
+            'arch_lm_statistic': round(float(lm_stat[k]), 4),
+            'arch_lm_pvalue': float(lm_p[k]),
+            'serial_correlation': bool(lb_p[k] < alpha),
+            'arch_effect': bool(lm_p[k] < alpha),
+        })
+    return results
+
+
+def screen_prices(series, alpha=0.05, window=500, min_observations=100):
+    """
+    篩檢多檔股票的價格序列（依報酬率長度分組，每組一次向量化計算）
+
+    Args:
+        series: {股票代號: 收盤價陣列}
+        alpha: 顯著水準
+        window: 只使用最近幾期報酬率
+        min_observations: 最少報酬率期數
+
+    Returns:
+        results: {股票代號: 篩檢結果}
+    """
+    groups = {}
+    for symbol, prices in series.items():
+        prices = np.asarray(prices, dtype=np.float64)
+        prices = prices[np.isfinite(prices) & (prices > 0)]
+        # 與 GARCHPredictor.calculate_returns 相同的百分比對數報酬率
+        returns = np.diff(np.log(prices))[-window:] * 100
+        if len(returns) >= min_observations:
+            groups.setdefault(len(returns), []).append((symbol, returns))
+
+    results = {}
+    for members in groups.values():
+        matrix = np.column_stack([returns for _, returns in members])
+        for (symbol, _), result in zip(members, screen_returns(matrix, alpha)):
+            results[symbol] = result
+    return results
+
+
+def screening_path(directory=None):
+    return os.path.join(directory or os.environ.get('STOCK_SCREENING_DIR', DEFAULT_SCREENING_DIR), RESULT_FILE)
+
+
+def save_results(results, as_of=None, alpha=0.05, window=500, directory=None):
+    """
+    寫入篩檢結果（先寫暫存檔再置換）
+
+    Args:
+        results: screen_prices 的結果
+        as_of: 資料最後交易日
+        alpha: 顯著水準
+        window: 使用的報酬率期數
+        directory: 輸出目錄（預設 STOCK_SCREENING_DIR）
+
+    Returns:
+        path: 結果檔路徑
+    """
+    path = screening_path(directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    content = {
+        'screened_at': datetime.now().isoformat(timespec='seconds'),
+        'as_of': as_of,
+        'alpha': alpha,
+        'window': window,
+        'ljung_box_lags': LB_LAGS,
+        'arch_lags': ARCH_LAGS,
+        'symbols': results,
+    }
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.json')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(content, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+    return path
+
+
+def lookup(symbol, max_age_days=7, directory=None):
+    """
+    查詢股票的篩檢結果
+
+    Args:
+        symbol: 股票代號
+        max_age_days: 結果有效天數
+        directory: 結果目錄（預設 STOCK_SCREENING_DIR）
+
+    Returns:
+        result: 篩檢結果（含 screened_at / as_of）；無結果、過期或檔案損毀時回傳 None
+    """
+    if not symbol:
+        return None
+    try:
+        with open(screening_path(directory), 'r', encoding='utf-8') as f:
+            content = json.load(f)
+        age = datetime.now() - datetime.fromisoformat(content['screened_at'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+    result = content.get('symbols', {}).get(str(symbol))
+    if result is None or age.days >= max_age_days:
+        return None
+    return {**result, 'screened_at': content['screened_at'], 'as_of': content.get('as_of')}
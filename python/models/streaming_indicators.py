@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+串流技術指標引擎
+以陣列保存每檔股票的指標狀態（環形緩衝區、累計和、EMA / Wilder 平滑值），
+每筆新資料以 O(1) 更新 SMA、EMA、MACD、RSI（Wilder）、布林通道與 ATR，
+同一次呼叫可向量化更新大量股票，狀態可由歷史資料批次初始化並存成檢查點
+
+與 BacktestService.php 的對應：
+  EMA / MACD：第一筆以收盤價起始，訊號線前 signal 筆等於 MACD 線（同 calculateMACD）
+  布林通道：母體標準差（同 calculateStdDev），但視窗包含當筆；
+            BacktestService 的視窗為「前 period 筆」，相當於本引擎前一筆的值
+  RSI：採 Wilder 平滑（前 period 筆變動取平均後遞迴平滑）；
+       calculateRSI 為最近 period 筆的簡單平均，數值不同
+"""
+
+import sys
+import os
+import json
+import tempfile
+import numpy as np
+
+# 預設參數（與 BacktestService 策略預設值相同）
+DEFAULT_PARAMS = {
+    'sma_period': 20,
+    'ema_period': 20,
+    'macd_fast': 12,
+    'macd_slow': 26,
+    'macd_signal': 9,
+    'rsi_period': 14,
+    'bb_period': 20,
+    'bb_std': 2.0,
+    'atr_period': 14,
+}
+
+# 指標輸出欄位
+INDICATORS = ('close', 'sma', 'ema', 'macd', 'macd_signal', 'macd_histogram', 'rsi',
+              'bb_middle', 'bb_upper', 'bb_lower', 'atr')
+
+# 每更新多少次重新由緩衝區計算累計和，避免浮點誤差累積
+RESYNC_EVERY = 4096
+
+# 狀態陣列（每檔股票一個值）
+STATE_FIELDS = ('count', 'prev_close', 'ema', 'ema_fast', 'ema_slow', 'signal',
+                'avg_gain', 'avg_loss', 'atr', 'sma_sum', 'bb_sum', 'bb_sumsq')
+
+
+class IndicatorEngine:
+    """以陣列保存多檔股票指標狀態的串流引擎"""
+
+    __slots__ = ('params', 'symbols', 'index', 'window', 'buffer', 'updates') + STATE_FIELDS
+
+    def __init__(self, symbols=(), params=None):
+        """
+        初始化引擎
+
+        Args:
+            symbols: 股票代號列表
+            params: 指標參數（未指定者使用 DEFAULT_PARAMS）
+        """
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        self.window = max(self.params['sma_period'], self.params['bb_period'])
+        self.symbols = []
+        self.index = {}
+        self.updates = 0
+
+        self.buffer = np.zeros((0, self.window))
+        for field in STATE_FIELDS:
+            setattr(self, field, np.zeros(0, dtype=np.int64 if field == 'count' else np.float64))
+        self.add_symbols(symbols)
+
+    def add_symbols(self, symbols):
+        """
+        加入新股票（已存在的略過）
+
+        Args:
+            symbols: 股票代號列表
+
+        Returns:
+            rows: 各股票的列索引
+        """
+        new = [s for s in dict.fromkeys(symbols) if s not in self.index]
+        if new:
+            for symbol in new:
+                self.index[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+            self.buffer = np.vstack([self.buffer, np.zeros((len(new), self.window))])
+            for field in STATE_FIELDS:
+                values = getattr(self, field)
+                fill = 0 if field == 'count' else (np.nan if field == 'prev_close' else 0.0)
+                setattr(self, field, np.concatenate([values, np.full(len(new), fill, dtype=values.dtype)]))
+        return np.array([self.index[s] for s in symbols], dtype=np.int64)
+
+    def _rows(self, symbols):
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        missing = [s for s in symbols if s not in self.index]
+        if missing:
+            self.add_symbols(missing)
+        return np.array([self.index[s] for s in symbols], dtype=np.int64)
+
+    def _step(self, rows, close, high, low):
+        """
+        計算 rows 加入一筆資料後的新狀態（不寫回）
+
+        Returns:
+            state: 新狀態字典
+            slot: 本筆寫入環形緩衝區的位置
+        """
+        p = self.params
+        count = self.count[rows]
+        first = count == 0
+        prev_close = self.prev_close[rows]
+
+        def ema(previous, period):
+            alpha = 2.0 / (period + 1)
+            return np.where(first, close, close * alpha + previous * (1 - alpha))
+
+        state = {'count': count + 1, 'prev_close': close}
+        state['ema'] = ema(self.ema[rows], p['ema_period'])
+        state['ema_fast'] = ema(self.ema_fast[rows], p['macd_fast'])
+        state['ema_slow'] = ema(self.ema_slow[rows], p['macd_slow'])
+        macd = state['ema_fast'] - state['ema_slow']
+        alpha = 2.0 / (p['macd_signal'] + 1)
+        state['signal'] = np.where(count < p['macd_signal'], macd,
+                                   macd * alpha + self.signal[rows] * (1 - alpha))
+
+        # 移動視窗累計和：離開視窗的值為 period 筆前寫入的位置（未滿時為 0）
+        slot = count % self.window
+        buffer = self.buffer[rows]
+        leaving_sma = buffer[np.arange(len(rows)), (count - p['sma_period']) % self.window]
+        leaving_bb = buffer[np.arange(len(rows)), (count - p['bb_period']) % self.window]
+        leaving_sma = np.where(count >= p['sma_period'], leaving_sma, 0.0)
+        leaving_bb = np.where(count >= p['bb_period'], leaving_bb, 0.0)
+        state['sma_sum'] = self.sma_sum[rows] + close - leaving_sma
+        state['bb_sum'] = self.bb_sum[rows] + close - leaving_bb
+        state['bb_sumsq'] = self.bb_sumsq[rows] + close * close - leaving_bb * leaving_bb
+
+        # RSI（Wilder）：前 period 筆變動累計平均，之後遞迴平滑
+        period = p['rsi_period']
+        change = np.where(first, 0.0, close - prev_close)
+        gain, loss = np.maximum(change, 0.0), np.maximum(-change, 0.0)
+        warming = count <= period
+        state['avg_gain'] = np.where(warming, self.avg_gain[rows] + gain / period,
+                                     (self.avg_gain[rows] * (period - 1) + gain) / period)
+        state['avg_loss'] = np.where(warming, self.avg_loss[rows] + loss / period,
+                                     (self.avg_loss[rows] * (period - 1) + loss) / period)
+
+        # ATR（Wilder）：真實波幅，前 period 筆取平均
+        period = p['atr_period']
+        true_range = np.where(first, high - low,
+                              np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close))))
+        state['atr'] = np.where(count < period, self.atr[rows] + true_range / period,
+                                (self.atr[rows] * (period - 1) + true_range) / period)
+        return state, slot
+
+    def _indicators(self, state, close):
+        """由狀態計算指標值（尚未累積足夠資料者為 NaN）"""
+        p = self.params
+        count = state['count']
+
+        sma = np.where(count >= p['sma_period'], state['sma_sum'] / p['sma_period'], np.nan)
+        middle = np.where(count >= p['bb_period'], state['bb_sum'] / p['bb_period'], np.nan)
+        variance = np.maximum(state['bb_sumsq'] / p['bb_period'] - middle * middle, 0.0)
+        band = p['bb_std'] * np.sqrt(variance)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = state['avg_gain'] / state['avg_loss']
+        rsi = np.where(state['avg_loss'] == 0, 100.0, 100.0 - 100.0 / (1.0 + rs))
+        rsi = np.where(count - 1 >= p['rsi_period'], rsi, np.nan)
+
+        macd = state['ema_fast'] - state['ema_slow']
+        return {
+            'close': close,
+            'sma': sma,
+            'ema': state['ema'],
+            'macd': macd,
+            'macd_signal': state['signal'],
+            'macd_histogram': macd - state['signal'],
+            'rsi': rsi,
+            'bb_middle': middle,
+            'bb_upper': middle + band,
+            'bb_lower': middle - band,
+            'atr': np.where(count >= p['atr_period'], state['atr'], np.nan),
+        }
+
+    @staticmethod
+    def _prices(close, high, low, n):
+        close = np.broadcast_to(np.asarray(close, dtype=np.float64), (n,))
+        high = close if high is None else np.broadcast_to(np.asarray(high, dtype=np.float64), (n,))
+        low = close if low is None else np.broadcast_to(np.asarray(low, dtype=np.float64), (n,))
+        # 盤中即時報價可能尚未包含最新價
+        return close, np.maximum(high, close), np.minimum(low, close)
+
+    def update(self, symbols, close, high=None, low=None):
+        """
+        每檔股票加入一筆新資料（一根 K 棒收盤）
+
+        Args:
+            symbols: 股票代號或代號列表（同一次呼叫不可重複）
+            close: 收盤價（純量或陣列）
+            high: 最高價（None 時以收盤價代替）
+            low: 最低價（None 時以收盤價代替）
+
+        Returns:
+            indicators: 各指標陣列
+        """
+        rows = self._rows(symbols)
+        close, high, low = self._prices(close, high, low, len(rows))
+        state, slot = self._step(rows, close, high, low)
+
+        for field, values in state.items():
+            getattr(self, field)[rows] = values
+        self.buffer[rows, slot] = close
+
+        self.updates += 1
+        if self.updates % RESYNC_EVERY == 0:
+            self.resync()
+        return self._indicators(state, close)
+
+    def peek(self, symbols, close, high=None, low=None):
+        """
+        計算盤中報價的暫定指標（不改變狀態，收盤後再以 update 寫入）
+
+        Args:
+            symbols: 股票代號或代號列表
+            close: 即時價
+            high: 當日最高價
+            low: 當日最低價
+
+        Returns:
+            indicators: 各指標陣列
+        """
+        rows = self._rows(symbols)
+        close, high, low = self._prices(close, high, low, len(rows))
+        state, _ = self._step(rows, close, high, low)
+        return self._indicators(state, close)
+
+    def values(self, symbols=None):
+        """
+        取得最新一筆資料的指標
+
+        Args:
+            symbols: 股票代號列表（None 為全部）
+
+        Returns:
+            indicators: 各指標陣列
+        """
+        rows = self._rows(self.symbols if symbols is None else symbols)
+        state = {field: getattr(self, field)[rows] for field in STATE_FIELDS}
+        return self._indicators(state, state['prev_close'])
+
+    def resync(self):
+        """由環形緩衝區重新計算移動視窗累計和"""
+        count = self.count[:, None]
+        for period, fields in ((self.params['sma_period'], ('sma_sum',)),
+                               (self.params['bb_period'], ('bb_sum', 'bb_sumsq'))):
+            lags = np.arange(period)
+            values = np.take_along_axis(self.buffer, (count - 1 - lags) % self.window, axis=1)
+            values = np.where(lags < count, values, 0.0)
+            getattr(self, fields[0])[:] = values.sum(axis=1)
+            if len(fields) > 1:
+                getattr(self, fields[1])[:] = (values * values).sum(axis=1)
+
+    @classmethod
+    def from_history(cls, history, params=None):
+        """
+        由歷史資料批次初始化
+
+        各股票的歷史長度可不同：資料靠右對齊成 (股票數 × 天數) 面板，
+        逐日以向量化 update 推進，只更新當日有資料的股票
+
+        Args:
+            history: {股票代號: {'close': [...], 'high': [...], 'low': [...]}}（high / low 可省略）
+            params: 指標參數
+
+        Returns:
+            engine: IndicatorEngine
+        """
+        symbols = list(history)
+        engine = cls(symbols, params)
+        if not symbols:
+            return engine
+
+        length = max(len(history[s]['close']) for s in symbols)
+        panels = {}
+        for field in ('close', 'high', 'low'):
+            panel = np.full((len(symbols), length), np.nan)
+            for row, symbol in enumerate(symbols):
+                values = history[symbol].get(field)
+                if values is None:
+                    values = history[symbol]['close']
+                values = np.asarray(values, dtype=np.float64)
+                if len(values):
+                    panel[row, length - len(values):] = values
+            panels[field] = panel
+
+        symbol_array = np.array(symbols, dtype=object)
+        for t in range(length):
+            available = ~np.isnan(panels['close'][:, t])
+            if available.all():
+                engine.update(symbols, panels['close'][:, t], panels['high'][:, t], panels['low'][:, t])
+            elif available.any():
+                engine.update(list(symbol_array[available]), panels['close'][available, t],
+                              panels['high'][available, t], panels['low'][available, t])
+        return engine
+
+    def save(self, path):
+        """
+        儲存檢查點（.npz，先寫暫存檔再置換）
+
+        Args:
+            path: 檔案路徑
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.npz')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, symbols=np.array(self.symbols, dtype=str), buffer=self.buffer,
+                     params=json.dumps(self.params), updates=self.updates,
+                     **{field: getattr(self, field) for field in STATE_FIELDS})
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        讀取檢查點
+
+        Args:
+            path: 檔案路徑
+
+        Returns:
+            engine: IndicatorEngine
+        """
+        with np.load(path) as archive:
+            engine = cls(params=json.loads(str(archive['params'])))
+            symbols = archive['symbols'].tolist()
+            engine.symbols = symbols
+            engine.index = {symbol: row for row, symbol in enumerate(symbols)}
+            engine.buffer = archive['buffer']
+            engine.updates = int(archive['updates'])
+            for field in STATE_FIELDS:
+                setattr(engine, field, archive[field])
+        return engine
+
+    def snapshot(self, symbols=None):
+        """
+        指標轉為 JSON 可輸出的字典
+
+        Args:
+            symbols: 股票代號列表（None 為全部）
+
+        Returns:
+            result: {股票代號: {指標: 值}}
+        """
+        symbols = self.symbols if symbols is None else list(symbols)
+        return to_records(symbols, self.values(symbols))
+
+
+def to_records(symbols, indicators):
+    """將指標陣列轉為 {股票代號: {指標: 值}}（NaN 轉為 None）"""
+    result = {}
+    for row, symbol in enumerate(symbols):
+        result[symbol] = {
+            name: (None if np.isnan(indicators[name][row]) else round(float(indicators[name][row]), 4))
+            for name in INDICATORS
+        }
+    return result
+
+
+def main():
+    """
+    主函數
+
+    輸入 JSON：
+      state_path: 檢查點路徑（存在時載入，處理後寫回）
+      params: 指標參數（僅建立新引擎時使用）
+      history: {股票代號: {'close', 'high', 'low'}}，提供時重新初始化引擎
+      ticks: [{'symbol', 'close', 'high', 'low'}]，收盤後的新 K 棒
+      quotes: [{'symbol', 'close', 'high', 'low'}]，盤中報價（只計算暫定指標，不寫入狀態）
+    """
+    try:
+        if len(sys.argv) < 2:
+            print(json.dumps({
+                'success': False,
+                'error': '請提供輸入資料'
+            }))
+            sys.exit(1)
+
+        input_arg = sys.argv[1]
+        if os.path.exists(input_arg):
+            with open(input_arg, 'r', encoding='utf-8') as f:
+                input_data = json.load(f)
+        else:
+            input_data = json.loads(input_arg)
+
+        state_path = input_data.get('state_path')
+        if input_data.get('history'):
+            engine = IndicatorEngine.from_history(input_data['history'], input_data.get('params'))
+        elif state_path and os.path.exists(state_path):
+            engine = IndicatorEngine.load(state_path)
+        else:
+            engine = IndicatorEngine(params=input_data.get('params'))
+
+        updated = []
+        for tick in input_data.get('ticks', []):
+            engine.update(tick['symbol'], tick['close'], tick.get('high') or tick['close'],
+                          tick.get('low') or tick['close'])
+            updated.append(tick['symbol'])
+
+        result = {
+            'success': True,
+            'symbols': len(engine.symbols),
+            'indicators': engine.snapshot(list(dict.fromkeys(updated)) or None),
+        }
+
+        quotes = input_data.get('quotes', [])
+        if quotes:
+            symbols = [q['symbol'] for q in quotes]
+            provisional = engine.peek(symbols, [q['close'] for q in quotes],
+                                      [q.get('high') or q['close'] for q in quotes],
+                                      [q.get('low') or q['close'] for q in quotes])
+            result['provisional'] = to_records(symbols, provisional)
+
+        if state_path:
+            engine.save(state_path)
+
+        print(json.dumps(result, ensure_ascii=False))
+
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+臺灣證券交易所交易日曆
+以週一至週五扣除休市日計算交易日。固定日期的國定假日內建（週六假日提前至週五、
+週日假日順延至週一），農曆假日、補假與颱風休市等由休市日清單提供
+"""
+
+import os
+import json
+import numpy as np
+
+# 休市日清單（JSON 陣列，元素為 YYYY-MM-DD）：storage/app/twse_holidays.json，可用 STOCK_TWSE_HOLIDAYS 覆寫
+DEFAULT_HOLIDAY_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'storage', 'app', 'twse_holidays.json'
+)
+
+# 固定日期的休市國定假日 (月, 日)：元旦、和平紀念日、兒童節、勞動節、國慶日
+FIXED_HOLIDAYS = [(1, 1), (2, 28), (4, 4), (5, 1), (10, 10)]
+
+
+def to_days(dates):
+    """將日期字串或 datetime 陣列轉為 datetime64[D]"""
+    return np.asarray(dates, dtype='datetime64[D]')
+
+
+def fixed_holidays(first_year, last_year):
+    """
+    計算固定日期國定假日的實際休市日
+
+    Args:
+        first_year: 起始年份
+        last_year: 結束年份
+
+    Returns:
+        holidays: datetime64[D] 陣列
+    """
+    days = np.array([f'{year:04d}-{month:02d}-{day:02d}'
+                     for year in range(first_year, last_year + 1)
+                     for month, day in FIXED_HOLIDAYS], dtype='datetime64[D]')
+
+    # 1970-01-01 為週四：(天數 + 3) % 7 得到 0=週一 ... 6=週日
+    weekday = (days.astype(np.int64) + 3) % 7
+    observed = days.copy()
+    observed[weekday == 5] -= 1
+    observed[weekday == 6] += 1
+    return observed
+
+
+def load_holidays(path=None):
+    """
+    讀取休市日清單
+
+    Args:
+        path: 清單檔案路徑（預設 DEFAULT_HOLIDAY_FILE）
+
+    Returns:
+        holidays: datetime64[D] 陣列；檔案不存在時為空陣列
+    """
+    path = path or os.environ.get('STOCK_TWSE_HOLIDAYS', DEFAULT_HOLIDAY_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return to_days(json.load(f))
+    except (OSError, ValueError):
+        return np.array([], dtype='datetime64[D]')
+
+
+class TwseCalendar:
+    """TWSE 交易日曆"""
+
+    def __init__(self, holidays=None, first_year=1990, last_year=2100):
+        """
+        初始化交易日曆
+
+        Args:
+            holidays: 額外休市日（None 時讀取 load_holidays() 的清單）
+            first_year: 固定假日計算的起始年份
+            last_year: 固定假日計算的結束年份
+        """
+        extra = load_holidays() if holidays is None else to_days(holidays)
+        self.holidays = np.union1d(fixed_holidays(first_year, last_year), extra)
+        self.calendar = np.busdaycalendar(weekmask='1111100', holidays=self.holidays)
+
+    def is_trading_day(self, dates):
+        """
+        判斷是否為交易日
+
+        Args:
+            dates: 日期或日期陣列
+
+        Returns:
+            mask: 布林值或布林陣列
+        """
+        return np.is_busday(to_days(dates), busdaycal=self.calendar)
+
+    def trading_days(self, start, end):
+        """
+        取得區間內所有交易日（含頭尾）
+
+        Args:
+            start: 起始日
+            end: 結束日
+
+        Returns:
+            days: datetime64[D] 陣列
+        """
+        start, end = to_days(start), to_days(end)
+        days = np.arange(start, end + 1, dtype='datetime64[D]')
+        return days[np.is_busday(days, busdaycal=self.calendar)]
+
+    def offset(self, date, n=1):
+        """
+        取得距離指定日期 n 個交易日的日期（非交易日先順延至下一個交易日）
+
+        Args:
+            date: 日期
+            n: 交易日數（負數為往前）
+
+        Returns:
+            day: datetime64[D]
+        """
+        roll = 'forward' if n >= 0 else 'backward'
+        return np.busday_offset(to_days(date), n, roll=roll, busdaycal=self.calendar)
+
+    def count(self, start, end):
+        """
+        計算 [start, end) 之間的交易日數
+
+        Args:
+            start: 起始日
+            end: 結束日（不含）
+
+        Returns:
+            count: 交易日數
+        """
+        return int(np.busday_count(to_days(start), to_days(end), busdaycal=self.calendar))
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+選擇權分析立方體
+將 option_prices 依 標的 × 交易日 × 到期日 × 履約價 × 買賣權 預先彙總到 option_cube，
+並依 標的 × 交易日 彙總成交量、未平倉量、Put/Call 比、加權指數與平均隱含波動率到 option_daily_stats，
+供 OptionAnalysisService / TxoMarketIndexService 直接讀取，不必每次請求都對原始資料 GROUP BY
+
+兩張表都只存可累加的統計量（總和、筆數、最大/最小值）與由其計算的衍生欄位，任意再彙總結果與原始查詢相同。
+增量更新以交易日為單位：比對每個交易日的原始筆數與最後更新時間，只重算有變動的交易日（期交所匯入後執行）
+"""
+
+import sys
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from db import Database
+
+CELL_KEYS = ['underlying', 'trade_date', 'expiry_date', 'strike_price', 'option_type']
+DAILY_KEYS = ['underlying', 'trade_date']
+
+# 立方體格子的可累加統計量
+# close_sum: COALESCE(close, open, 0) 總和（與 getTxoTrend 的平均收盤相同口徑）
+# turnover / traded_volume / traded_close_sum / traded_count: 只計 close > 0 且 volume > 0 的成交（加權指數口徑）
+CELL_SUMS = ['contracts', 'volume', 'open_interest', 'turnover', 'traded_volume', 'traded_close_sum',
+             'traded_count', 'close_sum', 'iv_sum', 'iv_count']
+CELL_COLUMNS = CELL_KEYS + CELL_SUMS + ['high', 'low', 'vwap', 'avg_iv', 'created_at', 'updated_at']
+
+DAILY_SUMS = ['contracts', 'call_volume', 'put_volume', 'call_oi', 'put_oi', 'turnover', 'traded_volume',
+              'traded_close_sum', 'traded_count', 'close_sum', 'call_iv_sum', 'call_iv_count',
+              'put_iv_sum', 'put_iv_count']
+DAILY_DERIVED = ['total_volume', 'total_oi', 'put_call_volume_ratio', 'put_call_oi_ratio', 'weighted_index',
+                 'avg_price', 'avg_close', 'avg_iv', 'call_avg_iv', 'put_avg_iv']
+DAILY_COLUMNS = DAILY_KEYS + DAILY_SUMS + ['high', 'low'] + DAILY_DERIVED + [
+    'source_rows', 'source_updated_at', 'created_at', 'updated_at']
+
+
+def _ratio(numerator, denominator):
+    """分母為 0 時為 NaN 的比值"""
+    denominator = np.asarray(denominator, dtype=np.float64)
+    return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1), np.nan)
+
+
+def build_cells(rows):
+    """
+    將原始價格列彙總為立方體格子
+
+    Args:
+        rows: 含 CELL_KEYS 與 open, high, low, close, volume, open_interest, implied_volatility 的 DataFrame
+
+    Returns:
+        cells: 每個 (標的, 交易日, 到期日, 履約價, 買賣權) 一列
+    """
+    close = rows['close'].fillna(rows['open']).fillna(0)
+    volume = rows['volume'].fillna(0)
+    traded = (rows['close'] > 0) & (volume > 0)
+    iv = rows['implied_volatility']
+
+    frame = rows[CELL_KEYS].assign(
+        contracts=1,
+        volume=volume,
+        open_interest=rows['open_interest'].fillna(0),
+        turnover=(rows['close'] * volume).where(traded, 0),
+        traded_volume=volume.where(traded, 0),
+        traded_close_sum=rows['close'].where(traded, 0),
+        traded_count=traded.astype(np.int64),
+        close_sum=close,
+        iv_sum=iv.fillna(0),
+        iv_count=iv.notna().astype(np.int64),
+        high=rows['high'],
+        low=rows['low'],
+    )
+    cells = frame.groupby(CELL_KEYS, sort=False).agg(
+        **{c: (c, 'sum') for c in CELL_SUMS}, high=('high', 'max'), low=('low', 'min')
+    ).reset_index()
+    cells['vwap'] = _ratio(cells['turnover'], cells['traded_volume'])
+    cells['avg_iv'] = _ratio(cells['iv_sum'], cells['iv_count'])
+    return cells
+
+
+def build_daily(cells):
+    """
+    由立方體格子彙總每日統計
+
+    Args:
+        cells: build_cells 的結果
+
+    Returns:
+        daily: 每個 (標的, 交易日) 一列
+    """
+    is_call = cells['option_type'] == 'call'
+    is_put = cells['option_type'] == 'put'
+    frame = cells[DAILY_KEYS + ['contracts', 'turnover', 'traded_volume', 'traded_close_sum', 'traded_count',
+                                'close_sum', 'high', 'low']].assign(
+        call_volume=cells['volume'].where(is_call, 0),
+        put_volume=cells['volume'].where(is_put, 0),
+        call_oi=cells['open_interest'].where(is_call, 0),
+        put_oi=cells['open_interest'].where(is_put, 0),
+        call_iv_sum=cells['iv_sum'].where(is_call, 0),
+        call_iv_count=cells['iv_count'].where(is_call, 0),
+        put_iv_sum=cells['iv_sum'].where(is_put, 0),
+        put_iv_count=cells['iv_count'].where(is_put, 0),
+    )
+    daily = frame.groupby(DAILY_KEYS, sort=False).agg(
+        **{c: (c, 'sum') for c in DAILY_SUMS}, high=('high', 'max'), low=('low', 'min')
+    ).reset_index()
+    return derive_daily(daily)
+
+
+def derive_daily(daily):
+    """由每日統計量計算 Put/Call 比、加權指數與平均隱含波動率"""
+    daily['total_volume'] = daily['call_volume'] + daily['put_volume']
+    daily['total_oi'] = daily['call_oi'] + daily['put_oi']
+    daily['put_call_volume_ratio'] = _ratio(daily['put_volume'], daily['call_volume'])
+    daily['put_call_oi_ratio'] = _ratio(daily['put_oi'], daily['call_oi'])
+    daily['weighted_index'] = _ratio(daily['turnover'], daily['traded_volume'])
+    daily['avg_price'] = _ratio(daily['traded_close_sum'], daily['traded_count'])
+    daily['avg_close'] = _ratio(daily['close_sum'], daily['contracts'])
+    daily['avg_iv'] = _ratio(daily['call_iv_sum'] + daily['put_iv_sum'],
+                             daily['call_iv_count'] + daily['put_iv_count'])
+    daily['call_avg_iv'] = _ratio(daily['call_iv_sum'], daily['call_iv_count'])
+    daily['put_avg_iv'] = _ratio(daily['put_iv_sum'], daily['put_iv_count'])
+    return daily
+
+
+def _records(frame, columns):
+    """DataFrame 轉為 executemany 參數（NaN 轉 None、numpy 純量轉 Python 型別）"""
+    frame = frame[columns].astype(object).where(frame[columns].notna(), None)
+    return [tuple(v.item() if isinstance(v, np.generic) else v for v in row)
+            for row in frame.itertuples(index=False, name=None)]
+
+
+class OptionCube:
+    """選擇權分析立方體維護器"""
+
+    def __init__(self, db, dates_per_batch=20, batch_size=5000):
+        """
+        初始化
+
+        Args:
+            db: db.Database
+            dates_per_batch: 每次讀取與重算的交易日數
+            batch_size: 每次 executemany 的列數
+        """
+        self.db = db
+        self.dates_per_batch = dates_per_batch
+        self.batch_size = batch_size
+        self.stats = {'dates': 0, 'source_rows': 0, 'cells': 0, 'removed_dates': 0}
+        self.cell_sql = db.upsert_sql('option_cube', CELL_COLUMNS, CELL_KEYS, CELL_COLUMNS[len(CELL_KEYS):])
+        self.daily_sql = db.upsert_sql('option_daily_stats', DAILY_COLUMNS, DAILY_KEYS,
+                                       DAILY_COLUMNS[len(DAILY_KEYS):])
+
+    def _in_dates(self, dates):
+        return ', '.join([self.db.placeholder] * len(dates))
+
+    def source_versions(self):
+        """各交易日的原始筆數與最後更新時間"""
+        rows = self.db.execute('SELECT trade_date, COUNT(*), MAX(updated_at) FROM option_prices '
+                               'GROUP BY trade_date').fetchall()
+        return {str(d)[:10]: (int(n), str(u) if u is not None else '') for d, n, u in rows}
+
+    def cube_versions(self):
+        """立方體中各交易日記錄的原始筆數與最後更新時間"""
+        rows = self.db.execute('SELECT trade_date, SUM(source_rows), MAX(source_updated_at) '
+                               'FROM option_daily_stats GROUP BY trade_date').fetchall()
+        return {str(d)[:10]: (int(n), str(u) if u is not None else '') for d, n, u in rows}
+
+    def stale_dates(self):
+        """
+        找出需要重算與需要移除的交易日
+
+        Returns:
+            stale: 原始資料有新增、更新或刪除的交易日
+            removed: 原始資料已不存在的交易日
+        """
+        source, cube = self.source_versions(), self.cube_versions()
+        stale = sorted(d for d, version in source.items() if cube.get(d) != version)
+        removed = sorted(set(cube) - set(source))
+        return stale, removed
+
+    def load_rows(self, dates):
+        """讀取指定交易日的原始價格（含合約維度）"""
+        rows = self.db.execute(
+            'SELECT o.underlying, p.trade_date, o.expiry_date, o.strike_price, o.option_type, '
+            'p.open, p.high, p.low, p.close, p.volume, p.open_interest, p.implied_volatility, p.updated_at '
+            'FROM option_prices p JOIN options o ON o.id = p.option_id '
+            f'WHERE p.trade_date IN ({self._in_dates(dates)})', tuple(dates)
+        ).fetchall()
+        frame = pd.DataFrame(rows, columns=CELL_KEYS + ['open', 'high', 'low', 'close', 'volume', 'open_interest',
+                                                        'implied_volatility', 'updated_at'])
+        for column in ('trade_date', 'expiry_date'):
+            frame[column] = frame[column].astype(str).str[:10]
+        for column in ('strike_price', 'open', 'high', 'low', 'close', 'volume', 'open_interest',
+                       'implied_volatility'):
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').astype(np.float64)
+        return frame
+
+    def refresh_dates(self, dates):
+        """重算指定交易日（刪除舊格子後寫入，單一交易）"""
+        rows = self.load_rows(dates)
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        cells = build_cells(rows)
+        daily = build_daily(cells)
+        versions = rows.assign(updated_at=rows['updated_at'].astype(str).where(rows['updated_at'].notna(), '')
+                               ).groupby(DAILY_KEYS).agg(source_rows=('updated_at', 'size'),
+                                                         source_updated_at=('updated_at', 'max')).reset_index()
+        daily = daily.merge(versions, on=DAILY_KEYS, how='left')
+        daily['source_updated_at'] = daily['source_updated_at'].replace('', None)
+        cells = cells.assign(created_at=now, updated_at=now)
+        daily = daily.assign(created_at=now, updated_at=now)
+
+        placeholders = self._in_dates(dates)
+        try:
+            self.db.execute(f'DELETE FROM option_cube WHERE trade_date IN ({placeholders})', tuple(dates))
+            self.db.execute(f'DELETE FROM option_daily_stats WHERE trade_date IN ({placeholders})', tuple(dates))
+            for sql, records in ((self.cell_sql, _records(cells, CELL_COLUMNS)),
+                                 (self.daily_sql, _records(daily, DAILY_COLUMNS))):
+                for start in range(0, len(records), self.batch_size):
+                    self.db.executemany(sql, records[start:start + self.batch_size])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        self.stats['dates'] += len(dates)
+        self.stats['source_rows'] += len(rows)
+        self.stats['cells'] += len(cells)
+
+    def remove_dates(self, dates):
+        """移除原始資料已不存在的交易日"""
+        try:
+            for start in range(0, len(dates), 500):
+                batch = tuple(dates[start:start + 500])
+                self.db.execute(f'DELETE FROM option_cube WHERE trade_date IN ({self._in_dates(batch)})', batch)
+                self.db.execute(f'DELETE FROM option_daily_stats WHERE trade_date IN ({self._in_dates(batch)})', batch)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        self.stats['removed_dates'] += len(dates)
+
+    def run(self, dates=None):
+        """
+        更新立方體
+
+        Args:
+            dates: 強制重算的交易日（None 時自動找出有變動的交易日）
+
+        Returns:
+            stats: 重算的交易日數、讀取的原始筆數、寫入的格子數與移除的交易日數
+        """
+        if dates is None:
+            dates, removed = self.stale_dates()
+            if removed:
+                self.remove_dates(removed)
+        for start in range(0, len(dates), self.dates_per_batch):
+            self.refresh_dates(list(dates[start:start + self.dates_per_batch]))
+        return self.stats
+
+    def rebuild(self):
+        """清空立方體（下次執行時全部重算）"""
+        try:
+            self.db.execute('DELETE FROM option_cube')
+            self.db.execute('DELETE FROM option_daily_stats')
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+
+def main():
+    """主函數：python option_cube.py [--database=sqlite路徑] [--date=2025-01-02,2025-01-03] [--rebuild]"""
+    try:
+        options = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+
+        db = Database(options.get('database'))
+        db.ensure_schema()
+
+        cube = OptionCube(db, dates_per_batch=int(options.get('dates-per-batch', 20)),
+                          batch_size=int(options.get('batch-size', 5000)))
+        started = time.perf_counter()
+        if '--rebuild' in sys.argv:
+            cube.rebuild()
+        dates = [d for d in options['date'].split(',') if d] if options.get('date') else None
+        stats = cube.run(dates)
+        stats['seconds'] = round(time.perf_counter() - started, 2)
+        db.close()
+
+        print(json.dumps({'success': True, **stats}, ensure_ascii=False))
+
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }, ensure_ascii=False))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+全市場配對與共整合掃描
+由模型端股價快取組成對數價格矩陣，先以報酬率相關係數矩陣（分塊矩陣乘法）篩選候選配對，
+再以 Engle-Granger 兩步驟法（OLS 避險比率 + 殘差 adfuller）在程序池中檢定，
+結果（避險比率、半衰期、價差 z 分數）保存於 storage/app/pairs
+
+每日增量更新：只重新檢定既有候選配對，避險比率以視窗充分統計量（加入新交易日、扣除移出視窗的交易日）
+更新，ADF 沿用全掃描時選定的落後期；候選名單超過 rescan_days 天、視窗設定改變或資料無法對齊時重新全掃描
+"""
+
+import sys
+import os
+import json
+import time
+import tempfile
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+from statsmodels.tsa.stattools import adfuller
+from statsmodels.tsa.adfvalues import mackinnonp
+
+from price_cache import PriceCache
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+from arima_model import ARIMAPredictor
+
+# 預設輸出目錄：Laravel storage/app/pairs
+DEFAULT_PAIRS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'storage', 'app', 'pairs'
+)
+
+STATE_FILE = 'state.npz'
+RESULT_FILE = 'pairs.json'
+
+# 視窗充分統計量欄位：n, Σx, Σy, Σx², Σxy, Σy²
+SUM_FIELDS = ('n', 'sx', 'sy', 'sxx', 'sxy', 'syy')
+
+# 檢定結果欄位（state.npz 中的 result 矩陣）
+RESULT_FIELDS = ('alpha', 'beta', 'adf_statistic', 'p_value', 'half_life', 'zscore')
+
+
+def load_universe(cache, symbols, days, ffill_limit=5):
+    """
+    讀取股價快取並對齊為對數收盤價矩陣
+
+    停牌等短暫缺值以前值補齊（最多 ffill_limit 個交易日），補齊後仍有缺值的股票不納入
+
+    Args:
+        cache: PriceCache
+        symbols: 股票代號
+        days: 每檔讀取的最近交易日數
+        ffill_limit: 最多補齊的連續缺值交易日數
+
+    Returns:
+        dates: 交易日 (datetime64[D])
+        symbols: 納入的股票代號
+        log_prices: 對數收盤價矩陣 (交易日數 × 股票數)
+    """
+    series = {}
+    for symbol in symbols:
+        data = cache.load(symbol, days)
+        if data is not None and len(data['dates']) and np.all(data['close'] > 0):
+            series[symbol] = data
+
+    if not series:
+        return np.array([], dtype='datetime64[D]'), [], np.empty((0, 0))
+
+    # 以全市場最近 days 個交易日為共同日期軸
+    dates = np.unique(np.concatenate([data['dates'] for data in series.values()]))[-days:]
+    matrix = np.full((len(dates), len(series)), np.nan)
+    for column, data in enumerate(series.values()):
+        rows = np.searchsorted(dates, data['dates'])
+        keep = (rows < len(dates)) & (dates[np.minimum(rows, len(dates) - 1)] == data['dates'])
+        matrix[rows[keep], column] = np.log(data['close'][keep])
+
+    # 向量化前值補齊：每格取同欄最近一個有值的列，距離超過 ffill_limit 則維持缺值
+    index = np.where(np.isnan(matrix), 0, np.arange(len(dates))[:, None])
+    np.maximum.accumulate(index, axis=0, out=index)
+    filled = np.take_along_axis(matrix, index, axis=0)
+    gap = np.arange(len(dates))[:, None] - index
+    filled[gap > ffill_limit] = np.nan
+
+    complete = ~np.isnan(filled).any(axis=0)
+    names = [symbol for symbol, ok in zip(series, complete) if ok]
+    return dates, names, np.ascontiguousarray(filled[:, complete])
+
+
+def correlated_pairs(log_prices, min_correlation=0.7, block_size=512):
+    """
+    以報酬率相關係數篩選候選配對
+
+    標準化報酬率矩陣 Z 後，相關係數矩陣即 ZᵀZ / (T-1)；以分塊矩陣乘法計算，
+    每次只保留一個 block_size × N 的區塊，記憶體與股票數成線性
+
+    Args:
+        log_prices: 對數價格矩陣 (交易日數 × 股票數)
+        min_correlation: 最低相關係數（只取正相關）
+        block_size: 每個區塊的股票數
+
+    Returns:
+        first, second: 配對的欄位索引 (first < second)
+        correlation: 相關係數
+    """
+    returns = np.diff(log_prices, axis=0)
+    std = returns.std(axis=0, ddof=1)
+    std[std == 0] = np.inf
+    z = (returns - returns.mean(axis=0)) / std
+    n_symbols = z.shape[1]
+
+    first, second, correlation = [], [], []
+    for start in range(0, n_symbols, block_size):
+        stop = min(start + block_size, n_symbols)
+        block = z[:, start:stop].T @ z[:, start:] / (len(z) - 1)
+        # 只取上三角（第二檔索引大於第一檔）
+        rows, cols = np.nonzero(np.triu(block >= min_correlation, k=1))
+        first.append(rows + start)
+        second.append(cols + start)
+        correlation.append(block[rows, cols])
+
+    if not first:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([])
+    return np.concatenate(first), np.concatenate(second), np.concatenate(correlation)
+
+
+def window_sums(x, y):
+    """
+    配對視窗的迴歸充分統計量
+
+    Args:
+        x, y: (交易日數 × 配對數) 矩陣
+
+    Returns:
+        sums: (配對數 × 6)，欄位依 SUM_FIELDS
+    """
+    return np.column_stack([np.full(x.shape[1], len(x), dtype=np.float64),
+                            x.sum(axis=0), y.sum(axis=0),
+                            (x * x).sum(axis=0), (x * y).sum(axis=0), (y * y).sum(axis=0)])
+
+
+def hedge_from_sums(sums):
+    """
+    由充分統計量計算 y = alpha + beta * x 的 OLS 係數
+
+    Args:
+        sums: window_sums 的結果
+
+    Returns:
+        alpha, beta: 截距與避險比率
+    """
+    n, sx, sy, sxx, sxy = (sums[:, i] for i in range(5))
+    var = sxx - sx * sx / n
+    beta = np.where(var > 0, (sxy - sx * sy / n) / np.where(var > 0, var, 1), np.nan)
+    alpha = (sy - beta * sx) / n
+    return alpha, beta
+
+
+def half_life(spread):
+    """
+    價差均值回復半衰期：Δs_t = c + φ s_{t-1} 的 φ 換算為 -ln 2 / ln(1 + φ)
+
+    Args:
+        spread: 價差序列
+
+    Returns:
+        half_life: 交易日數（不回復時為 inf）
+    """
+    lagged = spread[:-1] - spread[:-1].mean()
+    delta = np.diff(spread)
+    denom = float(lagged @ lagged)
+    phi = float(lagged @ (delta - delta.mean())) / denom if denom > 0 else 0.0
+    if not -1 < phi < 0:
+        return np.inf
+    return float(-np.log(2) / np.log1p(phi))
+
+
+def engle_granger(x, y, alpha, beta, lag=None):
+    """
+    Engle-Granger 共整合檢定（殘差 ADF，與 statsmodels coint 相同：殘差不含常數項，
+    p 值採 MacKinnon 兩變數共整合分配）
+
+    Args:
+        x, y: 對數價格序列
+        alpha, beta: 避險迴歸係數
+        lag: ADF 落後期（None 時以 ARIMAPredictor.select_adf_lag 依 AIC 選擇）
+
+    Returns:
+        statistic, p_value, lag, half_life, zscore
+    """
+    spread = y - beta * x - alpha
+    if lag is None:
+        lag = ARIMAPredictor.select_adf_lag(spread)
+    statistic = float(adfuller(spread, maxlag=int(lag), autolag=None, regression='n')[0])
+    p_value = float(mackinnonp(statistic, regression='c', N=2))
+    std = spread.std()
+    zscore = float(spread[-1] / std) if std > 0 else 0.0
+    return statistic, p_value, int(lag), half_life(spread), zscore
+
+
+# 程序池子程序共用的對數價格矩陣（由 initializer 設定，避免每個工作重複序列化）
+_PRICES = None
+
+
+def _init_worker(log_prices):
+    global _PRICES
+    _PRICES = log_prices
+
+
+def _test_chunk(task):
+    """
+    檢定一批配對
+
+    Args:
+        task: (first, second, alpha, beta, lag, both_directions)；
+              both_directions 時兩個方向都檢定，保留統計量較小（較顯著）的方向
+
+    Returns:
+        rows: (swapped, alpha, beta, statistic, p_value, lag, half_life, zscore) 列表
+    """
+    first, second, alphas, betas, lags, both = task
+    rows = []
+    for i, j, alpha, beta, lag in zip(first, second, alphas, betas, lags):
+        x, y = _PRICES[:, i], _PRICES[:, j]
+        lag = None if lag < 0 else lag
+        best = (False, alpha, beta) + engle_granger(x, y, alpha, beta, lag)
+        if both:
+            r_alpha, r_beta = hedge_from_sums(window_sums(y[:, None], x[:, None]))
+            reverse = (True, float(r_alpha[0]), float(r_beta[0])) + engle_granger(y, x, r_alpha[0], r_beta[0])
+            if reverse[3] < best[3]:
+                best = reverse
+        rows.append(best)
+    return rows
+
+
+class PairsScanner:
+    """全市場配對共整合掃描器"""
+
+    def __init__(self, cache=None, pairs_dir=None, window=250, min_correlation=0.7, max_p_value=0.05,
+                 max_half_life=60, rescan_days=7, workers=None, chunk_size=500, ffill_limit=5):
+        """
+        初始化
+
+        Args:
+            cache: PriceCache（預設 storage/app/price_cache）
+            pairs_dir: 輸出目錄（預設 storage/app/pairs，可用 STOCK_PAIRS_DIR 覆寫）
+            window: 檢定視窗交易日數
+            min_correlation: 報酬率相關係數篩選門檻
+            max_p_value: 共整合 p 值門檻
+            max_half_life: 半衰期上限（交易日）
+            rescan_days: 候選名單重新全掃描的天數
+            workers: 程序數（None 為 CPU 數，1 為不使用程序池）
+            chunk_size: 每個程序工作的配對數
+            ffill_limit: 停牌缺值最多補齊的交易日數
+        """
+        self.cache = cache or PriceCache()
+        self.pairs_dir = pairs_dir or os.environ.get('STOCK_PAIRS_DIR', DEFAULT_PAIRS_DIR)
+        self.window = window
+        self.min_correlation = min_correlation
+        self.max_p_value = max_p_value
+        self.max_half_life = max_half_life
+        self.rescan_days = rescan_days
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.ffill_limit = ffill_limit
+        self.stats = {}
+        os.makedirs(self.pairs_dir, exist_ok=True)
+
+    def _symbols(self):
+        return sorted(name[:-4] for name in os.listdir(self.cache.cache_dir) if name.endswith('.npz'))
+
+    def _run_tests(self, log_prices, first, second, alpha, beta, lags, both):
+        """分批於程序池檢定配對，回傳結果矩陣（依 _test_chunk 欄位）"""
+        tasks = [(first[s:s + self.chunk_size], second[s:s + self.chunk_size], alpha[s:s + self.chunk_size],
+                  beta[s:s + self.chunk_size], lags[s:s + self.chunk_size], both)
+                 for s in range(0, len(first), self.chunk_size)]
+        workers = min(self.workers, len(tasks))
+        if workers <= 1:
+            _init_worker(log_prices)
+            chunks = [_test_chunk(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(log_prices,)) as executor:
+                chunks = list(executor.map(_test_chunk, tasks))
+        self.stats['workers'] = max(workers, 1)
+        rows = [row for chunk in chunks for row in chunk]
+        return np.array(rows, dtype=np.float64).reshape(-1, 8)
+
+    def scan(self, symbols=None):
+        """
+        全市場掃描：相關係數篩選 + 所有候選配對雙向共整合檢定
+
+        Args:
+            symbols: 股票代號（None 為快取中的全部股票）
+
+        Returns:
+            pairs: 通過門檻的配對（依 p 值排序）
+        """
+        started = time.perf_counter()
+        dates, names, log_prices = load_universe(self.cache, symbols or self._symbols(),
+                                                 self.window, self.ffill_limit)
+        if len(dates) < self.window:
+            raise ValueError(f'共同交易日不足 {self.window} 天（目前 {len(dates)} 天）')
+
+        first, second, correlation = correlated_pairs(log_prices, self.min_correlation)
+        self.stats.update({'mode': 'scan', 'symbols': len(names), 'pairs_total': len(names) * (len(names) - 1) // 2,
+                           'candidates': len(first)})
+
+        sums = window_sums(log_prices[:, first], log_prices[:, second])
+        alpha, beta = hedge_from_sums(sums)
+        tested = self._run_tests(log_prices, first, second, alpha, beta, np.full(len(first), -1), True)
+
+        # 反向較顯著的配對交換自變數與應變數，充分統計量一併重算
+        swapped = tested[:, 0].astype(bool)
+        first[swapped], second[swapped] = second[swapped], first[swapped].copy()
+        sums[swapped] = window_sums(log_prices[:, first[swapped]], log_prices[:, second[swapped]])
+
+        state = {
+            'symbols': np.array(names), 'dates': dates, 'first': first, 'second': second,
+            'correlation': correlation, 'sums': sums, 'lags': tested[:, 5].astype(np.int64),
+            'result': tested[:, [1, 2, 3, 4, 6, 7]], 'scanned_at': np.array(datetime.now().isoformat()),
+            'window': np.array(self.window),
+        }
+        self.stats['seconds'] = round(time.perf_counter() - started, 2)
+        return self._finish(state)
+
+    def update(self, force_scan=False):
+        """
+        每日增量更新；沒有可用的候選名單時改為全掃描
+
+        Args:
+            force_scan: 強制重新全掃描
+
+        Returns:
+            pairs: 通過門檻的配對（依 p 值排序）
+        """
+        state = None if force_scan else self.load_state()
+        if state is None or not self._state_usable(state):
+            return self.scan()
+
+        started = time.perf_counter()
+        names = list(state['symbols'])
+        dates, loaded, log_prices = load_universe(self.cache, names, self.window * 2, self.ffill_limit)
+        old_end = np.searchsorted(dates, state['dates'][-1])
+        if loaded != names or old_end >= len(dates) or dates[old_end] != state['dates'][-1] \
+                or old_end + 1 < self.window:
+            # 有股票下市、缺值超過補齊上限或舊視窗已不在快取中：無法對齊，重新全掃描
+            return self.scan()
+
+        first, second, sums = state['first'], state['second'], state['sums'].copy()
+        new_end = len(dates) - 1
+        added = np.arange(old_end + 1, new_end + 1)
+        dropped = np.arange(old_end + 1 - self.window, new_end + 1 - self.window)
+        if len(added):
+            sums += window_sums(log_prices[added][:, first], log_prices[added][:, second])
+            sums -= window_sums(log_prices[dropped][:, first], log_prices[dropped][:, second])
+            sums[:, 0] = self.window
+
+        log_prices = np.ascontiguousarray(log_prices[-self.window:])
+        alpha, beta = hedge_from_sums(sums)
+        tested = self._run_tests(log_prices, first, second, alpha, beta, state['lags'], False)
+
+        state.update({'dates': dates[-self.window:], 'sums': sums, 'result': tested[:, [1, 2, 3, 4, 6, 7]]})
+        self.stats.update({'mode': 'update', 'symbols': len(names), 'candidates': len(first),
+                           'new_days': int(len(added)), 'seconds': round(time.perf_counter() - started, 2)})
+        return self._finish(state)
+
+    def _state_usable(self, state):
+        try:
+            age = datetime.now() - datetime.fromisoformat(str(state['scanned_at']))
+        except ValueError:
+            return False
+        return int(state['window']) == self.window and age.days < self.rescan_days and len(state['first']) > 0
+
+    def _finish(self, state):
+        self.save_state(state)
+        pairs = self.select(state)
+        self.stats['cointegrated'] = len(pairs)
+        self.stats['as_of'] = str(state['dates'][-1])
+        self.write_results(pairs, state)
+        return pairs
+
+    def select(self, state):
+        """
+        由檢定結果挑出共整合且半衰期合理的配對
+
+        Args:
+            state: 掃描狀態
+
+        Returns:
+            pairs: [{'dependent', 'independent', 'hedge_ratio', ...}]，依 p 值排序
+        """
+        result = dict(zip(RESULT_FIELDS, state['result'].T))
+        mask = (result['p_value'] <= self.max_p_value) & (result['half_life'] <= self.max_half_life)
+        names = state['symbols']
+        pairs = []
+        for k in np.flatnonzero(mask)[np.argsort(result['p_value'][mask], kind='stable')]:
+            pairs.append({
+                # 價差 = log(dependent) - hedge_ratio * log(independent) - intercept
+                'dependent': str(names[state['second'][k]]),
+                'independent': str(names[state['first'][k]]),
+                'correlation': round(float(state['correlation'][k]), 4),
+                'hedge_ratio': round(float(result['beta'][k]), 6),
+                'intercept': round(float(result['alpha'][k]), 6),
+                'adf_statistic': round(float(result['adf_statistic'][k]), 4),
+                'p_value': round(float(result['p_value'][k]), 6),
+                'half_life': round(float(result['half_life'][k]), 2),
+                'zscore': round(float(result['zscore'][k]), 3),
+                'lag': int(state['lags'][k]),
+            })
+        return pairs
+
+    def load_state(self):
+        """讀取上次的掃描狀態，不存在或損毀時回傳 None"""
+        try:
+            with np.load(os.path.join(self.pairs_dir, STATE_FILE)) as archive:
+                return {name: archive[name] for name in archive.files}
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save_state(self, state):
+        """寫入掃描狀態（先寫暫存檔再置換）"""
+        fd, temp_path = tempfile.mkstemp(dir=self.pairs_dir, suffix='.npz')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **state)
+        os.replace(temp_path, os.path.join(self.pairs_dir, STATE_FILE))
+
+    def write_results(self, pairs, state):
+        """寫入 pairs.json 供 Laravel 讀取"""
+        content = {
+            'as_of': str(state['dates'][-1]),
+            'scanned_at': str(state['scanned_at']),
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'window': self.window,
+            'pairs': pairs,
+        }
+        fd, temp_path = tempfile.mkstemp(dir=self.pairs_dir, suffix='.json')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(content, f, ensure_ascii=False)
+        os.replace(temp_path, os.path.join(self.pairs_dir, RESULT_FILE))
+
+
+def main():
+    """
+    主函數：python pairs_scanner.py [--scan] [--refresh-cache] [--database=sqlite路徑] [--workers=N]
+            [--window=250] [--min-correlation=0.7] [--max-p-value=0.05] [--max-half-life=60]
+    """
+    try:
+        options = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+
+        cache = PriceCache()
+        if '--refresh-cache' in sys.argv:
+            from db import Database
+            db = Database(options.get('database'))
+            cache.refresh_from_db(db)
+            db.close()
+
+        scanner = PairsScanner(
+            cache,
+            window=int(options.get('window', 250)),
+            min_correlation=float(options.get('min-correlation', 0.7)),
+            max_p_value=float(options.get('max-p-value', 0.05)),
+            max_half_life=float(options.get('max-half-life', 60)),
+            workers=int(options['workers']) if 'workers' in options else None,
+        )
+        pairs = scanner.update(force_scan='--scan' in sys.argv)
+
+        print(json.dumps({'success': True, **scanner.stats, 'top_pairs': pairs[:20]}, ensure_ascii=False))
+
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }, ensure_ascii=False))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+收盤後預先計算下一交易日預測
+每日資料匯入後依 TWSE 交易日曆執行：對觀察清單（或全市場）依優先順序排入 ARIMA / GARCH（可選 LSTM）工作，
+以 ModelJobScheduler 在 CPU 預算與時間預算內並行計算，結果寫入 storage/app/forecasts/{模型}/{代號}.json，
+PredictionService 查詢時若資料日與資料庫最新交易日相同即直接回傳，不必等待模型重新訓練
+"""
+
+import sys
+import os
+import json
+import time
+import hashlib
+import tempfile
+import shutil
+from datetime import datetime, date
+
+import numpy as np
+
+from price_cache import PriceCache
+from scheduler import ModelJobScheduler, available_cpus
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+from twse_calendar import TwseCalendar
+
+STORAGE_APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'storage', 'app')
+
+# 預設輸出目錄：Laravel storage/app/forecasts
+DEFAULT_FORECAST_DIR = os.path.join(STORAGE_APP_DIR, 'forecasts')
+
+# 預設觀察清單（JSON 陣列，依優先順序排列）：storage/app/forecast_watchlist.json，可用 STOCK_FORECAST_WATCHLIST 覆寫
+DEFAULT_WATCHLIST_FILE = os.path.join(STORAGE_APP_DIR, 'forecast_watchlist.json')
+
+MANIFEST_FILE = 'manifest.json'
+
+# 與 PredictionService 預設參數相同的模型輸入（歷史天數、最少資料天數、模型參數）
+MODEL_DEFAULTS = {
+    'arima': {
+        'historical_days': 100,
+        'min_days': 30,
+        'params': {'p': None, 'd': None, 'q': None, 'auto_select': True, 'fit_method': 'exact'},
+    },
+    'garch': {
+        'historical_days': 200,
+        'min_days': 100,
+        'params': {'p': 1, 'q': 1, 'dist': 'normal', 'vol': 'GARCH', 'select': False, 'criterion': 'bic'},
+    },
+    'lstm': {
+        'historical_days': 200,
+        'min_days': 100,
+        'params': {'epochs': None, 'units': None, 'lookback': None, 'dropout': None,
+                   'use_best_config': True, 'fast_train': False},
+    },
+}
+
+# 與 PredictionService::getValidationInput 相同的資料驗證預設值
+VALIDATION_DEFAULTS = {'validate': False, 'adjust_jumps': True}
+
+# 成交值排序使用的天數
+TURNOVER_DAYS = 20
+
+
+def load_watchlist(path=None):
+    """
+    讀取觀察清單
+
+    Args:
+        path: JSON 檔路徑（預設 STOCK_FORECAST_WATCHLIST 或 storage/app/forecast_watchlist.json）
+
+    Returns:
+        symbols: 股票代號列表；檔案不存在或格式錯誤時回傳空列表
+    """
+    path = path or os.environ.get('STOCK_FORECAST_WATCHLIST', DEFAULT_WATCHLIST_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            return [str(symbol) for symbol in json.load(f)]
+    except (OSError, ValueError, TypeError):
+        return []
+
+
+def prioritize(watchlist, universe, turnover):
+    """
+    決定計算順序：觀察清單依原順序在前，其餘股票依近期平均成交值由大到小
+
+    Args:
+        watchlist: 觀察清單股票代號
+        universe: 其餘要計算的股票代號（不需全市場時傳入空列表）
+        turnover: {股票代號: 平均成交值}
+
+    Returns:
+        symbols: 去除重複後的股票代號列表
+    """
+    ordered = list(dict.fromkeys(watchlist))
+    seen = set(ordered)
+    rest = sorted((s for s in universe if s not in seen), key=lambda s: (-turnover.get(s, 0.0), s))
+    return ordered + rest
+
+
+def input_hash(input_data):
+    """模型輸入的雜湊值，用來判斷既有預測是否可沿用"""
+    content = json.dumps(input_data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+
+
+def build_input(model_type, symbol, data, prediction_days, weights_dir=None):
+    """
+    建立與 PredictionService 相同格式的模型輸入
+
+    預測基準日為資料最後交易日（而非執行當下），預測第 1 天即為下一交易日
+
+    Args:
+        model_type: arima / garch / lstm
+        symbol: 股票代號
+        data: PriceCache.load() 的結果（已截取歷史天數）
+        prediction_days: 預測天數
+        weights_dir: LSTM 匯出權重目錄（預設 storage/app/lstm_weights）
+
+    Returns:
+        input_data: 模型輸入字典
+    """
+    defaults = MODEL_DEFAULTS[model_type]
+    input_data = {
+        'prices': [float(x) for x in data['close']],
+        'dates': [str(d) for d in data['dates']],
+        'base_date': str(data['dates'][-1]),
+        'prediction_days': prediction_days,
+        'stock_symbol': symbol,
+        **defaults['params'],
+        **VALIDATION_DEFAULTS,
+        'opens': [float(x) for x in data['open']],
+        'highs': [float(x) for x in data['high']],
+        'lows': [float(x) for x in data['low']],
+        'volumes': [int(x) for x in data['volume']],
+    }
+    if model_type == 'lstm':
+        weights_dir = weights_dir or os.path.join(STORAGE_APP_DIR, 'lstm_weights')
+        input_data['export_path'] = os.path.join(weights_dir, f'{symbol}.npz')
+    return input_data
+
+
+class ForecastPrecomputer:
+    """收盤後預先計算預測並保存供 PredictionService 直接讀取"""
+
+    def __init__(self, cache, forecast_dir=None, models=('arima', 'garch'), prediction_days=7,
+                 max_cpus=None, budget_seconds=1800, batch_size=None, calendar=None):
+        """
+        初始化
+
+        Args:
+            cache: PriceCache
+            forecast_dir: 輸出目錄（預設 storage/app/forecasts，可用 STOCK_FORECAST_DIR 覆寫）
+            models: 要計算的模型（依此順序排入同一檔股票的工作）
+            prediction_days: 預測天數（PredictionService 依請求天數截取）
+            max_cpus: 最多使用的核心數（None 表示全部可用核心）
+            budget_seconds: 時間預算，超過後不再排入新工作，已啟動的工作仍會完成
+            batch_size: 每批排入排程器的工作數（預設為核心數的兩倍）
+            calendar: TwseCalendar
+        """
+        unknown = [m for m in models if m not in MODEL_DEFAULTS]
+        if unknown:
+            raise ValueError(f"不支援的模型類型: {', '.join(unknown)}")
+
+        self.cache = cache
+        self.forecast_dir = forecast_dir or os.environ.get('STOCK_FORECAST_DIR', DEFAULT_FORECAST_DIR)
+        self.models = list(models)
+        self.prediction_days = prediction_days
+        self.max_cpus = max_cpus
+        self.budget_seconds = budget_seconds
+        cpus = len(available_cpus()[:max_cpus] if max_cpus else available_cpus())
+        self.batch_size = batch_size or 2 * cpus
+        self.calendar = calendar or TwseCalendar()
+
+    def forecast_path(self, model_type, symbol):
+        return os.path.join(self.forecast_dir, model_type, f'{symbol}.json')
+
+    def load_forecast(self, model_type, symbol):
+        """
+        讀取已保存的預測
+
+        Returns:
+            content: 預測檔內容；不存在或損毀時回傳 None
+        """
+        try:
+            with open(self.forecast_path(model_type, symbol), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_json(self, path, content):
+        """先寫暫存檔再置換，讀取端不會讀到寫到一半的檔案"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.json')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(content, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def turnover(self, symbols):
+        """
+        各股近期平均成交值（收盤價 × 成交量），作為全市場計算的優先順序
+
+        Returns:
+            turnover: {股票代號: 平均成交值}
+        """
+        result = {}
+        for symbol in symbols:
+            data = self.cache.load(symbol, TURNOVER_DAYS)
+            if data is not None and len(data['close']):
+                result[symbol] = float(np.mean(data['close'] * data['volume']))
+        return result
+
+    def plan(self, symbols, force=False):
+        """
+        建立工作清單：資料不足的略過，輸入與既有預測相同者沿用（force 時全部重算）
+
+        Args:
+            symbols: 依優先順序排列的股票代號
+            force: 是否忽略既有預測
+
+        Returns:
+            jobs: [(模型, 代號, 輸入資料, 輸入雜湊)]
+            counts: {'fresh': 沿用數, 'insufficient': 資料不足數, 'missing': 無快取股票數}
+        """
+        longest = max(MODEL_DEFAULTS[m]['historical_days'] for m in self.models)
+        jobs, counts = [], {'fresh': 0, 'insufficient': 0, 'missing': 0}
+        for symbol in symbols:
+            data = self.cache.load(symbol, longest)
+            if data is None or not len(data['close']):
+                counts['missing'] += 1
+                continue
+
+            for model_type in self.models:
+                defaults = MODEL_DEFAULTS[model_type]
+                window = {name: values[-defaults['historical_days']:] for name, values in data.items()}
+                if len(window['close']) < defaults['min_days']:
+                    counts['insufficient'] += 1
+                    continue
+
+                input_data = build_input(model_type, symbol, window, self.prediction_days)
+                digest = input_hash(input_data)
+                existing = None if force else self.load_forecast(model_type, symbol)
+                if existing is not None and existing.get('input_hash') == digest:
+                    counts['fresh'] += 1
+                    continue
+                jobs.append((model_type, symbol, input_data, digest))
+        return jobs, counts
+
+    def run(self, symbols, force=False):
+        """
+        依優先順序分批計算預測
+
+        每批排入 batch_size 個工作交給 ModelJobScheduler 依成本等級分配核心；
+        每批開始前檢查時間預算，超過即停止，未計算的股票留給 PredictionService 即時計算
+
+        Args:
+            symbols: 依優先順序排列的股票代號
+            force: 是否忽略既有預測
+
+        Returns:
+            stats: 執行統計（同時寫入 manifest.json）
+        """
+        started = time.time()
+        started_at = datetime.now().isoformat(timespec='seconds')
+        jobs, counts = self.plan(symbols, force)
+
+        work_dir = tempfile.mkdtemp(prefix='forecast_inputs_')
+        computed, failed, as_of_dates = 0, [], []
+        submitted = 0
+        try:
+            while submitted < len(jobs):
+                if time.time() - started >= self.budget_seconds:
+                    break
+
+                batch = jobs[submitted:submitted + self.batch_size]
+                scheduler = ModelJobScheduler(max_cpus=self.max_cpus)
+                for k, (model_type, symbol, input_data, _) in enumerate(batch):
+                    input_file = os.path.join(work_dir, f'{submitted + k}.json')
+                    with open(input_file, 'w', encoding='utf-8') as f:
+                        json.dump(input_data, f, ensure_ascii=False)
+                    scheduler.submit(model_type, input_file, job_id=submitted + k)
+                submitted += len(batch)
+
+                for job in scheduler.run():
+                    model_type, symbol, input_data, digest = jobs[job['job_id']]
+                    result = job['result'] or {}
+                    if not result.get('success'):
+                        failed.append({'model_type': model_type, 'symbol': symbol,
+                                       'error': str(result.get('error', ''))[-500:]})
+                        continue
+
+                    as_of = input_data['dates'][-1]
+                    self._write_json(self.forecast_path(model_type, symbol), {
+                        'symbol': symbol,
+                        'model_type': model_type,
+                        'computed_at': datetime.now().isoformat(timespec='seconds'),
+                        'as_of': as_of,
+                        'valid_for': str(self.calendar.offset(as_of, 1)),
+                        'prediction_days': self.prediction_days,
+                        'historical_days': len(input_data['prices']),
+                        # PredictionService 以合併預設值後的請求參數逐一比對，相同時才沿用
+                        'parameters': {**MODEL_DEFAULTS[model_type]['params'], **VALIDATION_DEFAULTS},
+                        'input_hash': digest,
+                        'elapsed_seconds': job['elapsed_seconds'],
+                        'result': result,
+                    })
+                    computed += 1
+                    as_of_dates.append(as_of)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        skipped = [{'model_type': m, 'symbol': s} for m, s, _, _ in jobs[submitted:]]
+        stats = {
+            'started_at': started_at,
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'models': self.models,
+            'prediction_days': self.prediction_days,
+            'symbols': len(symbols),
+            'jobs': len(jobs),
+            'computed': computed,
+            'fresh': counts['fresh'],
+            'insufficient': counts['insufficient'],
+            'missing': counts['missing'],
+            'failed': len(failed),
+            'budget_exhausted': len(skipped),
+            'as_of': max(as_of_dates) if as_of_dates else None,
+            'seconds': round(time.time() - started, 2),
+        }
+        self._write_json(os.path.join(self.forecast_dir, MANIFEST_FILE),
+                         {**stats, 'failures': failed[:100], 'not_computed': skipped[:500]})
+        return stats
+
+
+def main():
+    """
+    主函數：python precompute_forecasts.py [--symbols=2330,2317] [--watchlist=JSON路徑] [--universe]
+    [--models=arima,garch,lstm] [--prediction-days=7] [--max-cpus=N] [--budget-seconds=1800]
+    [--refresh-cache] [--database=sqlite路徑] [--date=YYYY-MM-DD] [--force]
+    """
+    try:
+        options = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+        force = '--force' in sys.argv
+
+        # 只在交易日收盤後執行（休市日資料不會變動，前一交易日的預測仍然有效）
+        calendar = TwseCalendar()
+        today = np.datetime64(options.get('date', date.today().isoformat()), 'D')
+        if not calendar.is_trading_day(today) and not force:
+            print(json.dumps({
+                'success': True,
+                'skipped': True,
+                'reason': 'not_trading_day',
+                'date': str(today),
+                'next_session': str(calendar.offset(today, 0)),
+            }, ensure_ascii=False))
+            return
+
+        if 'symbols' in options:
+            watchlist = [s for s in options['symbols'].split(',') if s]
+        else:
+            watchlist = load_watchlist(options.get('watchlist'))
+
+        cache = PriceCache()
+        if '--refresh-cache' in sys.argv:
+            from db import Database
+            db = Database(options.get('database'))
+            cache.refresh_from_db(db, None if '--universe' in sys.argv else watchlist)
+            db.close()
+
+        universe = []
+        if '--universe' in sys.argv:
+            universe = sorted(name[:-4] for name in os.listdir(cache.cache_dir) if name.endswith('.npz'))
+        if not watchlist and not universe:
+            raise ValueError('未指定觀察清單，請以 --symbols、--watchlist 或 --universe 指定計算範圍')
+
+        precomputer = ForecastPrecomputer(
+            cache,
+            models=[m for m in options.get('models', 'arima,garch').split(',') if m],
+            prediction_days=int(options.get('prediction-days', 7)),
+            max_cpus=int(options['max-cpus']) if 'max-cpus' in options else None,
+            budget_seconds=float(options.get('budget-seconds', 1800)),
+            calendar=calendar,
+        )
+        symbols = prioritize(watchlist, universe, precomputer.turnover(universe) if universe else {})
+        stats = precomputer.run(symbols, force=force)
+
+        print(json.dumps({
+            'success': True,
+            'date': str(today),
+            'next_session': str(calendar.offset(today, 1)),
+            **stats,
+        }, ensure_ascii=False))
+
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }, ensure_ascii=False))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+模型端股價快取
+每檔股票一個 .npz（日期、OHLCV 陣列），供模型與批次工作直接讀取，不必再查詢資料庫
+"""
+
+import sys
+import os
+import json
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+# 預設快取目錄：Laravel storage/app/price_cache
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'storage', 'app', 'price_cache'
+)
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class PriceCache:
+    """以股票代號為鍵的 OHLCV 陣列快取"""
+
+    def __init__(self, cache_dir=None):
+        """
+        初始化快取
+
+        Args:
+            cache_dir: 快取目錄（預設 storage/app/price_cache，可用 STOCK_PRICE_CACHE_DIR 覆寫）
+        """
+        self.cache_dir = cache_dir or os.environ.get('STOCK_PRICE_CACHE_DIR', DEFAULT_CACHE_DIR)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, symbol):
+        return os.path.join(self.cache_dir, f'{symbol}.npz')
+
+    def load(self, symbol, days=None):
+        """
+        讀取股票價格
+
+        Args:
+            symbol: 股票代號
+            days: 只取最近幾筆（None 為全部）
+
+        Returns:
+            data: {'dates': datetime64[D], 'open', 'high', 'low', 'close', 'volume'}；不存在時回傳 None
+        """
+        try:
+            with np.load(self._path(symbol)) as archive:
+                data = {name: archive[name] for name in ('dates',) + FIELDS}
+        except (OSError, KeyError, ValueError):
+            return None
+
+        if days:
+            data = {name: values[-days:] for name, values in data.items()}
+        return data
+
+    def save(self, symbol, data):
+        """
+        寫入股票價格（先寫暫存檔再置換）
+
+        Args:
+            symbol: 股票代號
+            data: load() 格式的字典
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.npz')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **{name: data[name] for name in ('dates',) + FIELDS})
+        os.replace(temp_path, self._path(symbol))
+
+    def update(self, symbol, data):
+        """
+        合併新資料：相同日期以新資料為準，並依日期排序
+
+        Args:
+            symbol: 股票代號
+            data: load() 格式的字典
+        """
+        existing = self.load(symbol)
+        if existing is not None:
+            keep = ~np.isin(existing['dates'], data['dates'])
+            data = {name: np.concatenate([existing[name][keep], np.asarray(data[name])])
+                    for name in ('dates',) + FIELDS}
+
+        order = np.argsort(data['dates'], kind='stable')
+        self.save(symbol, {name: np.asarray(values)[order] for name, values in data.items()})
+
+    def refresh_from_db(self, db, symbols=None, batch_symbols=200):
+        """
+        從資料庫重建快取（每次讀取一批股票，記憶體只保留該批資料）
+
+        Args:
+            db: db.Database
+            symbols: 要重建的股票代號（None 為全部）
+            batch_symbols: 每次查詢的股票數
+
+        Returns:
+            count: 重建的股票數
+        """
+        if symbols is None:
+            symbols = [row[0] for row in db.execute('SELECT symbol FROM stocks ORDER BY symbol').fetchall()]
+        symbols = list(symbols)
+
+        count = 0
+        for start in range(0, len(symbols), batch_symbols):
+            batch = symbols[start:start + batch_symbols]
+            placeholders = ', '.join([db.placeholder] * len(batch))
+            cursor = db.execute(
+                'SELECT s.symbol, p.trade_date, p.open, p.high, p.low, p.close, p.volume '
+                'FROM stock_prices p JOIN stocks s ON s.id = p.stock_id '
+                f'WHERE s.symbol IN ({placeholders}) ORDER BY s.symbol, p.trade_date',
+                tuple(batch)
+            )
+            frame = pd.DataFrame(cursor.fetchall(), columns=('symbol', 'dates') + FIELDS)
+            if frame.empty:
+                continue
+
+            frame['dates'] = frame['dates'].astype(str).str[:10]
+            for symbol, group in frame.groupby('symbol', sort=False):
+                self.save(symbol, {
+                    'dates': group['dates'].to_numpy(dtype='datetime64[D]'),
+                    **{name: group[name].to_numpy(dtype=np.float64) for name in FIELDS}
+                })
+                count += 1
+
+        return count
+
+
+def main():
+    """主函數：python price_cache.py [--database=sqlite路徑] [--symbols=2330,2317]（從資料庫重建模型端股價快取）"""
+    try:
+        from db import Database
+
+        options = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+        symbols = [s for s in options['symbols'].split(',') if s] if 'symbols' in options else None
+
+        started = time.perf_counter()
+        cache = PriceCache()
+        db = Database(options.get('database'))
+        count = cache.refresh_from_db(db, symbols)
+        db.close()
+
+        print(json.dumps({
+            'success': True,
+            'symbols': count,
+            'seconds': round(time.perf_counter() - started, 2),
+            'cache_dir': cache.cache_dir,
+        }, ensure_ascii=False))
+
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }, ensure_ascii=False))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
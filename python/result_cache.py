@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+模型結果快取
+以 (模型類型, 參數, 價格資料, 模型另外讀取的檔案狀態) 的雜湊為鍵，將模型輸出的 JSON 存於磁碟，
+支援 TTL 過期與依容量上限的 LRU 淘汰
+"""
+
+import sys
+import os
+import json
+import time
+import hashlib
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+
+# 預設快取目錄：Laravel storage/app/model_cache
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'storage', 'app', 'model_cache'
+)
+
+# 不影響模型輸出的輸入欄位，不列入快取鍵
+IGNORED_FIELDS = {'use_cache', 'priority'}
+
+
+def dependency_files(model_type, input_data):
+    """
+    模型執行時除輸入資料外另外讀取的檔案
+
+    - lstm_numpy：weights_path 權重檔
+    - lstm：use_best_config 時的超參數搜尋最佳設定
+    - garch：select 時的最佳設定備忘與序列篩檢結果
+    - arima：自動選階時的序列篩檢結果
+    - validate：TWSE 休市日清單
+
+    Args:
+        model_type: 模型類型
+        input_data: 模型輸入資料
+
+    Returns:
+        paths: 檔案路徑列表
+    """
+    symbol = input_data.get('stock_symbol')
+    paths = []
+
+    if model_type == 'lstm_numpy' and input_data.get('weights_path'):
+        paths.append(input_data['weights_path'])
+
+    if model_type == 'lstm' and input_data.get('use_best_config', True) and symbol:
+        from lstm_search import config_path
+        paths.append(config_path(symbol))
+
+    if model_type == 'garch' and input_data.get('select'):
+        from garch_selection import spec_path
+        from series_screening import screening_path
+        if symbol:
+            paths.append(spec_path(symbol))
+        if input_data.get('screen', True):
+            paths.append(screening_path())
+
+    if (model_type == 'arima' and input_data.get('auto_select', True) and input_data.get('screen', True)
+            and None in [input_data.get(name) for name in ('p', 'd', 'q')]):
+        from series_screening import screening_path
+        paths.append(screening_path())
+
+    if input_data.get('validate'):
+        from twse_calendar import DEFAULT_HOLIDAY_FILE
+        paths.append(os.environ.get('STOCK_TWSE_HOLIDAYS', DEFAULT_HOLIDAY_FILE))
+
+    return paths
+
+
+def file_signature(path):
+    """檔案的 (路徑, 修改時間, 大小)；不存在時為 (路徑, None, None)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return [path, None, None]
+    return [path, stat.st_mtime_ns, stat.st_size]
+
+
+def cache_key(model_type, input_data):
+    """
+    計算模型輸入的內容雜湊
+
+    模型另外讀取的檔案（權重、最佳設定、篩檢結果等）以修改時間與大小列入，
+    重新訓練或重新篩檢後不會回傳舊結果
+
+    Args:
+        model_type: 模型類型
+        input_data: 模型輸入資料（含參數與價格）
+
+    Returns:
+        key: SHA-256 十六進位字串
+    """
+    payload = {k: v for k, v in input_data.items() if k not in IGNORED_FIELDS}
+    files = [file_signature(path) for path in dependency_files(model_type, input_data)]
+    canonical = json.dumps([model_type, payload, files], sort_keys=True, separators=(',', ':'),
+                           ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """磁碟上的模型結果快取"""
+
+    def __init__(self, cache_dir=None, ttl=None, max_bytes=None):
+        """
+        初始化快取
+
+        Args:
+            cache_dir: 快取目錄（預設 storage/app/model_cache，可用 STOCK_MODEL_CACHE_DIR 覆寫）
+            ttl: 有效秒數（預設 STOCK_MODEL_CACHE_TTL 或 86400）
+            max_bytes: 快取總容量上限（預設 STOCK_MODEL_CACHE_MAX_BYTES 或 100MB）
+        """
+        self.cache_dir = cache_dir or os.environ.get('STOCK_MODEL_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.ttl = ttl if ttl is not None else int(os.environ.get('STOCK_MODEL_CACHE_TTL', 86400))
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.environ.get('STOCK_MODEL_CACHE_MAX_BYTES', 100 * 1024 * 1024))
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def get(self, key):
+        """
+        讀取快取結果
+
+        Args:
+            key: cache_key() 計算的鍵
+
+        Returns:
+            result: 快取的模型輸出；不存在或已過期時回傳 None
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry['created_at'] > self.ttl:
+            self._remove(path)
+            return None
+
+        # 更新修改時間作為 LRU 的最近使用時間
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return entry['result']
+
+    def put(self, key, result):
+        """
+        寫入模型結果並視需要淘汰舊項目
+
+        Args:
+            key: cache_key() 計算的鍵
+            result: 模型輸出
+        """
+        entry = {'created_at': time.time(), 'result': result}
+
+        # 先寫暫存檔再置換，避免並行讀取到寫到一半的檔案
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(temp_path, self._path(key))
+
+        self.evict()
+
+    def evict(self):
+        """刪除過期項目，並依最近使用時間淘汰直到總容量低於上限"""
+        now = time.time()
+        entries = []
+        total = 0
+
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+
+            # 最近使用超過 TTL 的項目必定已過期
+            if now - stat.st_mtime > self.ttl:
+                self._remove(path)
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -7,8 +7,175 @@
 import sys
 import os
 import json
+import time
 import subprocess
 
+from scheduler import budget_for
+from result_cache import ResultCache, cache_key
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+
+from profiling import (profile_threshold, new_run_id, write_capture, input_fingerprint, environment_info,
+                       STARTED_ENV, RUN_ID_ENV)
+
+def model_script_path(model_type):
+    """模型腳本路徑"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(script_dir, 'models', f'{model_type}_model.py')
+
+def model_env(model_type):
+    """依模型成本等級限制 BLAS / TensorFlow 執行緒數，避免多個預測同時執行時搶占全部核心"""
+    env = os.environ.copy()
+    for name, value in budget_for(model_type).to_env().items():
+        env.setdefault(name, value)
+    return env
+
+def execute_model(model_type, input_file):
+    """
+    以子程序執行模型腳本並解析輸出
+
+    Args:
+        model_type: 模型類型
+        input_file: 輸入資料檔案路徑
+
+    Returns:
+        output: 模型輸出的 JSON 物件
+    """
+    model_script = model_script_path(model_type)
+
+    if not os.path.exists(model_script):
+        return {
+            'success': False,
+            'error': f'模型腳本不存在: {model_script}'
+        }
+
+    env = model_env(model_type)
+
+    # 啟用剖析時，子程序與本行程的擷取寫入同一個目錄
+    threshold = profile_threshold()
+    if threshold is not None:
+        run_id = new_run_id(model_type)
+        env[RUN_ID_ENV] = run_id
+        env[STARTED_ENV] = repr(time.time())
+    started = time.perf_counter()
+
+    # 使用子程序執行，避免環境問題
+    python_exe = sys.executable
+    result = subprocess.run(
+        [python_exe, model_script, input_file],
+        capture_output=True,
+        env=env,
+        text=True,
+        encoding='utf-8',
+        errors='replace'
+    )
+
+    elapsed = time.perf_counter() - started
+    if threshold is not None and elapsed >= threshold:
+        record_slow_run(run_id, model_type, input_file, elapsed, threshold, result)
+
+    # 模型腳本失敗時通常仍會輸出 JSON 錯誤訊息，優先使用
+    try:
+        return json.loads(result.stdout)
+    except json.JSONDecodeError:
+        return {
+            'success': False,
+            'error': result.stderr if result.returncode != 0 else result.stdout
+        }
+
+def record_slow_run(run_id, model_type, input_file, elapsed, threshold, result):
+    """
+    記錄慢速執行的整體耗時、子程序狀態、輸入指紋與環境（模型端的 pstats 由子程序寫入同一目錄）
+
+    Args:
+        run_id: 擷取目錄名稱
+        model_type: 模型類型
+        input_file: 輸入資料檔案路徑
+        elapsed: 含子程序啟動的總秒數
+        threshold: 門檻秒數
+        result: subprocess.CompletedProcess
+    """
+    try:
+        with open(input_file, 'r', encoding='utf-8-sig') as f:
+            fingerprint = input_fingerprint(json.load(f))
+    except (OSError, ValueError):
+        fingerprint = None
+
+    try:
+        write_capture(run_id, {'run_model.json': {
+            'model_type': model_type,
+            'elapsed_seconds': round(elapsed, 3),
+            'threshold_seconds': threshold,
+            'returncode': result.returncode,
+            'stderr_tail': result.stderr[-4000:] if result.stderr else '',
+            'input': fingerprint,
+            'environment': environment_info(),
+        }})
+    except OSError:
+        # 剖析記錄失敗不影響模型輸出
+        pass
+
+def stream_model(model_type, input_file):
+    """
+    串流模式：子程序直接沿用本行程的標準輸入 / 輸出，每行 JSON 即時轉送，不經快取與輸出解析
+
+    Args:
+        model_type: 模型類型
+        input_file: 輸入資料檔案路徑
+
+    Returns:
+        returncode: 子程序結束碼
+    """
+    model_script = model_script_path(model_type)
+
+    if not os.path.exists(model_script):
+        print(json.dumps({
+            'success': False,
+            'error': f'模型腳本不存在: {model_script}'
+        }, ensure_ascii=False), flush=True)
+        return 1
+
+    sys.stdout.flush()
+    return subprocess.run([sys.executable, model_script, input_file], env=model_env(model_type)).returncode
+
+def run_with_cache(model_type, input_file, input_data=None):
+    """
+    執行模型，相同模型、參數與價格資料的請求直接回傳快取結果（輸入 use_cache=false 可停用）
+
+    Args:
+        model_type: 模型類型
+        input_file: 輸入資料檔案路徑
+        input_data: 已讀取的輸入資料（None 時從檔案讀取）
+
+    Returns:
+        output: 模型輸出，含 cache 命中資訊
+    """
+    if input_data is None:
+        with open(input_file, 'r', encoding='utf-8-sig') as f:
+            input_data = json.load(f)
+
+    if input_data.get('mode') == 'stream':
+        # 串流輸出為多行 JSON，無法包成單一結果
+        raise ValueError('串流模式須直接以 run_model.py 執行（stream_model），不支援快取或排程')
+
+    if not input_data.get('use_cache', True):
+        return execute_model(model_type, input_file)
+
+    cache = ResultCache()
+    key = cache_key(model_type, input_data)
+
+    cached = cache.get(key)
+    if cached is not None:
+        cached['cache'] = {'hit': True, 'key': key}
+        return cached
+
+    output = execute_model(model_type, input_file)
+    if output.get('success'):
+        cache.put(key, output)
+    output['cache'] = {'hit': False, 'key': key}
+
+    return output
+
 def run_model(model_type, input_file):
     """
     使用子程序執行模型，避免直接載入可能有問題的模組
@@ -18,35 +185,14 @@ def run_model(model_type, input_file):
         input_file: 輸入資料檔案路徑
     """
     try:
-        # 取得腳本目錄
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        model_script = os.path.join(script_dir, 'models', f'{model_type}_model.py')
-
-        if not os.path.exists(model_script):
-            print(json.dumps({
-                'success': False,
-                'error': f'模型腳本不存在: {model_script}'
-            }))
-            return
-
-        # 使用子程序執行，避免環境問題
-        python_exe = sys.executable
-        result = subprocess.run(
-            [python_exe, model_script, input_file],
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            errors='replace'
-        )
-
-        if result.returncode != 0:
-            print(json.dumps({
-                'success': False,
-                'error': result.stderr
-            }))
-        else:
-            # 直接輸出結果
-            print(result.stdout)
+        with open(input_file, 'r', encoding='utf-8-sig') as f:
+            input_data = json.load(f)
+
+        if input_data.get('mode') == 'stream':
+            sys.exit(stream_model(model_type, input_file))
+
+        output = run_with_cache(model_type, input_file, input_data)
+        print(json.dumps(output, ensure_ascii=False))
 
     except Exception as e:
         print(json.dumps({
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+模型工作排程器
+依 CPU 預算並行執行多個模型工作，避免 TensorFlow / BLAS 執行緒超額訂閱
+"""
+
+import sys
+import os
+import json
+import time
+import subprocess
+import tempfile
+from collections import deque
+
+# 模型成本等級
+COST_CLASSES = {
+    'lstm': 'heavy',
+    'lstm_panel': 'heavy',
+    'arima': 'medium',
+    'garch': 'light',
+    'har': 'light',
+    'lstm_numpy': 'light',
+}
+
+# 各成本等級預設的執行緒數（實際會再受可用核心數限制）
+CLASS_THREADS = {
+    'heavy': 4,
+    'medium': 2,
+    'light': 1,
+}
+
+# 排程優先順序：先放重型工作，再以輕型工作填滿剩餘核心
+CLASS_ORDER = ['heavy', 'medium', 'light']
+
+# 控制各數值函式庫執行緒數的環境變數
+THREAD_ENV_VARS = [
+    'OMP_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+]
+
+
+def available_cpus():
+    """
+    取得目前行程可使用的 CPU 編號
+
+    Returns:
+        cpus: CPU 編號列表
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def cost_class(model_type):
+    """
+    取得模型的成本等級，未知模型視為中型工作
+    """
+    return COST_CLASSES.get(model_type, 'medium')
+
+
+class CpuBudget:
+    """單一工作的 CPU 預算"""
+
+    def __init__(self, threads, cpus=None):
+        """
+        初始化 CPU 預算
+
+        Args:
+            threads: 可使用的執行緒數
+            cpus: 綁定的 CPU 編號（None 表示不設定親和性）
+        """
+        self.threads = max(1, int(threads))
+        self.cpus = list(cpus) if cpus else None
+
+    def to_env(self):
+        """
+        轉換為子程序環境變數
+
+        Returns:
+            env: 環境變數字典
+        """
+        env = {name: str(self.threads) for name in THREAD_ENV_VARS}
+
+        # TensorFlow：運算內平行使用全部預算，運算間平行最多 2 條
+        env['TF_NUM_INTRAOP_THREADS'] = str(self.threads)
+        env['TF_NUM_INTEROP_THREADS'] = str(min(2, self.threads))
+
+        return env
+
+    def apply_affinity(self):
+        """將目前行程綁定到預算內的 CPU（僅支援 Linux）"""
+        if self.cpus and hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(0, self.cpus)
+            except OSError:
+                pass
+
+    def to_dict(self):
+        return {'threads': self.threads, 'cpus': self.cpus}
+
+
+def budget_for(model_type, total_cpus=None):
+    """
+    依模型類型計算單一工作的預設 CPU 預算
+
+    Args:
+        model_type: 模型類型 (lstm, arima, garch)
+        total_cpus: 可用核心數
+
+    Returns:
+        budget: CpuBudget
+    """
+    total_cpus = total_cpus or len(available_cpus())
+    threads = min(CLASS_THREADS[cost_class(model_type)], total_cpus)
+    return CpuBudget(threads)
+
+
+class ModelJob:
+    """排程中的模型工作"""
+
+    def __init__(self, job_id, model_type, input_file):
+        self.job_id = job_id
+        self.model_type = model_type
+        self.input_file = input_file
+        self.cost_class = cost_class(model_type)
+        self.budget = None
+        self.process = None
+        self.stdout = None
+        self.stderr = None
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+
+
+class ModelJobScheduler:
+    """依成本等級排隊並分配 CPU 預算的模型工作排程器"""
+
+    def __init__(self, max_cpus=None, poll_interval=0.05):
+        """
+        初始化排程器
+
+        Args:
+            max_cpus: 最多使用的核心數（None 表示全部可用核心）
+            poll_interval: 檢查子程序狀態的間隔秒數
+        """
+        cpus = available_cpus()
+        if max_cpus:
+            cpus = cpus[:max_cpus]
+
+        self.cpus = cpus
+        self.free_cpus = list(cpus)
+        self.poll_interval = poll_interval
+        self.queues = {name: deque() for name in CLASS_ORDER}
+        self.running = []
+        self.finished = []
+        self.script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    def submit(self, model_type, input_file, job_id=None):
+        """
+        加入一個模型工作
+
+        Args:
+            model_type: 模型類型
+            input_file: 輸入資料檔案路徑
+            job_id: 工作識別碼
+
+        Returns:
+            job: ModelJob
+        """
+        if job_id is None:
+            job_id = sum(len(q) for q in self.queues.values()) + len(self.running) + len(self.finished)
+
+        job = ModelJob(job_id, model_type, input_file)
+        self.queues[job.cost_class].append(job)
+        return job
+
+    def _next_job(self):
+        """
+        選出下一個可啟動的工作
+
+        依重→輕順序挑選預設預算放得下的工作；若都放不下且較輕的佇列已空，
+        則以剩餘核心降級啟動最重的工作，避免核心閒置
+        """
+        free = len(self.free_cpus)
+        if free == 0:
+            return None, 0
+
+        for name in CLASS_ORDER:
+            queue = self.queues[name]
+            threads = min(CLASS_THREADS[name], len(self.cpus))
+            if queue and threads <= free:
+                return queue.popleft(), threads
+
+        for name in CLASS_ORDER:
+            if self.queues[name]:
+                return self.queues[name].popleft(), free
+
+        return None, 0
+
+    def _start(self, job, threads):
+        """以指定預算啟動工作子程序"""
+        cpus = self.free_cpus[:threads]
+        self.free_cpus = self.free_cpus[threads:]
+        job.budget = CpuBudget(threads, cpus)
+
+        env = os.environ.copy()
+        env.update(job.budget.to_env())
+
+        model_script = os.path.join(self.script_dir, 'models', f'{job.model_type}_model.py')
+        preexec_fn = job.budget.apply_affinity if os.name == 'posix' else None
+
+        # 輸出寫入暫存檔，避免大量 stderr 塞滿管線造成子程序阻塞
+        job.stdout = tempfile.TemporaryFile(mode='w+', encoding='utf-8', errors='replace')
+        job.stderr = tempfile.TemporaryFile(mode='w+', encoding='utf-8', errors='replace')
+
+        job.started_at = time.time()
+        job.process = subprocess.Popen(
+            [sys.executable, model_script, job.input_file],
+            stdout=job.stdout,
+            stderr=job.stderr,
+            env=env,
+            preexec_fn=preexec_fn
+        )
+        self.running.append(job)
+
+    def _collect(self, job):
+        """回收已結束的工作並釋放其 CPU"""
+        job.finished_at = time.time()
+
+        job.stdout.seek(0)
+        job.stderr.seek(0)
+        stdout, stderr = job.stdout.read(), job.stderr.read()
+        job.stdout.close()
+        job.stderr.close()
+
+        if job.process.returncode != 0 and not stdout.strip():
+            job.result = {'success': False, 'error': stderr}
+        else:
+            try:
+                job.result = json.loads(stdout)
+            except json.JSONDecodeError:
+                job.result = {'success': False, 'error': stderr or stdout}
+
+        self.free_cpus = sorted(self.free_cpus + job.budget.cpus)
+        self.finished.append(job)
+
+    def run(self):
+        """
+        執行所有已排入的工作直到完成
+
+        Returns:
+            results: 依完成順序排列的工作結果
+        """
+        while self.running or any(self.queues.values()):
+            while True:
+                job, threads = self._next_job()
+                if job is None:
+                    break
+                self._start(job, threads)
+
+            for job in list(self.running):
+                if job.process.poll() is not None:
+                    self.running.remove(job)
+                    self._collect(job)
+
+            if self.running:
+                time.sleep(self.poll_interval)
+
+        return [
+            {
+                'job_id': job.job_id,
+                'model_type': job.model_type,
+                'cost_class': job.cost_class,
+                'budget': job.budget.to_dict(),
+                'elapsed_seconds': round(job.finished_at - job.started_at, 3),
+                'result': job.result
+            }
+            for job in self.finished
+        ]
+
+
+def main():
+    """主函數"""
+    try:
+        if len(sys.argv) < 2:
+            print(json.dumps({
+                'success': False,
+                'error': '使用方式: python scheduler.py <jobs_file>'
+            }))
+            sys.exit(1)
+
+        with open(sys.argv[1], 'r', encoding='utf-8-sig') as f:
+            config = json.load(f)
+
+        scheduler = ModelJobScheduler(max_cpus=config.get('max_cpus'))
+
+        for i, job in enumerate(config['jobs']):
+            scheduler.submit(job['model_type'], job['input_file'], job.get('job_id', i))
+
+        started_at = time.time()
+        results = scheduler.run()
+
+        print(json.dumps({
+            'success': True,
+            'results': results,
+            'stats': {
+                'cpus': len(scheduler.cpus),
+                'jobs': len(results),
+                'elapsed_seconds': round(time.time() - started_at, 3)
+            }
+        }, ensure_ascii=False))
+
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+預測準確度批次計算
+將 predictions 資料表中尚未評分的股票預測，以向量化方式對應到實際收盤價，
+寫回每筆預測的誤差欄位（mae / mse / rmse / accuracy），並依 模型 × 股票 × 預測天數
+累加誤差與信賴區間命中率到 prediction_accuracies 摘要表，供預測頁面直接讀取
+
+只處理 mae 為 NULL 且目標交易日已有收盤價的預測，重複執行只會計入新實現的目標日；
+目標交易日為基準日（base_date，模型輸入最後一筆價格日；舊資料無此欄位時為預測日）之後
+第 prediction_days 個交易日（依 stock_prices 的實際交易日）。
+同一 股票 × 模型 × 基準日 × 預測天數 的重複預測（同日重複檢視）仍寫回誤差，但摘要只計入一次
+"""
+
+import sys
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from db import Database
+
+STOCK_TYPE = 'App\\Models\\Stock'
+
+SUMMARY_KEYS = ['predictable_type', 'predictable_id', 'model_type', 'horizon']
+
+# 可累加的充分統計量；衍生指標由這些欄位計算
+SUM_COLUMNS = ['sample_count', 'sum_error', 'sum_abs_error', 'sum_squared_error', 'sum_abs_pct_error',
+               'interval_count', 'interval_hits', 'direction_count', 'direction_hits']
+
+DERIVED_COLUMNS = ['mae', 'rmse', 'mape', 'bias', 'coverage', 'direction_accuracy']
+
+SUMMARY_COLUMNS = SUMMARY_KEYS + SUM_COLUMNS + DERIVED_COLUMNS + [
+    'first_target_date', 'last_target_date', 'created_at', 'updated_at']
+
+# 重複預測的判斷鍵（同一基準日的預測只計入摘要一次）
+DUPLICATE_KEYS = ['stock_id', 'model_type', 'base_day', 'horizon']
+
+# 日期鍵：股票 id 左移 20 位元加上 epoch 日數，排序後可對全部股票一次 searchsorted
+DAY_BITS = 20
+
+
+def to_days(values):
+    """日期（字串或 date）轉為 epoch 日數"""
+    return pd.to_datetime(pd.Series(values).astype(str).str[:10]).to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def assign_targets(predictions, prices):
+    """
+    對應每筆預測的基準價格與目標日收盤價
+
+    Args:
+        predictions: 含 stock_id, base_day, horizon 的 DataFrame
+        prices: 含 stock_id, day, close 的 DataFrame
+
+    Returns:
+        frame: 已實現的預測，新增 target_day, actual, base
+    """
+    prices = prices.sort_values(['stock_id', 'day'])
+    stock_ids = prices['stock_id'].to_numpy(np.int64)
+    keys = (stock_ids << DAY_BITS) + prices['day'].to_numpy(np.int64)
+    closes = prices['close'].to_numpy(np.float64)
+    days = prices['day'].to_numpy(np.int64)
+
+    stock = predictions['stock_id'].to_numpy(np.int64)
+    after = np.searchsorted(keys, (stock << DAY_BITS) + predictions['base_day'].to_numpy(np.int64), 'right')
+    target = after + predictions['horizon'].to_numpy(np.int64) - 1
+    base = after - 1
+
+    realized = target < len(keys)
+    realized[realized] = stock_ids[target[realized]] == stock[realized]
+    has_base = base >= 0
+    has_base[has_base] = stock_ids[base[has_base]] == stock[has_base]
+
+    frame = predictions.assign(base=np.where(has_base, closes[np.maximum(base, 0)], np.nan))[realized].copy()
+    frame['target_day'] = days[target[realized]]
+    frame['actual'] = closes[target[realized]]
+    return frame
+
+
+def score(frame):
+    """
+    計算每筆預測的誤差、區間命中與方向命中
+
+    Args:
+        frame: assign_targets 的結果
+
+    Returns:
+        frame: 新增誤差欄位
+    """
+    error = frame['predicted_price'] - frame['actual']
+    frame['error'] = error
+    frame['abs_error'] = error.abs()
+    frame['squared_error'] = error * error
+    frame['abs_pct_error'] = frame['abs_error'] / frame['actual'] * 100
+
+    has_interval = frame['lower_bound'].notna() & frame['upper_bound'].notna()
+    frame['interval_count'] = has_interval.astype(np.int64)
+    frame['interval_hits'] = (has_interval & (frame['actual'] >= frame['lower_bound'])
+                              & (frame['actual'] <= frame['upper_bound'])).astype(np.int64)
+
+    # 方向：預測漲跌與實際漲跌同號（預測持平不計入）
+    predicted_move = np.sign(frame['predicted_price'] - frame['base'])
+    has_direction = frame['base'].notna() & (predicted_move != 0)
+    frame['direction_count'] = has_direction.astype(np.int64)
+    frame['direction_hits'] = (has_direction & (predicted_move == np.sign(frame['actual'] - frame['base']))
+                               ).astype(np.int64)
+    return frame
+
+
+def aggregate(frame):
+    """依 模型 × 股票 × 預測天數 加總充分統計量"""
+    grouped = frame.groupby(['stock_id', 'model_type', 'horizon'], sort=False)
+    summary = grouped.agg(
+        sample_count=('error', 'size'),
+        sum_error=('error', 'sum'),
+        sum_abs_error=('abs_error', 'sum'),
+        sum_squared_error=('squared_error', 'sum'),
+        sum_abs_pct_error=('abs_pct_error', 'sum'),
+        interval_count=('interval_count', 'sum'),
+        interval_hits=('interval_hits', 'sum'),
+        direction_count=('direction_count', 'sum'),
+        direction_hits=('direction_hits', 'sum'),
+        first_target_day=('target_day', 'min'),
+        last_target_day=('target_day', 'max'),
+    ).reset_index()
+    return summary.rename(columns={'stock_id': 'predictable_id'})
+
+
+def derive(summary):
+    """由充分統計量計算 MAE、RMSE、MAPE、偏誤、區間命中率與方向準確率"""
+    n = summary['sample_count']
+    summary['mae'] = summary['sum_abs_error'] / n
+    summary['rmse'] = np.sqrt(summary['sum_squared_error'] / n)
+    summary['mape'] = summary['sum_abs_pct_error'] / n
+    summary['bias'] = summary['sum_error'] / n
+    summary['coverage'] = (summary['interval_hits'] / summary['interval_count'] * 100).where(summary['interval_count'] > 0)
+    summary['direction_accuracy'] = (summary['direction_hits'] / summary['direction_count'] * 100
+                                     ).where(summary['direction_count'] > 0)
+    return summary
+
+
+class AccuracyTracker:
+    """預測準確度批次計算器"""
+
+    def __init__(self, db, chunk_size=200000, batch_size=5000):
+        """
+        初始化
+
+        Args:
+            db: db.Database
+            chunk_size: 每次處理的待評分預測筆數
+            batch_size: 每次 executemany 的列數
+        """
+        self.db = db
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.stats = {'pending': 0, 'scored': 0, 'duplicates': 0, 'summary_rows': 0}
+        self.summary_sql = db.upsert_sql('prediction_accuracies', SUMMARY_COLUMNS, SUMMARY_KEYS,
+                                         [c for c in SUMMARY_COLUMNS if c not in SUMMARY_KEYS + ['created_at']])
+        p = db.placeholder
+        self.update_sql = (f'UPDATE predictions SET mae = {p}, mse = {p}, rmse = {p}, accuracy = {p}, '
+                           f'updated_at = {p} WHERE id = {p}')
+
+    def _in_batches(self, sql, ids, params=()):
+        """以 IN 子句分批查詢，回傳所有列"""
+        rows = []
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ', '.join([self.db.placeholder] * len(batch))
+            rows.extend(self.db.execute(sql.format(ids=placeholders), tuple(batch) + tuple(params)).fetchall())
+        return rows
+
+    def load_pending(self, after_id):
+        """讀取下一批尚未評分的股票預測"""
+        rows = self.db.execute(
+            'SELECT id, predictable_id, model_type, COALESCE(base_date, prediction_date), prediction_days, '
+            'predicted_price, '
+            'lower_bound, upper_bound FROM predictions '
+            'WHERE predictable_type = ? AND mae IS NULL AND predicted_price IS NOT NULL AND id > ? '
+            f'ORDER BY id LIMIT {int(self.chunk_size)}',
+            (STOCK_TYPE, after_id)
+        ).fetchall()
+        frame = pd.DataFrame(rows, columns=['id', 'stock_id', 'model_type', 'base_date', 'horizon',
+                                            'predicted_price', 'lower_bound', 'upper_bound'])
+        if frame.empty:
+            return frame
+        for column in ('predicted_price', 'lower_bound', 'upper_bound'):
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').astype(np.float64)
+        frame['stock_id'] = frame['stock_id'].astype(np.int64)
+        frame['horizon'] = frame['horizon'].fillna(1).clip(lower=1).astype(np.int64)
+        frame['model_type'] = frame['model_type'].astype(str).str.lower()
+        frame['base_day'] = to_days(frame['base_date'])
+        return frame
+
+    def load_scored_keys(self, stock_ids, since_day):
+        """讀取已評分（已計入摘要）的 股票 × 模型 × 基準日 × 預測天數"""
+        since = str(np.datetime64(int(since_day), 'D'))
+        rows = self._in_batches('SELECT predictable_id, model_type, COALESCE(base_date, prediction_date), '
+                                'prediction_days FROM predictions WHERE predictable_id IN ({ids}) '
+                                'AND predictable_type = ? AND mae IS NOT NULL '
+                                'AND COALESCE(base_date, prediction_date) >= ?', stock_ids, (STOCK_TYPE, since))
+        scored = pd.DataFrame(rows, columns=['stock_id', 'model_type', 'base_date', 'horizon'])
+        scored['stock_id'] = scored['stock_id'].astype(np.int64)
+        scored['model_type'] = scored['model_type'].astype(str).str.lower()
+        scored['base_day'] = to_days(scored['base_date']) if len(scored) else pd.Series(dtype=np.int64)
+        scored['horizon'] = scored['horizon'].fillna(1).clip(lower=1).astype(np.int64)
+        return scored[DUPLICATE_KEYS]
+
+    def load_prices(self, stock_ids, since_day):
+        """讀取預測涉及股票自最早預測日前一段期間起的收盤價（含基準價格）"""
+        since = str(np.datetime64(int(since_day) - 14, 'D'))
+        rows = self._in_batches('SELECT stock_id, trade_date, close FROM stock_prices '
+                                'WHERE stock_id IN ({ids}) AND trade_date >= ?', stock_ids, (since,))
+        prices = pd.DataFrame(rows, columns=['stock_id', 'trade_date', 'close'])
+        prices['stock_id'] = prices['stock_id'].astype(np.int64)
+        prices['day'] = to_days(prices['trade_date'])
+        prices['close'] = pd.to_numeric(prices['close']).astype(np.float64)
+        return prices
+
+    def load_summary(self, stock_ids):
+        """讀取既有摘要列"""
+        columns = SUMMARY_KEYS + SUM_COLUMNS + ['first_target_date', 'last_target_date', 'created_at']
+        rows = self._in_batches(f'SELECT {", ".join(columns)} FROM prediction_accuracies '
+                                'WHERE predictable_id IN ({ids}) AND predictable_type = ?', stock_ids, (STOCK_TYPE,))
+        existing = pd.DataFrame(rows, columns=columns)
+        if existing.empty:
+            return existing
+        existing['predictable_id'] = existing['predictable_id'].astype(np.int64)
+        existing['horizon'] = existing['horizon'].astype(np.int64)
+        existing['first_target_day'] = to_days(existing['first_target_date'])
+        existing['last_target_day'] = to_days(existing['last_target_date'])
+        return existing.drop(columns=['predictable_type', 'first_target_date', 'last_target_date'])
+
+    def merge(self, existing, new):
+        """新舊充分統計量相加並重算衍生指標"""
+        keys = ['predictable_id', 'model_type', 'horizon']
+        if existing.empty:
+            merged = new.assign(created_at=None)
+        else:
+            combined = pd.concat([existing, new.assign(created_at=None)], ignore_index=True)
+            merged = combined.groupby(keys, sort=False).agg(
+                **{c: (c, 'sum') for c in SUM_COLUMNS},
+                first_target_day=('first_target_day', 'min'),
+                last_target_day=('last_target_day', 'max'),
+                created_at=('created_at', 'first'),
+            ).reset_index()
+            # 只寫回本批有新增樣本的列
+            touched = new.set_index(keys).index
+            merged = merged[merged.set_index(keys).index.isin(touched)]
+        return derive(merged)
+
+    def _summary_rows(self, summary, now):
+        frame = summary.assign(
+            predictable_type=STOCK_TYPE,
+            first_target_date=summary['first_target_day'].to_numpy().astype('datetime64[D]').astype(str),
+            last_target_date=summary['last_target_day'].to_numpy().astype('datetime64[D]').astype(str),
+            created_at=summary['created_at'].where(summary['created_at'].notna(), now),
+            updated_at=now,
+        )[SUMMARY_COLUMNS]
+        frame[DERIVED_COLUMNS] = frame[DERIVED_COLUMNS].round(6)
+        frame = frame.astype(object).where(frame.notna(), None)
+        rows = []
+        for row in frame.itertuples(index=False, name=None):
+            rows.append(tuple(v.item() if isinstance(v, np.generic) else v for v in row))
+        return rows
+
+    def _prediction_rows(self, scored, now):
+        accuracy = (100 - scored['abs_pct_error']).clip(lower=0)
+        return list(zip(scored['abs_error'].round(6).tolist(), scored['squared_error'].round(6).tolist(),
+                        scored['abs_error'].round(6).tolist(), accuracy.round(2).tolist(),
+                        [now] * len(scored), scored['id'].astype(np.int64).tolist()))
+
+    def process_chunk(self, pending):
+        """評分一批預測並在單一交易中寫回預測列與摘要表"""
+        stock_ids = sorted(pending['stock_id'].unique().tolist())
+        prices = self.load_prices(stock_ids, pending['base_day'].min())
+        scored = score(assign_targets(pending, prices))
+        if scored.empty:
+            return 0
+
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        scored_ids = sorted(scored['stock_id'].unique().tolist())
+        try:
+            # 已計入摘要或本批較早的同鍵預測視為重複：照常寫回誤差，不再累加
+            previous = self.load_scored_keys(scored_ids, scored['base_day'].min())
+            duplicated = pd.concat([previous, scored[DUPLICATE_KEYS]], ignore_index=True).duplicated()
+            counted = scored[~duplicated.to_numpy()[len(previous):]]
+            summary = self.merge(self.load_summary(scored_ids), aggregate(counted))
+            rows = self._summary_rows(summary, now)
+            for start in range(0, len(rows), self.batch_size):
+                self.db.executemany(self.summary_sql, rows[start:start + self.batch_size])
+            rows = self._prediction_rows(scored, now)
+            for start in range(0, len(rows), self.batch_size):
+                self.db.executemany(self.update_sql, rows[start:start + self.batch_size])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        self.stats['duplicates'] += len(scored) - len(counted)
+        self.stats['summary_rows'] += len(summary)
+        return len(scored)
+
+    def rebuild(self):
+        """清除所有評分結果（下次執行時全部重新計算）"""
+        try:
+            self.db.execute('DELETE FROM prediction_accuracies WHERE predictable_type = ?', (STOCK_TYPE,))
+            self.db.execute('UPDATE predictions SET mae = NULL, mse = NULL, rmse = NULL, accuracy = NULL '
+                            'WHERE predictable_type = ?', (STOCK_TYPE,))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def run(self):
+        """
+        評分所有已實現的待評分預測
+
+        Returns:
+            stats: 待評分筆數、本次評分筆數與寫入的摘要列數
+        """
+        after_id = 0
+        while True:
+            pending = self.load_pending(after_id)
+            if pending.empty:
+                break
+            self.stats['pending'] += len(pending)
+            self.stats['scored'] += self.process_chunk(pending)
+            after_id = int(pending['id'].max())
+        return self.stats
+
+
+def main():
+    """主函數：python score_predictions.py [--database=sqlite路徑] [--chunk-size=200000] [--rebuild]"""
+    try:
+        options = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+
+        db = Database(options.get('database'))
+        db.ensure_schema()
+
+        tracker = AccuracyTracker(db, chunk_size=int(options.get('chunk-size', 200000)),
+                                  batch_size=int(options.get('batch-size', 5000)))
+        started = time.perf_counter()
+        if '--rebuild' in sys.argv:
+            tracker.rebuild()
+        stats = tracker.run()
+        stats['seconds'] = round(time.perf_counter() - started, 2)
+        db.close()
+
+        print(json.dumps({'success': True, **stats}, ensure_ascii=False))
+
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }, ensure_ascii=False))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
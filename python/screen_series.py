@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+全市場序列相關與 ARCH 效應篩檢
+讀取模型端股價快取，以 models/series_screening 對所有股票一次計算 Ljung-Box 與 ARCH-LM 檢定，
+結果寫入 storage/app/screening/series_screening.json，供 GARCH / ARIMA 模型執行時查詢
+"""
+
+import sys
+import os
+import json
+import time
+
+from price_cache import PriceCache
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+from series_screening import screen_prices, save_results
+
+
+def main():
+    """主函數：python screen_series.py [--refresh-cache] [--database=sqlite路徑] [--window=500] [--alpha=0.05]"""
+    try:
+        options = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+        window = int(options.get('window', 500))
+        alpha = float(options.get('alpha', 0.05))
+
+        cache = PriceCache()
+        if '--refresh-cache' in sys.argv:
+            from db import Database
+            db = Database(options.get('database'))
+            cache.refresh_from_db(db)
+            db.close()
+
+        started = time.perf_counter()
+        symbols = sorted(name[:-4] for name in os.listdir(cache.cache_dir) if name.endswith('.npz'))
+        series, last_dates = {}, []
+        for symbol in symbols:
+            data = cache.load(symbol, window + 1)
+            if data is not None and len(data['close']):
+                series[symbol] = data['close']
+                last_dates.append(data['dates'][-1])
+        loaded = time.perf_counter() - started
+
+        results = screen_prices(series, alpha=alpha, window=window)
+        as_of = str(max(last_dates)) if last_dates else None
+        path = save_results(results, as_of=as_of, alpha=alpha, window=window)
+
+        print(json.dumps({
+            'success': True,
+            'symbols': len(results),
+            'skipped': len(symbols) - len(results),
+            'serial_correlation': int(sum(r['serial_correlation'] for r in results.values())),
+            'arch_effect': int(sum(r['arch_effect'] for r in results.values())),
+            'as_of': as_of,
+            'load_seconds': round(loaded, 2),
+            'seconds': round(time.perf_counter() - started, 2),
+            'path': path,
+        }, ensure_ascii=False))
+
+    except Exception as e:
+        print(json.dumps({
+            'success': False,
+            'error': str(e)
+        }, ensure_ascii=False))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
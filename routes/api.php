@@ -132,7 +132,9 @@
     Route::post('/lstm', [PredictionController::class, 'lstm']);
     Route::post('/arima', [PredictionController::class, 'arima']);
     Route::post('/garch', [PredictionController::class, 'garch']);
+    Route::post('/har', [PredictionController::class, 'har']);
     Route::get('/history', [PredictionController::class, 'history']);
+    Route::get('/accuracy', [PredictionController::class, 'accuracy']);
     Route::get('/{id}', [PredictionController::class, 'show']);
 });
 
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+ARIMA 快速估計測試腳本
+以已知參數模擬 ARIMA 序列，驗證 css 與 hannan_rissanen 估計的 AR / MA 係數、常數與殘差變異數
+接近精確概似（exact）估計，預測值與標準誤相近，條件殘差與直接遞迴一致，
+以及快速選參能判斷出差分階數
+"""
+
+import sys
+import os
+import time
+import warnings
+warnings.filterwarnings('ignore')
+
+import numpy as np
+from scipy.signal import lfilter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python', 'models'))
+
+from arima_model import ARIMAPredictor
+
+# (名稱, (p, d, q), AR 係數, MA 係數, 平均數)
+CASES = [
+    ('ARIMA(1,1,0)', (1, 1, 0), [0.5], [], 0.0),
+    ('ARIMA(0,1,1)', (0, 1, 1), [], [0.4], 0.0),
+    ('ARMA(1,1) 含平均數', (1, 0, 1), [0.7], [-0.3], 50.0),
+    ('ARIMA(2,1,1)', (2, 1, 1), [0.5, -0.2], [0.3], 0.0),
+]
+
+
+def simulate(order, ar, ma, mean, n=1500, seed=0):
+    """以 lfilter 產生 ARIMA 序列"""
+    rng = np.random.default_rng(seed)
+    e = rng.standard_normal(n + 200)
+    z = lfilter(np.r_[1.0, ma], np.r_[1.0, -np.asarray(ar)], e)[200:]
+    series = z + mean
+    for _ in range(order[1]):
+        series = 100 + np.cumsum(series)
+    return series
+
+
+def fit(series, order, method):
+    predictor = ARIMAPredictor(*order, auto_select=False, fit_method=method)
+    started = time.perf_counter()
+    info = predictor.train(series)
+    elapsed = time.perf_counter() - started
+    return predictor, np.array(list(info['params'].values())), elapsed
+
+
+def check(name, passed, detail=''):
+    print(f"{'✅' if passed else '❌'} {name}{'：' + detail if detail else ''}")
+    return passed
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("ARIMA 快速估計測試")
+    print("="*60)
+
+    ok = True
+    for k, (name, order, ar, ma, mean) in enumerate(CASES):
+        series = simulate(order, ar, ma, mean, seed=k)
+        exact, exact_params, exact_time = fit(series, order, 'exact')
+        exact_forecast = exact.predict(5)
+        print(f"\n{name}：exact 參數 {np.round(exact_params, 3).tolist()}（{exact_time:.2f}s）")
+
+        for method in ('css', 'hannan_rissanen'):
+            predictor, params, elapsed = fit(series, order, method)
+            coef_error = np.max(np.abs(params[:-1] - exact_params[:-1]) / np.maximum(1.0, np.abs(exact_params[:-1])))
+            sigma2_error = abs(params[-1] / exact_params[-1] - 1)
+            forecast = predictor.predict(5)
+            forecast_error = max(abs(f['predicted'] - e['predicted']) / e['std_error']
+                                 for f, e in zip(forecast, exact_forecast))
+            se_error = max(abs(f['std_error'] / e['std_error'] - 1) for f, e in zip(forecast, exact_forecast))
+            ok &= check(f'{method} 接近 exact',
+                        coef_error < 0.05 and sigma2_error < 0.03 and forecast_error < 0.1 and se_error < 0.03,
+                        f'參數 {np.round(params, 3).tolist()}，係數差 {coef_error:.3f}，σ² 差 {sigma2_error:.2%}，'
+                        f'預測差 {forecast_error:.3f} 個標準誤，{elapsed:.2f}s')
+
+    # 條件殘差：ARMA(1,1) 的 css_residuals 與直接遞迴一致
+    rng = np.random.default_rng(9)
+    y = rng.standard_normal(300)
+    params = np.array([0.2, 0.6, -0.25])
+    residuals = ARIMAPredictor.css_residuals(params, y, 1, 1, include_mean=True)
+    z = y - params[0]
+    direct = np.zeros(len(y) - 1)
+    for t in range(1, len(y)):
+        direct[t - 1] = z[t] - params[1] * z[t - 1] - params[2] * (direct[t - 2] if t >= 2 else 0.0)
+    print()
+    ok &= check('條件殘差與直接遞迴一致', np.allclose(residuals, direct))
+
+    # 快速選參：含單根的序列選出 d=1
+    series = simulate((1, 1, 0), [0.5], [], 0.0, seed=11)
+    predictor = ARIMAPredictor(fit_method='css')
+    info = predictor.train(series)
+    ok &= check('快速選參判斷差分階數', info['order'][1] == 1, f"選出 {info['order']}")
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+非同步爬蟲測試腳本
+啟動本機模擬伺服器（含延遲與隨機 503），驗證並行回補、連線重用、重試、檢查點續傳與資料庫寫入，
+以及當月與查無資料的任務不寫入檢查點、下次執行重新抓取
+"""
+
+import sys
+import os
+import json
+import asyncio
+import calendar
+import tempfile
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python'))
+
+from crawler import (Crawler, Checkpoint, JsonlSink, DatabaseSink, DEFAULT_SYMBOLS,
+                     stock_day_tasks, stock_day_all_task, options_task)
+from crawler_stub import StubServer
+from db import Database
+
+START, END = '2024-01', '2024-12'
+
+
+def expected_rows(symbols):
+    """2024 年每月平日數 × 股票數"""
+    weekdays = sum(1 for month in range(1, 13) for day in range(1, calendar.monthrange(2024, month)[1] + 1)
+                   if calendar.weekday(2024, month, day) < 5)
+    return weekdays * len(symbols)
+
+
+def read_jsonl(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+async def crawl(base_url, tmp, name, concurrency, checkpoint=True, timeout=None):
+    output = os.path.join(tmp, f'{name}.jsonl')
+    crawler = Crawler(JsonlSink(output),
+                      Checkpoint(os.path.join(tmp, f'{name}.checkpoint.jsonl') if checkpoint else None),
+                      concurrency=concurrency, rate=0, backoff=0.05, flush_every=10)
+    tasks = stock_day_tasks(DEFAULT_SYMBOLS, START, END, base_url)
+    try:
+        stats = await asyncio.wait_for(crawler.run(tasks), timeout)
+    except asyncio.TimeoutError:
+        stats = None
+    crawler.sink.close()
+    return crawler, stats, output
+
+
+async def run_tests(tmp):
+    stub = StubServer(response_file=os.devnull, latency=0.02, fail_rate=0.1, seed=1)
+    base_url = await stub.start()
+    total = expected_rows(DEFAULT_SYMBOLS)
+    ok = True
+
+    # 1. 逐一請求與並行請求
+    _, sequential, _ = await crawl(base_url, tmp, 'sequential', 1, checkpoint=False)
+    crawler, concurrent, output = await crawl(base_url, tmp, 'concurrent', 8, checkpoint=False)
+    records = read_jsonl(output)
+    speedup = sequential['seconds'] / concurrent['seconds']
+    print(f"逐一: {sequential['seconds']}s  並行(8): {concurrent['seconds']}s  加速 {speedup:.1f}x")
+    print(f"任務 {concurrent['completed']}/{concurrent['tasks']}，重試 {concurrent['retries']} 次，"
+          f"記錄 {len(records)}（預期 {total}）")
+    print(f"HTTP 請求 {concurrent['http']['requests']}，建立連線 {concurrent['http']['connections']}，"
+          f"重用 {concurrent['http']['reused']}")
+    ok &= concurrent['failed'] == 0 and len(records) == total
+    ok &= concurrent['retries'] > 0 and concurrent['http']['connections'] <= 8
+    ok &= speedup > 3
+
+    # 2. 中斷後由檢查點續傳
+    _, _, output = await crawl(base_url, tmp, 'resume', 4, timeout=0.5)
+    first = len(read_jsonl(output))
+    _, resumed, output = await crawl(base_url, tmp, 'resume', 4)
+    records = read_jsonl(output)
+    keys = {(r['symbol'], r['trade_date']) for r in records}
+    print(f"續傳: 中斷前 {first} 筆，略過 {resumed['skipped']} 個任務，合計 {len(records)} 筆，"
+          f"不重複 {len(keys)}")
+    ok &= 0 < resumed['skipped'] < resumed['tasks'] and len(records) == total and len(keys) == total
+
+    # 3. 寫入資料庫（import_prices 驗證與 upsert）
+    db = Database(os.path.join(tmp, 'crawl.sqlite'))
+    db.ensure_schema()
+    sink = DatabaseSink(db, update_cache=False)
+    crawler = Crawler(sink, concurrency=8, rate=0, backoff=0.05)
+    await crawler.run(stock_day_tasks(DEFAULT_SYMBOLS[:3], START, END, base_url))
+    db_stats = sink.close()
+    count = db.execute('SELECT COUNT(*) FROM stock_prices').fetchone()[0]
+    print(f"資料庫: 寫入 {db_stats['rows_upserted']} 筆，資料表 {count} 筆")
+    ok &= count == expected_rows(DEFAULT_SYMBOLS[:3])
+    db.close()
+
+    # 4. OpenAPI 全市場與選擇權
+    stub.fail_rate = 0
+    sink = JsonlSink(None)
+    crawler = Crawler(sink, rate=0)
+    await crawler.run(stock_day_all_task('2025-01-31', base_url) + options_task('2025-01-02', base_url))
+    print(f"STOCK_DAY_ALL + TXO: {crawler.stats['records']} 筆（預期 1000 + 124）")
+    ok &= crawler.stats['records'] == 1000 + 124
+
+    # 5. 轉址：跟隨 Location（與 Laravel Http 用戶端相同）
+    crawler = Crawler(JsonlSink(None), rate=0)
+    await crawler.run(stock_day_all_task('2025-01-31', base_url + '/moved'))
+    print(f"轉址: 記錄 {crawler.stats['records']} 筆，跟隨轉址 {crawler.stats['redirects']} 次，"
+          f"失敗 {crawler.stats['failed']}")
+    ok &= crawler.stats['records'] == 1000 and crawler.stats['redirects'] == 1 and crawler.stats['failed'] == 0
+    await stub.stop()
+
+    # 6. 非預期的回應格式：解析錯誤記錄為失敗，工作者不中止、run() 不會卡住
+    payload_file = os.path.join(tmp, 'bad_payload.json')
+    with open(payload_file, 'w', encoding='utf-8') as f:
+        json.dump([['not', 'a', 'dict']], f)
+    stub = StubServer(response_file=payload_file)
+    base_url = await stub.start()
+    crawler = Crawler(JsonlSink(None), concurrency=1, rate=0, retries=0)
+    tasks = stock_day_all_task('2025-01-31', base_url) + options_task('2025-01-02', base_url)
+    try:
+        stats = await asyncio.wait_for(crawler.run(tasks), 10)
+    except asyncio.TimeoutError:
+        stats = None
+    print(f"格式錯誤回應: {'完成' if stats else '逾時'}，失敗 {crawler.stats['failed']} 個任務，"
+          f"{crawler.failed[:1]}")
+    ok &= stats is not None and stats['failed'] == 2 and stats['completed'] == 0
+    await stub.stop()
+
+    # 7. 當月（資料仍會增加）與查無資料的月份不寫入檢查點，每次執行都重新抓取
+    stub = StubServer(response_file=os.devnull, no_data=['9999'])
+    base_url = await stub.start()
+    symbols = DEFAULT_SYMBOLS[:2] + ['9999']
+    tasks = stock_day_tasks(symbols, '2024-11', '2024-12', base_url, today=date(2024, 12, 10))
+    runs = []
+    for _ in range(2):
+        crawler = Crawler(JsonlSink(None), Checkpoint(os.path.join(tmp, 'open.checkpoint.jsonl')), rate=0,
+                          flush_every=1)
+        runs.append(await crawler.run(tasks))
+    done = Checkpoint(os.path.join(tmp, 'open.checkpoint.jsonl')).done
+    print(f"未結束 / 查無資料: 檢查點 {sorted(done)}，第二次略過 {runs[1]['skipped']} 個、"
+          f"重新抓取 {runs[1]['completed']} 個（查無資料 {runs[1]['empty']} 個）")
+    ok &= done == {f'stock_day:{symbol}:202411' for symbol in DEFAULT_SYMBOLS[:2]}
+    ok &= runs[1]['skipped'] == 2 and runs[1]['completed'] == 4 and runs[1]['empty'] == 2
+    await stub.stop()
+
+    return ok
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("非同步爬蟲測試")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['STOCK_PRICE_CACHE_DIR'] = os.path.join(tmp, 'cache')
+        ok = asyncio.run(run_tests(tmp))
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+模型請求分派器測試腳本
+以可控制耗時的模型執行函式驗證：相同請求合併、互動請求優先、佇列深度背壓、
+長時間執行的請求以心跳維持（不因執行時間被判定遺失）、擁有者消失或心跳停止時由等待者接手，
+以及請求被清除時不會拋出例外；最後以命令列實際執行一次 HAR 模型
+"""
+
+import sys
+import os
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+import subprocess
+
+import numpy as np
+
+PYTHON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python')
+sys.path.insert(0, PYTHON_DIR)
+
+import dispatcher
+from dispatcher import ModelDispatcher
+
+
+class FakeModel:
+    """取代 run_with_cache：記錄執行順序，依輸入的 sleep 秒數模擬模型耗時"""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, model_type, input_file, input_data):
+        with self.lock:
+            self.calls.append(input_data['name'])
+        time.sleep(input_data.get('sleep', 0))
+        return {'success': True, 'name': input_data['name']}
+
+
+def write_input(tmp, name, sleep=0.0):
+    path = os.path.join(tmp, f'{name}.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'name': name, 'sleep': sleep}, f)
+    return path
+
+
+def submit_async(dispatcher_, path, priority, results, name):
+    def run():
+        results[name] = dispatcher_.submit('har', path, priority)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def check(name, passed, detail=''):
+    print(f"{'✅' if passed else '❌'} {name}{'：' + detail if detail else ''}")
+    return passed
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("模型請求分派器測試")
+    print("="*60)
+
+    ok = True
+    original_run = dispatcher.run_with_cache
+    with tempfile.TemporaryDirectory() as tmp:
+        fake = FakeModel()
+        dispatcher.run_with_cache = fake
+        try:
+            # 1. 相同請求合併
+            d = ModelDispatcher(os.path.join(tmp, 'coalesce.sqlite'), max_concurrency=2, poll_interval=0.02)
+            path = write_input(tmp, 'same', sleep=0.5)
+            results = {}
+            threads = [submit_async(d, path, 'interactive', results, i) for i in range(4)]
+            for thread in threads:
+                thread.join()
+            coalesced = sum(bool(r.get('dispatch', {}).get('coalesced')) for r in results.values())
+            ok &= check('相同請求合併', fake.calls == ['same'] and coalesced == 3
+                        and all(r['success'] for r in results.values()),
+                        f'執行 {len(fake.calls)} 次，合併 {coalesced} 個')
+
+            # 2. 互動請求優先於較早排隊的批次請求
+            fake.calls.clear()
+            d = ModelDispatcher(os.path.join(tmp, 'priority.sqlite'), max_concurrency=1, poll_interval=0.02)
+            results = {}
+            threads = [submit_async(d, write_input(tmp, 'running', 0.4), 'batch', results, 'running')]
+            time.sleep(0.1)
+            threads.append(submit_async(d, write_input(tmp, 'batch'), 'batch', results, 'batch'))
+            time.sleep(0.1)
+            threads.append(submit_async(d, write_input(tmp, 'interactive'), 'interactive', results, 'interactive'))
+            for thread in threads:
+                thread.join()
+            ok &= check('互動請求優先', fake.calls == ['running', 'interactive', 'batch'], str(fake.calls))
+
+            # 3. 佇列深度背壓：批次上限 1，互動請求為兩倍
+            fake.calls.clear()
+            d = ModelDispatcher(os.path.join(tmp, 'backpressure.sqlite'), max_concurrency=1, max_queue_depth=1,
+                                poll_interval=0.02)
+            results = {}
+            threads = [submit_async(d, write_input(tmp, 'slow', 0.5), 'batch', results, 'slow')]
+            time.sleep(0.1)
+            threads.append(submit_async(d, write_input(tmp, 'queued'), 'batch', results, 'queued'))
+            time.sleep(0.1)
+            rejected = d.submit('har', write_input(tmp, 'rejected'), 'batch')
+            threads.append(submit_async(d, write_input(tmp, 'urgent'), 'interactive', results, 'urgent'))
+            for thread in threads:
+                thread.join()
+            ok &= check('佇列已滿時拒絕批次請求、互動請求仍可排入',
+                        not rejected['success'] and rejected['dispatch']['rejected'] and results['urgent']['success'])
+
+            # 4. 長時間執行：心跳持續更新，執行時間超過 stale_after 的等待者仍取得同一結果
+            fake.calls.clear()
+            d = ModelDispatcher(os.path.join(tmp, 'heartbeat.sqlite'), poll_interval=0.02,
+                                stale_after=0.5, heartbeat_interval=0.1)
+            path = write_input(tmp, 'long', sleep=1.5)
+            results = {}
+            owner = submit_async(d, path, 'interactive', results, 'owner')
+            time.sleep(1.0)
+            waiter = submit_async(d, path, 'interactive', results, 'waiter')
+            owner.join()
+            waiter.join()
+            ok &= check('長時間執行的請求不被判定遺失',
+                        fake.calls == ['long'] and results['waiter'].get('dispatch', {}).get('coalesced') is True,
+                        f"執行 {fake.calls}")
+
+            # 5. 擁有者行程已結束：等待者接手執行
+            fake.calls.clear()
+            db_path = os.path.join(tmp, 'lost.sqlite')
+            d = ModelDispatcher(db_path, poll_interval=0.02, stale_after=60)
+            dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+            dead.wait()
+            path = write_input(tmp, 'orphan')
+            key = dispatcher.cache_key('har', {'name': 'orphan', 'sleep': 0.0})
+            now = time.time()
+            conn = sqlite3.connect(db_path)
+            conn.execute("INSERT INTO requests (key, model_type, priority, status, owner_pid, waiters, created_at, "
+                         "heartbeat_at) VALUES (?, 'har', 0, 'running', ?, 0, ?, ?)", (key, dead.pid, now, now))
+            conn.commit()
+            output = d.submit('har', path)
+            ok &= check('擁有者已結束時接手執行', output['success'] and fake.calls == ['orphan'])
+
+            # 6. 擁有者仍存在但心跳停止（其他主機或非 POSIX 平台）：視為遺失
+            fake.calls.clear()
+            path = write_input(tmp, 'silent')
+            key = dispatcher.cache_key('har', {'name': 'silent', 'sleep': 0.0})
+            conn.execute("INSERT INTO requests (key, model_type, priority, status, owner_pid, waiters, created_at, "
+                         "heartbeat_at) VALUES (?, 'har', 0, 'running', ?, 0, ?, ?)",
+                         (key, os.getpid(), now - 3600, now - 120))
+            conn.commit()
+            output = d.submit('har', path)
+            ok &= check('心跳逾時時接手執行', output['success'] and fake.calls == ['silent'])
+
+            # 7. 排隊中的請求被其他行程清除：_acquire_slot 回傳 False 而非拋出 TypeError
+            worker = d._connect()
+            d._register(worker, 'vanished', 'har', 0)
+            conn.execute("DELETE FROM requests WHERE key = 'vanished'")
+            conn.commit()
+            try:
+                acquired = d._acquire_slot(worker, 'vanished')
+                ok &= check('請求已清除時重新登記', acquired is False)
+            except Exception as e:
+                ok &= check('請求已清除時重新登記', False, repr(e))
+            worker.close()
+            conn.close()
+        finally:
+            dispatcher.run_with_cache = original_run
+
+        # 8. 命令列實際執行 HAR 模型
+        prices = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, 120)))
+        path = os.path.join(tmp, 'har_input.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'prices': [round(float(p), 4) for p in prices], 'base_date': '2025-01-01',
+                       'prediction_days': 3, 'stock_symbol': 'TEST'}, f)
+        env = {**os.environ, 'STOCK_DISPATCH_DB': os.path.join(tmp, 'cli.sqlite'),
+               'STOCK_MODEL_CACHE_DIR': os.path.join(tmp, 'model_cache')}
+        outputs = []
+        for _ in range(2):
+            stdout = subprocess.run([sys.executable, os.path.join(PYTHON_DIR, 'dispatcher.py'), 'har', path,
+                                     '--priority=interactive'], capture_output=True, text=True, env=env,
+                                    timeout=300).stdout
+            outputs.append(json.loads(stdout))
+        ok &= check('命令列執行 HAR 模型', all(o['success'] for o in outputs) and len(outputs[0]['predictions']) == 3
+                    and outputs[1]['cache']['hit'] and outputs[0]['predictions'] == outputs[1]['predictions'])
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
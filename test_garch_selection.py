@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+GARCH 模型選擇測試腳本
+驗證暖啟動鏈結（候選集合外的來源模型只參與估計、不列入排序）、暖啟動起始值的長度與持續性，
+暖啟動與冷啟動（含多行程）選出相同的最佳設定與相近的對數概似，
+以及保存的最佳設定在準則、候選集合、有效期間與 reselect 不同時不沿用
+"""
+
+import sys
+import os
+import json
+import tempfile
+import warnings
+warnings.filterwarnings('ignore')
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python', 'models')
+sys.path.insert(0, MODELS_DIR)
+
+from garch_selection import (select, candidate_specs, fit_order, warm_start, fit_candidate, spec_key,
+                             spec_path, LAG_SPLIT)
+
+# 8 組候選：GARCH / GJR × (1,1) / (2,1) × normal / t
+CANDIDATES = {'vol': ['GARCH', 'GJR'], 'p': [1, 2], 'q': [1], 'dist': ['normal', 't']}
+
+
+def simulate_prices(n=1500, seed=0):
+    """以 GJR-GARCH(1,1) 與 t 分配產生股價（槓桿效果與厚尾，使 GJR-t 明顯勝出）"""
+    rng = np.random.default_rng(seed)
+    variance, returns = 1.0, np.empty(n)
+    for t in range(n):
+        returns[t] = np.sqrt(variance) * rng.standard_t(5) * np.sqrt(3 / 5)
+        variance = 0.05 + (0.03 + 0.15 * (returns[t] < 0)) * returns[t] ** 2 + 0.85 * variance
+    return 100 * np.exp(np.cumsum(returns / 100))
+
+
+def check(name, passed, detail=''):
+    print(f"{'✅' if passed else '❌'} {name}{'：' + detail if detail else ''}")
+    return passed
+
+
+def test_chain(prices):
+    ok = True
+    ok &= check('預設候選為 36 組', len(candidate_specs()) == 36)
+
+    # 只要求 skewt 的高階模型：同階 t、同階常態與 (1,1) 常態都須先估計，但不列入排序
+    specs = candidate_specs({'vol': ['GJR'], 'p': [2], 'q': [1], 'dist': ['skewt']})
+    order, extra = fit_order(specs, warm=True)
+    ok &= check('暖啟動鏈結補上來源模型', [spec_key(s) for s in order] == [
+        'GJR(1,1)-normal', 'GJR(2,1)-normal', 'GJR(2,1)-t', 'GJR(2,1)-skewt']
+        and extra == {'GJR(1,1)-normal', 'GJR(2,1)-normal', 'GJR(2,1)-t'})
+    ok &= check('冷啟動不補來源模型', fit_order(specs, warm=False) == (specs, set()))
+
+    # 由 (1,1) 常態暖啟動 (2,1)-t：起始值長度與 arch 參數數相同，alpha 拆分後總和不變
+    base = fit_candidate({'vol': 'GJR', 'p': 1, 'q': 1, 'dist': 'normal'}, prices)
+    spec = {'vol': 'GJR', 'p': 2, 'q': 1, 'dist': 't'}
+    start = warm_start({**spec, 'dist': 'normal'}, base['params'])
+    child = fit_candidate({**spec, 'dist': 'normal'}, prices, start)
+    start_t = warm_start(spec, child['params'])
+    warm = fit_candidate(spec, prices, start_t)
+    alpha = base['params']['alpha[1]']
+    ok &= check('暖啟動起始值', len(start) == len(child['params']) and len(start_t) == len(warm['params'])
+                and np.allclose(start[2:4], [alpha * LAG_SPLIT[0], alpha * LAG_SPLIT[1]])
+                and start_t[-1] == 8.0 and warm['warm_start'] and warm['converged'],
+                f'{np.round(start, 4).tolist()}')
+    return ok
+
+
+def test_warm_matches_cold(prices):
+    ok = True
+    runs = {
+        '冷啟動': select(prices, candidates=CANDIDATES, warm=False, workers=1),
+        '暖啟動': select(prices, candidates=CANDIDATES, warm=True, workers=1),
+        '暖啟動（2 行程）': select(prices, candidates=CANDIDATES, warm=True, workers=2),
+    }
+    cold = runs['冷啟動']
+    cold_bic = {r['key']: r['bic'] for r in cold['ranking']}
+    for name, result in runs.items():
+        summary = result['summary']
+        print(f"  {name}: 最佳 {result['best']['label']}-{result['best']['dist']}，"
+              f"暖啟動 {summary['warm_started']} 組，迭代 {summary['iterations']} 次，{summary['seconds']}s")
+
+    for name in ('暖啟動', '暖啟動（2 行程）'):
+        result = runs[name]
+        bic_gap = max(abs(r['bic'] - cold_bic[r['key']]) for r in result['ranking'])
+        ok &= check(f'{name}與冷啟動選出相同設定',
+                    spec_key(result['best']) == spec_key(cold['best'])
+                    and len(result['ranking']) == len(cold['ranking']) == 8
+                    and result['summary']['warm_started'] > 0 and bic_gap < 0.5,
+                    f"{spec_key(result['best'])}，BIC 最大差 {bic_gap:.4f}")
+    ok &= check('選出 GJR-t', spec_key(cold['best']) == 'GJR(1,1)-t', spec_key(cold['best']))
+    return ok
+
+
+def test_memo(prices):
+    ok = True
+    with tempfile.TemporaryDirectory() as spec_dir:
+        first = select(prices, symbol='TEST', candidates=CANDIDATES, workers=1, spec_dir=spec_dir)
+        memo = select(prices, symbol='TEST', candidates=CANDIDATES, workers=1, spec_dir=spec_dir)
+        ok &= check('保存後沿用最佳設定', not first['summary']['from_memo'] and memo['summary']['from_memo']
+                    and memo['best'] == first['best'] and first['spec_path'] == spec_path('TEST', spec_dir))
+
+        # 以下情況不沿用（persist=False 避免覆寫保存的設定）
+        misses = {
+            '準則不同': select(prices, symbol='TEST', candidates=CANDIDATES, criterion='aic', workers=1,
+                               spec_dir=spec_dir, persist=False),
+            '候選集合不同': select(prices, symbol='TEST', candidates={**CANDIDATES, 'dist': ['normal']}, workers=1,
+                                   spec_dir=spec_dir, persist=False),
+            '指定 reselect': select(prices, symbol='TEST', candidates=CANDIDATES, workers=1, spec_dir=spec_dir,
+                                    reselect=True, persist=False),
+        }
+
+        path = spec_path('TEST', spec_dir)
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        entry['selected_at'] = (datetime.now() - timedelta(days=8)).strftime('%Y-%m-%d %H:%M:%S')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        misses['超過有效期間'] = select(prices, symbol='TEST', candidates=CANDIDATES, workers=1, spec_dir=spec_dir)
+
+        for name, result in misses.items():
+            ok &= check(f'重新選擇（{name}）', not result['summary']['from_memo'])
+
+        with open(path, 'r', encoding='utf-8') as f:
+            refreshed = json.load(f)
+        ok &= check('重新選擇後更新保存時間', refreshed['selected_at'] > entry['selected_at']
+                    and refreshed['candidates'] == sorted(spec_key(s) for s in candidate_specs(CANDIDATES)))
+    return ok
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("GARCH 模型選擇測試")
+    print("="*60)
+
+    prices = simulate_prices()
+    ok = test_chain(prices)
+    ok &= test_warm_matches_cold(prices)
+    ok &= test_memo(prices)
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
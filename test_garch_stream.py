@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+GARCH 串流更新測試腳本
+以 arch 固定參數的預測為基準，驗證 GARCHStream 每筆更新後與背景重新估計後的
+條件變異數預測一致（GARCH 與 GJR-GARCH），暫定價不改變狀態，EGARCH 串流模式被拒絕，
+以及經 run_model.py 執行時每筆價格的 JSON Lines 即時轉送、且與直接執行模型腳本相同
+"""
+
+import sys
+import os
+import json
+import tempfile
+import subprocess
+import warnings
+warnings.filterwarnings('ignore')
+
+import numpy as np
+from arch import arch_model
+
+PYTHON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python')
+MODELS_DIR = os.path.join(PYTHON_DIR, 'models')
+sys.path.insert(0, PYTHON_DIR)
+sys.path.insert(0, MODELS_DIR)
+
+from garch_model import GARCHPredictor, GARCHStream, VOL_MODELS
+
+HORIZON = 3
+
+
+def simulate_prices(n, seed=0):
+    """以 GJR-GARCH(1,1) 模擬股價（負報酬後波動放大）"""
+    rng = np.random.default_rng(seed)
+    omega, alpha, gamma, beta = 0.05, 0.04, 0.12, 0.86
+    variance, resid = omega / (1 - alpha - gamma / 2 - beta), 0.0
+    returns = np.empty(n)
+    for t in range(n):
+        variance = omega + (alpha + gamma * (resid < 0)) * resid ** 2 + beta * variance
+        resid = np.sqrt(variance) * rng.standard_normal()
+        returns[t] = resid
+    return 100 * np.exp(np.cumsum(returns / 100))
+
+
+def check(name, passed, detail=''):
+    print(f"{'✅' if passed else '❌'} {name}{'：' + detail if detail else ''}")
+    return passed
+
+
+def arch_forecast(stream):
+    """以串流目前的參數與完整價格，由 arch 固定參數模型計算多期變異數預測"""
+    returns = np.diff(np.log(np.array(stream.prices))) * 100
+    vol, o = VOL_MODELS[stream.vol]
+    model = arch_model(returns, vol=vol, p=stream.p, o=o, q=stream.q, dist=stream.dist)
+    return model.fix(stream.params.values).forecast(horizon=HORIZON).variance.values[-1]
+
+
+def test_stream(vol, prices, train_size):
+    ok = True
+    predictor = GARCHPredictor(vol=vol)
+    predictor.train(prices[:train_size])
+    stream = GARCHStream(predictor, prices[:train_size], refit_every=15, max_history=len(prices))
+
+    worst = 0.0
+    for price in prices[train_size:]:
+        streamed = [p['variance'] for p in stream.step(price, HORIZON)['predictions']]
+        worst = max(worst, np.max(np.abs(np.array(streamed) / arch_forecast(stream) - 1)))
+
+    # 等待最後一次重新估計並重播估計期間的觀測值
+    stream.close()
+    refit = np.array([p['variance'] for p in stream.forecast(HORIZON)])
+    refit_error = np.max(np.abs(refit / arch_forecast(stream) - 1))
+    gamma = stream.params.get('gamma[1]')
+
+    print(f"  {vol}: 更新 {stream.observations} 筆，重新估計 {stream.parameters_version} 次，"
+          f"gamma={gamma if gamma is None else round(float(gamma), 4)}，"
+          f"最大相對誤差 {worst:.2e}，重新估計後 {refit_error:.2e}")
+    ok &= worst < 1e-6 and refit_error < 1e-6
+    ok &= stream.parameters_version >= 2
+    ok &= (gamma is not None) == (vol == 'GJR')
+
+    # 暫定價只計算預測，不寫入狀態
+    before = (stream.next_variance, stream.observations)
+    stream.step(prices[-1] * 0.97, HORIZON, provisional=True)
+    ok &= (stream.next_variance, stream.observations) == before
+    return ok
+
+
+def test_egarch_rejected(prices):
+    ok = True
+    predictor = GARCHPredictor(vol='EGARCH')
+    predictor.train(prices)
+    try:
+        GARCHStream(predictor, prices)
+        ok = False
+    except ValueError as e:
+        print(f"  EGARCH 串流: {e}")
+
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump({'mode': 'stream', 'vol': 'EGARCH', 'prices': [float(p) for p in prices]}, f)
+    try:
+        result = subprocess.run([sys.executable, os.path.join(MODELS_DIR, 'garch_model.py'), f.name],
+                                input='', capture_output=True, text=True, timeout=120)
+        output = json.loads(result.stdout)
+        ok &= result.returncode == 1 and not output['success'] and 'EGARCH' in output['error']
+    finally:
+        os.unlink(f.name)
+    return ok
+
+
+def test_run_model(prices, updates):
+    """經 run_model.py 執行串流模式：逐筆送出價格，收到對應的輸出後才送下一筆"""
+    from run_model import run_with_cache
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'stream.json')
+        with open(input_file, 'w', encoding='utf-8') as f:
+            json.dump({'mode': 'stream', 'prices': [float(p) for p in prices], 'prediction_days': HORIZON,
+                       'refit_every': 1000}, f)
+        lines = '\n'.join(str(round(float(p), 4)) for p in updates) + '\n'
+
+        process = subprocess.Popen([sys.executable, os.path.join(PYTHON_DIR, 'run_model.py'), 'garch', input_file],
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        streamed = [json.loads(process.stdout.readline())]
+        for line in lines.splitlines():
+            # 子程序未結束前即可讀到每筆更新（不等到標準輸入關閉）
+            process.stdin.write(line + '\n')
+            process.stdin.flush()
+            streamed.append(json.loads(process.stdout.readline()))
+        process.stdin.close()
+        rest = process.stdout.read()
+        process.wait(timeout=120)
+
+        direct = subprocess.run([sys.executable, os.path.join(MODELS_DIR, 'garch_model.py'), input_file],
+                                input=lines, capture_output=True, text=True, timeout=120)
+        expected = [json.loads(line) for line in direct.stdout.splitlines()]
+        ok &= check('run_model.py 串流逐筆轉送', process.returncode == 0 and rest == ''
+                    and len(streamed) == len(updates) + 1 and all(item['success'] for item in streamed)
+                    and streamed[-1]['observations'] == len(updates),
+                    f'{len(streamed)} 行')
+        ok &= check('run_model.py 串流與直接執行相同', streamed == expected)
+
+        try:
+            run_with_cache('garch', input_file)
+            ok &= check('run_with_cache 拒絕串流模式', False)
+        except ValueError as e:
+            ok &= check('run_with_cache 拒絕串流模式', 'stream' in str(e))
+    return ok
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("GARCH 串流更新測試")
+    print("="*60)
+
+    prices = simulate_prices(600)
+    ok = True
+    for vol in ('GARCH', 'GJR'):
+        ok &= test_stream(vol, prices, 540)
+    ok &= test_egarch_rejected(prices[:300])
+    ok &= test_run_model(prices[:300], prices[300:305])
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
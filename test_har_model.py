@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+HAR-RV 波動率模型測試腳本
+以 pandas 移動平均另行建立日 / 週 / 月成分，驗證批次正規方程式求得的係數與 R² 和 statsmodels OLS 相同，
+多檔（含左側補 NaN 的較短序列）一次估計與逐檔估計相同，以及第一期預測等於係數套用最新成分
+"""
+
+import sys
+import os
+import json
+import tempfile
+import subprocess
+
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python', 'models')
+sys.path.insert(0, MODELS_DIR)
+
+from har_model import HARPredictor
+
+
+def simulate_prices(n, seed):
+    """以 GARCH(1,1) 產生具波動聚集的股價"""
+    rng = np.random.default_rng(seed)
+    variance, returns = 1.0, np.empty(n)
+    for t in range(n):
+        returns[t] = np.sqrt(variance) * rng.standard_normal()
+        variance = 0.05 + 0.1 * returns[t] ** 2 + 0.85 * variance
+    return 100 * np.exp(np.cumsum(returns / 100))
+
+
+def ols_reference(prices, weekly=5, monthly=22):
+    """以 pandas rolling 與 statsmodels OLS 估計 HAR 係數"""
+    rv = pd.Series(np.diff(np.log(prices)) * 100) ** 2
+    frame = pd.DataFrame({
+        'rv_d': rv,
+        'rv_w': rv.rolling(weekly).mean(),
+        'rv_m': rv.rolling(monthly).mean(),
+        'target': rv.shift(-1),
+    }).dropna()
+    fit = sm.OLS(frame['target'], sm.add_constant(frame[['rv_d', 'rv_w', 'rv_m']])).fit()
+    return fit, rv
+
+
+def check(name, passed, detail=''):
+    print(f"{'✅' if passed else '❌'} {name}{'：' + detail if detail else ''}")
+    return passed
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("HAR-RV 波動率模型測試")
+    print("="*60)
+
+    ok = True
+    prices = simulate_prices(600, seed=0)
+
+    # 1. 單檔係數與 R² 和 statsmodels OLS 相同
+    predictor = HARPredictor()
+    info = predictor.train(prices)
+    fit, rv = ols_reference(prices)
+    coef = predictor.coef[0]
+    ok &= check('係數與 statsmodels OLS 相同', np.allclose(coef, fit.params.values, rtol=1e-8, atol=1e-10),
+                f'HAR {np.round(coef, 5).tolist()}，OLS {np.round(fit.params.values, 5).tolist()}')
+    ok &= check('R² 與觀測數相同', np.isclose(info['r_squared'][0], fit.rsquared)
+                and info['observations'][0] == int(fit.nobs))
+
+    # 2. 第一期預測等於係數套用最新的日 / 週 / 月成分
+    forecast = predictor.predict(horizon=3)[0]
+    latest = np.array([1.0, rv.iloc[-1], rv.iloc[-5:].mean(), rv.iloc[-22:].mean()])
+    ok &= check('第一期預測', np.isclose(forecast[0], max(latest @ coef, rv.mean() * 1e-3)),
+                f'{forecast[0]:.4f}')
+
+    # 3. 多檔一次估計：較短的序列左側補 NaN，結果與逐檔估計相同
+    series = [simulate_prices(600, seed=1), simulate_prices(400, seed=2), simulate_prices(300, seed=3)]
+    panel = np.full((3, 600), np.nan)
+    for k, s in enumerate(series):
+        panel[k, -len(s):] = s
+    batch = HARPredictor()
+    batch.train(panel)
+    batch_forecast = batch.predict(horizon=5)
+    same = True
+    for k, s in enumerate(series):
+        single = HARPredictor()
+        single.train(s)
+        same &= np.allclose(batch.coef[k], single.coef[0], rtol=1e-8, atol=1e-10)
+        same &= np.allclose(batch_forecast[k], single.predict(horizon=5)[0])
+        same &= np.allclose(batch.coef[k], ols_reference(s)[0].params.values, rtol=1e-8, atol=1e-10)
+    ok &= check('多檔一次估計與逐檔、OLS 相同', same)
+
+    # 4. 命令列輸出
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump({'prices': prices.tolist(), 'base_date': '2025-01-01', 'prediction_days': 3}, f)
+    try:
+        output = json.loads(subprocess.run([sys.executable, os.path.join(MODELS_DIR, 'har_model.py'), f.name],
+                                           capture_output=True, text=True, timeout=60).stdout)
+    finally:
+        os.unlink(f.name)
+    ok &= check('命令列輸出', output['success'] and len(output['predictions']) == 3
+                and np.isclose(output['predictions'][0]['predicted_volatility'], np.sqrt(forecast[0]), atol=1e-4))
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+歷史股價匯入測試腳本
+以 Big5 編碼的證交所個股月報（民國年日期、千分位、'--' 無成交、X 標記）與 UTF-8 全市場資料
+經命令列匯入 SQLite，驗證資料表內容、剔除原因統計、分塊與重複匯入的 upsert，
+以及匯入後模型端股價快取的日期與 OHLCV 與原始檔案相同
+"""
+
+import sys
+import os
+import json
+import sqlite3
+import tempfile
+import subprocess
+
+import numpy as np
+
+PYTHON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python')
+sys.path.insert(0, PYTHON_DIR)
+
+from price_cache import PriceCache
+from import_prices import parse_dates, parse_numbers
+
+import pandas as pd
+
+# 證交所個股月報：第一行為標題，民國年日期
+TWSE_MONTHLY = '''114年01月 2330 台積電 各日成交資訊
+日期,成交股數,成交金額,開盤價,最高價,最低價,收盤價,漲跌價差,成交筆數
+114/01/02,"38,335,325","40,808,426,145","1,065.00","1,070.00","1,055.00","1,065.00",-10.00,"61,112"
+114/01/03,"32,431,123","35,013,258,337","1,080.00","1,085.00","1,075.00","1,085.00",+20.00,"45,010"
+114/01/06,"40,112,331","44,545,231,412","1,100.00","1,115.00","1,095.00","1,110.00",X25.00,"70,221"
+114/01/07,0,0,--,--,--,"1,110.00",0.00,0
+114/01/08,"21,000,000","23,100,000,000","1,100.00","1,098.00","1,095.00","1,105.00",-5.00,"30,000"
+114/01/09,"10,000","10,000,000",0.00,0.00,0.00,0.00,0.00,1
+114/01/10,"25,000,000","27,500,000,000","1,100.00","1,112.00","1,098.00","1,108.00",-2.00,"33,000"
+114/01/10,"25,500,000","27,600,000,000","1,100.00","1,112.00","1,098.00","1,109.00",-1.00,"33,100"
+'''
+
+# 全市場資料：證券代號欄位（含 ="0050" 形式）
+TWSE_MARKET = '''證券代號,證券名稱,日期,成交股數,成交金額,開盤價,最高價,最低價,收盤價,成交筆數
+"=""0050""",元大台灣50,114/01/02,"12,000,000","2,280,000,000",190.00,191.50,189.20,190.80,"8,000"
+"=""0050""",元大台灣50,114/01/03,"11,000,000","2,100,000,000",191.00,192.00,190.50,191.90,"7,500"
+2317,鴻海,2025-01-02,"50,000,000","9,000,000,000",180.00,182.00,178.50,181.50,"40,000"
+2317,鴻海,,"1,000","180,000",180.00,182.00,178.50,181.50,1
+'''
+
+
+def run_import(paths, db_path, cache_dir, *options):
+    env = {**os.environ, 'STOCK_PRICE_CACHE_DIR': cache_dir}
+    result = subprocess.run([sys.executable, os.path.join(PYTHON_DIR, 'import_prices.py'), *paths,
+                             f'--database={db_path}', *options], capture_output=True, text=True, env=env, timeout=120)
+    return json.loads(result.stdout)
+
+
+def check(name, passed, detail=''):
+    print(f"{'✅' if passed else '❌'} {name}{'：' + detail if detail else ''}")
+    return passed
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("歷史股價匯入測試")
+    print("="*60)
+
+    ok = True
+    dates = parse_dates(pd.Series(['114/01/02', '99/12/31', '2025-01-03', '114/02/30', 'abc'])).tolist()
+    ok &= check('民國年與西元年日期解析', dates[:3] == ['2025-01-02', '2010-12-31', '2025-01-03']
+                and pd.isna(dates[3]) and pd.isna(dates[4]), str(dates))
+    numbers = parse_numbers(pd.Series(['1,065.00', '--', 'X25.00', '+20.00', ' 3 ']))
+    ok &= check('數字欄位解析', np.allclose(numbers, [1065.0, np.nan, 25.0, 20.0, 3.0], equal_nan=True))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        monthly = os.path.join(tmp, 'STOCK_DAY_2330_202501.csv')
+        with open(monthly, 'w', encoding='cp950') as f:
+            f.write(TWSE_MONTHLY)
+        market = os.path.join(tmp, 'MI_INDEX.csv')
+        with open(market, 'w', encoding='utf-8-sig') as f:
+            f.write(TWSE_MARKET)
+
+        db_path = os.path.join(tmp, 'prices.sqlite')
+        cache_dir = os.path.join(tmp, 'price_cache')
+        stats = run_import([monthly, market], db_path, cache_dir, '--chunk-size=3')
+        print(f"  匯入統計: {stats}")
+        ok &= check('匯入筆數與剔除原因', stats['success'] and stats['rows_read'] == 12 and stats['rows_upserted'] == 8
+                    and stats['stocks_created'] == 3 and stats['rejected'] == {
+                        'unparseable': 1, 'non_positive': 1, 'ohlc_inconsistent': 1, 'duplicate': 1}
+                    and stats['cache_updated'] == 3)
+
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute(
+            'SELECT s.symbol, s.name, p.trade_date, p.open, p.high, p.low, p.close, p.volume, p.turnover, '
+            'p.change, p.transactions FROM stock_prices p JOIN stocks s ON s.id = p.stock_id '
+            'ORDER BY s.symbol, p.trade_date').fetchall()
+        by_symbol = {}
+        for row in rows:
+            by_symbol.setdefault(row[0], []).append(row)
+        tsmc = by_symbol['2330']
+        ok &= check('個股月報代號取自標題、名稱以代號代替', [r[2] for r in tsmc] == [
+            '2025-01-02', '2025-01-03', '2025-01-06', '2025-01-07', '2025-01-10'] and tsmc[0][1] == '2330')
+        ok &= check('千分位與漲跌標記', tsmc[0][3:] == (1065.0, 1070.0, 1055.0, 1065.0, 38335325, 40808426145.0, -10.0, 61112)
+                    and tsmc[2][9] == 25.0 and tsmc[1][9] == 20.0)
+        ok &= check('無成交日以收盤價補齊開高低價', tsmc[3][3:8] == (1110.0, 1110.0, 1110.0, 1110.0, 0))
+        ok &= check('同一交易日重複時以最後一筆為準', tsmc[4][6] == 1109.0)
+        ok &= check('全市場資料代號與名稱', [r[2] for r in by_symbol['0050']] == ['2025-01-02', '2025-01-03']
+                    and by_symbol['0050'][0][1] == '元大台灣50' and by_symbol['2317'][0][6] == 181.5)
+
+        # 模型端股價快取與資料表一致
+        cache = PriceCache(cache_dir)
+        cached = cache.load('2330')
+        ok &= check('股價快取與資料表一致',
+                    [str(d) for d in cached['dates']] == [r[2] for r in tsmc]
+                    and np.allclose(cached['close'], [r[6] for r in tsmc])
+                    and np.allclose(cached['volume'], [r[7] for r in tsmc])
+                    and cached['dates'].dtype == np.dtype('datetime64[D]'))
+
+        # 重複匯入：upsert 不新增資料列，修正後的價格覆寫舊值
+        with open(monthly, 'w', encoding='cp950') as f:
+            f.write(TWSE_MONTHLY.replace('"1,085.00",+20.00', '"1,084.00",+19.00'))
+        stats = run_import([monthly], db_path, cache_dir)
+        count = conn.execute('SELECT COUNT(*) FROM stock_prices').fetchone()[0]
+        close = conn.execute("SELECT close FROM stock_prices WHERE trade_date = '2025-01-03' AND stock_id = "
+                             "(SELECT id FROM stocks WHERE symbol = '2330')").fetchone()[0]
+        print(f"  重複匯入: {stats}，資料列 {count}，收盤價 {close}")
+        ok &= check('重複匯入以 upsert 覆寫', stats['stocks_created'] == 0 and count == 8 and close == 1084.0
+                    and cache.load('2330')['close'][1] == 1084.0)
+        conn.close()
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
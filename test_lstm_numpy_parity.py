@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+LSTM NumPy 推論一致性測試腳本
+訓練一個小型 LSTMPredictor，匯出權重後比較 Keras 與 NumPy 前向傳播的輸出
+"""
+
+import sys
+import os
+import time
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python', 'models'))
+
+from lstm_model import LSTMPredictor
+from lstm_numpy_model import NumpyLSTMPredictor
+
+# float32 前向傳播允許的最大誤差（標準化後數值）
+TOLERANCE = 1e-4
+
+
+def make_prices(seed, length=200):
+    """產生模擬股價"""
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.01, length)))
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("LSTM NumPy 推論一致性測試")
+    print("="*60)
+
+    temp_dir = tempfile.mkdtemp()
+    symbols = ['TEST_A', 'TEST_B']
+    predictors = []
+    paths = []
+    price_series = []
+
+    for i, symbol in enumerate(symbols):
+        prices = make_prices(i)
+        predictor = LSTMPredictor(lookback=30, units=32, epochs=3)
+        predictor.train(prices)
+
+        path = os.path.join(temp_dir, f'{symbol}.npz')
+        predictor.export_weights(path, {'stock_symbol': symbol})
+
+        predictors.append(predictor)
+        paths.append(path)
+        price_series.append(prices)
+        print(f"✓ {symbol} 已訓練並匯出: {path}")
+
+    failures = 0
+
+    # 單一網路：隨機視窗批次比較
+    rng = np.random.default_rng(42)
+    windows = rng.uniform(0, 1, (16, 30, 1)).astype(np.float32)
+    keras_out = predictors[0].model.predict(windows, verbose=0)[:, 0]
+    numpy_out = NumpyLSTMPredictor.load(paths[0]).network.forward(windows[None])[0, :, 0]
+    diff = float(np.max(np.abs(keras_out - numpy_out)))
+    ok = diff < TOLERANCE
+    failures += 0 if ok else 1
+    print(f"\n{'✅' if ok else '❌'} 單一網路前向傳播最大誤差: {diff:.2e}")
+
+    # 多檔堆疊：遞迴預測價格比較
+    stacked = NumpyLSTMPredictor.load_many(paths)
+    start = time.time()
+    numpy_prices = stacked.predict_batch(np.vstack(price_series), days=5)
+    numpy_elapsed = time.time() - start
+
+    start = time.time()
+    keras_prices = np.array([p.predict(prices, days=5) for p, prices in zip(predictors, price_series)])
+    keras_elapsed = time.time() - start
+
+    relative = float(np.max(np.abs(keras_prices - numpy_prices) / keras_prices))
+    ok = relative < TOLERANCE
+    failures += 0 if ok else 1
+    print(f"{'✅' if ok else '❌'} 多檔遞迴預測最大相對誤差: {relative:.2e}")
+    print(f"  Keras 預測耗時: {keras_elapsed:.3f} 秒")
+    print(f"  NumPy 預測耗時: {numpy_elapsed:.3f} 秒")
+
+    print("\n" + "="*60)
+    print("測試通過" if failures == 0 else f"測試失敗: {failures} 項")
+    print("="*60 + "\n")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
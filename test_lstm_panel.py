@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+面板 LSTM 模型測試腳本
+驗證所有股票資料都短於 lookback 時回傳清楚的資料不足訊息（函式與命令列），
+過短的股票被略過、每檔股票依時間切分訓練與驗證視窗，以及小型模型的訓練與預測流程
+"""
+
+import sys
+import os
+import json
+import tempfile
+import subprocess
+
+import numpy as np
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python', 'models')
+sys.path.insert(0, MODELS_DIR)
+
+from lstm_panel_model import PanelLSTMPredictor
+
+LOOKBACK = 10
+
+
+def make_panel(lengths, seed=0):
+    """產生各檔長度不同的模擬股價"""
+    rng = np.random.default_rng(seed)
+    return {f'S{k}': 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n))) for k, n in enumerate(lengths)}
+
+
+def run_cli(input_data):
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump(input_data, f)
+    try:
+        result = subprocess.run([sys.executable, os.path.join(MODELS_DIR, 'lstm_panel_model.py'), f.name],
+                                capture_output=True, text=True, timeout=600)
+        return result.returncode, json.loads(result.stdout)
+    finally:
+        os.unlink(f.name)
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("面板 LSTM 模型測試")
+    print("="*60)
+
+    ok = True
+    predictor = PanelLSTMPredictor(lookback=LOOKBACK, units=8, epochs=2, batch_size=64)
+
+    # 1. 所有股票都短於 lookback：明確的資料不足訊息，而非 numpy 的 concatenate 錯誤
+    short = make_panel([5, LOOKBACK, LOOKBACK + 1])
+    predictor._encode(list(short), {})
+    try:
+        predictor.prepare_data(short)
+        ok &= False
+        print("❌ 資料不足時未拋出例外")
+    except ValueError as e:
+        passed = '資料不足' in str(e) and str(LOOKBACK + 2) in str(e)
+        print(f"{'✅' if passed else '❌'} 資料不足訊息: {e}")
+        ok &= passed
+
+    with tempfile.TemporaryDirectory() as tmp:
+        returncode, output = run_cli({'mode': 'train', 'panel': {k: v.tolist() for k, v in short.items()},
+                                      'model_dir': tmp, 'lookback': LOOKBACK})
+        passed = returncode == 1 and not output['success'] and '資料不足' in output['error']
+        print(f"{'✅' if passed else '❌'} 命令列訓練模式回傳錯誤 JSON")
+        ok &= passed
+
+    # 2. 過短股票略過，每檔股票的驗證視窗都在訓練視窗之後
+    panel = make_panel([200, 120, 8])
+    predictor._encode(list(panel), {})
+    (X, sym, _, y), (X_val, sym_val, _, y_val) = predictor.prepare_data(panel)
+    expected = sum(len(p) - LOOKBACK for p in panel.values() if len(p) > LOOKBACK + 1)
+    symbols = set(np.unique(np.concatenate([sym, sym_val])).tolist())
+    passed = (len(X) + len(X_val) == expected and X.shape[1:] == (LOOKBACK,)
+              and symbols == {predictor.symbol_ids['S0'], predictor.symbol_ids['S1']})
+    for name in ('S0', 'S1'):
+        prices = panel[name]
+        returns = prices[1:] / prices[:-1] - 1
+        n_train = int((len(prices) - LOOKBACK) * (1 - 0.2))
+        passed &= np.allclose(y[sym == predictor.symbol_ids[name]], returns[LOOKBACK - 1:][:n_train], atol=1e-6)
+        passed &= np.allclose(y_val[sym_val == predictor.symbol_ids[name]], returns[LOOKBACK - 1:][n_train:], atol=1e-6)
+    print(f"{'✅' if passed else '❌'} 訓練 {len(X)} / 驗證 {len(X_val)} 個視窗，依時間切分且略過過短股票")
+    ok &= passed
+
+    # 3. 小型模型訓練、保存與預測
+    with tempfile.TemporaryDirectory() as tmp:
+        predictor.train(panel)
+        predictor.save(tmp)
+        loaded = PanelLSTMPredictor.load(tmp)
+        forecasts = loaded.predict({'S0': panel['S0'], 'S1': panel['S1']}, days=3)
+        passed = all(len(v) == 3 and np.all(np.isfinite(v)) for v in forecasts.values())
+        print(f"{'✅' if passed else '❌'} 訓練後預測: { {k: [round(x, 2) for x in v] for k, v in forecasts.items()} }")
+        ok &= passed
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+LSTM 超參數搜尋測試腳本
+驗證中位數剪枝（暖身期、對照試驗數不足、劣於 / 優於中位數）、時間序列切分只以訓練段估計標準化，
+格點抽樣不重複，以及小型搜尋保存的最佳設定可被讀回並由 lstm_model.py 沿用
+"""
+
+import sys
+import os
+import json
+import tempfile
+import subprocess
+
+import numpy as np
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python', 'models')
+sys.path.insert(0, MODELS_DIR)
+
+from lstm_search import (_median_pruner_callback, time_series_split, sample_configs, search,
+                         load_best_config, save_best_config, config_path)
+from lstm_model import LSTMPredictor
+
+
+class FakeModel:
+    """剪枝回調只需要 stop_training 屬性"""
+    stop_training = False
+
+
+def make_pruner(trial_id, curves, warmup=3, min_trials=2):
+    pruner = _median_pruner_callback(trial_id, curves, warmup, min_trials)
+    pruner.set_model(FakeModel())
+    return pruner
+
+
+def feed(pruner, losses):
+    for epoch, loss in enumerate(losses):
+        pruner.on_epoch_end(epoch, {'val_loss': loss})
+        if pruner.model.stop_training:
+            break
+
+
+def check(name, passed, detail=''):
+    print(f"{'✅' if passed else '❌'} {name}{'：' + detail if detail else ''}")
+    return passed
+
+
+def test_pruner():
+    ok = True
+    peers = {1: [0.5, 0.4, 0.3, 0.2, 0.1], 2: [0.6, 0.5, 0.4, 0.3, 0.2], 3: [0.7, 0.6, 0.5]}
+
+    # 劣於對照試驗中位數：暖身期（3 輪）後第一次比較即剪枝
+    curves = dict(peers)
+    worse = make_pruner(0, curves)
+    feed(worse, [0.9, 0.9, 0.9, 0.9, 0.9])
+    ok &= check('劣於中位數時於暖身期後剪枝', worse.pruned_at == 3 and worse.model.stop_training
+                and curves[0] == [0.9, 0.9, 0.9])
+
+    # 優於中位數：不剪枝
+    curves = dict(peers)
+    better = make_pruner(0, curves)
+    feed(better, [0.3, 0.2, 0.1, 0.05, 0.01])
+    ok &= check('優於中位數時繼續訓練', better.pruned_at is None and len(curves[0]) == 5)
+
+    # 第 4 輪之後只剩 2 個對照試驗有資料；min_trials=3 時不剪枝
+    curves = {1: peers[1], 2: peers[2], 3: peers[3]}
+    few = make_pruner(0, curves, warmup=4, min_trials=3)
+    feed(few, [0.9] * 5)
+    ok &= check('對照試驗數不足時不剪枝', few.pruned_at is None)
+
+    # 暖身期內即使遠差於對照試驗也不剪枝
+    curves = dict(peers)
+    warmup = make_pruner(0, curves, warmup=10)
+    feed(warmup, [9.0] * 5)
+    ok &= check('暖身期內不剪枝', warmup.pruned_at is None)
+    return ok
+
+
+def test_split():
+    ok = True
+    prices = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, 300))
+    targets = {}
+    for lookback in (20, 60):
+        predictor = LSTMPredictor(lookback=lookback)
+        X_train, y_train, X_val, y_val = time_series_split(predictor, prices, 0.2)
+        ok &= X_train.shape[1:] == (lookback, 1) and len(X_train) == 240 - lookback and len(X_val) == 60
+        ok &= np.isclose(predictor.scaler.data_min_[0], prices[:240].min())
+        ok &= np.isclose(predictor.scaler.data_max_[0], prices[:240].max())
+        targets[lookback] = predictor.scaler.inverse_transform(y_val.reshape(-1, 1))[:, 0]
+    ok &= np.allclose(targets[20], prices[240:]) and np.allclose(targets[60], prices[240:])
+    ok = check('時間序列切分（標準化只用訓練段，不同 lookback 驗證相同期間）', bool(ok))
+
+    configs = sample_configs(None, 10, seed=3)
+    unique = {tuple(sorted(c.items())) for c in configs}
+    ok &= check('格點抽樣不重複且可重現', len(unique) == 10 and configs == sample_configs(None, 10, seed=3)
+                and len(sample_configs(None, 1000)) == 27)
+    return ok
+
+
+def test_persistence():
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        config_dir = os.path.join(tmp, 'lstm_configs')
+        os.environ['STOCK_LSTM_CONFIG_DIR'] = config_dir
+        try:
+            ok &= check('尚未搜尋時回傳 None', load_best_config('TEST') is None and load_best_config(None) is None)
+            save_best_config('TEST', {'config': {'units': 8}})
+            ok &= check('保存路徑依 STOCK_LSTM_CONFIG_DIR', config_path('TEST') == os.path.join(config_dir, 'TEST.json')
+                        and load_best_config('TEST') == {'units': 8})
+
+            prices = 100 * np.exp(np.cumsum(np.random.default_rng(1).normal(0, 0.01, 160)))
+            result = search(prices, symbol='TEST', n_trials=3, workers=1, warmup_epochs=2, seed=0,
+                            search_space={'lookback': [10, 20], 'units': [8], 'dropout': [0.1, 0.2], 'epochs': [4]})
+            best = result['best_config']
+            completed = [t for t in result['trials'] if not t['pruned']]
+            print(f"  搜尋: {result['summary']}，最佳 {best}")
+            ok &= check('最佳設定為未剪枝試驗中驗證損失最小者',
+                        result['best_trial']['val_loss'] == min(t['val_loss'] for t in completed)
+                        and best['epochs'] == min(4, result['best_trial']['best_epoch'] + 10))
+
+            with open(config_path('TEST'), 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            ok &= check('最佳設定寫入檔案', saved['config'] == best and load_best_config('TEST') == best
+                        and saved['n_trials'] == 3 and saved['data_points'] == len(prices))
+
+            # lstm_model.py 未指定超參數時沿用最佳設定
+            input_file = os.path.join(tmp, 'input.json')
+            with open(input_file, 'w', encoding='utf-8') as f:
+                json.dump({'prices': prices.tolist(), 'stock_symbol': 'TEST', 'base_date': '2025-01-01',
+                           'prediction_days': 2}, f)
+            output = json.loads(subprocess.run([sys.executable, os.path.join(MODELS_DIR, 'lstm_model.py'), input_file],
+                                               capture_output=True, text=True, timeout=600).stdout)
+            hyperparameters = output.get('hyperparameters', {})
+            ok &= check('lstm_model.py 沿用最佳設定', output['success'] and hyperparameters.get('from_best_config')
+                        and all(hyperparameters[name] == best[name] for name in best), str(hyperparameters))
+        finally:
+            del os.environ['STOCK_LSTM_CONFIG_DIR']
+    return ok
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("LSTM 超參數搜尋測試")
+    print("="*60)
+
+    ok = test_pruner()
+    ok &= test_split()
+    ok &= test_persistence()
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+蒙地卡羅選擇權定價測試腳本
+驗證歐式選擇權價格在數個標準誤內等於 Black-Scholes（含 / 不含變異數縮減、不同分塊大小），
+幾何平均亞式封閉解、障礙選擇權 in + out 等於歐式、美式賣權接近二元樹價格，
+以及 alpha = 0 的 GARCH 模擬退化為固定波動率
+"""
+
+import sys
+import os
+import json
+import subprocess
+
+import numpy as np
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python', 'models')
+sys.path.insert(0, MODELS_DIR)
+
+from monte_carlo_pricer import MonteCarloPricer, black_scholes_price, geometric_asian_price
+
+SPOT, STRIKE, T, RATE, VOL = 100.0, 105.0, 0.5, 0.02, 0.25
+
+
+def binomial_american(spot, strike, T, rate, volatility, option_type='put', steps=2000):
+    """Cox-Ross-Rubinstein 二元樹美式選擇權價格（作為參考值）"""
+    dt = T / steps
+    up = np.exp(volatility * np.sqrt(dt))
+    p = (np.exp(rate * dt) - 1 / up) / (up - 1 / up)
+    discount = np.exp(-rate * dt)
+    prices = spot * up ** np.arange(-steps, steps + 1, 2)
+    sign = 1 if option_type == 'call' else -1
+    values = np.maximum(sign * (prices - strike), 0.0)
+    for _ in range(steps):
+        prices = prices[1:] / up
+        values = np.maximum(discount * (p * values[1:] + (1 - p) * values[:-1]), sign * (prices - strike))
+    return float(values[0])
+
+
+def within(result, reference, k=4.0):
+    """估計值與參考值的差距是否在 k 個標準誤內"""
+    return abs(result['price'] - reference) <= k * max(result['standard_error'], 1e-4)
+
+
+def check(name, passed, detail=''):
+    print(f"{'✅' if passed else '❌'} {name}{'：' + detail if detail else ''}")
+    return passed
+
+
+def test_european():
+    ok = True
+    for option_type in ('call', 'put'):
+        reference = black_scholes_price(SPOT, STRIKE, T, RATE, VOL, option_type)
+        for seed in range(3):
+            pricer = MonteCarloPricer(SPOT, STRIKE, T, RATE, VOL, option_type, seed=seed)
+            plain = pricer.price(paths=200000, antithetic=False, control_variate=False)
+            reduced = pricer.price(paths=200000)
+            ok &= check(f'歐式 {option_type}（種子 {seed}）在 4 個標準誤內',
+                        within(plain, reference) and within(reduced, reference)
+                        and reduced['standard_error'] < plain['standard_error'],
+                        f"BS {reference:.4f}，未縮減 {plain['price']} ± {plain['standard_error']:.4f}，"
+                        f"縮減後 {reduced['price']} ± {reduced['standard_error']:.4f}")
+
+    # 分塊大小只影響記憶體，不改變路徑：同一種子、不同分塊的結果相同
+    pricer = MonteCarloPricer(SPOT, STRIKE, T, RATE, VOL, 'call', steps=20, seed=5)
+    small = pricer.price(payoff='asian', paths=20000, chunk_size=1000)
+    large = pricer.price(payoff='asian', paths=20000, chunk_size=20000)
+    ok &= check('分塊大小不影響估計', abs(small['price'] - large['price']) < 1e-3
+                and abs(small['standard_error'] / large['standard_error'] - 1) < 0.02
+                and small['paths'] == large['paths'] == 20000 and pricer.steps == 20,
+                f"{small['price']} / {large['price']}")
+    return ok
+
+
+def test_path_dependent():
+    ok = True
+
+    # 幾何平均亞式：以控制變數本身的蒙地卡羅估計驗證封閉解
+    steps = 12
+    pricer = MonteCarloPricer(SPOT, STRIKE, T, RATE, VOL, 'call', steps=steps, seed=0)
+    rng = np.random.default_rng(0)
+    prices, _ = pricer.simulate(rng.standard_normal((400000, steps)))
+    geometric = np.exp(-RATE * T) * np.maximum(np.exp(np.log(prices[:, 1:]).mean(axis=1)) - STRIKE, 0.0)
+    closed = geometric_asian_price(SPOT, STRIKE, T, RATE, VOL, steps)
+    se = geometric.std() / np.sqrt(len(geometric))
+    ok &= check('幾何平均亞式封閉解', abs(geometric.mean() - closed) < 4 * se,
+                f'封閉解 {closed:.4f}，模擬 {geometric.mean():.4f} ± {se:.4f}')
+
+    asian = pricer.price(payoff='asian', paths=100000)
+    ok &= check('算術平均亞式介於幾何平均與歐式之間', closed < asian['price'] < asian['black_scholes_european']
+                and asian['control_variates'] == 2, f"{asian['price']} ± {asian['standard_error']}")
+
+    # 障礙選擇權：同一組路徑下 in + out = 歐式（歐式 gbm 改為單步模擬，故以碰不到的障礙取得同路徑的歐式價格）
+    barrier = {}
+    for name, barrier_type, level in (('up-and-out', 'up-and-out', 125), ('up-and-in', 'up-and-in', 125),
+                                      ('european', 'up-and-out', 1e9)):
+        barrier[name] = MonteCarloPricer(SPOT, STRIKE, T, RATE, VOL, 'call', steps=50, seed=2).price(
+            payoff='barrier', paths=50000, barrier=level, barrier_type=barrier_type, control_variate=False)
+    european = barrier['european']
+    total = barrier['up-and-out']['price'] + barrier['up-and-in']['price']
+    ok &= check('障礙選擇權 in + out = 歐式', abs(total - european['price']) < 2e-4
+                and barrier['up-and-out']['price'] < european['price']
+                and within(european, black_scholes_price(SPOT, STRIKE, T, RATE, VOL)),
+                f"{barrier['up-and-out']['price']} + {barrier['up-and-in']['price']} / {european['price']}")
+
+    # 美式賣權：Longstaff-Schwartz 為下界估計，應高於歐式並接近二元樹
+    reference = binomial_american(SPOT, STRIKE, T, RATE, VOL)
+    american = MonteCarloPricer(SPOT, STRIKE, T, RATE, VOL, 'put', seed=3).price(
+        payoff='american', paths=100000, lsm_paths=50000)
+    ok &= check('美式賣權接近二元樹價格', american['price'] > american['black_scholes_european']
+                and abs(american['price'] - reference) < 4 * american['standard_error'] + 0.01 * reference,
+                f"二元樹 {reference:.4f}，LSM {american['price']} ± {american['standard_error']}，"
+                f"歐式 {american['black_scholes_european']}")
+    return ok
+
+
+def test_garch():
+    # alpha = 0 時條件變異數固定為 omega / (1 - beta)（百分比日報酬單位），每步一個交易日即退化為固定波動率
+    daily_variance = VOL ** 2 / 252 * 1e4
+    garch = {'omega': daily_variance * 0.1, 'alpha': 0.0, 'beta': 0.9}
+    result = MonteCarloPricer(SPOT, STRIKE, T, RATE, option_type='call', dynamics='garch', garch=garch,
+                              seed=4).price(paths=100000)
+    reference = black_scholes_price(SPOT, STRIKE, T, RATE, VOL)
+    ok = check('alpha = 0 的 GARCH 等同固定波動率', within(result, reference),
+               f"BS {reference:.4f}，GARCH {result['price']} ± {result['standard_error']}")
+
+    payload = {'spot_price': SPOT, 'strike_price': STRIKE, 'days_to_expiry': 30, 'option_type': 'put',
+               'paths': 20000, 'dynamics': 'garch', 'garch': {'omega': 0.05, 'alpha': 0.6, 'beta': 0.5}}
+    output = json.loads(subprocess.run([sys.executable, os.path.join(MODELS_DIR, 'monte_carlo_pricer.py'),
+                                        json.dumps(payload)], capture_output=True, text=True, timeout=60).stdout)
+    ok &= check('不平穩的 GARCH 參數回傳錯誤', not output['success'] and 'alpha + beta' in output['error'])
+
+    payload['garch'] = {'omega': 0.05, 'alpha': 0.08, 'beta': 0.9}
+    output = json.loads(subprocess.run([sys.executable, os.path.join(MODELS_DIR, 'monte_carlo_pricer.py'),
+                                        json.dumps(payload)], capture_output=True, text=True, timeout=60).stdout)
+    ok &= check('命令列輸出', output['success'] and output['paths'] == 20000 and output['steps'] == 21
+                and output['confidence_interval'][0] < output['price'] < output['confidence_interval'][1])
+    return ok
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("蒙地卡羅選擇權定價測試")
+    print("="*60)
+
+    ok = test_european()
+    ok &= test_path_dependent()
+    ok &= test_garch()
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+選擇權分析立方體測試腳本
+以 SQLite 建立模擬 TXO 價格，驗證由立方體讀取的各分析端點數值與原始資料 GROUP BY 相同、
+增量更新只重算有變動的交易日，並比較端點查詢時間
+"""
+
+import sys
+import os
+import time
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python'))
+
+from db import Database
+from option_cube import OptionCube
+
+N_DAYS, N_STRIKES = 120, 60
+EXPIRIES = ('2025-03-19', '2025-04-16', '2025-06-18')
+
+
+def build_database(path, seed=0):
+    """建立選擇權合約與每日價格，回傳 (db, 交易日列表)"""
+    rng = np.random.default_rng(seed)
+    db = Database(path)
+    db.ensure_schema()
+
+    options = []
+    for expiry in EXPIRIES:
+        for k in range(N_STRIKES):
+            for option_type in ('call', 'put'):
+                options.append(('TXO', f'TXO{expiry}{option_type[0]}{k}', option_type, 20000 + 100 * k, expiry))
+    db.executemany('INSERT INTO options (underlying, option_code, option_type, strike_price, expiry_date) '
+                   'VALUES (?, ?, ?, ?, ?)', options)
+
+    dates = pd.bdate_range('2025-01-02', periods=N_DAYS).strftime('%Y-%m-%d').tolist()
+    rows = []
+    for d, date in enumerate(dates):
+        stamp = f'{date} 14:00:00'
+        for option_id in range(1, len(options) + 1):
+            close = float(rng.uniform(1, 500))
+            volume = int(rng.integers(0, 2000)) if rng.random() > 0.2 else 0
+            rows.append((option_id, date, close * 0.98, close * 1.05, close * 0.95,
+                         None if rng.random() < 0.1 else round(close, 2), volume,
+                         None if rng.random() < 0.05 else int(rng.integers(0, 20000)),
+                         None if rng.random() < 0.3 else round(float(rng.uniform(0.1, 0.4)), 6), stamp, stamp))
+    db.executemany('INSERT INTO option_prices (option_id, trade_date, open, high, low, close, volume, open_interest, '
+                   'implied_volatility, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+    db.commit()
+    return db, dates
+
+
+# 與 OptionAnalysisService / TxoMarketIndexService 相同的原始查詢與立方體查詢
+RAW = {
+    'volume': ("SELECT o.option_type, SUM(p.volume) FROM option_prices p JOIN options o ON p.option_id = o.id "
+               "WHERE p.trade_date = ? GROUP BY o.option_type ORDER BY o.option_type"),
+    'oi': ("SELECT o.option_type, SUM(p.open_interest) FROM option_prices p JOIN options o ON p.option_id = o.id "
+           "WHERE p.trade_date = ? GROUP BY o.option_type ORDER BY o.option_type"),
+    'distribution': ("SELECT o.strike_price, o.option_type, SUM(p.open_interest) FROM option_prices p "
+                     "JOIN options o ON p.option_id = o.id WHERE p.trade_date = ? "
+                     "GROUP BY o.strike_price, o.option_type ORDER BY o.strike_price, o.option_type"),
+    'avg_iv': "SELECT AVG(implied_volatility) FROM option_prices WHERE trade_date = ?",
+    'trend': ("SELECT trade_date, AVG(COALESCE(close, open, 0)), MAX(high), MIN(low), SUM(volume) FROM option_prices "
+              "WHERE trade_date BETWEEN ? AND ? GROUP BY trade_date ORDER BY trade_date"),
+    'iv': ("SELECT p.trade_date, o.option_type, AVG(p.implied_volatility) FROM option_prices p "
+           "JOIN options o ON p.option_id = o.id WHERE p.trade_date BETWEEN ? AND ? "
+           "AND p.implied_volatility IS NOT NULL GROUP BY p.trade_date, o.option_type ORDER BY 1, 2"),
+    'index': ("SELECT * FROM (SELECT trade_date, SUM(close * volume) / SUM(volume), AVG(close), SUM(volume) "
+              "FROM option_prices WHERE option_id IN (SELECT id FROM options WHERE underlying = 'TXO') "
+              "AND close > 0 AND volume > 0 GROUP BY trade_date ORDER BY trade_date DESC LIMIT ?) ORDER BY 1"),
+}
+CUBE = {
+    'volume': ("SELECT 'call', SUM(call_volume) FROM option_daily_stats WHERE trade_date = ? "
+               "UNION ALL SELECT 'put', SUM(put_volume) FROM option_daily_stats WHERE trade_date = ?"),
+    'oi': ("SELECT 'call', SUM(call_oi) FROM option_daily_stats WHERE trade_date = ? "
+           "UNION ALL SELECT 'put', SUM(put_oi) FROM option_daily_stats WHERE trade_date = ?"),
+    'distribution': ("SELECT strike_price, option_type, SUM(open_interest) FROM option_cube WHERE trade_date = ? "
+                     "GROUP BY strike_price, option_type ORDER BY strike_price, option_type"),
+    'avg_iv': ("SELECT (SUM(call_iv_sum) + SUM(put_iv_sum)) / (SUM(call_iv_count) + SUM(put_iv_count)) "
+               "FROM option_daily_stats WHERE trade_date = ?"),
+    'trend': ("SELECT trade_date, SUM(close_sum) / SUM(contracts), MAX(high), MIN(low), SUM(total_volume) "
+              "FROM option_daily_stats WHERE trade_date BETWEEN ? AND ? GROUP BY trade_date ORDER BY trade_date"),
+    'iv': ("SELECT trade_date, 'call', SUM(call_iv_sum) / SUM(call_iv_count) FROM option_daily_stats "
+           "WHERE trade_date BETWEEN ? AND ? GROUP BY trade_date UNION ALL "
+           "SELECT trade_date, 'put', SUM(put_iv_sum) / SUM(put_iv_count) FROM option_daily_stats "
+           "WHERE trade_date BETWEEN ? AND ? GROUP BY trade_date ORDER BY 1, 2"),
+    'index': ("SELECT * FROM (SELECT trade_date, weighted_index, avg_price, traded_volume FROM option_daily_stats "
+              "WHERE underlying = 'TXO' AND traded_count > 0 ORDER BY trade_date DESC LIMIT ?) ORDER BY 1"),
+}
+
+
+def params(name, dates):
+    date, start = dates[-1], dates[-30]
+    return {'volume': ((date,), (date, date)), 'oi': ((date,), (date, date)),
+            'distribution': ((date,), (date,)), 'avg_iv': ((date,), (date,)),
+            'trend': ((start, date), (start, date)), 'iv': ((start, date), (start, date, start, date)),
+            'index': ((200,), (200,))}[name]
+
+
+def compare(db, dates):
+    """比較各端點查詢，回傳 (最大差異, 原始查詢耗時, 立方體查詢耗時)"""
+    worst, raw_seconds, cube_seconds = 0.0, 0.0, 0.0
+    for name in RAW:
+        raw_params, cube_params = params(name, dates)
+        started = time.perf_counter()
+        raw = db.execute(RAW[name], raw_params).fetchall()
+        raw_seconds += time.perf_counter() - started
+        started = time.perf_counter()
+        cube = db.execute(CUBE[name], cube_params).fetchall()
+        cube_seconds += time.perf_counter() - started
+
+        if len(raw) != len(cube):
+            print(f"  {name}: 列數不同 {len(raw)} vs {len(cube)}")
+            return np.inf, raw_seconds, cube_seconds
+        for a, b in zip(raw, cube):
+            for x, y in zip(a, b):
+                if isinstance(x, (int, float)) and isinstance(y, (int, float)):
+                    worst = max(worst, abs(x - y) / max(1.0, abs(x)))
+                elif str(x) != str(y):
+                    print(f"  {name}: {a} vs {b}")
+                    return np.inf, raw_seconds, cube_seconds
+    return worst, raw_seconds, cube_seconds
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("選擇權分析立方體測試")
+    print("="*60)
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        db, dates = build_database(os.path.join(tmp, 'options.sqlite'))
+        total = db.execute('SELECT COUNT(*) FROM option_prices').fetchone()[0]
+
+        # 1. 全部建立
+        started = time.perf_counter()
+        stats = OptionCube(db).run()
+        print(f"原始價格 {total:,} 筆 → 立方體 {stats['cells']:,} 格，{stats['dates']} 個交易日，"
+              f"{time.perf_counter() - started:.2f}s")
+        worst, raw_seconds, cube_seconds = compare(db, dates)
+        print(f"端點查詢最大相對差異 {worst:.2e}；原始 GROUP BY {raw_seconds * 1000:.1f}ms，"
+              f"立方體 {cube_seconds * 1000:.1f}ms")
+        ok &= worst < 1e-9
+
+        # 2. 沒有變動時不重算
+        stats = OptionCube(db).run()
+        print(f"無變動重複執行: 重算 {stats['dates']} 個交易日")
+        ok &= stats['dates'] == 0
+
+        # 3. 修改一個交易日、新增一個交易日、刪除一個交易日
+        stamp = (datetime.now() + timedelta(minutes=1)).strftime('%Y-%m-%d %H:%M:%S')
+        db.execute('UPDATE option_prices SET volume = volume + 7, updated_at = ? WHERE trade_date = ? AND option_id < 50',
+                   (stamp, dates[-1]))
+        new_date = (pd.Timestamp(dates[-1]) + pd.offsets.BDay(1)).strftime('%Y-%m-%d')
+        db.execute('INSERT INTO option_prices (option_id, trade_date, open, high, low, close, volume, open_interest, '
+                   'implied_volatility, created_at, updated_at) SELECT option_id, ?, open, high, low, close, volume + 1, '
+                   'open_interest, implied_volatility, ?, ? FROM option_prices WHERE trade_date = ?',
+                   (new_date, stamp, stamp, dates[-1]))
+        db.execute('DELETE FROM option_prices WHERE trade_date = ?', (dates[0],))
+        db.commit()
+        dates = dates[1:] + [new_date]
+
+        started = time.perf_counter()
+        stats = OptionCube(db).run()
+        print(f"增量更新: 重算 {stats['dates']} 個交易日、移除 {stats['removed_dates']} 個，"
+              f"{time.perf_counter() - started:.2f}s")
+        ok &= stats['dates'] == 2 and stats['removed_dates'] == 1
+
+        worst, _, _ = compare(db, dates)
+        cube_dates = db.execute('SELECT COUNT(DISTINCT trade_date) FROM option_daily_stats').fetchone()[0]
+        print(f"增量更新後端點最大相對差異 {worst:.2e}，立方體交易日 {cube_dates}")
+        ok &= worst < 1e-9 and cube_dates == len(dates)
+        db.close()
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
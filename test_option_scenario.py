@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+選擇權組合情境分析測試腳本
+以逐點移植的 BlackScholesService.php 公式（Abramowitz-Stegun 常態累積分佈）為參考，
+驗證網格上的價值、損益與 Greeks，到期損益與損平衡點（跨式、價差的解析解），
+到期日的內在價值，以及命令列 base64 輸出可還原為相同的網格
+"""
+
+import sys
+import os
+import json
+import math
+import base64
+import subprocess
+
+import numpy as np
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python', 'models')
+sys.path.insert(0, MODELS_DIR)
+
+from option_scenario import evaluate_grid, expiry_payoff, summarize, TXO_MULTIPLIER
+
+
+def php_normal_cdf(x):
+    """BlackScholesService::normalCDF（Abramowitz-Stegun 近似）"""
+    a1, a2, a3, a4, a5, p = 0.254829592, -0.284496736, 1.421413741, -1.453152027, 1.061405429, 0.3275911
+    sign = -1 if x < 0 else 1
+    x = abs(x) / math.sqrt(2)
+    t = 1.0 / (1.0 + p * x)
+    y = 1.0 - (((((a5 * t + a4) * t) + a3) * t + a2) * t + a1) * t * math.exp(-x * x)
+    return 0.5 * (1.0 + sign * y)
+
+
+def php_black_scholes(S, K, T, r, sigma, option_type):
+    """BlackScholesService::calculatePrice 與 calculateGreeks（未四捨五入）"""
+    d1 = (math.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * math.sqrt(T))
+    d2 = d1 - sigma * math.sqrt(T)
+    n_prime = math.exp(-0.5 * d1 ** 2) / math.sqrt(2 * math.pi)
+    discount = math.exp(-r * T)
+    term1 = -(S * n_prime * sigma) / (2 * math.sqrt(T))
+    if option_type == 'call':
+        price = S * php_normal_cdf(d1) - K * discount * php_normal_cdf(d2)
+        delta = php_normal_cdf(d1)
+        term2 = -r * K * discount * php_normal_cdf(d2)
+        rho = K * T * discount * php_normal_cdf(d2)
+    else:
+        price = K * discount * php_normal_cdf(-d2) - S * php_normal_cdf(-d1)
+        delta = php_normal_cdf(d1) - 1
+        term2 = r * K * discount * php_normal_cdf(-d2)
+        rho = -K * T * discount * php_normal_cdf(-d2)
+    return {
+        'value': price,
+        'delta': delta,
+        'gamma': n_prime / (S * sigma * math.sqrt(T)),
+        'theta': (term1 + term2) / 365,
+        'vega': S * math.sqrt(T) * n_prime / 100,
+        'rho': rho / 100,
+    }
+
+
+def php_payoff(strike, premium, option_type, position, spots):
+    """BlackScholesService::calculatePayoff（未四捨五入）"""
+    sign = 1 if position == 'long' else -1
+    intrinsic = [max(0, s - strike) if option_type == 'call' else max(0, strike - s) for s in spots]
+    return np.array([(v - premium) * sign for v in intrinsic])
+
+
+def check(name, passed, detail=''):
+    print(f"{'✅' if passed else '❌'} {name}{'：' + detail if detail else ''}")
+    return passed
+
+
+def test_grid_against_php():
+    """鐵兀鷹（不同到期日、各腳波動率不同）每個網格點與 PHP 公式逐腳加總相同"""
+    spot, rate = 22000.0, 0.015
+    legs = [
+        {'option_type': 'put', 'strike_price': 21000, 'days_to_expiry': 30, 'position': 'long', 'quantity': 1,
+         'premium': 60, 'volatility': 0.24},
+        {'option_type': 'put', 'strike_price': 21500, 'days_to_expiry': 30, 'position': 'short', 'quantity': 2,
+         'premium': 120},
+        {'option_type': 'call', 'strike_price': 22500, 'days_to_expiry': 45, 'position': 'short', 'quantity': 2,
+         'premium': 150},
+        {'option_type': 'call', 'strike_price': 23000, 'days_to_expiry': 45, 'position': 'long', 'quantity': 1,
+         'premium': 70, 'volatility': 0.18},
+    ]
+    result = evaluate_grid(spot, legs, rate=rate, volatility=0.2, spot_points=9, time_points=5,
+                           vol_shifts=[-0.05, 0.0, 0.05], dtype=np.float64)
+    axes, grid = result['axes'], result['grid']
+    entry_cost = 60 - 2 * 120 - 2 * 150 + 70
+
+    worst = {field: 0.0 for field in ('value', 'pnl', 'delta', 'gamma', 'theta', 'vega', 'rho')}
+    for t, elapsed in enumerate(axes['days_elapsed']):
+        for v, shift in enumerate(axes['vol_shift']):
+            for s, S in enumerate(axes['spot']):
+                total = {field: 0.0 for field in worst if field != 'pnl'}
+                for leg in legs:
+                    days = leg['days_to_expiry'] - elapsed
+                    weight = (1 if leg['position'] == 'long' else -1) * leg['quantity']
+                    if days <= 0:
+                        intrinsic = (max(S - leg['strike_price'], 0) if leg['option_type'] == 'call'
+                                     else max(leg['strike_price'] - S, 0))
+                        total['value'] += weight * intrinsic
+                        if leg['option_type'] == 'call':
+                            total['delta'] += weight * float(S > leg['strike_price'])
+                        else:
+                            total['delta'] -= weight * float(S < leg['strike_price'])
+                        continue
+                    greeks = php_black_scholes(S, leg['strike_price'], days / 365, rate,
+                                               leg.get('volatility', 0.2) + shift, leg['option_type'])
+                    for field in total:
+                        total[field] += weight * greeks[field]
+                expected = {field: value * (1 if field in ('delta', 'gamma') else TXO_MULTIPLIER)
+                            for field, value in total.items()}
+                expected['pnl'] = (total['value'] - entry_cost) * TXO_MULTIPLIER
+                for field, value in expected.items():
+                    worst[field] = max(worst[field], abs(grid[field][t, v, s] - value))
+
+    # PHP 的常態累積分佈近似誤差約 1.5e-7：以 50 元 × 22000 點計，金額誤差在 1 元以內
+    tolerance = {'value': 1.0, 'pnl': 1.0, 'delta': 1e-6, 'gamma': 1e-9, 'theta': 0.05, 'vega': 0.05, 'rho': 0.05}
+    ok = check('網格與 BlackScholesService 公式相同', all(worst[f] < tolerance[f] for f in worst),
+               ', '.join(f'{f} {worst[f]:.2e}' for f in worst))
+    ok &= check('網格形狀與成本', grid['pnl'].shape == (5, 3, 9)
+                and np.isclose(result['entry_cost'], entry_cost)
+                and np.isclose(axes['days_to_expiry'][-1], 0.0))
+    return ok
+
+
+def test_payoff_and_breakevens():
+    ok = True
+    spots = np.linspace(19000, 25000, 601)
+
+    # 買進跨式：損平衡點為履約價 ± 兩腳權利金合計
+    straddle = [
+        {'option_type': 'call', 'strike_price': 22000, 'days_to_expiry': 20, 'position': 'long', 'premium': 300},
+        {'option_type': 'put', 'strike_price': 22000, 'days_to_expiry': 20, 'position': 'long', 'premium': 250},
+    ]
+    result = evaluate_grid(22000, straddle, spot_range=[19000, 25000], spot_points=601, time_points=3, vol_points=3)
+    payoff = expiry_payoff(result['axes']['spot'], result['legs'])
+    reference = sum(php_payoff(leg['strike_price'], leg['premium'], leg['option_type'], leg['position'], spots)
+                    for leg in straddle) * TXO_MULTIPLIER
+    summary = summarize(result['axes']['spot'], payoff, result, 22000)
+    ok &= check('到期損益與 calculatePayoff 加總相同', np.allclose(payoff, reference))
+    ok &= check('跨式損平衡點', summary['breakevens'] == [21450.0, 22550.0]
+                and summary['max_loss'] == -550 * TXO_MULTIPLIER and summary['entry_cost'] == 550 * TXO_MULTIPLIER,
+                str(summary['breakevens']))
+
+    # 多頭買權價差（損平衡點不在網格點上，需線性內插）：低履約價 + 淨權利金支出
+    spread = [
+        {'option_type': 'call', 'strike_price': 21800, 'days_to_expiry': 20, 'position': 'long', 'premium': 333},
+        {'option_type': 'call', 'strike_price': 22300, 'days_to_expiry': 20, 'position': 'short', 'premium': 121},
+    ]
+    result = evaluate_grid(22000, spread, spot_range=[19000, 25000], spot_points=601, time_points=3, vol_points=3)
+    payoff = expiry_payoff(result['axes']['spot'], result['legs'])
+    summary = summarize(result['axes']['spot'], payoff, result, 22000)
+    ok &= check('價差損平衡點與最大損益', summary['breakevens'] == [22012.0]
+                and summary['max_profit'] == (500 - 212) * TXO_MULTIPLIER
+                and summary['max_loss'] == -212 * TXO_MULTIPLIER, str(summary))
+
+    # 未提供權利金：以目前理論價為成本，今日、波動率不平移、價平的損益為零
+    unpriced = [{**leg, 'premium': None} for leg in spread]
+    result = evaluate_grid(22000, unpriced, spot_points=201, time_points=3, vol_shifts=[-0.02, 0.0, 0.02])
+    summary = summarize(result['axes']['spot'], expiry_payoff(result['axes']['spot'], result['legs']), result, 22000)
+    premium = php_black_scholes(22000, 21800, 20 / 365, 0.015, 0.2, 'call')['value']
+    ok &= check('未提供權利金時以理論價為成本', abs(summary['current']['pnl']) < 0.01
+                and abs(result['legs'][0]['premium'] - premium) < 0.01)
+    return ok
+
+
+def test_cli():
+    legs = [{'option_type': 'call', 'strike_price': 22000, 'days_to_expiry': 10, 'position': 'short', 'premium': 180}]
+    payload = {'spot_price': 22000, 'legs': legs, 'spot_points': 11, 'time_points': 4, 'vol_points': 3,
+               'fields': ['pnl', 'delta'], 'format': 'base64'}
+    output = json.loads(subprocess.run([sys.executable, os.path.join(MODELS_DIR, 'option_scenario.py'),
+                                        json.dumps(payload)], capture_output=True, text=True, timeout=60).stdout)
+    encoded = output['grid']['pnl']
+    decoded = np.frombuffer(base64.b64decode(encoded['data']), dtype='<f4').reshape(encoded['shape'])
+    expected = evaluate_grid(22000, legs, spot_points=11, time_points=4, vol_points=3)['grid']['pnl']
+    ok = check('命令列 base64 輸出可還原', output['success'] and encoded['shape'] == [4, 3, 11]
+               and np.array_equal(decoded, expected) and output['summary']['breakevens'] == [22180.0])
+
+    payload['fields'] = ['pnl', 'vanna']
+    output = json.loads(subprocess.run([sys.executable, os.path.join(MODELS_DIR, 'option_scenario.py'),
+                                        json.dumps(payload)], capture_output=True, text=True, timeout=60).stdout)
+    ok &= check('不支援的欄位回傳錯誤', not output['success'] and 'vanna' in output['error'])
+    return ok
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("選擇權組合情境分析測試")
+    print("="*60)
+
+    ok = test_grid_against_php()
+    ok &= test_payoff_and_breakevens()
+    ok &= test_cli()
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
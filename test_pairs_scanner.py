@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+配對共整合掃描測試腳本
+以模擬股價（共同因子 + 植入的共整合配對）建立股價快取，驗證：
+植入的配對被找出、檢定統計量與 statsmodels coint 一致、
+增量更新的避險比率與對新視窗直接 OLS 相同，並量測掃描與增量更新時間
+"""
+
+import sys
+import os
+import time
+import tempfile
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.stattools import coint
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python'))
+
+from price_cache import PriceCache, FIELDS
+from pairs_scanner import PairsScanner, load_universe
+
+N_SYMBOLS, N_DAYS, N_PLANTED, WINDOW = 300, 400, 10, 250
+
+
+def build_cache(cache_dir, seed=0):
+    """建立模擬股價快取，回傳 (cache, 植入的配對集合)"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2024-01-01', periods=N_DAYS).to_numpy().astype('datetime64[D]')
+
+    # 市場因子 + 產業因子 + 個股雜訊，報酬率彼此相關但價格不共整合
+    market = rng.normal(0, 0.01, N_DAYS)
+    sectors = rng.normal(0, 0.008, (10, N_DAYS))
+    returns = market + sectors[np.arange(N_SYMBOLS) % 10] + rng.normal(0, 0.012, (N_SYMBOLS, N_DAYS))
+    log_prices = np.log(50) + np.cumsum(returns, axis=1)
+
+    # 植入共整合配對：dependent = 0.3 + beta * independent + AR(1) 價差
+    planted = set()
+    for k in range(N_PLANTED):
+        i, j = 2 * k, 2 * k + 1
+        beta = rng.uniform(0.6, 1.4)
+        spread = np.zeros(N_DAYS)
+        for t in range(1, N_DAYS):
+            spread[t] = 0.75 * spread[t - 1] + rng.normal(0, 0.01)
+        log_prices[j] = 0.3 + beta * log_prices[i] + spread
+        planted.add((f'{1000 + i}', f'{1000 + j}'))
+
+    cache = PriceCache(cache_dir)
+    for s in range(N_SYMBOLS):
+        close = np.exp(log_prices[s])
+        data = {'dates': dates, **{name: close for name in FIELDS}}
+        # 部分股票偶有停牌一天
+        if s % 37 == 0:
+            data = {name: np.delete(values, 100) for name, values in data.items()}
+        cache.save(f'{1000 + s}', data)
+    return cache, planted, dates
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("配對共整合掃描測試")
+    print("="*60)
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        cache, planted, dates = build_cache(os.path.join(tmp, 'cache'))
+
+        # 1. 以前 N_DAYS - 5 天全掃描
+        history = {s: cache.load(s) for s in sorted(p[:-4] for p in os.listdir(cache.cache_dir))}
+        for symbol, data in history.items():
+            keep = data['dates'] <= dates[-6]
+            cache.save(symbol, {name: values[keep] for name, values in data.items()})
+
+        for workers in (1, 2):
+            scanner = PairsScanner(cache, os.path.join(tmp, f'pairs{workers}'), window=WINDOW,
+                                   min_correlation=0.5, workers=workers)
+            started = time.perf_counter()
+            pairs = scanner.scan()
+            elapsed = time.perf_counter() - started
+            print(f"全掃描（{workers} 程序）: {scanner.stats['symbols']} 檔，{scanner.stats['pairs_total']:,} 組配對，"
+                  f"候選 {scanner.stats['candidates']:,} 組，共整合 {len(pairs)} 組，{elapsed:.2f}s")
+
+        found = {tuple(sorted((p['independent'], p['dependent']))) for p in pairs}
+        print(f"植入配對找回 {len(planted & found)}/{len(planted)}")
+        ok &= planted <= found
+
+        # 2. 與 statsmodels coint（相同落後期）比較
+        _, names, log_prices = load_universe(cache, list(history), WINDOW)
+        column = {name: k for k, name in enumerate(names)}
+        worst = 0.0
+        for p in pairs[:20]:
+            y, x = log_prices[:, column[p['dependent']]], log_prices[:, column[p['independent']]]
+            statistic, p_value, _ = coint(y, x, maxlag=p['lag'], autolag=None)
+            worst = max(worst, abs(statistic - p['adf_statistic']), abs(p_value - p['p_value']))
+        print(f"與 statsmodels coint 最大差異 {worst:.2e}")
+        ok &= worst < 1e-3
+
+        # 3. 新增 5 個交易日後增量更新
+        for symbol, data in history.items():
+            cache.update(symbol, {name: values[data['dates'] > dates[-6]] for name, values in data.items()})
+        started = time.perf_counter()
+        updated = scanner.update()
+        elapsed = time.perf_counter() - started
+        print(f"增量更新: 新增 {scanner.stats['new_days']} 天，{scanner.stats['candidates']:,} 組重新檢定，"
+              f"共整合 {len(updated)} 組，{elapsed:.2f}s")
+        ok &= scanner.stats['mode'] == 'update' and scanner.stats['new_days'] == 5
+
+        _, names, log_prices = load_universe(cache, list(history), WINDOW)
+        column = {name: k for k, name in enumerate(names)}
+        worst = 0.0
+        for p in updated:
+            y, x = log_prices[:, column[p['dependent']]], log_prices[:, column[p['independent']]]
+            beta, alpha = np.polyfit(x, y, 1)
+            worst = max(worst, abs(beta - p['hedge_ratio']), abs(alpha - p['intercept']))
+        print(f"增量避險比率與直接 OLS 最大差異 {worst:.2e}")
+        ok &= worst < 1e-5 and planted <= {tuple(sorted((p['independent'], p['dependent']))) for p in updated}
+
+        # 4. 強制重新全掃描與增量結果一致（植入配對）
+        rescanned = {(p['independent'], p['dependent']): p for p in scanner.update(force_scan=True)}
+        incremental = {(p['independent'], p['dependent']): p for p in updated}
+        common = [key for key in rescanned if key in incremental
+                  and tuple(sorted(key)) in planted]
+        diff = max(abs(rescanned[k]['hedge_ratio'] - incremental[k]['hedge_ratio']) for k in common)
+        print(f"重新全掃描 vs 增量：植入配對 {len(common)} 組，避險比率最大差異 {diff:.2e}")
+        ok &= len(common) == len(planted) and diff < 1e-5
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
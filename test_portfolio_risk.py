@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+投資組合風險值測試腳本
+以 NumPy 直接計算的投組報酬驗證參數法 VaR / CVaR、歷史模擬法 VaR，
+邊際 VaR 與數值微分一致、成分 VaR 加總等於投組 VaR，蒙地卡羅法接近參數法，命令列輸出，
+以及共變異數磁碟快取（鍵為排序後的代號、視窗與最後報酬日，欄位順序不同時還原）
+"""
+
+import sys
+import os
+import json
+import tempfile
+import subprocess
+
+import numpy as np
+from scipy import stats
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python', 'models')
+sys.path.insert(0, MODELS_DIR)
+
+from portfolio_risk import PortfolioRiskEngine, covariance_path
+
+
+def make_prices(n_days=500, n_assets=5, seed=0):
+    """產生具相關性的模擬股價矩陣"""
+    rng = np.random.default_rng(seed)
+    loadings = rng.uniform(0.3, 1.0, n_assets)
+    market = rng.normal(0, 1.0, n_days)
+    returns = (market[:, None] * loadings + rng.normal(0, 0.8, (n_days, n_assets))) / 100
+    return 100 * np.exp(np.cumsum(returns, axis=0))
+
+
+def direct_parametric(returns, w, level):
+    """直接以投組報酬序列的平均與樣本標準差計算常態 VaR / CVaR"""
+    portfolio = returns @ w
+    mean, std = portfolio.mean(), portfolio.std(ddof=1)
+    z = stats.norm.ppf(1 - level)
+    return mean + z * std, mean - std * stats.norm.pdf(z) / (1 - level)
+
+
+def test_covariance_cache(returns, tmp):
+    """共變異數快取的命中、欄位順序還原與失效條件"""
+    symbols = ['2330', '2317', '2454', '1301', '2882']
+    direct = PortfolioRiskEngine.covariance(returns, 250)
+    first = PortfolioRiskEngine.covariance(returns, 250, symbols, '2025-06-30', tmp)
+    path = covariance_path(symbols, 250, '2025-06-30', 250, tmp)
+    ok = os.path.exists(path) and all(np.allclose(a, b) for a, b in zip(first, direct))
+
+    # 相同鍵直接讀取快取（以改變後的報酬確認未重新估計），欄位順序不同時還原為輸入順序
+    perm = [3, 0, 4, 1, 2]
+    mean, cov = PortfolioRiskEngine.covariance(returns[:, perm] * 2, 250, [symbols[i] for i in perm],
+                                               '2025-06-30', tmp)
+    ok &= np.allclose(mean, direct[0][perm]) and np.allclose(cov, direct[1][np.ix_(perm, perm)])
+
+    # 最後報酬日或視窗不同時重新估計；未提供代號時不寫入快取
+    newer = PortfolioRiskEngine.covariance(returns * 2, 250, symbols, '2025-07-01', tmp)
+    shorter = PortfolioRiskEngine.covariance(returns, 120, symbols, '2025-06-30', tmp)
+    PortfolioRiskEngine.covariance(returns, 60)
+    ok &= np.allclose(newer[1], direct[1] * 4) and np.allclose(shorter[1], np.cov(returns[-120:], rowvar=False))
+    ok &= sorted(os.listdir(tmp)) == sorted(os.path.basename(covariance_path(symbols, w, d, n, tmp))
+                                            for w, d, n in ((250, '2025-06-30', 250), (250, '2025-07-01', 250),
+                                                            (120, '2025-06-30', 120)))
+    print(f"共變異數快取: {len(os.listdir(tmp))} 個檔案，命中與欄位順序還原: {ok}")
+
+    # 命令列提供價格日期時以最後日期為鍵寫入 STOCK_COVARIANCE_CACHE_DIR，兩次執行結果相同
+    cli_dir = os.path.join(tmp, 'cli')
+    input_file = os.path.join(tmp, 'input.json')
+    prices = np.exp(np.cumsum(np.vstack([np.zeros(5), returns / 100]), axis=0)) * 100
+    with open(input_file, 'w', encoding='utf-8') as f:
+        json.dump({'prices': prices.tolist(), 'dates': [f'd{i}' for i in range(len(prices))], 'weights': [0.2] * 5,
+                   'window': 250, 'methods': ['parametric'], 'symbols': symbols}, f)
+    env = {**os.environ, 'STOCK_COVARIANCE_CACHE_DIR': cli_dir}
+    outputs = [subprocess.run([sys.executable, os.path.join(MODELS_DIR, 'portfolio_risk.py'), input_file],
+                              capture_output=True, text=True, env=env, timeout=60).stdout for _ in range(2)]
+    cli_ok = outputs[0] == outputs[1] and json.loads(outputs[0])['success'] and os.listdir(cli_dir) == [
+        os.path.basename(covariance_path(symbols, 250, f'd{len(prices) - 1}', 250, cli_dir))]
+    print(f"命令列寫入共變異數快取: {cli_ok}")
+    return ok and cli_ok
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("投資組合風險值測試")
+    print("="*60)
+
+    ok = True
+    prices = make_prices()
+    engine = PortfolioRiskEngine(seed=0, n_simulations=200000)
+    returns = engine.calculate_returns(prices)
+    ok &= np.allclose(returns, np.diff(np.log(prices), axis=0) * 100)
+
+    weights = np.random.default_rng(1).dirichlet(np.ones(5), size=4)
+    mean, cov = engine.covariance(returns, window=250)
+    window_returns = returns[-250:]
+
+    # 1. 參數法與直接計算一致
+    parametric = engine.parametric(mean, cov, weights)
+    errors = []
+    for level, label in ((0.95, 95), (0.99, 99)):
+        for k, w in enumerate(weights):
+            var, cvar = direct_parametric(window_returns, w, level)
+            errors += [abs(parametric[f'VaR_{label}'][k] - var), abs(parametric[f'CVaR_{label}'][k] - cvar)]
+    print(f"參數法與直接計算最大差異: {max(errors):.2e}")
+    ok &= max(errors) < 1e-10
+
+    # 2. 歷史模擬法與 np.percentile 一致
+    historical = engine.historical(window_returns, weights)
+    portfolio = window_returns @ weights.T
+    expected_var = np.percentile(portfolio, 5, axis=0)
+    expected_cvar = [portfolio[portfolio[:, k] <= expected_var[k], k].mean() for k in range(len(weights))]
+    hist_ok = np.allclose(historical['VaR_95'], expected_var) and np.allclose(historical['CVaR_95'], expected_cvar)
+    print(f"歷史模擬法與 np.percentile 一致: {hist_ok}")
+    ok &= hist_ok
+
+    # 3. 邊際 VaR 為投組 VaR 對權重的偏微分，成分 VaR 加總等於投組 VaR
+    marginal, component = engine.component_var(mean, cov, weights, 0.95)
+    h = 1e-6
+    numeric = np.empty_like(marginal)
+    for k, w in enumerate(weights):
+        for i in range(len(w)):
+            up, down = w.copy(), w.copy()
+            up[i] += h
+            down[i] -= h
+            numeric[k, i] = (direct_parametric(window_returns, up, 0.95)[0]
+                             - direct_parametric(window_returns, down, 0.95)[0]) / (2 * h)
+    gradient_error = np.max(np.abs(marginal - numeric))
+    sum_error = np.max(np.abs(component.sum(axis=1) - parametric['VaR_95']))
+    print(f"邊際 VaR 與數值微分最大差異: {gradient_error:.2e}，成分 VaR 加總差異: {sum_error:.2e}")
+    ok &= gradient_error < 1e-6 and sum_error < 1e-10
+
+    # 4. 蒙地卡羅法接近參數法（投組空間與標的空間兩種模擬路徑）
+    few = engine.monte_carlo(mean, cov, weights)
+    many_weights = np.random.default_rng(2).dirichlet(np.ones(5), size=8)
+    many = engine.monte_carlo(mean, cov, many_weights)
+    many_parametric = engine.parametric(mean, cov, many_weights)
+    mc_error = max(np.max(np.abs(few['VaR_99'] / parametric['VaR_99'] - 1)),
+                   np.max(np.abs(many['VaR_99'] / many_parametric['VaR_99'] - 1)))
+    print(f"蒙地卡羅 VaR_99 與參數法最大相對差異: {mc_error:.2%}")
+    ok &= mc_error < 0.02
+
+    # 5. 命令列輸出與直接計算一致
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump({'prices': prices.tolist(), 'weights': weights.tolist(), 'window': 250,
+                   'methods': ['parametric'], 'symbols': [f'S{i}' for i in range(5)]}, f)
+    try:
+        output = json.loads(subprocess.run([sys.executable, os.path.join(MODELS_DIR, 'portfolio_risk.py'), f.name],
+                                           capture_output=True, text=True, timeout=60).stdout)
+    finally:
+        os.unlink(f.name)
+    cli_var = [p['risk_metrics']['parametric']['VaR_95'] for p in output['portfolios']]
+    cli_ok = output['success'] and np.allclose(cli_var, parametric['VaR_95'], atol=1e-6)
+    print(f"命令列輸出一致: {cli_ok}")
+    ok &= cli_ok
+
+    # 6. 共變異數快取
+    with tempfile.TemporaryDirectory() as tmp:
+        ok &= test_covariance_cache(returns, tmp)
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
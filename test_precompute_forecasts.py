@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+收盤後預先計算預測測試腳本
+以模擬股價快取驗證：觀察清單優先、其餘依成交值排序，預測檔的資料日 / 適用交易日 / 輸入雜湊，
+與直接執行模型結果相同，輸入不變時重複執行沿用既有預測，時間預算用盡時停止排入，以及休市日略過
+"""
+
+import sys
+import os
+import json
+import time
+import tempfile
+import subprocess
+import warnings
+warnings.filterwarnings('ignore')
+
+import numpy as np
+
+PYTHON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python')
+sys.path.insert(0, PYTHON_DIR)
+
+from price_cache import PriceCache
+from precompute_forecasts import ForecastPrecomputer, prioritize, build_input, MANIFEST_FILE
+from twse_calendar import TwseCalendar
+
+N_SYMBOLS, N_DAYS = 6, 260
+WATCHLIST = ['S0004', 'S0001']
+
+
+def build_cache(cache_dir, calendar, seed=0):
+    """建立模擬股價快取（最後一日為 2025-06-30），回傳 PriceCache"""
+    rng = np.random.default_rng(seed)
+    cache = PriceCache(cache_dir)
+    dates = calendar.trading_days('2024-01-01', '2025-06-30')[-N_DAYS:]
+    for k in range(N_SYMBOLS):
+        close = 100 * np.exp(np.cumsum(rng.standard_normal(N_DAYS) * 0.015))
+        cache.save(f'S{k:04d}', {
+            'dates': dates,
+            'open': close * 0.995,
+            'high': close * 1.01,
+            'low': close * 0.99,
+            'close': np.round(close, 2),
+            # 成交量依代號遞增，全市場排序應為 S0005, S0004, ...
+            'volume': np.full(N_DAYS, 1000.0 * 10 ** k),
+        })
+    return cache
+
+
+def run_model(model_type, input_data):
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump(input_data, f)
+    try:
+        output = subprocess.run([sys.executable, os.path.join(PYTHON_DIR, 'models', f'{model_type}_model.py'), f.name],
+                                capture_output=True, text=True, timeout=600).stdout
+        return json.loads(output)
+    finally:
+        os.unlink(f.name)
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("收盤後預先計算預測測試")
+    print("="*60)
+
+    ok = True
+    calendar = TwseCalendar(holidays=[])
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = build_cache(os.path.join(tmp, 'cache'), calendar)
+        forecast_dir = os.path.join(tmp, 'forecasts')
+        universe = sorted(name[:-4] for name in os.listdir(cache.cache_dir) if name.endswith('.npz'))
+
+        # 1. 計算順序
+        precomputer = ForecastPrecomputer(cache, forecast_dir=forecast_dir, prediction_days=5, calendar=calendar)
+        symbols = prioritize(WATCHLIST, universe, precomputer.turnover(universe))
+        print(f"計算順序: {symbols}")
+        ok &= symbols == ['S0004', 'S0001', 'S0005', 'S0003', 'S0002', 'S0000']
+
+        # 2. 時間預算用盡時不排入工作
+        stats = ForecastPrecomputer(cache, forecast_dir=forecast_dir, budget_seconds=0,
+                                    calendar=calendar).run(symbols)
+        with open(os.path.join(forecast_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        print(f"時間預算 0 秒: 計算 {stats['computed']}，未計算 {stats['budget_exhausted']}，"
+              f"第一個未計算 {manifest['not_computed'][0]}")
+        ok &= stats['computed'] == 0 and stats['budget_exhausted'] == 2 * N_SYMBOLS
+        ok &= manifest['not_computed'][0] == {'model_type': 'arima', 'symbol': 'S0004'}
+
+        # 3. 全部計算
+        started = time.perf_counter()
+        stats = precomputer.run(symbols)
+        print(f"完整計算: {stats['computed']} 個預測，失敗 {stats['failed']}，{time.perf_counter() - started:.1f}s")
+        ok &= stats['computed'] == 2 * N_SYMBOLS and stats['failed'] == 0
+
+        content = precomputer.load_forecast('garch', 'S0004')
+        print(f"  GARCH S0004: 資料日 {content['as_of']}，適用交易日 {content['valid_for']}，"
+              f"預測 {len(content['result']['predictions'])} 天，第 1 天 {content['result']['predictions'][0]['target_date']}")
+        ok &= content['as_of'] == '2025-06-30' and content['valid_for'] == '2025-07-01'
+        ok &= len(content['result']['predictions']) == 5 and content['historical_days'] == 200
+        # PredictionService 以合併預設值後的請求參數逐一比對這些參數（含資料驗證預設值）
+        mirrored = build_input('garch', 'S0004', cache.load('S0004', 200), 5)
+        ok &= content['parameters'] == {key: mirrored[key] for key in content['parameters']} \
+            and {'p', 'q', 'dist', 'validate', 'adjust_jumps'} <= set(content['parameters'])
+
+        # 4. 與直接執行模型相同；輸入與 PredictionService 預設相同（不做資料驗證清理）
+        mirrored = build_input('arima', 'S0001', cache.load('S0001', 100), 5)
+        print(f"  預設資料驗證: {mirrored['validate']}，跳空調整: {mirrored['adjust_jumps']}")
+        ok &= mirrored['validate'] is False and mirrored['adjust_jumps'] is True
+        for model_type, days in (('arima', 100), ('garch', 200)):
+            data = cache.load('S0001', days)
+            direct = run_model(model_type, build_input(model_type, 'S0001', data, 5))
+            saved = precomputer.load_forecast(model_type, 'S0001')['result']
+            same = direct['predictions'] == saved['predictions']
+            print(f"  {model_type} S0001 與直接執行相同: {same}")
+            ok &= same
+
+        # 5. 輸入不變時沿用，新增一日價格後重算
+        stats = precomputer.run(symbols)
+        print(f"重複執行: 計算 {stats['computed']}，沿用 {stats['fresh']}")
+        ok &= stats['computed'] == 0 and stats['fresh'] == 2 * N_SYMBOLS
+
+        data = cache.load('S0002')
+        cache.update('S0002', {'dates': np.array(['2025-07-01'], dtype='datetime64[D]'),
+                               **{name: data[name][-1:] for name in ('open', 'high', 'low', 'close', 'volume')}})
+        stats = precomputer.run(symbols)
+        content = precomputer.load_forecast('arima', 'S0002')
+        print(f"S0002 新增價格後: 計算 {stats['computed']}，資料日 {content['as_of']}，適用交易日 {content['valid_for']}")
+        ok &= stats['computed'] == 2 and content['as_of'] == '2025-07-01' and content['valid_for'] == '2025-07-02'
+
+        # 6. 休市日略過
+        env = {**os.environ, 'STOCK_PRICE_CACHE_DIR': cache.cache_dir, 'STOCK_FORECAST_DIR': forecast_dir}
+        output = json.loads(subprocess.run(
+            [sys.executable, os.path.join(PYTHON_DIR, 'precompute_forecasts.py'), '--date=2025-07-05', '--universe'],
+            capture_output=True, text=True, env=env, timeout=60).stdout)
+        print(f"週六執行: {output}")
+        ok &= output['success'] and output.get('reason') == 'not_trading_day' and output['next_session'] == '2025-07-07'
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
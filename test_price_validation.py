@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+股價資料驗證與 TWSE 交易日曆測試腳本
+驗證固定假日的週末調移、休市日清單、交易日位移與計數，
+以及 OHLCV 面板檢查（缺漏交易日、非交易日、非正價格、OHLC 不一致、停滯價格、推定休市日）、
+跳空回溯調整與模型輸入清理時移除的資料列
+"""
+
+import sys
+import os
+import json
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python', 'models'))
+
+from twse_calendar import TwseCalendar, load_holidays
+from price_validation import validate_panel, clean_input
+
+
+def check(name, passed, detail=''):
+    print(f"{'✅' if passed else '❌'} {name}{'：' + detail if detail else ''}")
+    return passed
+
+
+def test_calendar():
+    ok = True
+    calendar = TwseCalendar(holidays=[])
+
+    # 固定假日：2025-04-04 週五休市；2021-10-10 週日順延至週一；2022-01-01 週六提前至 2021-12-31
+    days = ['2025-04-03', '2025-04-04', '2021-10-11', '2021-12-31', '2022-01-03', '2025-04-05']
+    trading = calendar.is_trading_day(days).tolist()
+    ok &= check('固定假日與週末調移', trading == [True, False, False, False, True, False], str(trading))
+
+    shifts = [str(calendar.offset('2025-04-03', 1)), str(calendar.offset('2025-04-05', 0)),
+              str(calendar.offset('2025-04-07', -1))]
+    ok &= check('交易日位移（跨週末與假日、非交易日順延）',
+                shifts == ['2025-04-07', '2025-04-07', '2025-04-03'], str(shifts))
+    ok &= check('交易日計數', calendar.count('2025-03-31', '2025-04-07') == 4)
+    ok &= check('區間交易日', [str(d) for d in calendar.trading_days('2025-04-03', '2025-04-07')]
+                == ['2025-04-03', '2025-04-07'])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'holidays.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(['2025-01-27', '2025-01-28'], f)
+        os.environ['STOCK_TWSE_HOLIDAYS'] = path
+        try:
+            loaded = TwseCalendar()
+            ok &= check('休市日清單（農曆假日）', not loaded.is_trading_day('2025-01-27')
+                        and str(loaded.offset('2025-01-24', 1)) == '2025-01-29')
+            ok &= check('清單不存在時為空', len(load_holidays(os.path.join(tmp, 'missing.json'))) == 0)
+        finally:
+            del os.environ['STOCK_TWSE_HOLIDAYS']
+    return ok
+
+
+def build_panel(calendar, seed=0):
+    """建立三檔股票的乾淨 OHLCV 面板"""
+    rng = np.random.default_rng(seed)
+    dates = calendar.trading_days('2025-02-03', '2025-04-30')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(dates), 3)), axis=0))
+    panel = {'close': close, 'open': close.copy(), 'high': close * 1.01, 'low': close * 0.99,
+             'volume': np.full(close.shape, 1000.0)}
+    return dates, panel
+
+
+def test_panel():
+    ok = True
+    calendar = TwseCalendar(holidays=[])
+    dates, panel = build_panel(calendar)
+    original = panel['close'].copy()
+
+    # 股票 0：第 20 筆起價格減半（類似 1 拆 2）
+    for name in ('close', 'open', 'high', 'low'):
+        panel[name][20:, 0] /= 2
+    # 股票 1：非正價格與最高價低於收盤價
+    panel['close'][10, 1] = -1.0
+    panel['high'][15, 1] = panel['close'][15, 1] * 0.9
+    # 股票 2：連續 5 筆相同收盤價且無成交量、一個缺漏交易日
+    panel['close'][31:35, 2] = panel['close'][30, 2]
+    panel['open'][31:35, 2] = panel['high'][31:35, 2] = panel['low'][31:35, 2] = panel['close'][30, 2]
+    panel['volume'][31:35, 2] = 0
+    panel['close'][40, 2] = np.nan
+    # 所有股票皆無資料的平日：推定為日曆外的休市日
+    panel['close'][45] = np.nan
+
+    # 股票 0 在週六多出一筆資料
+    dates = np.append(dates, np.datetime64('2025-03-08'))
+    for name in panel:
+        extra = np.full((1, 3), np.nan)
+        extra[0, 0] = panel[name][23, 0]
+        panel[name] = np.vstack([panel[name], extra])
+
+    cleaned_dates, cleaned, report = validate_panel(
+        dates, panel['close'], open_=panel['open'], high=panel['high'], low=panel['low'],
+        volume=panel['volume'], symbols=['A', 'B', 'C'], calendar=calendar)
+    summary = report['summary']
+    print(f"  報告: {summary}，推定休市日 {report['inferred_closures']}")
+
+    expected = {'missing_day': 1, 'non_trading_day': 1, 'non_positive': 1, 'ohlc_inconsistent': 1,
+                'split_like_jump': 1, 'stale': 4}
+    ok &= check('各類問題筆數', summary == expected)
+    ok &= check('推定休市日', report['inferred_closures'] == [str(dates[45])])
+    ok &= check('週六與推定休市日自時間軸移除',
+                len(cleaned_dates) == len(dates) - 2 and np.datetime64('2025-03-08') not in cleaned_dates
+                and dates[45] not in cleaned_dates)
+    ok &= check('跳空問題日期', report['issues']['A']['split_like_jump']['dates'] == [str(dates[20])])
+
+    # 跳空前價格乘上跳空當日的價格比例：跳空當日報酬為 0，其餘報酬率與原始序列相同，跳空後價格不變
+    a = cleaned[:, 0]
+    kept = np.array([d != dates[45] for d in dates[:-1]])
+    adjusted_returns = np.diff(np.log(a))
+    original_returns = np.diff(np.log(original[kept, 0]))
+    jump = 19
+    ok &= check('跳空回溯調整', np.isclose(adjusted_returns[jump], 0)
+                and np.allclose(np.delete(adjusted_returns, jump), np.delete(original_returns, jump))
+                and np.isclose(a[-1], original[-1, 0] / 2))
+
+    # 無效價格與停滯價格以前值填補（fill_missing 預設）
+    b = cleaned[:, 1]
+    ok &= check('無效價格以前值填補', b[10] == b[9] and b[15] == b[14])
+    return ok
+
+
+def test_clean_input():
+    ok = True
+    calendar = TwseCalendar(holidays=[])
+    dates, panel = build_panel(calendar, seed=1)
+    close = panel['close'][:, 0].copy()
+    close[30:] /= 2
+    close[12] = 0.0
+
+    input_data = {'dates': [str(d) for d in dates], 'stock_symbol': 'A', 'volumes': [1000] * len(dates)}
+    prices, report = clean_input(input_data, close)
+    print(f"  模型輸入: {report['data_points']}，跳空 {report['summary']['split_like_jump']}")
+    ok &= check('移除非正價格資料列', report['data_points'] == {'input': len(close), 'cleaned': len(close) - 1})
+    # 跳空前價格乘上跳空當日的價格比例（含當日正常報酬），跳空後價格不變
+    ratio = close[30] / close[29]
+    ok &= check('模型輸入跳空調整', np.isclose(prices[0], close[0] * ratio) and np.isclose(prices[-1], close[-1]))
+
+    raw, report = clean_input({**input_data, 'adjust_jumps': False}, close)
+    ok &= check('adjust_jumps=false 只回報不調整', np.isclose(raw[0], close[0])
+                and report['summary']['split_like_jump'] == 1 and not report['adjusted_jumps'])
+
+    no_dates, report = clean_input({'stock_symbol': 'A'}, close)
+    ok &= check('沒有日期時略過交易日檢查', not report['calendar_checked'] and len(no_dates) == len(close) - 1)
+    return ok
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("股價資料驗證與 TWSE 交易日曆測試")
+    print("="*60)
+
+    ok = test_calendar()
+    ok &= test_panel()
+    ok &= test_clean_input()
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+慢速執行剖析擷取測試腳本
+驗證未設定門檻時不剖析、未超過門檻時不寫入、超過門檻時寫入可由 pstats 讀取的剖析檔與中繼資料
+（含輸入指紋而不含原始資料、例外時的狀態）、輪替只保留最新的擷取，
+以及經 run_model.py 執行時包裝程序與模型子程序寫入同一個擷取目錄
+"""
+
+import sys
+import os
+import json
+import time
+import pstats
+import tempfile
+import subprocess
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(ROOT_DIR, 'python', 'models')
+sys.path.insert(0, MODELS_DIR)
+
+from profiling import ProfileCapture, profile_threshold, input_fingerprint, write_capture
+
+
+def slow_function(seconds):
+    """以忙碌迴圈消耗 CPU 時間，讓剖析結果中出現本函式"""
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+def captures(directory):
+    return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+
+def check(name, passed, detail=''):
+    print(f"{'✅' if passed else '❌'} {name}{'：' + detail if detail else ''}")
+    return passed
+
+
+def test_capture(tmp):
+    ok = True
+    directory = os.environ['STOCK_PROFILE_DIR']
+    prices = list(np.round(np.linspace(100, 120, 500), 2))
+    input_file = os.path.join(tmp, 'input.json')
+    with open(input_file, 'w', encoding='utf-8') as f:
+        json.dump({'prices': prices, 'prediction_days': 5, 'stock_symbol': '2330'}, f)
+
+    os.environ.pop('STOCK_PROFILE_THRESHOLD', None)
+    with ProfileCapture('test') as capture:
+        slow_function(0.05)
+    ok &= check('未設定門檻時不剖析', profile_threshold() is None and not capture.enabled
+                and capture.profiler is None and captures(directory) == [])
+
+    with ProfileCapture('test', threshold=10.0, input_path=input_file) as capture:
+        slow_function(0.05)
+    ok &= check('未超過門檻不寫入', capture.elapsed < 10.0 and capture.path is None and captures(directory) == [])
+
+    with ProfileCapture('test', threshold=0.1, input_path=input_file) as capture:
+        slow_function(0.2)
+    files = sorted(os.listdir(capture.path)) if capture.path else []
+    ok &= check('超過門檻寫入擷取目錄', files == ['meta.json', 'profile.pstats', 'profile.txt'], str(files))
+
+    stats = pstats.Stats(os.path.join(capture.path, 'profile.pstats'))
+    functions = {name for (_, _, name) in stats.stats}
+    with open(os.path.join(capture.path, 'meta.json'), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    ok &= check('剖析檔可由 pstats 讀取', 'slow_function' in functions)
+    ok &= check('中繼資料', meta['status'] == 'ok' and meta['elapsed_seconds'] >= 0.1
+                and meta['threshold_seconds'] == 0.1 and 'numpy' in meta['environment']['libraries'])
+    fingerprint = meta['input']
+    ok &= check('輸入指紋不含原始資料', fingerprint == input_fingerprint(
+                    {'prices': prices, 'prediction_days': 5, 'stock_symbol': '2330'})
+                and fingerprint['fields']['prices'] == {'length': 500, 'first': 100.0, 'last': 120.0}
+                and not os.path.exists(os.path.join(capture.path, 'input.json')))
+
+    # 例外照常拋出，狀態記為 error；sys.exit(0) 視為正常結束
+    raised = False
+    try:
+        with ProfileCapture('failing', threshold=0.0) as failing:
+            raise ValueError('boom')
+    except ValueError:
+        raised = True
+    try:
+        with ProfileCapture('exit', threshold=0.0) as exiting:
+            sys.exit(0)
+    except SystemExit:
+        pass
+    statuses = []
+    for capture_path in (failing.path, exiting.path):
+        with open(os.path.join(capture_path, 'meta.json'), 'r', encoding='utf-8') as f:
+            statuses.append(json.load(f)['status'])
+    ok &= check('例外時狀態與傳遞', raised and statuses == ['error', 'ok'], str(statuses))
+
+    os.environ['STOCK_PROFILE_SAVE_INPUT'] = '1'
+    try:
+        with ProfileCapture('saved', threshold=0.0, input_path=input_file) as saved:
+            pass
+    finally:
+        del os.environ['STOCK_PROFILE_SAVE_INPUT']
+    with open(os.path.join(saved.path, 'input.json'), 'r', encoding='utf-8') as f:
+        ok &= check('STOCK_PROFILE_SAVE_INPUT 保存完整輸入', json.load(f)['prices'] == prices)
+    return ok
+
+
+def test_rotation(tmp):
+    directory = os.path.join(tmp, 'rotation')
+    names = [f'20250101-00000{i}-000000_test_1' for i in range(5)]
+    for name in names:
+        write_capture(name, {'meta.json': {'name': name}}, directory=directory, keep=3)
+    return check('輪替只保留最新的擷取', captures(directory) == names[2:], str(captures(directory)))
+
+
+def test_run_model(tmp):
+    ok = True
+    input_file = os.path.join(tmp, 'har_input.json')
+    prices = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, 300)))
+    with open(input_file, 'w', encoding='utf-8') as f:
+        json.dump({'prices': prices.tolist(), 'base_date': '2025-01-01', 'prediction_days': 3,
+                   'use_cache': False}, f)
+
+    results = {}
+    for threshold in ('1000', '0'):
+        directory = os.path.join(tmp, f'run_model_{threshold}')
+        env = {**os.environ, 'STOCK_PROFILE_THRESHOLD': threshold, 'STOCK_PROFILE_DIR': directory}
+        output = json.loads(subprocess.run([sys.executable, os.path.join(ROOT_DIR, 'python', 'run_model.py'), 'har',
+                                            input_file], capture_output=True, text=True, env=env, timeout=120).stdout)
+        results[threshold] = (output['success'], captures(directory), directory)
+
+    ok &= check('run_model.py 未超過門檻不寫入', results['1000'][:2] == (True, []))
+    success, runs, directory = results['0']
+    files = sorted(os.listdir(os.path.join(directory, runs[0]))) if len(runs) == 1 else []
+    ok &= check('run_model.py 與模型子程序寫入同一目錄', success and '_har_' in runs[0]
+                and files == ['meta.json', 'profile.pstats', 'profile.txt', 'run_model.json'], f'{runs} {files}')
+    if files:
+        with open(os.path.join(directory, runs[0], 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(os.path.join(directory, runs[0], 'run_model.json'), 'r', encoding='utf-8') as f:
+            wrapper = json.load(f)
+        ok &= check('子程序記錄啟動時間、包裝程序記錄總耗時',
+                    meta['name'] == 'har' and meta['startup_seconds'] is not None and meta['startup_seconds'] >= 0
+                    and wrapper['returncode'] == 0 and wrapper['elapsed_seconds'] >= meta['elapsed_seconds']
+                    and wrapper['input']['sha256'] == meta['input']['sha256'])
+    return ok
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("慢速執行剖析擷取測試")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['STOCK_PROFILE_DIR'] = os.path.join(tmp, 'profiles')
+        os.environ['STOCK_MODEL_CACHE_DIR'] = os.path.join(tmp, 'model_cache')
+        ok = test_capture(tmp)
+        ok &= test_rotation(tmp)
+        ok &= test_run_model(tmp)
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
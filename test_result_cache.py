@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+模型結果快取測試腳本
+驗證快取鍵包含模型另外讀取的檔案：重新訓練 LSTM 權重後 lstm_numpy 不再回傳舊結果，
+LSTM 最佳設定、GARCH 最佳設定備忘與序列篩檢結果變動時快取鍵隨之改變
+"""
+
+import sys
+import os
+import json
+import time
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python', 'models'))
+
+
+def make_prices(seed, length=200):
+    """產生模擬股價"""
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.01, length)))
+
+
+def train_weights(path, seed):
+    """訓練小型 LSTM 並匯出權重"""
+    from lstm_model import LSTMPredictor
+    import tensorflow as tf
+    tf.random.set_seed(seed)
+    predictor = LSTMPredictor(lookback=30, units=16, epochs=2 + seed)
+    predictor.train(make_prices(seed))
+    predictor.export_weights(path, {'stock_symbol': 'TEST'})
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("模型結果快取測試")
+    print("="*60)
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['STOCK_MODEL_CACHE_DIR'] = os.path.join(tmp, 'model_cache')
+        os.environ['STOCK_LSTM_CONFIG_DIR'] = os.path.join(tmp, 'lstm_configs')
+        os.environ['STOCK_GARCH_SPEC_DIR'] = os.path.join(tmp, 'garch_specs')
+        os.environ['STOCK_SCREENING_DIR'] = os.path.join(tmp, 'screening')
+
+        from run_model import run_with_cache
+        from result_cache import cache_key
+        from lstm_search import save_best_config
+        from series_screening import save_results
+
+        # 1. lstm_numpy：重新訓練權重後快取失效
+        weights_path = os.path.join(tmp, 'TEST.npz')
+        train_weights(weights_path, 0)
+        input_data = {'prices': [round(float(p), 4) for p in make_prices(7)], 'prediction_days': 3,
+                      'base_date': '2025-01-01', 'stock_symbol': 'TEST', 'weights_path': weights_path}
+        input_file = os.path.join(tmp, 'input.json')
+        with open(input_file, 'w', encoding='utf-8') as f:
+            json.dump(input_data, f)
+
+        first = run_with_cache('lstm_numpy', input_file)
+        second = run_with_cache('lstm_numpy', input_file)
+        print(f"第一次: 命中 {first['cache']['hit']}；第二次: 命中 {second['cache']['hit']}")
+        ok &= first['success'] and not first['cache']['hit'] and second['cache']['hit']
+        ok &= first['predictions'] == second['predictions']
+
+        # 確保修改時間不同（部分檔案系統時間解析度較粗）
+        time.sleep(0.05)
+        train_weights(weights_path, 1)
+        retrained = run_with_cache('lstm_numpy', input_file)
+        changed = retrained['predictions'] != first['predictions']
+        print(f"重新訓練後: 命中 {retrained['cache']['hit']}，預測改變 {changed}")
+        ok &= not retrained['cache']['hit'] and changed
+
+        # 2. 其他模型讀取的檔案
+        base = {'prices': input_data['prices'], 'stock_symbol': 'TEST', 'prediction_days': 3}
+
+        def key_changes(model_type, data, update):
+            before = cache_key(model_type, data)
+            time.sleep(0.05)
+            update()
+            return cache_key(model_type, data) != before
+
+        lstm = key_changes('lstm', base, lambda: save_best_config('TEST', {'config': {'units': 64}}))
+        print(f"LSTM 最佳設定更新後快取鍵改變: {lstm}")
+        ok &= lstm
+
+        arima = key_changes('arima', base, lambda: save_results({}, as_of='2025-01-01'))
+        fixed = cache_key('arima', {**base, 'p': 1, 'd': 1, 'q': 1})
+        save_results({}, as_of='2025-01-02')
+        fixed_same = cache_key('arima', {**base, 'p': 1, 'd': 1, 'q': 1}) == fixed
+        print(f"ARIMA 篩檢結果更新後快取鍵改變: {arima}；指定階數時不受影響: {fixed_same}")
+        ok &= arima and fixed_same
+
+        def write_spec():
+            os.makedirs(os.environ['STOCK_GARCH_SPEC_DIR'], exist_ok=True)
+            with open(os.path.join(os.environ['STOCK_GARCH_SPEC_DIR'], 'TEST.json'), 'w') as f:
+                json.dump({'spec': {'vol': 'GJR'}}, f)
+
+        garch = key_changes('garch', {**base, 'select': True}, write_spec)
+        plain = key_changes('garch', base, write_spec)
+        print(f"GARCH 最佳設定備忘更新後快取鍵改變: {garch}；未啟用 select 時不受影響: {not plain}")
+        ok &= garch and not plain
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
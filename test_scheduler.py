@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+模型工作排程器測試腳本
+驗證 CPU 預算轉成的執行緒環境變數、各成本等級的預設預算、依重→輕順序分配核心與降級啟動，
+以及子程序實際收到的執行緒環境變數與 CPU 親和性（以探測腳本取代模型）
+"""
+
+import sys
+import os
+import json
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python'))
+
+from scheduler import (ModelJobScheduler, CpuBudget, budget_for, available_cpus,
+                       THREAD_ENV_VARS, CLASS_THREADS)
+
+# 探測腳本：輸出收到的執行緒環境變數與 CPU 親和性
+PROBE_SCRIPT = '''
+import sys, os, json
+names = %r + ['TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS']
+affinity = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else None
+print(json.dumps({'success': True, 'env': {n: os.environ.get(n) for n in names}, 'affinity': affinity,
+                  'input_file': sys.argv[1]}))
+''' % THREAD_ENV_VARS
+
+FAILING_SCRIPT = '''
+import sys
+sys.stderr.write('boom')
+sys.exit(1)
+'''
+
+
+def check(name, passed, detail=''):
+    print(f"{'✅' if passed else '❌'} {name}{'：' + detail if detail else ''}")
+    return passed
+
+
+def test_budget():
+    ok = True
+    env = CpuBudget(3, [0, 1, 2]).to_env()
+    ok &= check('預算轉為執行緒環境變數',
+                all(env[name] == '3' for name in THREAD_ENV_VARS)
+                and env['TF_NUM_INTRAOP_THREADS'] == '3' and env['TF_NUM_INTEROP_THREADS'] == '2')
+    ok &= check('執行緒數至少為 1', CpuBudget(0).threads == 1 and CpuBudget(1).to_env()['TF_NUM_INTEROP_THREADS'] == '1')
+
+    threads = {model: budget_for(model, 8).threads for model in ('lstm', 'arima', 'garch', 'unknown')}
+    ok &= check('各成本等級預設預算', threads == {'lstm': 4, 'arima': 2, 'garch': 1, 'unknown': 2}, str(threads))
+    ok &= check('預算不超過可用核心數', budget_for('lstm', 2).threads == 2)
+    return ok
+
+
+def test_packing():
+    """以虛擬的 6 個核心驗證分配順序（不啟動子程序）"""
+    ok = True
+    scheduler = ModelJobScheduler()
+    scheduler.cpus = list(range(6))
+    scheduler.free_cpus = list(range(6))
+    for model in ('garch', 'lstm', 'har', 'arima', 'lstm'):
+        scheduler.submit(model, 'input.json')
+
+    picks = []
+    while True:
+        job, threads = scheduler._next_job()
+        if job is None:
+            break
+        picks.append((job.model_type, threads))
+        scheduler.free_cpus = scheduler.free_cpus[threads:]
+    ok &= check('先放重型工作，再以較輕工作填滿核心', picks == [('lstm', 4), ('arima', 2)], str(picks))
+
+    # 剩 3 核心：第二個 lstm 放不下預設的 4 核心，先啟動輕型工作，最後以剩餘核心降級啟動 lstm
+    scheduler.free_cpus = [0, 1, 2]
+    picks = []
+    while True:
+        job, threads = scheduler._next_job()
+        if job is None:
+            break
+        picks.append((job.model_type, threads))
+        scheduler.free_cpus = scheduler.free_cpus[threads:]
+    ok &= check('放不下重型工作時先啟動輕型工作，再以剩餘核心降級啟動',
+                picks == [('garch', 1), ('har', 1), ('lstm', 1)], str(picks))
+    return ok
+
+
+def test_subprocess():
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, 'models'))
+        with open(os.path.join(tmp, 'models', 'probe_model.py'), 'w') as f:
+            f.write(PROBE_SCRIPT)
+        with open(os.path.join(tmp, 'models', 'failing_model.py'), 'w') as f:
+            f.write(FAILING_SCRIPT)
+
+        scheduler = ModelJobScheduler()
+        scheduler.script_dir = tmp
+        for i in range(3):
+            scheduler.submit('probe', f'input_{i}.json')
+        scheduler.submit('failing', 'input_failing.json')
+        results = {r['result'].get('input_file', r['job_id']): r for r in scheduler.run()}
+
+        cpus = available_cpus()
+        threads = min(CLASS_THREADS['medium'], len(cpus))
+        for i in range(3):
+            result = results[f'input_{i}.json']
+            budget = result['budget']
+            env = result['result']['env']
+            passed = (budget['threads'] == threads and len(budget['cpus']) == threads
+                      and all(env[name] == str(threads) for name in THREAD_ENV_VARS)
+                      and env['TF_NUM_INTRAOP_THREADS'] == str(threads))
+            if result['result']['affinity'] is not None:
+                passed &= result['result']['affinity'] == budget['cpus']
+            ok &= check(f'子程序 {i} 的執行緒環境變數與 CPU 親和性', passed,
+                        f"預算 {budget}，親和性 {result['result']['affinity']}")
+
+        failed = results[3]['result']
+        ok &= check('模型失敗時回傳 stderr', not failed['success'] and 'boom' in failed['error'])
+        ok &= check('所有核心歸還', sorted(scheduler.free_cpus) == scheduler.cpus)
+    return ok
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print(f"模型工作排程器測試（可用核心: {available_cpus()}）")
+    print("="*60)
+
+    ok = test_budget()
+    ok &= test_packing()
+    ok &= test_subprocess()
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+預測準確度批次計算測試腳本
+以 SQLite 建立模擬股價與預測，驗證向量化評分與逐筆計算一致、
+分兩次（價格陸續實現）增量計算的摘要與一次重建相同，並量測處理速度；
+以及目標交易日由基準日（輸入最後價格日）起算、同一基準日的重複預測只計入摘要一次
+"""
+
+import sys
+import os
+import time
+import sqlite3
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python'))
+
+from db import Database
+from score_predictions import AccuracyTracker, STOCK_TYPE, SUM_COLUMNS
+
+N_STOCKS, N_DAYS, HORIZONS = 100, 300, 5
+MODELS = ('lstm', 'arima', 'garch', 'har')
+
+
+def build_database(path, seed=0):
+    """建立股價與預測資料，回傳 (db, 交易日列表)"""
+    rng = np.random.default_rng(seed)
+    db = Database(path)
+    db.ensure_schema()
+
+    dates = pd.bdate_range('2025-01-01', periods=N_DAYS).strftime('%Y-%m-%d').tolist()
+    db.executemany('INSERT INTO stocks (id, symbol, name) VALUES (?, ?, ?)',
+                   [(i, str(1100 + i), f'股票{i}') for i in range(1, N_STOCKS + 1)])
+
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (N_STOCKS, N_DAYS)), axis=1))
+    prices = [(s + 1, dates[d], c, c, c, c) for s in range(N_STOCKS) for d, c in enumerate(closes[s])]
+    db.executemany('INSERT INTO stock_prices (stock_id, trade_date, open, high, low, close) '
+                   'VALUES (?, ?, ?, ?, ?, ?)', prices)
+
+    rows = []
+    for s in range(N_STOCKS):
+        for d in range(N_DAYS):
+            for model in MODELS:
+                for h in range(1, HORIZONS + 1):
+                    predicted = closes[s, d] * (1 + rng.normal(0, 0.02 * np.sqrt(h)))
+                    width = closes[s, d] * 0.04 * np.sqrt(h)
+                    rows.append((STOCK_TYPE, s + 1, model, dates[d], h, round(predicted, 4),
+                                 round(predicted + width, 4), round(predicted - width, 4)))
+    db.executemany('INSERT INTO predictions (predictable_type, predictable_id, model_type, prediction_date, '
+                   'prediction_days, predicted_price, upper_bound, lower_bound) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+    db.commit()
+    return db, dates
+
+
+def brute_force(db):
+    """逐筆計算（每筆預測查詢目標交易日收盤價），作為對照"""
+    prices = pd.DataFrame(db.execute('SELECT stock_id, trade_date, close FROM stock_prices '
+                                     'ORDER BY stock_id, trade_date').fetchall(),
+                          columns=['stock_id', 'trade_date', 'close'])
+    series = {s: (g['trade_date'].tolist(), g['close'].tolist()) for s, g in prices.groupby('stock_id')}
+    totals = {}
+    for _, stock_id, model, date, h, predicted, upper, lower in db.execute(
+            'SELECT id, predictable_id, model_type, prediction_date, prediction_days, predicted_price, '
+            'upper_bound, lower_bound FROM predictions').fetchall():
+        days, closes = series[stock_id]
+        index = next((i for i, d in enumerate(days) if d > date), None)
+        if index is None or index + h - 1 >= len(days):
+            continue
+        actual = closes[index + h - 1]
+        entry = totals.setdefault((stock_id, model, h), [0, 0.0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += abs(predicted - actual)
+        entry[2] += (predicted - actual) ** 2
+        entry[3] += int(lower <= actual <= upper)
+    return totals
+
+
+def read_summary(db):
+    rows = db.execute(f'SELECT predictable_id, model_type, horizon, {", ".join(SUM_COLUMNS)}, mae, coverage '
+                      'FROM prediction_accuracies ORDER BY predictable_id, model_type, horizon').fetchall()
+    return pd.DataFrame(rows, columns=['predictable_id', 'model_type', 'horizon'] + SUM_COLUMNS + ['mae', 'coverage'])
+
+
+def test_base_date(path):
+    """開盤前預測（基準日為前一交易日）的目標日與重複預測"""
+    db = Database(path)
+    db.ensure_schema()
+    dates = pd.bdate_range('2025-03-03', periods=10).strftime('%Y-%m-%d').tolist()
+    db.execute('INSERT INTO stocks (id, symbol, name) VALUES (1, ?, ?)', ('2330', '台積電'))
+    db.executemany('INSERT INTO stock_prices (stock_id, trade_date, open, high, low, close) VALUES (1, ?, ?, ?, ?, ?)',
+                   [(d, 100 + i, 100 + i, 100 + i, 100 + i) for i, d in enumerate(dates)])
+    insert = ('INSERT INTO predictions (predictable_type, predictable_id, model_type, prediction_date, base_date, '
+              'prediction_days, predicted_price) VALUES (?, 1, ?, ?, ?, ?, ?)')
+    # 第 3 個交易日開盤前預測：輸入最後價格為第 2 個交易日，第 1 天目標為第 3 個交易日（收盤 102）
+    db.executemany(insert, [(STOCK_TYPE, 'arima', dates[2], dates[1], 1, 102.0),
+                            (STOCK_TYPE, 'arima', dates[2], dates[1], 2, 103.0)])
+    # 舊資料（無基準日）以預測日起算；同日重複檢視的相同預測只計入一次
+    db.executemany(insert, [(STOCK_TYPE, 'garch', dates[2], None, 1, 103.0)] * 3)
+    db.commit()
+
+    try:
+        db.execute(insert, (STOCK_TYPE, 'arima', dates[2], dates[1], 1, 110.0))
+        unique = False
+    except sqlite3.IntegrityError:
+        unique = True
+    db.rollback()
+
+    stats = AccuracyTracker(db).run()
+    summary = read_summary(db).set_index(['model_type', 'horizon'])
+    unscored = db.execute('SELECT COUNT(*) FROM predictions WHERE mae IS NULL').fetchone()[0]
+    print(f"基準日: 評分 {stats['scored']} 筆，重複 {stats['duplicates']} 筆，摘要 {len(summary)} 列，"
+          f"同基準日重複寫入{'被拒絕' if unique else '未被拒絕'}")
+    ok = unique and stats['scored'] == 5 and stats['duplicates'] == 2 and unscored == 0
+    ok &= summary.loc[('arima', 1), 'sum_abs_error'] == 0 and summary.loc[('arima', 2), 'sum_abs_error'] == 0
+    ok &= summary.loc[('garch', 1), 'sample_count'] == 1 and summary.loc[('garch', 1), 'sum_abs_error'] == 0
+
+    # 重複的預測在之後的批次才實現時，也不再計入
+    db.execute(insert, (STOCK_TYPE, 'garch', dates[2], None, 1, 103.0))
+    db.commit()
+    again = AccuracyTracker(db).run()
+    ok &= again['scored'] == 1 and again['duplicates'] == 1 and read_summary(db)['sample_count'].sum() == 3
+    db.close()
+    return ok
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("預測準確度批次計算測試")
+    print("="*60)
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'accuracy.sqlite')
+        db, dates = build_database(path)
+        total = db.execute('SELECT COUNT(*) FROM predictions').fetchone()[0]
+
+        # 1. 價格只到第 200 個交易日時的第一次評分
+        cutoff = dates[200]
+        removed = db.execute('SELECT stock_id, trade_date, open, high, low, close FROM stock_prices '
+                             'WHERE trade_date > ?', (cutoff,)).fetchall()
+        db.execute('DELETE FROM stock_prices WHERE trade_date > ?', (cutoff,))
+        db.commit()
+
+        started = time.perf_counter()
+        first = AccuracyTracker(db, chunk_size=100000).run()
+        elapsed = time.perf_counter() - started
+        print(f"預測 {total:,} 筆，第一次評分 {first['scored']:,} 筆，{elapsed:.2f}s "
+              f"（{first['pending'] / elapsed:,.0f} 筆/秒）")
+
+        # 2. 其餘價格實現後增量評分（已評分的預測不重算）
+        db.executemany('INSERT INTO stock_prices (stock_id, trade_date, open, high, low, close) '
+                       'VALUES (?, ?, ?, ?, ?, ?)', removed)
+        db.commit()
+        started = time.perf_counter()
+        second = AccuracyTracker(db, chunk_size=100000).run()
+        print(f"增量評分: 待評分 {second['pending']:,} 筆，評分 {second['scored']:,} 筆，"
+              f"{time.perf_counter() - started:.2f}s")
+        incremental = read_summary(db)
+
+        # 3. 再執行一次不應有任何變化
+        third = AccuracyTracker(db).run()
+        print(f"重複執行: 評分 {third['scored']} 筆")
+        ok &= third['scored'] == 0
+
+        # 4. 重建結果與增量相同
+        tracker = AccuracyTracker(db)
+        tracker.rebuild()
+        rebuilt = tracker.run()
+        full = read_summary(db)
+        diff = (incremental[SUM_COLUMNS].to_numpy(float) - full[SUM_COLUMNS].to_numpy(float))
+        print(f"重建: 評分 {rebuilt['scored']:,} 筆，摘要 {len(full)} 列，與增量最大差異 {np.abs(diff).max():.2e}")
+        ok &= first['scored'] + second['scored'] == rebuilt['scored']
+        ok &= len(full) == len(incremental) and np.abs(diff).max() < 1e-6
+
+        # 5. 與逐筆計算比較
+        expected = brute_force(db)
+        got = {(r.predictable_id, r.model_type, r.horizon): r for r in full.itertuples()}
+        worst = 0.0
+        for key, (n, abs_sum, sq_sum, hits) in expected.items():
+            row = got[key]
+            ok &= row.sample_count == n and row.interval_hits == hits
+            worst = max(worst, abs(row.sum_abs_error - abs_sum), abs(row.sum_squared_error - sq_sum))
+        print(f"逐筆對照: {len(expected)} 組，最大誤差 {worst:.2e}")
+        ok &= len(expected) == len(got) and worst < 1e-6
+
+        # 區間命中率應接近模擬設定（±2σ 約 95%）
+        coverage = full['interval_hits'].sum() / full['interval_count'].sum() * 100
+        unscored = db.execute('SELECT COUNT(*) FROM predictions WHERE mae IS NULL').fetchone()[0]
+        print(f"整體區間命中率 {coverage:.1f}%，未實現預測 {unscored} 筆")
+        ok &= unscored == total - rebuilt['scored']
+        db.close()
+
+        # 6. 基準日與重複預測
+        ok &= test_base_date(os.path.join(tmp, 'base_date.sqlite'))
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+序列相關與 ARCH 效應批次篩檢測試腳本
+以模擬報酬率（白噪音 / AR(1) / GARCH(1,1)）驗證向量化 Ljung-Box 與 ARCH-LM 與 statsmodels 逐檔計算相同、
+各類序列的檢出率，並驗證 GARCH / ARIMA 模型依篩檢結果略過模型選擇與階數搜尋
+"""
+
+import sys
+import os
+import json
+import time
+import tempfile
+import subprocess
+import warnings
+warnings.filterwarnings('ignore')
+
+import numpy as np
+from statsmodels.stats.diagnostic import acorr_ljungbox, het_arch
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python', 'models')
+sys.path.insert(0, MODELS_DIR)
+
+from series_screening import screen_prices, save_results, lookup, ljung_box, arch_lm
+
+N_PER_KIND, N_DAYS = 300, 600
+
+
+def simulate(seed=0):
+    """模擬三類價格序列，回傳 {代號: 價格}, {代號: 類別}"""
+    rng = np.random.default_rng(seed)
+    series, kinds = {}, {}
+    for k in range(N_PER_KIND):
+        noise = rng.standard_normal((3, N_DAYS))
+
+        # 白噪音
+        white = noise[0] * 0.015
+
+        # AR(1) 報酬率
+        ar = np.zeros(N_DAYS)
+        for t in range(1, N_DAYS):
+            ar[t] = 0.25 * ar[t - 1] + noise[1, t] * 0.015
+
+        # GARCH(1,1) 報酬率
+        garch = np.zeros(N_DAYS)
+        variance = 0.015 ** 2
+        for t in range(N_DAYS):
+            garch[t] = np.sqrt(variance) * noise[2, t]
+            variance = 0.05 * 0.015 ** 2 + 0.15 * garch[t] ** 2 + 0.8 * variance
+
+        for kind, returns in (('white', white), ('ar', ar), ('garch', garch)):
+            symbol = f'{kind[0].upper()}{k:04d}'
+            series[symbol] = 100 * np.exp(np.cumsum(returns))
+            kinds[symbol] = kind
+    return series, kinds
+
+
+def run_model(script, input_data, env):
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump(input_data, f)
+    try:
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, os.path.join(MODELS_DIR, script), f.name],
+                                capture_output=True, text=True, env=env, timeout=600).stdout
+        return json.loads(output), time.perf_counter() - started
+    finally:
+        os.unlink(f.name)
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("序列相關與 ARCH 效應批次篩檢測試")
+    print("="*60)
+
+    ok = True
+    series, kinds = simulate()
+
+    # 1. 向量化篩檢與逐檔 statsmodels 比較
+    started = time.perf_counter()
+    results = screen_prices(series, window=N_DAYS)
+    vectorized = time.perf_counter() - started
+
+    returns = np.column_stack([np.diff(np.log(series[s])) * 100 for s in series])
+    lb_stat, _ = ljung_box(returns)
+    lm_stat, _ = arch_lm(returns)
+    started = time.perf_counter()
+    worst = 0.0
+    for k in range(returns.shape[1]):
+        lb = acorr_ljungbox(returns[:, k], lags=10, return_df=True)['lb_stat'].iloc[-1]
+        lm = het_arch(returns[:, k], nlags=5)[0]
+        worst = max(worst, abs(lb - lb_stat[k]) / lb, abs(lm - lm_stat[k]) / max(lm, 1e-12))
+    looped = time.perf_counter() - started
+    print(f"{len(series)} 檔 × {N_DAYS} 天：向量化 {vectorized * 1000:.0f}ms，statsmodels 逐檔 {looped:.2f}s "
+          f"（{looped / vectorized:.0f} 倍），最大相對差異 {worst:.2e}")
+    ok &= worst < 1e-8
+
+    # 2. 各類序列的檢出率
+    for kind in ('white', 'ar', 'garch'):
+        members = [results[s] for s in series if kinds[s] == kind]
+        serial = np.mean([r['serial_correlation'] for r in members]) * 100
+        arch = np.mean([r['arch_effect'] for r in members]) * 100
+        print(f"  {kind:6s}: 序列相關 {serial:5.1f}%，ARCH 效應 {arch:5.1f}%")
+        if kind == 'white':
+            ok &= serial < 10 and arch < 10
+        elif kind == 'ar':
+            ok &= serial > 90
+        else:
+            ok &= arch > 90
+
+    # 3. 模型依篩檢結果略過昂貴的估計
+    with tempfile.TemporaryDirectory() as tmp:
+        save_results(results, as_of='2025-01-01', window=N_DAYS, directory=tmp)
+        env = {**os.environ, 'STOCK_SCREENING_DIR': tmp, 'STOCK_GARCH_SPEC_DIR': os.path.join(tmp, 'specs')}
+        ok &= lookup('W0000', directory=tmp) is not None and lookup('NONE', directory=tmp) is None
+
+        white = next(s for s in series if kinds[s] == 'white' and not results[s]['arch_effect']
+                     and not results[s]['serial_correlation'])
+        garch = next(s for s in series if kinds[s] == 'garch' and results[s]['arch_effect'])
+        for symbol in (white, garch):
+            prices = [round(float(p), 4) for p in series[symbol][-400:]]
+            base = {'prices': prices, 'base_date': '2025-01-01', 'prediction_days': 5, 'stock_symbol': symbol}
+            output, elapsed = run_model('garch_model.py', {**base, 'select': True}, env)
+            selection = output.get('selection', {})
+            print(f"  GARCH {symbol}: {output['model_info']['order']} {output['model_info']['dist']}，"
+                  f"選擇 {'略過' if selection.get('skipped') else str(selection.get('candidates')) + ' 組'}，{elapsed:.2f}s")
+            ok &= output['success'] and bool(selection.get('skipped')) == (symbol == white)
+
+        prices = [round(float(p), 4) for p in series[white][-400:]]
+        output, elapsed = run_model('arima_model.py', {'prices': prices, 'base_date': '2025-01-01',
+                                                       'prediction_days': 5, 'stock_symbol': white}, env)
+        print(f"  ARIMA {white}: order {output['model_info']['order']}，{elapsed:.2f}s")
+        ok &= output['success'] and output['model_info']['order'] == [0, 1, 0]
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+串流技術指標引擎測試腳本
+與逐筆重算的參考實作（BacktestService.php 的 MACD / 標準差算法、Wilder RSI / ATR）比對，
+並驗證檢查點還原、盤中暫定指標不改變狀態，以及大量股票的每秒更新筆數
+"""
+
+import sys
+import os
+import time
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python', 'models'))
+
+from streaming_indicators import IndicatorEngine, DEFAULT_PARAMS
+
+TOLERANCE = 1e-8
+
+
+def reference(close, high, low, p=DEFAULT_PARAMS):
+    """逐筆重算的參考指標（每個時間點都從完整歷史計算）"""
+    n = len(close)
+    out = {name: np.full(n, np.nan) for name in ('sma', 'ema', 'macd', 'macd_signal', 'rsi', 'bb_middle', 'bb_upper', 'atr')}
+
+    # BacktestService::calculateMACD
+    fast = slow = signal = ema = None
+    for i in range(n):
+        a = lambda period: 2 / (period + 1)
+        ema = close[i] if i == 0 else close[i] * a(p['ema_period']) + ema * (1 - a(p['ema_period']))
+        fast = close[i] if i == 0 else close[i] * a(p['macd_fast']) + fast * (1 - a(p['macd_fast']))
+        slow = close[i] if i == 0 else close[i] * a(p['macd_slow']) + slow * (1 - a(p['macd_slow']))
+        macd = fast - slow
+        signal = macd if i < p['macd_signal'] else macd * a(p['macd_signal']) + signal * (1 - a(p['macd_signal']))
+        out['ema'][i], out['macd'][i], out['macd_signal'][i] = ema, macd, signal
+
+    for i in range(n):
+        if i + 1 >= p['sma_period']:
+            out['sma'][i] = close[i + 1 - p['sma_period']:i + 1].mean()
+        if i + 1 >= p['bb_period']:
+            window = close[i + 1 - p['bb_period']:i + 1]
+            # BacktestService::calculateStdDev（母體標準差）
+            std = np.sqrt(np.sum((window - window.mean()) ** 2) / len(window))
+            out['bb_middle'][i] = window.mean()
+            out['bb_upper'][i] = window.mean() + p['bb_std'] * std
+
+    # Wilder RSI
+    period = p['rsi_period']
+    changes = np.diff(close)
+    for i in range(period, n):
+        gains, losses = np.maximum(changes[:i], 0), np.maximum(-changes[:i], 0)
+        avg_gain, avg_loss = gains[:period].mean(), losses[:period].mean()
+        for g, l in zip(gains[period:], losses[period:]):
+            avg_gain = (avg_gain * (period - 1) + g) / period
+            avg_loss = (avg_loss * (period - 1) + l) / period
+        out['rsi'][i] = 100.0 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss)
+
+    # Wilder ATR
+    period = p['atr_period']
+    tr = np.concatenate([[high[0] - low[0]], np.maximum(high[1:] - low[1:], np.maximum(
+        np.abs(high[1:] - close[:-1]), np.abs(low[1:] - close[:-1])))])
+    for i in range(period - 1, n):
+        atr = tr[:period].mean()
+        for value in tr[period:i + 1]:
+            atr = (atr * (period - 1) + value) / period
+        out['atr'][i] = atr
+    return out
+
+
+def make_history(rng, length):
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+    high = close * (1 + np.abs(rng.normal(0, 0.01, length)))
+    low = close * (1 - np.abs(rng.normal(0, 0.01, length)))
+    return {'close': close, 'high': high, 'low': low}
+
+
+def main():
+    """主函數"""
+    print("\n" + "="*60)
+    print("串流技術指標引擎測試")
+    print("="*60)
+    ok = True
+    rng = np.random.default_rng(0)
+
+    # 1. 與參考實作逐筆比對（不同長度的歷史、逐筆更新）
+    histories = {f'S{i}': make_history(rng, length) for i, length in enumerate([5, 30, 120, 200])}
+    engine = IndicatorEngine(list(histories))
+    worst = 0.0
+    for symbol, h in histories.items():
+        ref = reference(h['close'], h['high'], h['low'])
+        for t in range(len(h['close'])):
+            values = engine.update([symbol], h['close'][t], h['high'][t], h['low'][t])
+            for name, series in ref.items():
+                expected = series[t]
+                got = values[name][0]
+                if np.isnan(expected) != np.isnan(got):
+                    print(f"❌ {symbol} t={t} {name}: 預期 {expected}，得到 {got}")
+                    ok = False
+                elif not np.isnan(expected):
+                    worst = max(worst, abs(got - expected) / max(1.0, abs(expected)))
+    print(f"逐筆比對最大相對誤差: {worst:.2e}")
+    ok &= worst < TOLERANCE
+
+    # 2. 批次初始化與逐筆更新結果相同
+    bulk = IndicatorEngine.from_history(histories)
+    diff = max(np.nanmax(np.abs(bulk.values()[name] - engine.values()[name])) if not np.isnan(engine.values()[name]).all() else 0
+               for name in ('sma', 'ema', 'macd', 'rsi', 'bb_upper', 'atr'))
+    print(f"批次初始化差異: {diff:.2e}")
+    ok &= diff < TOLERANCE
+
+    # 3. 盤中暫定指標不改變狀態；檢查點還原後繼續更新結果一致
+    before = engine.values()['rsi'].copy()
+    engine.peek(['S3'], 150.0, 151.0, 149.0)
+    ok &= np.array_equal(before, engine.values()['rsi'], equal_nan=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'state.npz')
+        engine.save(path)
+        restored = IndicatorEngine.load(path)
+    a = engine.update(list(histories), 101.0, 102.0, 100.0)
+    b = restored.update(list(histories), 101.0, 102.0, 100.0)
+    same = all(np.array_equal(a[name], b[name], equal_nan=True) for name in a)
+    print(f"檢查點還原後更新一致: {same}")
+    ok &= same
+
+    # 4. 長時間更新後累計和重新同步
+    drift_engine = IndicatorEngine(['X'])
+    series = 1000 + np.cumsum(rng.normal(0, 1, 20000))
+    for price in series:
+        values = drift_engine.update(['X'], price)
+    expected = series[-DEFAULT_PARAMS['bb_period']:]
+    error = abs(values['bb_upper'][0] - (expected.mean() + 2 * expected.std()))
+    print(f"20000 筆後布林上軌誤差: {error:.2e}")
+    ok &= error < 1e-6
+
+    # 5. 吞吐量
+    n_symbols = 5000
+    symbols = [f'{1000 + i}' for i in range(n_symbols)]
+    started = time.perf_counter()
+    big = IndicatorEngine.from_history({s: {'close': 100 + np.cumsum(rng.normal(0, 1, 250))} for s in symbols})
+    init_seconds = time.perf_counter() - started
+
+    prices = 100 + rng.normal(0, 1, (100, n_symbols))
+    started = time.perf_counter()
+    for row in prices:
+        big.update(symbols, row)
+    batch_rate = prices.size / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for i in range(5000):
+        big.update(symbols[i % n_symbols], 100.0 + i % 7)
+    single_rate = 5000 / (time.perf_counter() - started)
+
+    print(f"初始化 {n_symbols} 檔 × 250 日: {init_seconds:.2f}s")
+    print(f"向量化更新: {batch_rate:,.0f} 筆/秒；逐檔更新: {single_rate:,.0f} 筆/秒")
+    ok &= single_rate > 1000
+
+    print("\n✅ 測試通過" if ok else "\n❌ 測試失敗")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -174,7 +174,7 @@ public function test_run_returns_422_with_prediction_days_too_large(): void
     }
 
     // ==========================================
-    // POST /api/predictions/lstm|arima|garch — 捷徑路由
+    // POST /api/predictions/lstm|arima|garch|har — 捷徑路由
     // ==========================================
 
     public function test_lstm_shortcut_returns_422_without_target(): void
@@ -195,4 +195,10 @@ public function test_garch_shortcut_returns_422_without_target(): void
         $response = $this->postJson('/api/predictions/garch', []);
         $response->assertStatus(422);
     }
+
+    public function test_har_shortcut_returns_422_without_target(): void
+    {
+        $response = $this->postJson('/api/predictions/har', []);
+        $response->assertStatus(422);
+    }
 }